@@ -75,6 +75,10 @@ DATABASE_URL = os.getenv('DATABASE_URL')
 MAKE_WEBHOOK_TIMEOUT = int(os.getenv("MAKE_WEBHOOK_TIMEOUT", 10))  # Таймаут в секундах
 MAKE_WEBHOOK_RETRIES = int(os.getenv("MAKE_WEBHOOK_RETRIES", 3))
 MAKE_WEBHOOK_RETRY_DELAY = int(os.getenv("MAKE_WEBHOOK_RETRY_DELAY", 5))  # Задержка между попытками в секундах
+MAKE_WEBHOOK_CONNECT_TIMEOUT = int(os.getenv("MAKE_WEBHOOK_CONNECT_TIMEOUT", 5))  # Таймаут установки соединения
+MAKE_WEBHOOK_POOL_LIMIT = int(os.getenv("MAKE_WEBHOOK_POOL_LIMIT", 50))  # Всего соединений в пуле
+MAKE_WEBHOOK_LIMIT_PER_HOST = int(os.getenv("MAKE_WEBHOOK_LIMIT_PER_HOST", 8))  # Соединений на один хост
+MAKE_WEBHOOK_DRAIN_TIMEOUT = int(os.getenv("MAKE_WEBHOOK_DRAIN_TIMEOUT", 30))  # Ожидание незавершённых отправок при остановке
 
 
 
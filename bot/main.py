@@ -28,6 +28,7 @@ from bot.handlers.webhook import router as webhook_handler_router
 from bot.handlers.payment_handler import router as payment_router
 from bot.middlewares.db_session import DbSessionMiddleware
 from bot.middlewares.user_middleware import UserMiddleware
+from bot.services.webhook_sender import start_webhook_client, close_webhook_client
 from bot.handlers.feedback import router as feedback_router
 from mini_app.app_handlers.handlers import router as mini_app_router
 from bot.config import (
@@ -233,6 +234,9 @@ async def main():
         # Инициализация базы данных
         await init_db()
 
+        # Общая сессия для отправки вебхуков (пул соединений на всё время работы бота)
+        await start_webhook_client()
+
         # Удаление вебхука
         await delete_webhook()
 
@@ -245,6 +249,8 @@ async def main():
         logger.exception("❌ Ошибка в функции main")
     finally:
         logger.info("🛑 Завершение работы приложения...")
+        # Дожидаемся отправляющихся вебхуков и закрываем сессию
+        await close_webhook_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
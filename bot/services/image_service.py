@@ -1,6 +1,7 @@
 # image_service.py
 
 import asyncio
+import copy
 import io
 import logging
 import os
@@ -8,13 +9,12 @@ import re
 import subprocess
 import textwrap
 from concurrent.futures import ThreadPoolExecutor
-from functools import partial
-from typing import Optional, Tuple
+from functools import lru_cache, partial
+from typing import List, Optional, Tuple
 
 from PIL import Image, ImageDraw
 from PIL.Image import Resampling
 from dotenv import load_dotenv
-from pygments import highlight
 from pygments.formatters import ImageFormatter
 from pygments.lexers import PythonLexer, JavaLexer, SqlLexer, GoLexer, get_lexer_by_name, TextLexer
 from pygments.styles import get_style_by_name
@@ -469,10 +469,12 @@ def wrap_text(task_text: str, max_line_length: int = 79) -> str:
     return '\n'.join(wrapped_lines)
 
 
+@lru_cache(maxsize=64)
 def get_lexer(language: str):
     """
     Автоматическое определение лексера Pygments для любого языка
-    Поддержка alias и популярных вариантов написания
+    Поддержка alias и популярных вариантов написания.
+    Лексеры не хранят состояние между разборами, поэтому кэшируются.
     """
     # Нормализуем название
     lang = language.lower().strip()
@@ -560,6 +562,103 @@ async def generate_image_if_needed(task: Task, user_chat_id: int) -> Optional[Im
         return None
 
 
+# Размеры шрифта кода, от крупного к мелкому
+CONSOLE_FONT_SIZES = tuple(range(50, 22, -2))
+# Область, в которую должен поместиться код; больший код рисуется
+# мельче, а при минимальном шрифте консоль просто растягивается
+MAX_CODE_WIDTH, MAX_CODE_HEIGHT = 2600, 2600
+
+
+@lru_cache(maxsize=None)
+def _get_console_formatter(font_size: int) -> ImageFormatter:
+    """
+    Прототип ImageFormatter для размера шрифта.
+    Pygments ищет шрифты через fc-list при каждом создании форматтера,
+    поэтому прототип создаётся один раз, а для рендера берётся его копия.
+    """
+    return ImageFormatter(
+        font_size=font_size,
+        style=get_style_by_name('monokai'),
+        line_numbers=True,  # 🔥 ВКЛЮЧЕНА НУМЕРАЦИЯ СТРОК
+        line_number_start=1,
+        line_number_fg='#888888',
+        line_number_bg='#272822',  # Цвет фона из темы monokai
+        image_pad=20,
+        line_pad=10,
+        background_color='#272822'  # Цвет фона из темы monokai
+    )
+
+
+def tokenize_code(code: str, lexer) -> Tuple[list, List[List[str]]]:
+    """
+    Разбирает код лексером один раз.
+
+    Returns:
+        (токены для рендера, фрагменты текста по строкам для замеров)
+        Разбиение повторяет ImageFormatter, чтобы замеры совпадали с рендером.
+    """
+    tokens = list(lexer.get_tokens(code))
+    lines: List[List[str]] = [[]]
+    for _ttype, value in tokens:
+        for line in value.expandtabs(4).splitlines(True):
+            text = line.rstrip('\n')
+            if text:
+                lines[-1].append(text)
+            if line.endswith('\n'):
+                lines.append([])
+    return tokens, lines
+
+
+def measure_code_image(formatter: ImageFormatter, lines: List[List[str]]) -> Tuple[int, int]:
+    """
+    Размер картинки кода, которую нарисует formatter, без рендера.
+    Последний элемент lines — строка после завершающего перевода строки.
+    """
+    text_width = formatter.fonts.get_text_size
+    max_line_length = max(
+        (sum(text_width(fragment)[0] for fragment in fragments) for fragments in lines),
+        default=0
+    )
+    width = max_line_length + formatter.line_number_width + 2 * formatter.image_pad
+    height = (len(lines) - 1) * (formatter.fonth + formatter.line_pad) + 2 * formatter.image_pad
+    return width, height
+
+
+def choose_console_font_size(lines: List[List[str]]) -> int:
+    """
+    Самый крупный шрифт, при котором код помещается в MAX_CODE_WIDTH x MAX_CODE_HEIGHT.
+    """
+    for font_size in CONSOLE_FONT_SIZES:
+        width, height = measure_code_image(_get_console_formatter(font_size), lines)
+        if width <= MAX_CODE_WIDTH and height <= MAX_CODE_HEIGHT:
+            return font_size
+    return CONSOLE_FONT_SIZES[-1]
+
+
+def render_code_image(tokens: list, font_size: int) -> Image.Image:
+    """Один финальный рендер подсвеченного кода."""
+    formatter = copy.copy(_get_console_formatter(font_size))
+    formatter.drawables = []
+    code_image_io = io.BytesIO()
+    formatter.format(tokens, code_image_io)
+    code_image_io.seek(0)
+    return Image.open(code_image_io).convert("RGBA")
+
+
+@lru_cache(maxsize=16)
+def _load_resized_logo(path: str, size: Tuple[int, int], mtime: float) -> Image.Image:
+    logo = Image.open(path).convert("RGBA")
+    return logo.resize(size, Resampling.LANCZOS)
+
+
+def load_logo(path: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Логотип нужного размера. Кэшируется по пути и времени изменения файла,
+    поэтому заменённый логотип подхватывается без перезапуска.
+    """
+    return _load_resized_logo(path, size, os.path.getmtime(path))
+
+
 def generate_console_image(task_text: str, language: str, logo_path: Optional[str] = None) -> Image.Image:
     """
     Генерация «консольного» изображения с подсветкой кода/текста и логотипом.
@@ -577,41 +676,11 @@ def generate_console_image(task_text: str, language: str, logo_path: Optional[st
 
     lexer = get_lexer(language)
 
-    # Начинаем с более крупного шрифта
-    font_size = 50
-    code_img = None
-    while font_size >= 24:
-        formatter = ImageFormatter(
-            font_size=font_size,
-            style=get_style_by_name('monokai'),
-            line_numbers=True,  # 🔥 ВКЛЮЧЕНА НУМЕРАЦИЯ СТРОК
-            line_number_start=1,
-            line_number_fg='#888888',
-            line_number_bg='#272822',  # Цвет фона из темы monokai
-            image_pad=20,
-            line_pad=10,
-            background_color='#272822'  # Цвет фона из темы monokai
-        )
-        code_image_io = io.BytesIO()
-        highlight(formatted_text.strip(), lexer, formatter, outfile=code_image_io)
-        code_image_io.seek(0)
-        tmp_code_img = Image.open(code_image_io).convert("RGBA")
-
-        console_width = max(MIN_CONSOLE_WIDTH, tmp_code_img.width + 160)
-        console_height = max(MIN_CONSOLE_HEIGHT, tmp_code_img.height + 240)
-        width = max(MIN_WIDTH, console_width + 300)
-        height = max(MIN_HEIGHT, console_height + 300)
-
-        if (tmp_code_img.width <= (console_width - 160)
-                and tmp_code_img.height <= (console_height - 240)):
-            code_img = tmp_code_img
-            logger.info(f"✅ Выбран размер шрифта: {font_size}")
-            break
-
-        font_size -= 2
-
-    if code_img is None:
-        code_img = tmp_code_img
+    # Разбираем код один раз, размер шрифта подбираем по замерам строк
+    tokens, lines = tokenize_code(formatted_text.strip(), lexer)
+    font_size = choose_console_font_size(lines)
+    logger.info(f"✅ Выбран размер шрифта: {font_size}")
+    code_img = render_code_image(tokens, font_size)
 
     console_width = max(MIN_CONSOLE_WIDTH, code_img.width + 160)
     console_height = max(MIN_CONSOLE_HEIGHT, code_img.height + 240)
@@ -650,9 +719,7 @@ def generate_console_image(task_text: str, language: str, logo_path: Optional[st
 
     if logo_path:
         try:
-            logo = Image.open(logo_path).convert("RGBA")
-            fixed_logo_size = (240, 240)
-            logo = logo.resize(fixed_logo_size, Resampling.LANCZOS)
+            logo = load_logo(logo_path, (240, 240))
             logo_x = width - logo.width - 30
             logo_y = 10
             image.paste(logo, (logo_x, logo_y), logo)
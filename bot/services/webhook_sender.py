@@ -1,9 +1,10 @@
 import asyncio
 import json
 import logging
+import random
 import ssl
 import uuid
-from typing import Dict
+from typing import Dict, Optional
 
 import aiohttp
 import certifi
@@ -11,7 +12,15 @@ from aiogram import Bot
 
 from bot.utils.markdownV2 import escape_markdown
 from bot.utils.url_validator import is_valid_url
-from bot.config import MAKE_WEBHOOK_TIMEOUT, MAKE_WEBHOOK_RETRIES, MAKE_WEBHOOK_RETRY_DELAY
+from bot.config import (
+    MAKE_WEBHOOK_CONNECT_TIMEOUT,
+    MAKE_WEBHOOK_DRAIN_TIMEOUT,
+    MAKE_WEBHOOK_LIMIT_PER_HOST,
+    MAKE_WEBHOOK_POOL_LIMIT,
+    MAKE_WEBHOOK_RETRIES,
+    MAKE_WEBHOOK_RETRY_DELAY,
+    MAKE_WEBHOOK_TIMEOUT,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,37 +32,150 @@ async def notify_admin(bot: Bot, admin_chat_id: int, message: str):
     except Exception as e:
         logger.error(f"Не удалось отправить сообщение администратору {admin_chat_id}: {e}")
 
-async def send_webhook(webhook_url: str, data: Dict, headers: Dict) -> bool:
+class WebhookHTTPClient:
     """
-    Отправляет данные на внешний вебхук с повторами при неудаче.
+    Общая на процесс бота aiohttp-сессия для отправки вебхуков.
+
+    Соединения переиспользуются между отправками (keep-alive), число
+    соединений ограничено всего и на хост. Незавершённые отправки
+    учитываются, чтобы close() мог дождаться их при остановке бота.
     """
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    async with aiohttp.ClientSession(
-        timeout=aiohttp.ClientTimeout(total=MAKE_WEBHOOK_TIMEOUT),
-        connector=aiohttp.TCPConnector(ssl=ssl_context)
-    ) as session:
-        for attempt in range(1, MAKE_WEBHOOK_RETRIES + 1):
+
+    def __init__(
+        self,
+        timeout: float = MAKE_WEBHOOK_TIMEOUT,
+        connect_timeout: float = MAKE_WEBHOOK_CONNECT_TIMEOUT,
+        retries: int = MAKE_WEBHOOK_RETRIES,
+        retry_delay: float = MAKE_WEBHOOK_RETRY_DELAY,
+        limit: int = MAKE_WEBHOOK_POOL_LIMIT,
+        limit_per_host: int = MAKE_WEBHOOK_LIMIT_PER_HOST,
+    ):
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = max(1, retries)
+        self.retry_delay = retry_delay
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._closing = False
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    async def start(self) -> "WebhookHTTPClient":
+        if self.closed:
+            ssl_context = ssl.create_default_context(cafile=certifi.where())
+            connector = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(timeout=self.timeout, connector=connector)
+            self._closing = False
+        return self
+
+    async def close(self, drain_timeout: float = MAKE_WEBHOOK_DRAIN_TIMEOUT):
+        """
+        Перестаёт принимать новые отправки, ждёт незавершённые
+        (не дольше drain_timeout) и закрывает сессию.
+        """
+        self._closing = True
+        if self._in_flight:
+            logger.info(f"⏳ Ожидание завершения {self._in_flight} отправок вебхуков...")
             try:
-                logger.info(f"📤 Попытка {attempt}/{MAKE_WEBHOOK_RETRIES} отправки вебхука на {webhook_url}")
+                await asyncio.wait_for(self._idle.wait(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Не дождались {self._in_flight} отправок вебхуков за {drain_timeout} с")
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
-                async with session.post(webhook_url, json=data, headers=headers) as response:
-                    response_text = await response.text()
-                    logger.info(f"📨 Webhook response from {webhook_url}:")
-                    logger.info(f"Status: {response.status}")
-                    logger.info(f"Headers: {dict(response.headers)}")
-                    logger.info(f"Body: {response_text}")
+    def _backoff(self, attempt: int) -> float:
+        # Экспоненциальная задержка с небольшим разбросом, чтобы повторы не шли пачкой
+        return self.retry_delay * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
 
-                    if response.status in [200, 201, 202, 204]:
-                        return True
-            except Exception as e:
-                logger.exception(f"❌ Попытка {attempt} не удалась для вебхука на {webhook_url}: {e}")
+    async def post_json(self, webhook_url: str, data: Dict, headers: Dict) -> bool:
+        """
+        Отправляет JSON с повторами при неудаче.
+        """
+        if self._closing:
+            logger.warning(f"⚠️ Бот останавливается, вебхук на {webhook_url} не отправлен")
+            return False
+        if self.closed:
+            await self.start()
+
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            for attempt in range(1, self.retries + 1):
+                try:
+                    logger.info(f"📤 Попытка {attempt}/{self.retries} отправки вебхука на {webhook_url}")
 
-            if attempt < MAKE_WEBHOOK_RETRIES:
-                delay = MAKE_WEBHOOK_RETRY_DELAY * attempt
-                logger.info(f"⏳ Ожидание {delay} секунд перед повтором отправки вебхука на {webhook_url}")
-                await asyncio.sleep(delay)
+                    async with self._session.post(webhook_url, json=data, headers=headers) as response:
+                        response_text = await response.text()
+                        logger.info(f"📨 Webhook response from {webhook_url}:")
+                        logger.info(f"Status: {response.status}")
+                        logger.info(f"Headers: {dict(response.headers)}")
+                        logger.info(f"Body: {response_text}")
+
+                        if response.status in [200, 201, 202, 204]:
+                            return True
+                        # Ошибку в запросе повтор не исправит
+                        if 400 <= response.status < 500 and response.status not in (408, 429):
+                            return False
+                except Exception as e:
+                    logger.exception(f"❌ Попытка {attempt} не удалась для вебхука на {webhook_url}: {e}")
+
+                if attempt < self.retries:
+                    delay = self._backoff(attempt)
+                    logger.info(f"⏳ Ожидание {delay:.1f} секунд перед повтором отправки вебхука на {webhook_url}")
+                    await asyncio.sleep(delay)
+
+            return False
+        finally:
+            self._in_flight -= 1
+            if not self._in_flight:
+                self._idle.set()
+
+
+_webhook_client: Optional[WebhookHTTPClient] = None
+
+
+async def start_webhook_client() -> WebhookHTTPClient:
+    """Создаёт общий клиент вебхуков; вызывается при старте бота (bot/main.py)."""
+    global _webhook_client
+    if _webhook_client is None:
+        _webhook_client = WebhookHTTPClient()
+    return await _webhook_client.start()
+
+
+async def close_webhook_client(drain_timeout: float = MAKE_WEBHOOK_DRAIN_TIMEOUT):
+    """Дожидается незавершённых отправок и закрывает общий клиент."""
+    global _webhook_client
+    if _webhook_client is not None:
+        await _webhook_client.close(drain_timeout)
+        _webhook_client = None
+
+
+async def send_webhook(webhook_url: str, data: Dict, headers: Dict) -> bool:
+    """
+    Отправляет данные на внешний вебхук с повторами при неудаче.
+    Использует общий клиент бота; вне бота (скрипты) открывает
+    одноразовую сессию.
+    """
+    if _webhook_client is not None:
+        return await _webhook_client.post_json(webhook_url, data, headers)
+
+    client = await WebhookHTTPClient().start()
+    try:
+        return await client.post_json(webhook_url, data, headers)
+    finally:
+        await client.close()
 
-        return False
 
 async def send_quiz_published_webhook(webhook_url: str, data: Dict) -> bool:
     """
@@ -319,26 +319,30 @@ class WebhookService:
         admin_chat_id: int,
         webhook_type_name: str
     ) -> None:
-        """Вспомогательный метод для отправки батча вебхуков."""
-        success_count = 0
-        failed_count = 0
+        """Вспомогательный метод для отправки батча вебхуков.
 
-        for webhook in webhooks:
+        Вебхуки батча отправляются одновременно через общую сессию
+        (число соединений ограничено её пулом).
+        """
+        async def send_one(webhook: Webhook) -> bool:
             try:
                 logger.info(f"📤 Отправка {webhook_type_name} вебхука на {webhook.url}...")
                 ok = await send_quiz_published_webhook(webhook.url, payload)
                 if ok:
-                    success_count += 1
                     logger.info(f"✅ Успешно отправлено на {webhook.url}")
                     await notify_admin(bot, admin_chat_id, f"✅ {webhook_type_name.title()} вебхук успешно отправлен на: {webhook.url}")
                 else:
-                    failed_count += 1
                     logger.error(f"❌ Не удалось отправить на {webhook.url}")
                     await notify_admin(bot, admin_chat_id, f"❌ Ошибка при отправке {webhook_type_name} вебхука на: {webhook.url}")
+                return ok
             except Exception as e:
-                failed_count += 1
                 logger.exception(f"Исключение при отправке {webhook_type_name} вебхука на {webhook.url}: {e}")
                 await notify_admin(bot, admin_chat_id, f"🔥 Исключение при отправке на {webhook.url}: {e}")
+                return False
+
+        results = await asyncio.gather(*(send_one(webhook) for webhook in webhooks))
+        success_count = sum(1 for ok in results if ok)
+        failed_count = len(results) - success_count
 
         summary_message = (
             f"🛰️ Отправка {webhook_type_name} вебхуков завершена.\n"
@@ -0,0 +1,3 @@
+"""
+Тестовые двойники внешних сервисов (фейковый приёмник вебхуков) для тестов и бенчмарков.
+"""
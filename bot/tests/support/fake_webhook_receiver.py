@@ -0,0 +1,72 @@
+"""
+Локальный приёмник вебхуков для тестов и бенчмарка отправки.
+
+Отвечает 200 (или статусами из очереди statuses), считает запросы
+и TCP-соединения, по которым они пришли.
+"""
+import asyncio
+from typing import List, Optional
+
+from aiohttp import web
+
+
+class FakeWebhookReceiver:
+    """
+    aiohttp-сервер на 127.0.0.1 со случайным портом.
+
+    Attributes:
+        statuses: Очередь HTTP-статусов для следующих ответов (дальше — 200)
+        requests: Тела полученных запросов
+        connections: Количество новых TCP-соединений
+        delay: Задержка ответа, секунды (имитация медленного сервиса)
+    """
+
+    def __init__(self, delay: float = 0.0, record: bool = True):
+        self.delay = delay
+        self.record = record
+        self.statuses: List[int] = []
+        self.requests: List[dict] = []
+        self.request_count = 0
+        self.connections = 0
+        self._peers = set()
+        self._runner: Optional[web.AppRunner] = None
+        self._port = None
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self._port}/hook'
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        peer = request.transport.get_extra_info('peername') if request.transport else None
+        if peer not in self._peers:
+            self._peers.add(peer)
+            self.connections += 1
+        self.request_count += 1
+        body = await request.json()
+        if self.record:
+            self.requests.append(body)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        status = self.statuses.pop(0) if self.statuses else 200
+        return web.json_response({'ok': status == 200}, status=status)
+
+    async def start(self) -> "FakeWebhookReceiver":
+        app = web.Application()
+        app.router.add_post('/hook', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self._port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from bot.services.webhook_sender import WebhookHTTPClient
+from bot.tests.support.fake_webhook_receiver import FakeWebhookReceiver
+
+HEADERS = {'Content-Type': 'application/json'}
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused():
+    """Вебхуки идут по пулу keep-alive соединений, а не по новому на каждый"""
+    async with FakeWebhookReceiver() as receiver:
+        client = await WebhookHTTPClient(retries=1, limit_per_host=4).start()
+        try:
+            results = await asyncio.gather(*(
+                client.post_json(receiver.url, {'n': index}, HEADERS) for index in range(20)
+            ))
+        finally:
+            await client.close()
+
+    assert all(results)
+    assert receiver.request_count == 20
+    assert receiver.connections <= 4
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried_and_client_errors_are_not():
+    """5xx повторяется с backoff, 4xx сразу считается неудачей"""
+    async with FakeWebhookReceiver() as receiver:
+        client = await WebhookHTTPClient(retries=3, retry_delay=0).start()
+        try:
+            receiver.statuses = [503, 502]
+            assert await client.post_json(receiver.url, {'n': 1}, HEADERS)
+            assert receiver.request_count == 3
+
+            receiver.statuses = [404]
+            assert not await client.post_json(receiver.url, {'n': 2}, HEADERS)
+            assert receiver.request_count == 4
+        finally:
+            await client.close()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_in_flight_deliveries():
+    """При остановке бота начатые отправки дожидаются ответа"""
+    async with FakeWebhookReceiver(delay=0.2) as receiver:
+        client = await WebhookHTTPClient(retries=1).start()
+        delivery = asyncio.create_task(client.post_json(receiver.url, {'n': 1}, HEADERS))
+        await asyncio.sleep(0.05)
+
+        await client.close(drain_timeout=5)
+
+        assert await delivery
+        assert client.closed
+        # Новые отправки во время остановки не начинаются
+        assert not await client.post_json(receiver.url, {'n': 2}, HEADERS)
+        assert receiver.request_count == 1
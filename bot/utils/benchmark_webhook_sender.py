@@ -0,0 +1,67 @@
+"""
+Бенчмарк отправки вебхуков бота на локальный фейковый приёмник.
+
+Сравнивает отправку с новой сессией на каждый вебхук (как было раньше)
+и через общий WebhookHTTPClient. Ничего не уходит во внешние сервисы.
+
+Использование:
+    python -m bot.utils.benchmark_webhook_sender --requests 500 --delay 0.02
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from bot.services.webhook_sender import WebhookHTTPClient
+from bot.tests.support.fake_webhook_receiver import FakeWebhookReceiver
+
+PAYLOAD = {
+    'type': 'quiz_published_bulk',
+    'published_tasks': [{'task': {'id': index}, 'translations': []} for index in range(20)],
+}
+HEADERS = {'Content-Type': 'application/json'}
+
+
+async def _run(receiver: FakeWebhookReceiver, count: int, concurrency: int, pooled: bool) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    shared = await WebhookHTTPClient(retries=1, limit_per_host=concurrency).start() if pooled else None
+
+    async def send_one():
+        async with semaphore:
+            if shared is not None:
+                return await shared.post_json(receiver.url, PAYLOAD, HEADERS)
+            client = await WebhookHTTPClient(retries=1).start()
+            try:
+                return await client.post_json(receiver.url, PAYLOAD, HEADERS)
+            finally:
+                await client.close()
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(send_one() for _ in range(count)))
+    elapsed = time.monotonic() - started
+    if shared is not None:
+        await shared.close()
+    assert all(results), 'часть вебхуков не доставлена'
+    return elapsed
+
+
+async def main(count: int, concurrency: int, delay: float):
+    for title, pooled in (('Новая сессия на каждый вебхук', False), ('Общая сессия', True)):
+        async with FakeWebhookReceiver(delay=delay, record=False) as receiver:
+            elapsed = await _run(receiver, count, concurrency, pooled)
+            print(
+                f'{title}: {count} вебхуков за {elapsed:.2f} с '
+                f'({count / elapsed:.0f}/с), TCP-соединений: {receiver.connections}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='Количество вебхуков')
+    parser.add_argument('--concurrency', type=int, default=8, help='Одновременных отправок')
+    parser.add_argument('--delay', type=float, default=0.0, help='Задержка ответа приёмника, с')
+    args = parser.parse_args()
+    # Логи отправки (по строке на ответ) искажают замер
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('bot.services.webhook_sender').setLevel(logging.WARNING)
+    asyncio.run(main(args.requests, args.concurrency, args.delay))
@@ -1335,7 +1335,7 @@ async def reorder_user_avatars(telegram_id: int, request: Request):
 # ========================================
 
 @router.get("/tasks/translations/{translation_id}/comments/")
-async def get_task_comments(translation_id: int, request: Request, page: int = 1, ordering: str = '-created_at'):
+async def get_task_comments(translation_id: int, request: Request, page: int = 1, ordering: str = '-created_at', cursor: str = None):
     """
     Получение комментариев для перевода задачи.
     
@@ -1344,6 +1344,7 @@ async def get_task_comments(translation_id: int, request: Request, page: int = 1
         request: FastAPI request
         page: Номер страницы для пагинации
         ordering: Сортировка (created_at, -created_at, reports_count, -reports_count)
+        cursor: Курсор следующей страницы из ссылки next (приоритетнее page)
         
     Returns:
         JSONResponse: Список комментариев с пагинацией
@@ -1351,6 +1352,9 @@ async def get_task_comments(translation_id: int, request: Request, page: int = 1
     try:
         django_url = f"{settings.DJANGO_API_BASE_URL}/api/tasks/translations/{translation_id}/comments/"
         params = {'page': page, 'ordering': ordering}
+        if cursor:
+            # Курсорная пагинация Django: следующая страница без OFFSET
+            params = {'cursor': cursor, 'ordering': ordering}
         
         async with httpx.AsyncClient(follow_redirects=True) as client:
             response = await client.get(
@@ -1408,6 +1412,42 @@ async def get_comments_count(translation_id: int, request: Request):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get("/tasks/comments/counts/")
+async def get_comments_counts(request: Request, ids: str):
+    """
+    Получение количества комментариев для нескольких переводов одним запросом.
+    
+    Args:
+        request: FastAPI request
+        ids: ID переводов через запятую
+        
+    Returns:
+        JSONResponse: {"counts": {"<translation_id>": <count>}}
+    """
+    try:
+        django_url = f"{settings.DJANGO_API_BASE_URL}/api/tasks/comments/counts/"
+        
+        async with httpx.AsyncClient(follow_redirects=True) as client:
+            response = await client.get(
+                django_url,
+                params={'ids': ids},
+                headers=get_proxy_headers(request),
+                timeout=10.0
+            )
+        
+        if response.status_code == 200:
+            return JSONResponse(content=response.json())
+        else:
+            logger.error(f"❌ Error fetching comments counts: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error in get_comments_counts: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.post("/tasks/translations/{translation_id}/comments/")
 async def create_task_comment(translation_id: int, request: Request):
     """
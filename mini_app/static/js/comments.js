@@ -3,6 +3,51 @@
  * Поддерживает древовидную структуру, изображения и модерацию
  */
 
+/**
+ * Пакетная загрузка количества комментариев.
+ * Запросы всех карточек за один тик объединяются в один вызов /comments/counts/.
+ */
+const CommentsCountBatcher = {
+    pending: new Map(),
+    timer: null,
+    maxBatchSize: 100,
+
+    request(translationId) {
+        return new Promise((resolve, reject) => {
+            const waiters = this.pending.get(translationId) || [];
+            waiters.push({ resolve, reject });
+            this.pending.set(translationId, waiters);
+            if (!this.timer) {
+                this.timer = setTimeout(() => this.flush(), 0);
+            }
+        });
+    },
+
+    async flush() {
+        const batch = this.pending;
+        this.pending = new Map();
+        this.timer = null;
+
+        const ids = Array.from(batch.keys());
+        for (let i = 0; i < ids.length; i += this.maxBatchSize) {
+            const chunk = ids.slice(i, i + this.maxBatchSize);
+            try {
+                const response = await fetch(`/api/tasks/comments/counts/?ids=${chunk.join(',')}`);
+                if (!response.ok) {
+                    throw new Error(`Ошибка загрузки количества комментариев: ${response.status}`);
+                }
+                const data = await response.json();
+                chunk.forEach(id => {
+                    const count = data.counts?.[String(id)] ?? 0;
+                    batch.get(id).forEach(waiter => waiter.resolve(count));
+                });
+            } catch (error) {
+                chunk.forEach(id => batch.get(id).forEach(waiter => waiter.reject(error)));
+            }
+        }
+    }
+};
+
 class CommentsManager {
     constructor(translationId, telegramId, username, language = 'en') {
         this.translationId = translationId;
@@ -11,6 +56,7 @@ class CommentsManager {
         this.language = language || 'en';
         this.currentPage = 1;
         this.hasMore = false;
+        this.nextCursor = null;
         this.comments = [];
         this.replyingTo = null;
     }
@@ -54,8 +100,12 @@ class CommentsManager {
         }
 
         try {
+            // Следующие страницы запрашиваем по курсору из ссылки next (без OFFSET)
+            const cursor = page > 1 && this.nextCursor
+                ? `&cursor=${encodeURIComponent(this.nextCursor)}`
+                : '';
             const response = await fetch(
-                `/api/tasks/translations/${this.translationId}/comments/?page=${page}&ordering=-created_at&language=${this.language}`
+                `/api/tasks/translations/${this.translationId}/comments/?page=${page}&ordering=-created_at&language=${this.language}${cursor}`
             );
 
             if (!response.ok) {
@@ -76,6 +126,9 @@ class CommentsManager {
 
             this.currentPage = page;
             this.hasMore = !!data.next;
+            this.nextCursor = data.next
+                ? new URL(data.next, window.location.origin).searchParams.get('cursor')
+                : null;
 
             console.log(`📋 Total comments in memory: ${this.comments.length}`);
 
@@ -99,14 +152,11 @@ class CommentsManager {
      */
     async loadCommentsCount() {
         try {
-            const response = await fetch(
-                `/api/tasks/translations/${this.translationId}/comments/count/`
-            );
-            const data = await response.json();
+            const count = await CommentsCountBatcher.request(this.translationId);
             
             const countElement = document.querySelector(`#comments-${this.translationId} .comments-count`);
-            if (countElement && data.count !== undefined) {
-                countElement.textContent = `(${data.count})`;
+            if (countElement && count !== undefined) {
+                countElement.textContent = `(${count})`;
             }
         } catch (error) {
             console.error('Ошибка загрузки количества комментариев:', error);
@@ -12,7 +12,7 @@ from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.utils import timezone
 
-from accounts.models import CustomUser, TelegramUser, TelegramAdmin, TelegramAdminGroup, DjangoAdmin, UserChannelSubscription, MiniAppUser, UserAvatar, Notification
+from accounts.models import CustomUser, TelegramUser, TelegramAdmin, TelegramAdminGroup, DjangoAdmin, UserChannelSubscription, MiniAppUser, UserAvatar, Notification, NotificationOutbox
 from .telegram_admin_service import TelegramAdminService, run_async_function
 import logging
 from tenants.mixins import TenantFilteredAdminMixin
@@ -3108,6 +3108,36 @@ class NotificationAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
     resend_to_telegram.short_description = "Повторно отправить в Telegram"
 
 
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
+    """
+    Админ-панель очереди исходящих уведомлений.
+    Позволяет найти недоставленные сообщения и вернуть их в очередь.
+    """
+    list_display = ['id', 'tenant', 'telegram_id', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'tenant', 'created_at']
+    search_fields = ['telegram_id', 'message', 'dedup_key']
+    readonly_fields = ['notification', 'dedup_key', 'attempts', 'last_error', 'created_at', 'sent_at']
+    list_per_page = 50
+    date_hierarchy = 'created_at'
+    actions = ['requeue']
+    
+    def requeue(self, request, queryset):
+        """Вернуть сообщения в очередь с обнулённым счётчиком попыток."""
+        from django.utils import timezone
+        from accounts.utils_folder.telegram_notifications import schedule_outbox_drain
+        
+        updated = queryset.exclude(status=NotificationOutbox.STATUS_SENT).update(
+            status=NotificationOutbox.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            last_error=''
+        )
+        schedule_outbox_drain()
+        self.message_user(request, f'В очередь возвращено {updated} сообщений.')
+    requeue.short_description = "Вернуть в очередь отправки"
+
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(TelegramUser, TelegramUserAdmin)
 admin.site.register(TelegramAdmin, TelegramAdminAdmin)
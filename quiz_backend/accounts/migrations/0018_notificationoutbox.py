@@ -0,0 +1,146 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0017_update_unique_email_index"),
+        ("tenants", "0002_tenant_contact_email"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationOutbox",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "telegram_id",
+                    models.BigIntegerField(verbose_name="Telegram ID получателя"),
+                ),
+                ("message", models.TextField(verbose_name="Текст сообщения")),
+                (
+                    "parse_mode",
+                    models.CharField(
+                        blank=True,
+                        default="Markdown",
+                        help_text="Markdown, HTML или пусто для обычного текста",
+                        max_length=20,
+                        verbose_name="Режим разметки",
+                    ),
+                ),
+                (
+                    "web_app_url",
+                    models.TextField(
+                        blank=True,
+                        help_text="Ссылка для inline-кнопки открытия Mini App",
+                        null=True,
+                        verbose_name="URL Mini App",
+                    ),
+                ),
+                (
+                    "dedup_key",
+                    models.CharField(
+                        blank=True,
+                        help_text="Повторная постановка сообщения с тем же ключом игнорируется",
+                        max_length=255,
+                        null=True,
+                        unique=True,
+                        verbose_name="Ключ дедупликации",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает отправки"),
+                            ("sent", "Отправлено"),
+                            ("dead", "Не доставлено"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Попыток отправки"
+                    ),
+                ),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="Не раньше этого времени сообщение будет взято в отправку",
+                        verbose_name="Следующая попытка",
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Последняя ошибка"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "sent_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Дата отправки"
+                    ),
+                ),
+                (
+                    "notification",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Уведомление, которое отмечается отправленным после доставки",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="outbox_messages",
+                        to="accounts.notification",
+                        verbose_name="Уведомление",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Тенант, чьим ботом отправляется сообщение",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notification_outbox",
+                        to="tenants.tenant",
+                        verbose_name="Тенант",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Исходящее уведомление",
+                "verbose_name_plural": "Очередь уведомлений",
+                "db_table": "notification_outbox",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="notificatio_status_7f28bd_idx",
+                    )
+                ],
+            },
+        ),
+    ]
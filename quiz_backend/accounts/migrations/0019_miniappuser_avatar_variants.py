@@ -0,0 +1,23 @@
+# Generated by Django 5.1.11 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0018_notificationoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="miniappuser",
+            name="avatar_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Копии аватара WebP/AVIF по ширинам для srcset",
+                verbose_name="Копии аватара",
+            ),
+        ),
+    ]
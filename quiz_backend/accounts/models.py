@@ -696,6 +696,12 @@ class MiniAppUser(models.Model):
         null=True, 
         verbose_name="Аватар Mini App"
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Копии аватара",
+        help_text="Копии аватара WebP/AVIF по ширинам для srcset"
+    )
     telegram_photo_url = models.URLField(
         max_length=500,
         blank=True,
@@ -1680,6 +1686,112 @@ class Notification(models.Model):
             self.save(update_fields=['sent_to_telegram'])
 
 
+class NotificationOutbox(models.Model):
+    """
+    Очередь исходящих Telegram-уведомлений (transactional outbox).
+
+    Запись создаётся в той же транзакции, что и событие (комментарий, жалоба,
+    донат), а доставку выполняет фоновая задача drain_notification_outbox:
+    пачками, с повторами и переводом в dead-letter после исчерпания попыток.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_DEAD, 'Не доставлено'),
+    ]
+
+    tenant = models.ForeignKey(
+        'tenants.Tenant',
+        on_delete=models.CASCADE,
+        related_name='notification_outbox',
+        null=True,
+        blank=True,
+        verbose_name="Тенант",
+        help_text="Тенант, чьим ботом отправляется сообщение"
+    )
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.SET_NULL,
+        related_name='outbox_messages',
+        null=True,
+        blank=True,
+        verbose_name="Уведомление",
+        help_text="Уведомление, которое отмечается отправленным после доставки"
+    )
+    telegram_id = models.BigIntegerField(
+        verbose_name="Telegram ID получателя"
+    )
+    message = models.TextField(
+        verbose_name="Текст сообщения"
+    )
+    parse_mode = models.CharField(
+        max_length=20,
+        blank=True,
+        default='Markdown',
+        verbose_name="Режим разметки",
+        help_text="Markdown, HTML или пусто для обычного текста"
+    )
+    web_app_url = models.TextField(
+        null=True,
+        blank=True,
+        verbose_name="URL Mini App",
+        help_text="Ссылка для inline-кнопки открытия Mini App"
+    )
+    dedup_key = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        unique=True,
+        verbose_name="Ключ дедупликации",
+        help_text="Повторная постановка сообщения с тем же ключом игнорируется"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попыток отправки"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Следующая попытка",
+        help_text="Не раньше этого времени сообщение будет взято в отправку"
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name="Последняя ошибка"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата создания"
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Дата отправки"
+    )
+
+    class Meta:
+        db_table = 'notification_outbox'
+        verbose_name = 'Исходящее уведомление'
+        verbose_name_plural = 'Очередь уведомлений'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Уведомление для {self.telegram_id} ({self.get_status_display()})"
+
+
 class UserAvatar(models.Model):
     """
     Модель для хранения нескольких аватарок пользователя Mini App.
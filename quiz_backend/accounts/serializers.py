@@ -4,9 +4,26 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.db.models import Count, Q
 from .models import CustomUser, UserChannelSubscription, TelegramAdmin, DjangoAdmin, MiniAppUser, TelegramUser, UserAvatar
+from tasks.services.image_variant_service import image_srcset
 
 logger = logging.getLogger(__name__)
 
+class AvatarSrcsetMixin:
+    """
+    Поле avatar_srcset для пользователей Mini App: srcset копий загруженного
+    аватара по форматам ({"webp": "url 320w, ..."}) или None.
+    """
+
+    def _absolute_media_url(self, url):
+        # Прокси-заголовки учитываются через USE_X_FORWARDED_HOST и SECURE_PROXY_SSL_HEADER
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_avatar_srcset(self, obj):
+        source = obj.avatar.name if obj.avatar else None
+        return image_srcset(obj.avatar_variants, source, self._absolute_media_url)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Базовый сериализатор пользователя.
@@ -362,7 +379,7 @@ class UserAvatarSerializer(serializers.ModelSerializer):
         return None
 
 
-class MiniAppUserSerializer(serializers.ModelSerializer):
+class MiniAppUserSerializer(AvatarSrcsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для пользователей Mini App.
     
@@ -373,6 +390,7 @@ class MiniAppUserSerializer(serializers.ModelSerializer):
     is_admin = serializers.BooleanField(read_only=True)
     admin_type = serializers.CharField(read_only=True)
     avatar = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
     avatars = serializers.SerializerMethodField()
     social_links = serializers.SerializerMethodField()
     programming_languages = serializers.StringRelatedField(many=True, read_only=True)
@@ -387,13 +405,13 @@ class MiniAppUserSerializer(serializers.ModelSerializer):
         model = MiniAppUser
         fields = (
             'id', 'telegram_id', 'username', 'first_name', 'last_name',
-            'full_name', 'language', 'avatar', 'avatars', 'created_at', 'last_seen',
+            'full_name', 'language', 'avatar', 'avatar_srcset', 'avatars', 'created_at', 'last_seen',
             'is_admin', 'admin_type', 'grade', 'programming_language', 'programming_languages',
             'gender', 'birth_date', 'is_profile_public', 'notifications_enabled',
             'telegram_user_id', 'telegram_admin_id', 'django_admin_username',
             'social_links'
         )
-        read_only_fields = ('id', 'created_at', 'last_seen', 'full_name', 'is_admin', 'admin_type', 'avatar', 'avatars', 'social_links')
+        read_only_fields = ('id', 'created_at', 'last_seen', 'full_name', 'is_admin', 'admin_type', 'avatar', 'avatar_srcset', 'avatars', 'social_links')
     
     def get_avatar(self, obj):
         """
@@ -730,7 +748,7 @@ class MiniAppUserCreateSerializer(serializers.ModelSerializer):
 
 
 
-class MiniAppTopUserSerializer(serializers.ModelSerializer):
+class MiniAppTopUserSerializer(AvatarSrcsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для топ-пользователей Mini App, включающий рейтинг и базовые данные.
     
@@ -738,6 +756,7 @@ class MiniAppTopUserSerializer(serializers.ModelSerializer):
     чтобы защитить приватность пользователей.
     """
     avatar_url = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
     quizzes_completed = serializers.SerializerMethodField()
     average_score = serializers.SerializerMethodField() # Это success_rate
@@ -749,7 +768,7 @@ class MiniAppTopUserSerializer(serializers.ModelSerializer):
         model = MiniAppUser
         fields = (
             'id', 'telegram_id', 'username', 'first_name', 'last_name',
-            'avatar_url', 'rating', 'quizzes_completed', 'average_score', 'is_online', 'last_seen',
+            'avatar_url', 'avatar_srcset', 'rating', 'quizzes_completed', 'average_score', 'is_online', 'last_seen',
             'gender', 'birth_date', 'age', 'grade', 'is_profile_public'
         )
 
@@ -933,7 +952,7 @@ class MiniAppTopUserSerializer(serializers.ModelSerializer):
         return data
 
 
-class PublicMiniAppUserSerializer(serializers.ModelSerializer):
+class PublicMiniAppUserSerializer(AvatarSrcsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для просмотра профиля пользователя Mini App другими пользователями.
     
@@ -942,6 +961,7 @@ class PublicMiniAppUserSerializer(serializers.ModelSerializer):
     """
     full_name = serializers.CharField(read_only=True)
     avatar = serializers.SerializerMethodField()
+    avatar_srcset = serializers.SerializerMethodField()
     avatars = serializers.SerializerMethodField()
     social_links = serializers.SerializerMethodField()
     programming_languages = serializers.StringRelatedField(many=True, read_only=True)
@@ -962,7 +982,7 @@ class PublicMiniAppUserSerializer(serializers.ModelSerializer):
         model = MiniAppUser
         fields = (
             'id', 'telegram_id', 'username', 'first_name', 'last_name',
-            'full_name', 'avatar', 'avatars', 'is_profile_public',
+            'full_name', 'avatar', 'avatar_srcset', 'avatars', 'is_profile_public',
             'grade', 'programming_languages', 'gender', 'birth_date', 'age',
             'social_links', 'rating', 'quizzes_completed', 'average_score',
             'is_online', 'last_seen',
@@ -1205,7 +1225,7 @@ class PublicMiniAppUserSerializer(serializers.ModelSerializer):
         # Если профиль приватный, оставляем только базовую информацию
         # Username скрыт, чтобы нельзя было найти пользователя в Telegram
         if not instance.is_profile_public:
-            allowed_fields = ['id', 'telegram_id', 'first_name', 'last_name', 'full_name', 'avatar', 'avatars', 'is_profile_public']
+            allowed_fields = ['id', 'telegram_id', 'first_name', 'last_name', 'full_name', 'avatar', 'avatar_srcset', 'avatars', 'is_profile_public']
             data = {key: value for key, value in data.items() if key in allowed_fields}
             # Явно скрываем username
             data['username'] = None
@@ -495,4 +495,12 @@ def sync_mini_app_user_with_custom_user(sender, instance, created, **kwargs):
                 logger.error(f"Ошибка при синхронизации полей с CustomUser для MiniAppUser telegram_id={instance.telegram_id}: {sync_error}", exc_info=True)
         
     except Exception as e:
-        logger.error(f"Ошибка синхронизации MiniAppUser (telegram_id={instance.telegram_id}) с CustomUser: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Ошибка синхронизации MiniAppUser (telegram_id={instance.telegram_id}) с CustomUser: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=MiniAppUser)
+def schedule_mini_app_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    """Строит копии аватара (WebP/AVIF) после загрузки нового файла."""
+    from tasks.services.image_variant_service import schedule_if_stale
+
+    schedule_if_stale('avatars', instance, update_fields)
@@ -91,9 +91,37 @@ document.addEventListener('DOMContentLoaded', function() {
             chatWindow.style.display = 'flex';
         }
 
-        const url = window.conversationUrlTemplate.replace('__USERNAME__', username);
+        conversationCursor = null;
+        conversationHasMore = false;
+        chatMessages.innerHTML = '';
 
-        fetch(url, {
+        fetchConversationPage(username, null)
+        .then(data => {
+            console.log('Данные диалога:', data);
+            data.messages.forEach(message => {
+                chatMessages.appendChild(createMessageElement(message));
+            });
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        })
+        .catch(error => {
+            console.error('Ошибка загрузки диалога:', error);
+            const errorMsg = window.inboxTranslations?.error_loading_conversation || 'Error loading conversation.';
+            showNotification(errorMsg, 'error');
+        });
+    };
+
+    // Состояние подгрузки ранних сообщений (курсор от сервера)
+    let conversationCursor = null;
+    let conversationHasMore = false;
+    let conversationLoading = false;
+
+    function fetchConversationPage(username, cursor) {
+        let url = window.conversationUrlTemplate.replace('__USERNAME__', username);
+        if (cursor) {
+            url += `?cursor=${encodeURIComponent(cursor)}`;
+        }
+        conversationLoading = true;
+        return fetch(url, {
             headers: {
                 'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value,
                 'X-Requested-With': 'XMLHttpRequest'
@@ -107,64 +135,87 @@ document.addEventListener('DOMContentLoaded', function() {
             return response.json();
         })
         .then(data => {
-            chatMessages.innerHTML = '';
-            console.log('Данные диалога:', data);
-            data.messages.forEach(message => {
-                console.log(`Сообщение ${message.id}, вложения:`, message.attachments);
-                const messageElement = document.createElement('div');
-                messageElement.className = `message-item ${message.is_sent_by_user ? 'sent' : 'received'}`;
-                messageElement.dataset.messageId = message.id;
-                messageElement.innerHTML = `
-                    <div class="message-content">${message.content.replace(/\n/g, '<br>')}</div>
-                    <div class="message-meta">${message.created_at}</div>
-                    ${message.attachments.length > 0 ? `
-                        <div class="message-attachments">
-                            <h4>${window.inboxTranslations?.attachments || 'Attachments'}:</h4>
-                            <div class="attachments-grid">
-                                ${message.attachments.map(att => {
-                                    console.log(`Рендеринг вложения: ${att.filename}, URL: ${att.url}`);
-                                    return `
-                                        <div class="attachment-item">
-                                            ${att.is_image ? `
-                                                <div class="attachment-preview">
-                                                    <img src="${att.url}" alt="${att.filename}"
-                                                         onclick="openImagePreview('${att.url}', '${att.filename}')">
-                                                </div>
-                                            ` : `
-                                                <div class="attachment-icon">
-                                                    <ion-icon name="${att.filename.endsWith('.pdf') ? 'document-text-outline' :
-                                                        att.filename.match(/\.(doc|docx)$/) ? 'document-outline' :
-                                                        att.filename.match(/\.(xls|xlsx)$/) ? 'grid-outline' :
-                                                        'document-attach-outline'}"></ion-icon>
-                                                </div>
-                                            `}
-                                            <a href="/messages/attachment/${att.id}/" class="attachment-download"
-                                               ${!att.is_image ? 'download' : ''}>
-                                                <span class="filename">${att.filename}</span>
-                                                <ion-icon name="download-outline"></ion-icon>
-                                            </a>
+            // Ответ на устаревший запрос (пользователь уже открыл другой диалог)
+            if (username !== currentUsername) {
+                return { messages: [] };
+            }
+            conversationCursor = data.next_cursor || null;
+            conversationHasMore = !!data.has_more;
+            return data;
+        })
+        .finally(() => {
+            conversationLoading = false;
+        });
+    }
+
+    function createMessageElement(message) {
+        console.log(`Сообщение ${message.id}, вложения:`, message.attachments);
+        const messageElement = document.createElement('div');
+        messageElement.className = `message-item ${message.is_sent_by_user ? 'sent' : 'received'}`;
+        messageElement.dataset.messageId = message.id;
+        messageElement.innerHTML = `
+            <div class="message-content">${message.content.replace(/\n/g, '<br>')}</div>
+            <div class="message-meta">${message.created_at}</div>
+            ${message.attachments.length > 0 ? `
+                <div class="message-attachments">
+                    <h4>${window.inboxTranslations?.attachments || 'Attachments'}:</h4>
+                    <div class="attachments-grid">
+                        ${message.attachments.map(att => {
+                            console.log(`Рендеринг вложения: ${att.filename}, URL: ${att.url}`);
+                            return `
+                                <div class="attachment-item">
+                                    ${att.is_image ? `
+                                        <div class="attachment-preview">
+                                            <img src="${att.url}" alt="${att.filename}"
+                                                 onclick="openImagePreview('${att.url}', '${att.filename}')">
                                         </div>
-                                    `;
-                                }).join('')}
-                            </div>
-                        </div>
-                    ` : ''}
-                    <div class="message-actions">
-                        <button class="delete-btn" data-message-id="${message.id}">
-                            <ion-icon name="trash-outline"></ion-icon>
-                        </button>
+                                    ` : `
+                                        <div class="attachment-icon">
+                                            <ion-icon name="${att.filename.endsWith('.pdf') ? 'document-text-outline' :
+                                                att.filename.match(/\.(doc|docx)$/) ? 'document-outline' :
+                                                att.filename.match(/\.(xls|xlsx)$/) ? 'grid-outline' :
+                                                'document-attach-outline'}"></ion-icon>
+                                        </div>
+                                    `}
+                                    <a href="/messages/attachment/${att.id}/" class="attachment-download"
+                                       ${!att.is_image ? 'download' : ''}>
+                                        <span class="filename">${att.filename}</span>
+                                        <ion-icon name="download-outline"></ion-icon>
+                                    </a>
+                                </div>
+                            `;
+                        }).join('')}
                     </div>
-                `;
-                chatMessages.appendChild(messageElement);
+                </div>
+            ` : ''}
+            <div class="message-actions">
+                <button class="delete-btn" data-message-id="${message.id}">
+                    <ion-icon name="trash-outline"></ion-icon>
+                </button>
+            </div>
+        `;
+        return messageElement;
+    }
+
+    // При прокрутке к началу переписки догружаем более ранние сообщения
+    chatMessages.addEventListener('scroll', function() {
+        if (chatMessages.scrollTop > 50 || !conversationHasMore || conversationLoading || !currentUsername) {
+            return;
+        }
+        const previousHeight = chatMessages.scrollHeight;
+        fetchConversationPage(currentUsername, conversationCursor)
+        .then(data => {
+            const fragment = document.createDocumentFragment();
+            data.messages.forEach(message => {
+                fragment.appendChild(createMessageElement(message));
             });
-            chatMessages.scrollTop = chatMessages.scrollHeight;
+            chatMessages.insertBefore(fragment, chatMessages.firstChild);
+            chatMessages.scrollTop = chatMessages.scrollHeight - previousHeight;
         })
         .catch(error => {
             console.error('Ошибка загрузки диалога:', error);
-            const errorMsg = window.inboxTranslations?.error_loading_conversation || 'Error loading conversation.';
-            showNotification(errorMsg, 'error');
         });
-    };
+    });
 
     window.showDialogsList = function() {
         console.log('Показываем список диалогов');
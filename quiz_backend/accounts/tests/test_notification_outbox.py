@@ -0,0 +1,101 @@
+"""
+Тесты очереди исходящих Telegram-уведомлений (NotificationOutbox).
+"""
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+
+from accounts.models import Notification, NotificationOutbox, TelegramAdmin
+from accounts.utils_folder.telegram_notifications import (
+    drain_notification_outbox_batch,
+    enqueue_telegram_notification,
+    notify_all_admins,
+)
+from tenants.models import Tenant
+
+SEND_PATH = 'accounts.utils_folder.telegram_notifications.send_telegram_notification_sync'
+
+
+@override_settings(TELEGRAM_ADMIN_CHAT_ID=None, ADMIN_TELEGRAM_ID=None)
+class NotificationOutboxTestCase(TestCase):
+    """
+    Уведомления ставятся в очередь, а доставка идёт пачками с повторами.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            slug='outbox-tenant',
+            name='Outbox Tenant',
+            domain='outbox.example.com',
+            site_name='Outbox Tenant'
+        )
+        for telegram_id in (101, 102):
+            TelegramAdmin.objects.create(telegram_id=telegram_id, tenant=self.tenant)
+
+    @patch.dict('os.environ', {'TELEGRAM_ADMIN_CHAT_ID': '', 'ADMIN_TELEGRAM_ID': ''})
+    def test_notify_all_admins_only_enqueues(self):
+        with patch(SEND_PATH) as send, self.captureOnCommitCallbacks() as callbacks:
+            queued = notify_all_admins(
+                notification_type='comment',
+                title='Новый комментарий',
+                message='Текст',
+                related_object_id=1,
+                related_object_type='comment',
+                web_app_url='https://example.com/?startapp=comment_1',
+                tenant=self.tenant,
+                dedup_key='comment:1'
+            )
+            send.assert_not_called()
+
+        self.assertEqual(queued, 2)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            set(NotificationOutbox.objects.values_list('telegram_id', flat=True)), {101, 102}
+        )
+
+        # Повтор того же события не создаёт ни уведомления, ни сообщений
+        again = notify_all_admins(
+            notification_type='comment',
+            title='Новый комментарий',
+            message='Текст',
+            tenant=self.tenant,
+            dedup_key='comment:1'
+        )
+        self.assertEqual(again, 0)
+        self.assertEqual(NotificationOutbox.objects.count(), 2)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_drain_marks_sent_and_notification(self):
+        notification = Notification.objects.create(
+            notification_type='other', title='Заголовок', message='Текст'
+        )
+        enqueue_telegram_notification(101, 'Текст', notification=notification, dedup_key='a')
+        self.assertFalse(enqueue_telegram_notification(101, 'Текст', dedup_key='a'))
+
+        with patch(SEND_PATH, return_value=True) as send:
+            stats = drain_notification_outbox_batch()
+
+        send.assert_called_once()
+        self.assertEqual(stats, {'sent': 1, 'retry': 0, 'dead': 0})
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, NotificationOutbox.STATUS_SENT)
+        notification.refresh_from_db()
+        self.assertTrue(notification.sent_to_telegram)
+
+    @override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_delivery_is_retried_then_dead_lettered(self):
+        enqueue_telegram_notification(101, 'Текст')
+
+        with patch(SEND_PATH, return_value=False):
+            self.assertEqual(drain_notification_outbox_batch(), {'sent': 0, 'retry': 1, 'dead': 0})
+            # Повтор ещё не наступил — сообщение не берётся в отправку
+            self.assertEqual(drain_notification_outbox_batch(), {'sent': 0, 'retry': 0, 'dead': 0})
+
+            NotificationOutbox.objects.update(next_attempt_at=NotificationOutbox.objects.get().created_at)
+            with patch(SEND_PATH, side_effect=RuntimeError('timeout')):
+                self.assertEqual(drain_notification_outbox_batch(), {'sent': 0, 'retry': 0, 'dead': 1})
+
+        entry = NotificationOutbox.objects.get()
+        self.assertEqual(entry.status, NotificationOutbox.STATUS_DEAD)
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(entry.last_error, 'timeout')
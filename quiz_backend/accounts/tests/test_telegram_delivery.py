@@ -0,0 +1,106 @@
+"""
+Тесты выбора токена и parse_mode при отправке уведомлений и рассылки админам.
+"""
+import threading
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from accounts.models import TelegramAdmin
+from accounts.utils_folder.telegram_notifications import send_telegram_notification_sync
+from config.telegram_client import TelegramAPIError
+from tasks.notification_service import send_to_all_admins
+from tenants.models import Tenant
+
+CLIENT_PATH = 'accounts.utils_folder.telegram_notifications.get_bot_client'
+
+
+class FakeBotClient:
+    """
+    Бот, который не принимает Markdown и не знает чатов из unknown_chats.
+    """
+
+    def __init__(self, calls, token, unknown_chats=()):
+        self.calls = calls
+        self.token = token
+        self.unknown_chats = unknown_chats
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        with self.lock:
+            self.calls.append((self.token, chat_id, parse_mode))
+        if chat_id in self.unknown_chats:
+            raise TelegramAPIError('Bad Request: chat not found', 400)
+        if parse_mode == 'Markdown':
+            raise TelegramAPIError("Bad Request: can't parse entities", 400)
+        return {'message_id': 1}
+
+
+@override_settings(TELEGRAM_ADMIN_CHAT_ID=None, ADMIN_TELEGRAM_ID=None)
+class TelegramDeliveryStrategyTestCase(TestCase):
+    """
+    Сработавшее сочетание (токен, parse_mode) запоминается для чата.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(
+            slug='delivery-tenant',
+            name='Delivery Tenant',
+            domain='delivery.example.com',
+            site_name='Delivery Tenant',
+            bot_token='tenant-token'
+        )
+        self.calls = []
+        self.unknown = {'tenant-token': set(), 'global-token': set()}
+
+    def _client(self, token):
+        return FakeBotClient(self.calls, token, self.unknown[token])
+
+    @patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': 'global-token'})
+    def test_working_strategy_is_cached_and_invalidated(self):
+        with patch(CLIENT_PATH, side_effect=self._client):
+            self.assertTrue(send_telegram_notification_sync(5, 'Текст', tenant=self.tenant))
+            self.assertEqual(self.calls, [
+                ('tenant-token', 5, 'Markdown'),
+                ('tenant-token', 5, None),
+            ])
+
+            # Второе сообщение уходит с первой попытки
+            self.calls.clear()
+            self.assertTrue(send_telegram_notification_sync(5, 'Текст', tenant=self.tenant))
+            self.assertEqual(self.calls, [('tenant-token', 5, None)])
+
+            # Пользователь пропал из бота тенанта: кэш сбрасывается, работает резервный токен
+            self.calls.clear()
+            self.unknown['tenant-token'].add(5)
+            self.assertTrue(send_telegram_notification_sync(5, 'Текст', tenant=self.tenant))
+            self.assertEqual(self.calls, [
+                ('tenant-token', 5, None),
+                ('global-token', 5, 'Markdown'),
+                ('global-token', 5, None),
+            ])
+
+            self.calls.clear()
+            self.assertTrue(send_telegram_notification_sync(5, 'Текст', tenant=self.tenant))
+            self.assertEqual(self.calls, [('global-token', 5, None)])
+
+    @patch.dict('os.environ', {
+        'TELEGRAM_BOT_TOKEN': 'global-token', 'TELEGRAM_ADMIN_CHAT_ID': '', 'ADMIN_TELEGRAM_ID': ''
+    })
+    def test_admin_fan_out_sends_one_request_per_admin(self):
+        admin_ids = list(range(100, 110))
+        for telegram_id in admin_ids:
+            TelegramAdmin.objects.create(telegram_id=telegram_id, tenant=self.tenant)
+        # Стратегия для чатов уже известна
+        with patch(CLIENT_PATH, side_effect=self._client):
+            for telegram_id in admin_ids:
+                send_telegram_notification_sync(telegram_id, 'Разогрев', tenant=self.tenant)
+            self.calls.clear()
+
+            sent = send_to_all_admins('Новый комментарий', tenant=self.tenant)
+
+        self.assertEqual(sent, 10)
+        self.assertEqual(len(self.calls), 10)
+        self.assertEqual({call[1] for call in self.calls}, set(admin_ids))
@@ -1,11 +1,17 @@
-import aiohttp
+import asyncio
+import hashlib
 import logging
 import os
 import re
-import requests
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Optional, Tuple
 from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
 from django.db import models as django_models
+from django.utils import timezone
+from config.telegram_client import TelegramAPIError, get_bot_client
 
 logger = logging.getLogger(__name__)
 
@@ -277,6 +283,43 @@ def format_markdown_link(text: str, url: str) -> str:
     return f"[{escaped_text}]({safe_url})"
 
 
+DELIVERY_SENT = 'sent'
+DELIVERY_BAD_REQUEST = 'bad_request'
+DELIVERY_CHAT_NOT_FOUND = 'chat_not_found'
+DELIVERY_FAILED = 'failed'
+
+
+def _token_fingerprint(token: str) -> str:
+    """Короткий отпечаток токена бота: сам токен в кэш не пишем."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()[:16]
+
+
+def _delivery_cache_key(telegram_id: int, parse_mode: Optional[str]) -> str:
+    return f"tg_delivery:{telegram_id}:{parse_mode or 'plain'}"
+
+
+def _try_delivery(telegram_id: int, message: str, candidate: Tuple[str, Optional[str]], reply_markup) -> str:
+    """
+    Одна попытка отправки с заданными токеном и parse_mode.
+    Возвращает одну из констант DELIVERY_*.
+    """
+    token, try_parse_mode = candidate
+    try:
+        get_bot_client(token).send_message(
+            telegram_id, message, parse_mode=try_parse_mode, reply_markup=reply_markup, timeout=10
+        )
+        logger.info(f"✅ Уведомление отправлено пользователю {telegram_id} через Telegram API (parse_mode: {try_parse_mode})")
+        return DELIVERY_SENT
+    except TelegramAPIError as e:
+        if e.error_code == 400:
+            logger.warning(f"⚠️ Telegram API вернул 400 (parse_mode: {try_parse_mode}): {e.description}")
+            if "chat not found" in e.description.lower():
+                return DELIVERY_CHAT_NOT_FOUND
+            return DELIVERY_BAD_REQUEST
+        logger.warning(f"⚠️ Ошибка отправки через Telegram API (parse_mode: {try_parse_mode}): {e.error_code or ''} {e.description}")
+        return DELIVERY_FAILED
+
+
 def send_telegram_notification_sync(
     telegram_id: int,
     message: str,
@@ -286,8 +329,11 @@ def send_telegram_notification_sync(
 ) -> bool:
     """
     Синхронная отправка уведомления пользователю в Telegram через бота.
-    Сначала пытается использовать прямой API Telegram, если не получается - через bot сервис.
-    При ошибке 400 (Bad Request) пытается отправить без parse_mode или с HTML.
+    При ошибке 400 (Bad Request) пытается отправить без parse_mode или с HTML,
+    если чат не найден — через резервный токен бота.
+
+    Сработавшее сочетание (токен, parse_mode) запоминается в кэше для чата
+    и в следующий раз пробуется первым; при его неудаче запись сбрасывается.
     
     Args:
         telegram_id: Telegram ID получателя
@@ -340,66 +386,227 @@ def send_telegram_notification_sync(
         logger.error("❌ Не найден bot_token ни в тенанте, ни в переменных окружения")
         return False
 
-    for current_token in bot_tokens_to_try:
-        # Пробуем разные режимы парсинга при ошибке
-        parse_modes_to_try = [parse_mode, None, "HTML"] if parse_mode else [None]
-        
-        chat_not_found = False
-        
-        for try_parse_mode in parse_modes_to_try:
-            try:
-                url = f"https://api.telegram.org/bot{current_token}/sendMessage"
-                payload = {
-                    'chat_id': telegram_id,
-                    'text': message
-                }
-                
-                # Добавляем parse_mode только если он указан
-                if try_parse_mode:
-                    payload['parse_mode'] = try_parse_mode
-                
-                # Добавляем reply_markup если есть
-                if reply_markup:
-                    payload['reply_markup'] = reply_markup
-                
-                response = requests.post(url, json=payload, timeout=10)
-                
-                if response.status_code == 200:
-                    logger.info(f"✅ Уведомление отправлено пользователю {telegram_id} через Telegram API (parse_mode: {try_parse_mode})")
-                    return True
-                elif response.status_code == 400:
-                    # Если ошибка 400, смотрим описание
-                    error_data = response.json() if response.content else {}
-                    error_desc = error_data.get('description', '')
-                    logger.warning(f"⚠️ Telegram API вернул 400 (parse_mode: {try_parse_mode}): {error_desc}")
-                    
-                    if "chat not found" in error_desc.lower():
-                        chat_not_found = True
-                        break # Бессмысленно менять parse_mode, если чата нет
-                        
-                    if try_parse_mode != parse_modes_to_try[-1]:  # Не последний режим
-                        continue
-                    break
-                else:
-                    logger.warning(f"⚠️ Telegram API вернул {response.status_code}")
-                    break
-            except Exception as e:
-                logger.warning(f"⚠️ Ошибка отправки через Telegram API (parse_mode: {try_parse_mode}): {e}")
-                if try_parse_mode == parse_modes_to_try[-1]:  # Последний режим
-                    break
-                continue
-                
-        # Если чат не найден для текущего токена, и есть еще токены в запасе, пробуем следующий
-        if chat_not_found and current_token != bot_tokens_to_try[-1]:
-            logger.info(f"🔄 Пробуем отправить через резервный токен бота для пользователя {telegram_id}")
+    # Пробуем разные режимы парсинга при ошибке
+    parse_modes_to_try = [parse_mode, None, "HTML"] if parse_mode else [None]
+    candidates = [(token, mode) for token in bot_tokens_to_try for mode in parse_modes_to_try]
+
+    # Сначала пробуем сочетание, которое сработало для этого чата в прошлый раз
+    cache_key = _delivery_cache_key(telegram_id, parse_mode)
+    cached = cache.get(cache_key)
+    cached_candidate = next(
+        (candidate for candidate in candidates
+         if cached and (_token_fingerprint(candidate[0]), candidate[1]) == tuple(cached)),
+        None
+    )
+    skipped_tokens = set()
+    if cached_candidate:
+        outcome = _try_delivery(telegram_id, message, cached_candidate, reply_markup)
+        if outcome == DELIVERY_SENT:
+            return True
+        cache.delete(cache_key)
+        candidates.remove(cached_candidate)
+        if outcome != DELIVERY_BAD_REQUEST:
+            skipped_tokens.add(cached_candidate[0])
+
+    for candidate in candidates:
+        current_token, try_parse_mode = candidate
+        if current_token in skipped_tokens:
             continue
-        elif chat_not_found:
+        outcome = _try_delivery(telegram_id, message, candidate, reply_markup)
+        if outcome == DELIVERY_SENT:
+            cache.set(
+                cache_key,
+                (_token_fingerprint(current_token), try_parse_mode),
+                settings.TELEGRAM_DELIVERY_CACHE_TIMEOUT
+            )
+            return True
+        if outcome == DELIVERY_BAD_REQUEST:
+            continue
+        # Чат не найден или ошибка API: менять parse_mode бессмысленно,
+        # пробуем резервный токен бота
+        skipped_tokens.add(current_token)
+        if current_token != bot_tokens_to_try[-1]:
+            logger.info(f"🔄 Пробуем отправить через резервный токен бота для пользователя {telegram_id}")
+        elif outcome == DELIVERY_CHAT_NOT_FOUND:
             logger.error(f"❌ Чат не найден для пользователя {telegram_id} ни в одном из ботов. Пользователь должен нажать /start в боте.")
-            return False
-            
+
     return False
 
 
+def send_telegram_notifications_parallel(jobs: List[dict]) -> List[Tuple[bool, str]]:
+    """
+    Отправляет несколько уведомлений параллельно, не больше
+    TELEGRAM_NOTIFICATION_CONCURRENCY запросов одновременно.
+    Лимиты Bot API соблюдает общий клиент.
+
+    Args:
+        jobs: Список kwargs для send_telegram_notification_sync
+
+    Returns:
+        list: Пары (успех, текст ошибки) в порядке jobs
+    """
+    def _send(job):
+        try:
+            if send_telegram_notification_sync(**job):
+                return True, ''
+            return False, 'Telegram API не принял сообщение'
+        except Exception as e:
+            return False, str(e)
+
+    if len(jobs) <= 1:
+        return [_send(job) for job in jobs]
+
+    workers = min(len(jobs), settings.TELEGRAM_NOTIFICATION_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_send, jobs))
+
+
+def schedule_outbox_drain():
+    """
+    Запускает доставку outbox после коммита текущей транзакции.
+    Если брокер недоступен, сообщения доставит периодическая задача.
+    """
+    def _kick():
+        try:
+            from config.tasks import drain_notification_outbox
+            drain_notification_outbox.apply_async(retry=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось запустить доставку уведомлений: {e}")
+
+    transaction.on_commit(_kick)
+
+
+def enqueue_telegram_notification(
+    telegram_id: int,
+    message: str,
+    parse_mode: Optional[str] = "Markdown",
+    web_app_url: Optional[str] = None,
+    tenant=None,
+    notification=None,
+    dedup_key: Optional[str] = None,
+) -> bool:
+    """
+    Ставит Telegram-уведомление в outbox вместо немедленной отправки.
+
+    Запись создаётся в текущей транзакции вызывающего кода, поэтому
+    уведомление не потеряется при ошибке Telegram API и не уйдёт,
+    если транзакция события откатится.
+
+    Args:
+        telegram_id: Telegram ID получателя
+        message: Текст сообщения
+        parse_mode: Режим парсинга (Markdown, HTML или None)
+        web_app_url: URL для открытия mini app (опционально)
+        tenant: Тенант, чьим ботом отправлять
+        notification: Notification, которое отметить отправленным после доставки
+        dedup_key: Ключ дедупликации (повтор с тем же ключом игнорируется)
+
+    Returns:
+        bool: True если сообщение поставлено в очередь, False если это дубликат
+    """
+    from accounts.models import NotificationOutbox
+
+    try:
+        with transaction.atomic():
+            NotificationOutbox.objects.create(
+                tenant=tenant,
+                notification=notification,
+                telegram_id=telegram_id,
+                message=message,
+                parse_mode=parse_mode or '',
+                web_app_url=web_app_url,
+                dedup_key=dedup_key,
+            )
+    except IntegrityError:
+        logger.info(f"ℹ️ Уведомление с ключом {dedup_key} уже в очереди, пропускаем")
+        return False
+
+    schedule_outbox_drain()
+    return True
+
+
+def _outbox_retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная задержка перед повтором: 30с, 1м, 2м, ... не больше часа."""
+    return timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def drain_notification_outbox_batch(batch_size: Optional[int] = None) -> dict:
+    """
+    Доставляет одну пачку сообщений из outbox.
+
+    Сообщения забираются через SELECT ... FOR UPDATE SKIP LOCKED и
+    «арендуются» сдвигом next_attempt_at, поэтому несколько воркеров не
+    отправят одно сообщение дважды, а упавший воркер не заблокирует очередь.
+    После NOTIFICATION_OUTBOX_MAX_ATTEMPTS неудач сообщение переводится
+    в статус dead.
+
+    Returns:
+        dict: Количество отправленных, отложенных и недоставленных сообщений
+    """
+    from accounts.models import Notification, NotificationOutbox
+
+    batch_size = batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE
+    max_attempts = settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+    lease = timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE_SECONDS)
+    stats = {'sent': 0, 'retry': 0, 'dead': 0}
+
+    now = timezone.now()
+    with transaction.atomic():
+        entries = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                status=NotificationOutbox.STATUS_PENDING,
+                next_attempt_at__lte=now
+            ).select_related('tenant').order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not entries:
+            return stats
+        NotificationOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(
+            next_attempt_at=now + lease
+        )
+
+    results = send_telegram_notifications_parallel([
+        {
+            'telegram_id': entry.telegram_id,
+            'message': entry.message,
+            'parse_mode': entry.parse_mode or None,
+            'web_app_url': entry.web_app_url,
+            'tenant': entry.tenant,
+        }
+        for entry in entries
+    ])
+
+    for entry, (success, error) in zip(entries, results):
+        entry.attempts += 1
+        if success:
+            entry.status = NotificationOutbox.STATUS_SENT
+            entry.sent_at = timezone.now()
+            entry.last_error = ''
+            stats['sent'] += 1
+            if entry.notification_id:
+                Notification.objects.filter(
+                    id=entry.notification_id, sent_to_telegram=False
+                ).update(sent_to_telegram=True)
+        elif entry.attempts >= max_attempts:
+            entry.status = NotificationOutbox.STATUS_DEAD
+            entry.last_error = error
+            stats['dead'] += 1
+            logger.error(
+                f"❌ Уведомление #{entry.id} для {entry.telegram_id} не доставлено "
+                f"после {entry.attempts} попыток: {error}"
+            )
+        else:
+            entry.next_attempt_at = timezone.now() + _outbox_retry_delay(entry.attempts)
+            entry.last_error = error
+            stats['retry'] += 1
+        entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+    logger.info(
+        f"📤 Outbox: отправлено {stats['sent']}, отложено {stats['retry']}, "
+        f"не доставлено {stats['dead']}"
+    )
+    return stats
+
+
 def create_notification(
     recipient_telegram_id: int,
     notification_type: str,
@@ -412,7 +619,8 @@ def create_notification(
     tenant=None
 ) -> Optional[object]:
     """
-    Создает уведомление в БД и опционально отправляет его в Telegram.
+    Создает уведомление в БД и опционально ставит его в очередь отправки в Telegram.
+    Доставку выполняет фоновая задача drain_notification_outbox.
     
     Args:
         recipient_telegram_id: Telegram ID получателя
@@ -465,16 +673,16 @@ def create_notification(
         
         logger.info(f"📝 Создано уведомление #{notification.id} для {recipient_telegram_id}")
         
-        # Отправляем в Telegram если нужно
+        # Ставим в очередь отправки в Telegram если нужно
         if send_to_telegram:
-            success = send_telegram_notification_sync(
+            enqueue_telegram_notification(
                 recipient_telegram_id,
                 message,
                 web_app_url=web_app_url,
                 tenant=notification_tenant,
+                notification=notification,
+                dedup_key=f"notification:{notification.id}",
             )
-            if success:
-                notification.mark_as_sent()
         
         return notification
         
@@ -491,11 +699,13 @@ def notify_all_admins(
     related_object_type: Optional[str] = None,
     web_app_url: Optional[str] = None,
     request=None,
-    tenant=None
+    tenant=None,
+    dedup_key: Optional[str] = None
 ) -> int:
     """
     Отправляет уведомление всем админам текущего тенанта.
-    Создает одно уведомление в БД (для всех админов этого тенанта) и отправляет в Telegram каждому админу.
+    Создает одно уведомление в БД (для всех админов этого тенанта) и ставит сообщение
+    каждому админу в outbox; доставка выполняется в фоне.
     
     Args:
         notification_type: Тип уведомления
@@ -506,11 +716,13 @@ def notify_all_admins(
         web_app_url: URL для открытия mini app (опционально, если не указан, будет сформирован автоматически)
         request: Django request объект (опционально, используется для получения тенанта и формирования URL)
         tenant: Объект тенанта (опционально, имеет приоритет перед request.tenant)
+        dedup_key: Ключ события (например, "comment:42"); повторный вызов с тем же
+            ключом ничего не отправляет
         
     Returns:
-        int: Количество админов, которым было отправлено уведомление
+        int: Количество админов, которым уведомление поставлено в очередь
     """
-    from accounts.models import MiniAppUser, Notification, TelegramAdmin
+    from accounts.models import MiniAppUser, Notification, NotificationOutbox, TelegramAdmin
     
     try:
         # Пытаемся определить тенант
@@ -590,38 +802,47 @@ def notify_all_admins(
             if web_app_url:
                 logger.debug(f"🔗 Автоматически сформирован web_app_url для уведомления: {web_app_url}")
         
-        # Создаем ОДНО уведомление в БД для всех админов этого тенанта
-        admin_notification = Notification.objects.create(
-            tenant=tenant,
-            recipient_telegram_id=None,  # NULL для админских уведомлений
-            is_admin_notification=True,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            related_object_id=related_object_id,
-            related_object_type=related_object_type
-        )
-        
-        logger.info(f"📝 Создано админское уведомление #{admin_notification.id} для админов тенанта {tenant}")
+        if dedup_key and NotificationOutbox.objects.filter(
+            dedup_key__startswith=f"admin:{dedup_key}:"
+        ).exists():
+            logger.info(f"ℹ️ Админское уведомление {dedup_key} уже поставлено в очередь, пропускаем")
+            return 0
         
-        # Отправляем в Telegram каждому админу с web_app_url если есть
-        sent_count = 0
-        for telegram_id in recipients:
-            success = send_telegram_notification_sync(
-                telegram_id=telegram_id,
-                message=message,
-                web_app_url=web_app_url,
+        # Создаем ОДНО уведомление в БД для всех админов этого тенанта.
+        # Savepoint защищает транзакцию вызывающего кода от ошибок записи уведомления.
+        with transaction.atomic():
+            admin_notification = Notification.objects.create(
                 tenant=tenant,
+                recipient_telegram_id=None,  # NULL для админских уведомлений
+                is_admin_notification=True,
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                related_object_id=related_object_id,
+                related_object_type=related_object_type
             )
-            if success:
-                sent_count += 1
         
-        # Отмечаем уведомление как отправленное, если хотя бы одному админу отправлено
-        if sent_count > 0:
-            admin_notification.mark_as_sent()
+            logger.info(f"📝 Создано админское уведомление #{admin_notification.id} для админов тенанта {tenant}")
         
-        logger.info(f"📤 Уведомление отправлено {sent_count} из {len(recipients)} получателям (Тенант: {tenant})")
-        return sent_count
+            # Ставим сообщение каждому админу в outbox одним INSERT.
+            # Уведомление отмечается отправленным после первой успешной доставки.
+            event_key = dedup_key or f"notification:{admin_notification.id}"
+            NotificationOutbox.objects.bulk_create([
+                NotificationOutbox(
+                    tenant=tenant,
+                    notification=admin_notification,
+                    telegram_id=telegram_id,
+                    message=message,
+                    parse_mode='Markdown',
+                    web_app_url=web_app_url,
+                    dedup_key=f"admin:{event_key}:{telegram_id}",
+                )
+                for telegram_id in recipients
+            ], ignore_conflicts=True)
+            schedule_outbox_drain()
+        
+        logger.info(f"📤 Уведомление поставлено в очередь для {len(recipients)} получателей (Тенант: {tenant})")
+        return len(recipients)
         
     except Exception as e:
         logger.error(f"❌ Ошибка при отправке уведомлений админам: {e}", exc_info=True)
@@ -661,21 +882,19 @@ async def notify_admin(action: str, admin, groups):
         logger.error(f"notify_admin: Некорректное действие: {action!r}")
         return
 
-    # Отправляем напрямую через Telegram Bot API (больше не через внутренний бот-сервис)
+    # Отправляем напрямую через Telegram Bot API (больше не через внутренний бот-сервис).
+    # Клиент синхронный, поэтому вызов уходит в отдельный поток.
     try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            'chat_id': admin.telegram_id,
-            'text': message,
-            'parse_mode': 'Markdown',
-            'disable_web_page_preview': True,
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    logger.info(f"✅ Уведомление TelegramAdmin ({action}) отправлено → {admin.telegram_id}")
-                else:
-                    resp_text = await response.text()
-                    logger.error(f"❌ Ошибка Telegram API при отправке уведомления TelegramAdmin: {response.status} — {resp_text}")
+        await asyncio.to_thread(
+            get_bot_client(bot_token).send_message,
+            admin.telegram_id,
+            message,
+            parse_mode='Markdown',
+            disable_web_page_preview=True,
+            timeout=10,
+        )
+        logger.info(f"✅ Уведомление TelegramAdmin ({action}) отправлено → {admin.telegram_id}")
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка Telegram API при отправке уведомления TelegramAdmin: {e.error_code} — {e.description}")
     except Exception as e:
         logger.error(f"❌ Исключение при отправке уведомления TelegramAdmin {admin.telegram_id}: {e}")
@@ -11,12 +11,11 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LogoutView, PasswordResetView, PasswordResetConfirmView, PasswordResetDoneView, PasswordResetCompleteView
 from django.core.paginator import Paginator
 from django.db.models import Count
-from django.db.models.functions import TruncDate
 from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, ListView, TemplateView
-from tasks.models import TaskStatistics
+from tasks.models import TaskStatistics, UserDailyActivity
 from django.urls import reverse_lazy, reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -453,18 +452,11 @@ def get_user_chart_data(user):
     """
     Возвращает данные для графиков: активность, темы, сложность.
     """
-    # Активность по дням
-    activity_stats = TaskStatistics.objects.filter(
-        user=user,
-        last_attempt_date__isnull=False
-    ).annotate(
-        date=TruncDate('last_attempt_date')
-    ).values('date').annotate(
-        count=Count('id')
-    ).order_by('date')
+    # Активность по дням (из дневного ряда, без группировок по TaskStatistics)
+    activity_stats = UserDailyActivity.get_series(user)
     
     activity_dates = [stat['date'].strftime('%d.%m') for stat in activity_stats]
-    activity_data = [stat['count'] for stat in activity_stats]
+    activity_data = [stat['attempts'] for stat in activity_stats]
     
     # Статистика по темам
     category_stats = TaskStatistics.objects.filter(user=user).values(
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0033_globalchatmessage_reply_to"),
+        ("tenants", "0002_tenant_contact_email"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["sender", "recipient", "-created_at", "-id"],
+                name="blog_messag_sender__773387_idx",
+            ),
+        ),
+    ]
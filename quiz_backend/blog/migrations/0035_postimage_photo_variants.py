@@ -0,0 +1,23 @@
+# Generated by Django 5.1.11 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0034_message_blog_messag_sender__773387_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="postimage",
+            name="photo_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Копии фото WebP/AVIF по ширинам для srcset",
+                verbose_name="Копии фото",
+            ),
+        ),
+    ]
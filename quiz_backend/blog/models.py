@@ -264,6 +264,12 @@ class PostImage(models.Model):
         format='JPEG',
         options={'quality': 85}
     )
+    photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Копии фото",
+        help_text="Копии фото WebP/AVIF по ширинам для srcset"
+    )
     gif = models.FileField(
         upload_to="blog/posts/gifs/",
         blank=True,
@@ -682,6 +688,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Курсорная подгрузка переписки по (created_at, id)
+            models.Index(fields=['sender', 'recipient', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         """Возвращает строковое представление сообщения."""
@@ -1,14 +1,36 @@
 from rest_framework import serializers
-from .models import Category, Post, Project
+from tasks.services.image_variant_service import image_srcset
+from .models import Category, Post, PostImage, Project
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description']
 
+class PostImageSerializer(serializers.ModelSerializer):
+    """Фото поста с srcset копий WebP/AVIF ({"webp": "url 320w, ..."})."""
+    url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PostImage
+        fields = ['id', 'url', 'srcset', 'alt_text', 'is_main']
+
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_url(self, obj):
+        return self._absolute(obj.photo.url)
+
+    def get_srcset(self, obj):
+        return image_srcset(obj.photo_variants, obj.photo.name, self._absolute)
+
+
 class PostSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -16,10 +38,16 @@ class PostSerializer(serializers.ModelSerializer):
             'id', 'title', 'slug', 'content', 'excerpt',
             'category', 'category_id', 'published',
             'featured', 'created_at', 'updated_at',
-            'published_at', 'views_count'
+            'published_at', 'views_count', 'images'
         ]
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at', 'views_count']
 
+    def get_images(self, obj):
+        """Фото поста (GIF и видео не включаются), главное — первым."""
+        photos = [image for image in obj.images.all() if image.photo]
+        photos.sort(key=lambda image: (not image.is_main, image.pk))
+        return PostImageSerializer(photos, many=True, context=self.context).data
+
 class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
@@ -4,7 +4,7 @@ import logging
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Post
+from .models import Post, PostImage
 from .utils import html_to_telegram_text, truncate_telegram_text
 
 logger = logging.getLogger(__name__)
@@ -257,3 +257,10 @@ def send_post_to_telegram_on_publish(sender, instance, created, **kwargs):
     except Exception as e:
         logger.error(f"Ошибка при автоматической отправке поста '{instance.title}' в Telegram: {e}")
 
+
+@receiver(post_save, sender=PostImage)
+def schedule_post_photo_variants(sender, instance, update_fields=None, **kwargs):
+    """Строит копии фото поста (WebP/AVIF) после загрузки нового файла."""
+    from tasks.services.image_variant_service import schedule_if_stale
+
+    schedule_if_stale('blog', instance, update_fields)
@@ -0,0 +1,50 @@
+"""
+Тесты подгрузки переписки между пользователями по курсору.
+"""
+import json
+
+from django.test import RequestFactory, TestCase
+
+from accounts.models import CustomUser
+from blog.models import Message
+from blog.views import get_conversation
+
+
+class ConversationKeysetTestCase(TestCase):
+    """
+    Переписка отдаётся последней страницей, ранние сообщения — по курсору.
+    """
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='reader', email='reader@example.com', password='password123'
+        )
+        self.other = CustomUser.objects.create_user(
+            username='writer', email='writer@example.com', password='password123'
+        )
+        self.messages = [
+            Message.objects.create(sender=self.other, recipient=self.user, content=f'Message {index}')
+            for index in range(7)
+        ]
+        self.factory = RequestFactory()
+
+    def _get(self, params):
+        request = self.factory.get('/messages/conversation/writer/', params)
+        request.user = self.user
+        return json.loads(get_conversation(request, 'writer').content)
+
+    def test_loads_older_messages_by_cursor(self):
+        latest = self._get({'limit': 5})
+        self.assertTrue(latest['has_more'])
+        self.assertEqual(
+            [message['id'] for message in latest['messages']],
+            [message.id for message in self.messages[2:]]
+        )
+
+        older = self._get({'limit': 5, 'cursor': latest['next_cursor']})
+        self.assertFalse(older['has_more'])
+        self.assertIsNone(older['next_cursor'])
+        self.assertEqual(
+            [message['id'] for message in older['messages']],
+            [message.id for message in self.messages[:2]]
+        )
@@ -2,6 +2,9 @@
 Тесты для проверки доступности ссылок для роботов поисковых систем.
 Проверяет, что роботы видят все страницы, canonical URL, hreflang теги, sitemap и robots.txt.
 """
+import shutil
+import tempfile
+
 from django.test import TransactionTestCase, Client, override_settings
 from django.contrib.sites.models import Site
 from django.urls import reverse
@@ -41,6 +44,13 @@ class SEORobotsTestCase(TransactionTestCase):
         """
         Настройка тестовых данных.
         """
+        # OG-изображения, которые рисуются при рендере страниц, пишутся во временный MEDIA_ROOT
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
         self.client = Client()
         
         # Django автоматически создает Site с id=1 в тестах, но обновляем домен
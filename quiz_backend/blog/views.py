@@ -41,7 +41,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response as DRFResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from tasks.models import Task, TaskTranslation, TaskStatistics
+from tasks.models import Task, TaskTranslation, TaskStatistics, UserDailyActivity
+from tasks.pagination import decode_cursor, encode_cursor, keyset_filter
 from topics.models import Topic, Subtopic
 
 
@@ -225,8 +226,8 @@ class PostViewSet(viewsets.ModelViewSet):
         Для других операций возвращаются все посты.
         """
         if self.action == 'list':
-            return Post.objects.filter(published=True)
-        return Post.objects.all()
+            return Post.objects.filter(published=True).prefetch_related('images')
+        return Post.objects.prefetch_related('images')
 
     @action(detail=True, methods=['post'])
     def increment_views(self, request, slug=None):
@@ -2074,6 +2075,10 @@ def submit_task_answer(request, quiz_type, subtopic, task_id):
             
             # Обновляем объект из БД, чтобы получить актуальное значение attempts
             stats.refresh_from_db()
+
+        # Учитываем ответ в дневном ряду активности (один раз на ответ,
+        # без дублей от синхронизации между языками)
+        UserDailyActivity.record(request.user, successful=is_correct)
         
         # Синхронизируем статистику для всех задач с тем же translation_group_id
         # Используем транзакцию для атомарности
@@ -2431,11 +2436,18 @@ def send_message(request):
 
 
 
+CONVERSATION_PAGE_SIZE = 50
+CONVERSATION_MAX_PAGE_SIZE = 200
+
+
 @login_required
 def get_conversation(request, recipient_username):
     """
     Возвращает сообщения между текущим пользователем и указанным recipient_username.
     Отмечает непрочитанные сообщения как прочитанные.
+
+    Отдаёт последние limit сообщений в хронологическом порядке. Если есть более
+    ранние, в ответе has_more=True и next_cursor для параметра ?cursor=.
     """
     logger.info(f"get_conversation: Запрос от {request.user.username} для {recipient_username}")
     recipient = get_object_or_404(CustomUser, username=recipient_username)
@@ -2449,17 +2461,39 @@ def get_conversation(request, recipient_username):
         is_deleted_by_recipient=False
     ).update(is_read=True)
 
-    # Получаем сообщения (входящие и исходящие) в хронологическом порядке
+    # Получаем сообщения (входящие и исходящие): последнюю страницу диалога,
+    # более ранние сообщения догружаются по курсору (created_at, id)
     messages = Message.objects.filter(
         (
             Q(sender=user, recipient=recipient, is_deleted_by_sender=False) |
             Q(sender=recipient, recipient=user, is_deleted_by_recipient=False)
         )
-    ).select_related('sender', 'recipient').prefetch_related('attachments').order_by('created_at')
+    ).select_related('sender', 'recipient').prefetch_related('attachments')
+
+    try:
+        limit = int(request.GET.get('limit', CONVERSATION_PAGE_SIZE))
+    except (TypeError, ValueError):
+        limit = CONVERSATION_PAGE_SIZE
+    limit = min(max(limit, 1), CONVERSATION_MAX_PAGE_SIZE)
+
+    cursor_raw = request.GET.get('cursor')
+    if cursor_raw:
+        cursor = decode_cursor(cursor_raw)
+        if cursor is None:
+            return JsonResponse({'status': 'error', 'message': 'Неверный курсор'}, status=400)
+        messages = keyset_filter(messages, cursor['c'], cursor['i'], descending=True)
+
+    page = list(messages.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    page.reverse()
+    next_cursor = None
+    if has_more and page:
+        next_cursor = encode_cursor({'c': page[0].created_at.isoformat(), 'i': page[0].id})
 
     # Формируем JSON-ответ
     messages_data = []
-    for message in messages:
+    for message in page:
         attachments = [
             {
                 'id': att.id,
@@ -2479,7 +2513,11 @@ def get_conversation(request, recipient_username):
         })
 
     logger.info(f"get_conversation: Возвращено {len(messages_data)} сообщений")
-    return JsonResponse({'messages': messages_data})
+    return JsonResponse({
+        'messages': messages_data,
+        'has_more': has_more,
+        'next_cursor': next_cursor,
+    })
 
 
 
@@ -2540,42 +2578,47 @@ def inbox(request):
         last_message_id=Max('id')
     ).distinct().order_by('-last_message_id')
 
-    dialog_list = []
-    seen_users = set()  # Для исключения дубликатов
+    # Для каждого собеседника берём пару с самым свежим сообщением
+    dialog_last_ids = {}
     for dialog in dialogs:
         other_user_id = dialog['recipient'] if dialog['sender'] == user.id else dialog['sender']
-        if other_user_id in seen_users:
-            continue
-        seen_users.add(other_user_id)
+        if other_user_id not in dialog_last_ids:
+            dialog_last_ids[other_user_id] = dialog['last_message_id']
+
+    # Собеседники, последние сообщения и счётчики непрочитанных — тремя запросами
+    # на весь список вместо нескольких запросов на каждый диалог
+    other_users = CustomUser.objects.filter(is_active=True).in_bulk(list(dialog_last_ids))
+    last_messages = Message.objects.in_bulk(list(dialog_last_ids.values()))
+    unread_counts = dict(
+        Message.objects.filter(
+            recipient=user,
+            sender_id__in=list(other_users),
+            is_read=False,
+            is_deleted_by_recipient=False,
+            sender__is_active=True,  # Учитываем только активных отправителей
+        ).values('sender_id').annotate(
+            unread=Count('id')
+        ).values_list('sender_id', 'unread')
+    )
 
-        try:
-            # Проверяем, существует ли пользователь и активен ли он
-            other_user = CustomUser.objects.get(id=other_user_id, is_active=True)
-        except CustomUser.DoesNotExist:
+    dialog_list = []
+    for other_user_id, last_message_id in dialog_last_ids.items():
+        other_user = other_users.get(other_user_id)
+        if other_user is None:
             logger.warning(f"User with id={other_user_id} does not exist or is inactive, skipping dialog")
             continue
-
-        try:
-            last_message = Message.objects.get(id=dialog['last_message_id'])
-            # Подсчет непрочитанных сообщений с учетом всех условий
-            unread_count = Message.objects.filter(
-                recipient=user,
-                sender=other_user,
-                is_read=False,
-                is_deleted_by_recipient=False,
-                sender__is_active=True,  # Учитываем только активных отправителей
-                sender__isnull=False  # Исключаем анонимные сообщения
-            ).count()
-            if unread_count > 0:
-                logger.debug(f"Found {unread_count} unread messages for dialog with user {other_user.username}")
-            dialog_list.append({
-                'user': other_user,
-                'last_message': last_message,
-                'unread_count': unread_count
-            })
-        except Message.DoesNotExist:
-            logger.warning(f"Last message with id={dialog['last_message_id']} not found, skipping dialog")
+        last_message = last_messages.get(last_message_id)
+        if last_message is None:
+            logger.warning(f"Last message with id={last_message_id} not found, skipping dialog")
             continue
+        unread_count = unread_counts.get(other_user_id, 0)
+        if unread_count > 0:
+            logger.debug(f"Found {unread_count} unread messages for dialog with user {other_user.username}")
+        dialog_list.append({
+            'user': other_user,
+            'last_message': last_message,
+            'unread_count': unread_count
+        })
 
     logger.info(f"Found {len(dialog_list)} valid dialogs for user: {user.username}")
     
@@ -44,6 +44,16 @@ app.conf.beat_schedule = {
         'task': 'config.tasks.delete_old_videos_from_r2',
         'schedule': crontab(hour=4, minute=0),
     },
+    # Доставка отложенных Telegram-уведомлений (повторы из outbox) каждую минуту
+    'drain-notification-outbox': {
+        'task': 'config.tasks.drain_notification_outbox',
+        'schedule': crontab(minute='*'),
+    },
+    # Продолжение брошенных рассылок подписчикам бота каждые 5 минут
+    'resume-bot-broadcasts': {
+        'task': 'config.tasks.resume_bot_broadcasts',
+        'schedule': crontab(minute='*/5'),
+    },
 }
 
 
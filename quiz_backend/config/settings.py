@@ -705,6 +705,34 @@ DEFAULT_META_KEYWORDS = 'programming quiz, coding challenges, Python tutorial, J
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_BOT_USERNAME = os.getenv('TELEGRAM_BOT_USERNAME', 'mr_proger_bot')
 
+# Общий клиент Bot API (config/telegram_client.py)
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+# Лимиты Telegram: сообщений в секунду на бота, в секунду в личный чат, в минуту в группу
+TELEGRAM_API_GLOBAL_RATE = float(os.getenv('TELEGRAM_API_GLOBAL_RATE', '30'))
+TELEGRAM_API_CHAT_RATE = float(os.getenv('TELEGRAM_API_CHAT_RATE', '1'))
+TELEGRAM_API_GROUP_RATE_PER_MINUTE = float(os.getenv('TELEGRAM_API_GROUP_RATE_PER_MINUTE', '20'))
+# Повторы при 429/5xx/сетевых ошибках; retry_after больше лимита не ждём
+TELEGRAM_API_MAX_RETRIES = int(os.getenv('TELEGRAM_API_MAX_RETRIES', '3'))
+TELEGRAM_API_MAX_RETRY_AFTER = int(os.getenv('TELEGRAM_API_MAX_RETRY_AFTER', '60'))
+TELEGRAM_API_TIMEOUT = int(os.getenv('TELEGRAM_API_TIMEOUT', '30'))
+# Размер пула keep-alive соединений на один токен
+TELEGRAM_API_POOL_SIZE = int(os.getenv('TELEGRAM_API_POOL_SIZE', '10'))
+# Dotted path к функции hook(event: dict), получающей событие на каждый HTTP-запрос
+TELEGRAM_API_METRICS_HOOK = os.getenv('TELEGRAM_API_METRICS_HOOK') or None
+
+# Рассылка постов подписчикам бота (platforms.broadcast)
+# Сколько получателей читать из БД за один запрос
+BOT_BROADCAST_CHUNK_SIZE = int(os.getenv('BOT_BROADCAST_CHUNK_SIZE', '200'))
+# Сколько получателей отправлять между сохранениями курсора и heartbeat:
+# после падения воркера повторно может уйти не больше одной такой порции
+BOT_BROADCAST_PROGRESS_BATCH = int(os.getenv('BOT_BROADCAST_PROGRESS_BATCH', '20'))
+# Сколько раз продолжать упавшую рассылку, прежде чем отметить её ошибкой
+BOT_BROADCAST_MAX_RESUMES = int(os.getenv('BOT_BROADCAST_MAX_RESUMES', '3'))
+# Параллельные отправки; общий темп всё равно ограничивает TELEGRAM_API_GLOBAL_RATE
+BOT_BROADCAST_CONCURRENCY = int(os.getenv('BOT_BROADCAST_CONCURRENCY', '16'))
+# Через сколько секунд без прогресса рассылка считается брошенной и перезапускается
+BOT_BROADCAST_STALE_SECONDS = int(os.getenv('BOT_BROADCAST_STALE_SECONDS', '300'))
+
 # Google OAuth settings
 GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID')
 GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET')
@@ -775,12 +803,56 @@ else:
 # Logo path for image generation
 LOGO_PATH = os.path.join(MEDIA_ROOT, 'logos/logo.png')
 
+# Локальный индекс кэша отрисованных картинок задач (ключ отрисовки -> URL в R2/S3)
+IMAGE_RENDER_CACHE_DIR = os.getenv('IMAGE_RENDER_CACHE_DIR', os.path.join(MEDIA_ROOT, 'render_cache'))
+# Пакетная генерация картинок: процессов для отрисовки и одновременных загрузок в R2/S3
+IMAGE_BATCH_WORKERS = int(os.getenv('IMAGE_BATCH_WORKERS', min(4, os.cpu_count() or 1)))
+IMAGE_BATCH_UPLOAD_CONCURRENCY = int(os.getenv('IMAGE_BATCH_UPLOAD_CONCURRENCY', 8))
+# Уровень сжатия PNG перед загрузкой (0-9): 3 заметно быстрее optimize=True при близком размере
+IMAGE_PNG_COMPRESS_LEVEL = int(os.getenv('IMAGE_PNG_COMPRESS_LEVEL', 3))
+# Общий клиент R2/S3: соединений в пуле; multipart-загрузка видео: размер части (МБ) и частей одновременно
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', 20))
+S3_MULTIPART_PART_SIZE_MB = int(os.getenv('S3_MULTIPART_PART_SIZE_MB', 8))
+S3_MULTIPART_CONCURRENCY = int(os.getenv('S3_MULTIPART_CONCURRENCY', 4))
+# Адаптивные копии картинок задач, аватаров и фото блога для srcset: ширины (px), форматы
+# (avif — только с pillow-avif-plugin или Pillow >= 11.2) и качество
+IMAGE_VARIANTS_ENABLED = os.getenv('IMAGE_VARIANTS_ENABLED', 'True').lower() == 'true'
+IMAGE_VARIANT_WIDTHS = [int(width) for width in os.getenv('IMAGE_VARIANT_WIDTHS', '320,640,960').split(',') if width.strip()]
+IMAGE_VARIANT_FORMATS = [fmt.strip() for fmt in os.getenv('IMAGE_VARIANT_FORMATS', 'webp,avif').split(',') if fmt.strip()]
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+# Удаление старых видео из R2/S3: возраст видео (дни) и задач в одной пачке (ключи удаляются по 1000)
+VIDEO_RETENTION_DAYS = int(os.getenv('VIDEO_RETENTION_DAYS', 10))
+VIDEO_RETENTION_BATCH_SIZE = int(os.getenv('VIDEO_RETENTION_BATCH_SIZE', 500))
+# Долгоживущие форматтеры кода (prettier, gofmt): процессов на язык, таймаут вызова и старта (с),
+# пауза перед повторной попыткой, если инструмента нет, и интервал проверки простаивающего воркера
+CODE_FORMATTER_POOL_SIZE = int(os.getenv('CODE_FORMATTER_POOL_SIZE', 2))
+CODE_FORMATTER_TIMEOUT = float(os.getenv('CODE_FORMATTER_TIMEOUT', 5))
+CODE_FORMATTER_STARTUP_TIMEOUT = float(os.getenv('CODE_FORMATTER_STARTUP_TIMEOUT', 20))
+CODE_FORMATTER_RETRY_AFTER = int(os.getenv('CODE_FORMATTER_RETRY_AFTER', 300))
+CODE_FORMATTER_HEALTHCHECK_INTERVAL = int(os.getenv('CODE_FORMATTER_HEALTHCHECK_INTERVAL', 60))
+# Кэш отформатированного кода по хэшу исходника (с)
+CODE_FORMAT_CACHE_TIMEOUT = int(os.getenv('CODE_FORMAT_CACHE_TIMEOUT', 7 * 24 * 3600))
+
 # Video generation settings
 VIDEO_GENERATION_ENABLED = os.getenv('VIDEO_GENERATION_ENABLED', 'True').lower() == 'true'
 VIDEO_WIDTH = int(os.getenv('VIDEO_WIDTH', '1080'))
 VIDEO_HEIGHT = int(os.getenv('VIDEO_HEIGHT', '1920'))
 VIDEO_TYPING_SPEED = float(os.getenv('VIDEO_TYPING_SPEED', '25'))  # символов в секунду (побуквенное печатание)
 VIDEO_FPS = int(os.getenv('VIDEO_FPS', '24'))
+# Клипы с набором кода без вопроса, общие для языковых версий видео задачи, и их срок жизни (с)
+VIDEO_CODE_CLIP_CACHE_DIR = os.getenv('VIDEO_CODE_CLIP_CACHE_DIR', os.path.join(MEDIA_ROOT, 'video_clip_cache'))
+VIDEO_CODE_CLIP_CACHE_TTL = int(os.getenv('VIDEO_CODE_CLIP_CACHE_TTL', 6 * 3600))
+# Кодирование видео кусками: одновременных кусков на задачу (1 — выключено), минимум кадров
+# в куске и бюджет памяти на задачу (МБ), которым ограничивается число одновременных кусков
+VIDEO_CHUNK_WORKERS = int(os.getenv('VIDEO_CHUNK_WORKERS', 1))
+VIDEO_CHUNK_MIN_FRAMES = int(os.getenv('VIDEO_CHUNK_MIN_FRAMES', 96))
+VIDEO_CHUNK_MEMORY_BUDGET_MB = int(os.getenv('VIDEO_CHUNK_MEMORY_BUDGET_MB', 768))
+# Блокировка генерации видео (задача, язык): аренда воркера с продлением и срок метки «в очереди» (с)
+VIDEO_JOB_LOCK_LEASE = int(os.getenv('VIDEO_JOB_LOCK_LEASE', 120))
+VIDEO_JOB_QUEUED_TTL = int(os.getenv('VIDEO_JOB_QUEUED_TTL', 1800))
+# Сведённые аудиодорожки видео (WAV по ключу таймлайна и версии звуков) и скачанная фоновая музыка
+VIDEO_AUDIO_CACHE_DIR = os.getenv('VIDEO_AUDIO_CACHE_DIR', os.path.join(MEDIA_ROOT, 'video_audio_cache'))
+VIDEO_AUDIO_CACHE_TTL = int(os.getenv('VIDEO_AUDIO_CACHE_TTL', 24 * 3600))
 KEYBOARD_AUDIO_PATH = os.getenv('KEYBOARD_AUDIO_PATH', None)  # опционально, если нет - видео без звука
 TELEGRAM_ADMIN_CHAT_ID = os.getenv('TELEGRAM_ADMIN_CHAT_ID', None)  # Chat ID админа для отправки сгенерированных видео
 
@@ -807,6 +879,18 @@ CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 # Исправление предупреждения о broker_connection_retry для Celery 6.0+
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 
+# NOTIFICATION OUTBOX SETTINGS
+# Размер пачки, которую доставляет одна итерация drain_notification_outbox
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATION_OUTBOX_BATCH_SIZE', '50'))
+# После стольких неудачных попыток сообщение переводится в статус dead
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', '5'))
+# Время «аренды» сообщения воркером (секунды); после него сообщение снова доступно
+NOTIFICATION_OUTBOX_LEASE_SECONDS = int(os.getenv('NOTIFICATION_OUTBOX_LEASE_SECONDS', '300'))
+# Сколько уведомлений отправлять одновременно (рассылка админам, пачка outbox)
+TELEGRAM_NOTIFICATION_CONCURRENCY = int(os.getenv('TELEGRAM_NOTIFICATION_CONCURRENCY', '8'))
+# Сколько помнить сработавшие для чата токен бота и parse_mode (секунды)
+TELEGRAM_DELIVERY_CACHE_TIMEOUT = int(os.getenv('TELEGRAM_DELIVERY_CACHE_TIMEOUT', str(7 * 24 * 3600)))
+
 # WEBHOOK SETTINGS
 # Режим отправки вебхуков: sync (синхронно) или async (асинхронно через Celery)
 WEBHOOK_SEND_MODE = os.getenv('WEBHOOK_SEND_MODE', 'async').lower()
@@ -818,6 +902,14 @@ WEBHOOK_TIMEOUT = int(os.getenv('WEBHOOK_TIMEOUT', '30'))
 WEBHOOK_RETRIES = int(os.getenv('WEBHOOK_RETRIES', '3'))
 # Задержка между попытками (секунды)
 WEBHOOK_RETRY_DELAY = int(os.getenv('WEBHOOK_RETRY_DELAY', '2'))
+# Сколько вебхуков отправлять одновременно (и размер пула соединений)
+WEBHOOK_MAX_CONCURRENT = int(os.getenv('WEBHOOK_MAX_CONCURRENT', '5'))
+# После скольких неудач подряд вебхук временно пропускается (circuit breaker)
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', '3'))
+# Первая пауза после открытия circuit (секунды), дальше удваивается
+WEBHOOK_CIRCUIT_COOLDOWN = int(os.getenv('WEBHOOK_CIRCUIT_COOLDOWN', '60'))
+# Максимальная пауза circuit breaker (секунды)
+WEBHOOK_CIRCUIT_MAX_COOLDOWN = int(os.getenv('WEBHOOK_CIRCUIT_MAX_COOLDOWN', '3600'))
 
 # ============================================================
 # SESSION SETTINGS (оптимизация)
@@ -225,9 +225,12 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
     Returns:
         URL видео или None при ошибке
     """
+    job_lock = None
+    retrying = False
     try:
         from tasks.models import Task
         from tasks.services.video_generation_service import generate_video_for_task
+        from tasks.services.video_job_service import VideoJobLock, record_video_result
         from django.contrib import messages
         from django.contrib.admin.models import LogEntry, ADDITION, CHANGE
         from django.core.cache import cache
@@ -239,7 +242,6 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
 
         if failures_count >= max_failures:
             logger.error(f"🚫 [Circuit Breaker] Видео генерация отключена из-за {failures_count} последовательных ошибок")
-            logs.append(f"🚫 Circuit Breaker: {failures_count} ошибок подряд, генерация отключена")
             return None
 
         # Инициализируем логи для админки (максимум 5000 символов для экономии памяти)
@@ -279,6 +281,20 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
             task.save(update_fields=['video_generation_logs'])
             return task.video_url
         
+        # Одна генерация на (задачу, язык, версию рендерера): повторный запуск присоединяется к идущей
+        job_lock = VideoJobLock(task_id, video_language, owner=self.request.id)
+        if not job_lock.acquire():
+            holder = job_lock.holder or {}
+            info_msg = (
+                f"🔗 Видео задачи {task_id} ({video_language}) уже генерирует {holder.get('owner')} "
+                f"на {holder.get('host')}, запуск присоединён к ней"
+            )
+            logger.info(f"🔗 [Celery] {info_msg}")
+            logs.append(info_msg)
+            task.video_generation_logs = "\n".join(logs)
+            task.save(update_fields=['video_generation_logs'])
+            return None
+
         # Если требуется перегенерация и есть старое видео, удаляем его
         if task.video_url and force_regenerate:
             old_video_url = task.video_url
@@ -331,14 +347,11 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
             logger.info(f"📝 [Celery] Этап 2/4: Видео сгенерировано")
             logger.info(f"📝 [Celery] Этап 3/4: Загрузка в S3/R2...")
             
-            # Сохраняем URL видео в задачу по языку
-            task.video_urls = task.video_urls or {}
-            task.video_urls[video_language] = video_url
-
-            # Отмечаем язык как готовый
-            task.video_generation_progress = task.video_generation_progress or {}
-            task.video_generation_progress[video_language] = True
-            task.save(update_fields=['video_urls', 'video_generation_progress', 'video_generation_logs'])
+            # Сохраняем URL видео по языку и отмечаем язык как готовый (под блокировкой строки:
+            # другие языки этой задачи могут записывать свои результаты одновременно)
+            task.video_urls, task.video_generation_progress = record_video_result(task_id, video_language, video_url)
+            task.save(update_fields=['video_generation_logs'])
+            job_lock.release()
 
             # Проверяем, все ли ожидаемые языки готовы
             if expected_languages:
@@ -443,6 +456,7 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
             task.video_generation_logs = log_text
             task.save(update_fields=['video_generation_logs'])
             
+            job_lock.release()
             logger.warning(f"⚠️ [Celery] Не удалось сгенерировать видео для задачи {task_id}")
             logger.warning(f"   🔍 Проверьте логи выше для деталей ошибки")
             logger.info(f"🎬 [Celery] ════════════════════════════════════════════════")
@@ -485,8 +499,22 @@ def generate_video_for_task_async(self, task_id, task_question, topic_name, subt
         except Exception as cache_exc:
             logger.error(f"❌ Ошибка обновления circuit breaker: {cache_exc}")
 
+        # Повтор с тем же ID снова возьмёт блокировку; без повторов — снимаем её
+        retrying = self.request.retries < self.max_retries
+        if job_lock is not None and job_lock.owner == self.request.id and retrying:
+            job_lock.requeue()
+        elif job_lock is not None:
+            job_lock.release()
+
         # Повторная попытка через 5 минут (если не превышен лимит)
         raise self.retry(exc=exc, countdown=300)
+    finally:
+        # Выход до аренды (circuit breaker, задачи нет, видео уже есть) оставил бы метку
+        # «в очереди» из enqueue_video_job, и новые запросы присоединялись бы к ней
+        # до VIDEO_JOB_QUEUED_TTL; повтору задачи метка ещё нужна
+        if job_lock is None and not retrying:
+            from tasks.services.video_job_service import discard_queued_video_job
+            discard_queued_video_job(task_id, video_language, self.request.id)
 
 
 @shared_task(bind=True, max_retries=2, default_retry_delay=60, queue='webhooks_queue' if os.getenv('DEBUG') != 'True' else 'celery')
@@ -694,74 +722,130 @@ def send_webhooks_async(self, task_ids, webhook_type_filter=None, admin_chat_id=
 @shared_task
 def delete_old_videos_from_r2():
     """
-    Удаляет видео из R2, которые старше 10 дней.
-    Запускается автоматически каждый день в 4:00.
+    Удаляет видео из R2, которые старше VIDEO_RETENTION_DAYS (10 дней),
+    и логи генерации видео старше 7 дней.
+    Запускается автоматически каждый день в 4:00; прерванный запуск
+    продолжается со своего места (см. video_retention_service).
     
     Returns:
-        int: Количество удаленных видео
+        dict: Сводка запуска (задачи, удалённые объекты, ошибки, запросы, время)
     """
-    from tasks.models import Task
-    from tasks.services.s3_service import delete_image_from_s3
-    from django.utils import timezone
-    from datetime import timedelta
+    from tasks.services.video_retention_service import cleanup_old_videos
     
     try:
-        # Вычисляем дату 10 дней назад
-        cutoff_date = timezone.now() - timedelta(days=10)
-        
-        # Находим задачи с видео, которые старше 10 дней
-        # Используем publish_date если есть, иначе create_date
-        from django.db.models import Q, F
-        old_tasks = Task.objects.filter(
-            video_url__isnull=False
-        ).exclude(video_url='').filter(
-            Q(publish_date__lt=cutoff_date) | 
-            Q(publish_date__isnull=True, create_date__lt=cutoff_date)
-        )
-        
-        deleted_count = 0
-        failed_count = 0
-        
-        logger.info(f"🗑️ [Celery] ════════════════════════════════════════════════")
-        logger.info(f"🗑️ [Celery] Начинаем удаление старых видео (старше 10 дней)")
-        logger.info(f"   📅 Дата отсечки: {cutoff_date.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"   📊 Найдено задач с видео: {old_tasks.count()}")
-        
-        for task in old_tasks:
-            try:
-                video_url = task.video_url
-                if delete_image_from_s3(video_url):
-                    # Очищаем video_url в задаче
-                    task.video_url = None
-                    task.save(update_fields=['video_url'])
-                    deleted_count += 1
-                    logger.info(f"✅ [Celery] Видео удалено для задачи {task.id}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"⚠️ [Celery] Не удалось удалить видео для задачи {task.id}")
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"❌ [Celery] Ошибка при удалении видео для задачи {task.id}: {e}")
-        
-        logger.info(f"🎉 [Celery] Удаление завершено: удалено {deleted_count}, ошибок {failed_count}")
-        
-        # Очищаем старые логи генерации видео (старше 7 дней)
-        logs_cutoff_date = timezone.now() - timedelta(days=7)
-        old_logs_tasks = Task.objects.filter(
-            video_generation_logs__isnull=False
-        ).exclude(video_generation_logs='').filter(
-            Q(publish_date__lt=logs_cutoff_date) | 
-            Q(publish_date__isnull=True, create_date__lt=logs_cutoff_date)
-        )
-        
-        logs_cleared_count = old_logs_tasks.update(video_generation_logs=None)
-        if logs_cleared_count > 0:
-            logger.info(f"🧹 [Celery] Очищено старых логов генерации видео: {logs_cleared_count}")
-        
-        logger.info(f"🗑️ [Celery] ════════════════════════════════════════════════")
-        return deleted_count
-        
+        return cleanup_old_videos()
     except Exception as e:
         logger.error(f"❌ [Celery] Критическая ошибка при удалении старых видео: {e}", exc_info=True)
-        return 0
+        return None
+
+
+@shared_task
+def drain_notification_outbox(max_batches=20):
+    """
+    Доставка Telegram-уведомлений из outbox (NotificationOutbox).
+    Запускается после коммита транзакции, поставившей уведомление,
+    и раз в минуту по расписанию для повторов.
+    
+    Args:
+        max_batches: Максимум пачек за один запуск
+    """
+    from accounts.utils_folder.telegram_notifications import drain_notification_outbox_batch
+    
+    totals = {'sent': 0, 'retry': 0, 'dead': 0}
+    for _ in range(max_batches):
+        stats = drain_notification_outbox_batch()
+        for key, value in stats.items():
+            totals[key] += value
+        if not any(stats.values()):
+            break
+    return totals
+
+
+@shared_task
+def run_bot_broadcast_task(broadcast_id):
+    """
+    Рассылка поста подписчикам бота (BotBroadcast).
+    Продолжает с сохранённого курсора, если рассылка уже начиналась.
+    
+    Args:
+        broadcast_id: ID рассылки
+    """
+    from platforms.broadcast import run_bot_broadcast
+    
+    broadcast = run_bot_broadcast(broadcast_id)
+    if broadcast is None:
+        return None
+    return {
+        'status': broadcast.status,
+        'sent': broadcast.sent_count,
+        'blocked': broadcast.blocked_count,
+        'failed': broadcast.failed_count,
+    }
+
+
+@shared_task
+def resume_bot_broadcasts():
+    """
+    Перезапускает рассылки, которые не стартовали или остановились
+    вместе с воркером.
+    """
+    from platforms.broadcast import resume_stale_broadcasts
+    
+    broadcast_ids = resume_stale_broadcasts()
+    for broadcast_id in broadcast_ids:
+        logger.info(f"🔁 [Celery] Продолжаем рассылку #{broadcast_id}")
+        run_bot_broadcast_task.delay(broadcast_id)
+    return broadcast_ids
+
 
+@shared_task(
+    # Воркер video_queue запущен с --pool=solo: он может создавать пул процессов для отрисовки
+    queue='celery' if os.getenv('DEBUG') == 'True' else 'video_queue',
+    time_limit=3600,
+    soft_time_limit=3300
+)
+def generate_task_images_batch(task_ids, theme='code', custom_logo_path=None, workers=None):
+    """
+    Пакетная генерация картинок задач (действие админки).
+
+    Картинки рисуются в пуле процессов и загружаются в R2/S3 параллельно,
+    уже загруженные с теми же входными данными берутся из кэша отрисовок.
+
+    Args:
+        task_ids: ID задач
+        theme: Тема оформления ('code', 'islamic')
+        custom_logo_path: Логотип тенанта
+        workers: Процессов для отрисовки (по умолчанию IMAGE_BATCH_WORKERS)
+    """
+    from tasks.models import Task
+    from tasks.services.image_batch_service import generate_task_images
+    
+    tasks = Task.objects.filter(id__in=task_ids).select_related('topic', 'tenant').prefetch_related('translations')
+    result = generate_task_images(tasks, theme=theme, custom_logo_path=custom_logo_path, workers=workers)
+    logger.info(f"🖼️ [Celery] Картинки задач: {result.summary()}")
+    return {
+        'rendered': result.rendered,
+        'cached': result.cached,
+        'failed': result.failed,
+        'elapsed': round(result.elapsed, 2),
+        'images_per_second': round(result.images_per_second, 2),
+    }
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60)
+def generate_image_variants_async(self, target_name, pk):
+    """
+    Строит адаптивные копии (WebP/AVIF) изображения объекта и записывает их на модель.
+
+    Args:
+        target_name: 'tasks' (картинка задачи), 'avatars' (аватар Mini App) или 'blog' (фото поста)
+        pk: ID объекта
+    """
+    from tasks.services.image_variant_service import generate_variants
+
+    try:
+        manifest = generate_variants(target_name, pk)
+    except Exception as e:
+        logger.warning(f"⚠️ Копии изображения {target_name}#{pk} не построены: {e}")
+        raise self.retry(exc=e)
+    return bool(manifest and len(manifest) > 1)
@@ -0,0 +1,370 @@
+"""
+Общий клиент Telegram Bot API для Django-части проекта.
+
+Все синхронные вызовы Bot API (публикация задач, уведомления, ответы
+поддержки, рассылки постов) идут через этот модуль:
+
+- один requests.Session с пулом keep-alive соединений на каждый токен бота;
+- token bucket на токен (общий лимит ~30 сообщений в секунду) и на чат
+  (1 сообщение в секунду в личку, 20 в минуту в группу/канал);
+- повторы при 429 с ожиданием ровно retry_after из ответа Telegram,
+  при 5xx и сетевых ошибках — экспоненциальная задержка;
+- хук метрик, который получает событие на каждую HTTP-попытку.
+
+Лимиты считаются в пределах процесса: каждый воркер Celery и каждый
+процесс gunicorn имеет свои корзины.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Методы, которые отправляют сообщение в чат и подпадают под лимит на чат
+CHAT_LIMITED_METHOD_PREFIXES = ('send', 'copy', 'forward')
+
+# Фрагменты описания ошибки, означающие, что чат недоступен навсегда
+CHAT_UNAVAILABLE_MARKERS = (
+    'bot was blocked',
+    'chat not found',
+    'user not found',
+    'user is deactivated',
+    'bot can\'t initiate conversation',
+    'bot was kicked',
+)
+
+
+class TelegramAPIError(Exception):
+    """
+    Ошибка вызова Bot API: ответ с ok=false или исчерпанные повторы.
+    """
+
+    def __init__(self, description: str, error_code: Optional[int] = None,
+                 retry_after: Optional[int] = None, method: Optional[str] = None):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+        self.retry_after = retry_after
+        self.method = method
+
+    @property
+    def chat_unavailable(self) -> bool:
+        """
+        True, если пользователь заблокировал бота или чат не существует.
+        """
+        text = (self.description or '').lower()
+        return any(marker in text for marker in CHAT_UNAVAILABLE_MARKERS)
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket.
+
+    reserve() сразу забирает токен (баланс может уйти в минус) и возвращает,
+    сколько секунд нужно подождать перед запросом. Так очередь ожидающих
+    потоков выстраивается без активного ожидания.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def pause(self, seconds: float):
+        """
+        Блокирует корзину на seconds (используется при 429 retry_after).
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+def _chat_limits(chat_id) -> tuple:
+    """
+    Возвращает (rate, capacity) для чата: личные чаты имеют положительный id,
+    группы и каналы — отрицательный id или @username.
+    """
+    chat = str(chat_id)
+    if chat.startswith('-') or chat.startswith('@'):
+        per_minute = getattr(settings, 'TELEGRAM_API_GROUP_RATE_PER_MINUTE', 20)
+        return per_minute / 60.0, per_minute
+    rate = getattr(settings, 'TELEGRAM_API_CHAT_RATE', 1)
+    return rate, max(1, rate * 3)
+
+
+class TelegramBotClient:
+    """
+    Клиент Bot API для одного токена бота.
+
+    Используйте get_bot_client(token) вместо прямого создания, чтобы
+    соединения и лимиты были общими для всех вызывающих в процессе.
+    """
+    max_chat_buckets = 10000
+
+    def __init__(self, token: str, base_url: Optional[str] = None,
+                 metrics_hook: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.token = token
+        self.base_url = (base_url or getattr(
+            settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org'
+        )).rstrip('/')
+        self.max_retries = getattr(settings, 'TELEGRAM_API_MAX_RETRIES', 3)
+        self.max_retry_after = getattr(settings, 'TELEGRAM_API_MAX_RETRY_AFTER', 60)
+        self.timeout = getattr(settings, 'TELEGRAM_API_TIMEOUT', 30)
+        self.metrics_hook = metrics_hook
+        self.sleep = time.sleep
+
+        global_rate = getattr(settings, 'TELEGRAM_API_GLOBAL_RATE', 30)
+        self.bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets = OrderedDict()
+        self._chat_lock = threading.Lock()
+
+        pool_size = getattr(settings, 'TELEGRAM_API_POOL_SIZE', 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        key = str(chat_id)
+        with self._chat_lock:
+            bucket = self._chat_buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*_chat_limits(chat_id))
+                self._chat_buckets[key] = bucket
+                if len(self._chat_buckets) > self.max_chat_buckets:
+                    self._chat_buckets.popitem(last=False)
+            else:
+                self._chat_buckets.move_to_end(key)
+            return bucket
+
+    def _emit(self, event: Dict[str, Any]):
+        if not self.metrics_hook:
+            return
+        try:
+            self.metrics_hook(event)
+        except Exception as e:
+            logger.debug(f"Ошибка в хуке метрик Telegram API: {e}")
+
+    @staticmethod
+    def _form_data(params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        multipart/form-data не умеет вложенные структуры: Bot API принимает
+        такие поля (reply_markup, options) как JSON-строку.
+        """
+        return {
+            key: json.dumps(value) if isinstance(value, (dict, list)) else value
+            for key, value in params.items() if value is not None
+        }
+
+    @staticmethod
+    def _open_files(files: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Пути открываются заново на каждую попытку, файловые объекты
+        перематываются в начало.
+        """
+        opened = {}
+        for field, value in files.items():
+            if isinstance(value, (str, os.PathLike)):
+                opened[field] = open(value, 'rb')
+            else:
+                if hasattr(value, 'seek'):
+                    value.seek(0)
+                opened[field] = value
+        return opened
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None,
+             files: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Вызывает метод Bot API и возвращает поле result.
+
+        Args:
+            method: Имя метода (sendMessage, sendPhoto, ...)
+            params: Параметры вызова
+            files: Загружаемые файлы {поле: путь или файловый объект}
+            timeout: Таймаут запроса в секундах
+
+        Raises:
+            TelegramAPIError: Telegram вернул ошибку или повторы исчерпаны
+        """
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        chat_id = params.get('chat_id')
+        chat_bucket = None
+        if chat_id is not None and method.startswith(CHAT_LIMITED_METHOD_PREFIXES):
+            chat_bucket = self._chat_bucket(chat_id)
+
+        url = f"{self.base_url}/bot{self.token}/{method}"
+        attempts = self.max_retries + 1
+        for attempt in range(1, attempts + 1):
+            waited = self.bucket.reserve()
+            if chat_bucket is not None:
+                waited = max(waited, chat_bucket.reserve())
+            if waited > 0:
+                self.sleep(waited)
+
+            event = {'method': method, 'attempt': attempt, 'waited': waited, 'status': None,
+                     'ok': False, 'retry_after': None, 'error': None}
+            started = time.monotonic()
+            opened = {}
+            try:
+                if files:
+                    opened = self._open_files(files)
+                    response = self.session.post(
+                        url, data=self._form_data(params), files=opened, timeout=timeout or self.timeout
+                    )
+                else:
+                    response = self.session.post(url, json=params, timeout=timeout or self.timeout)
+            except requests.exceptions.RequestException as e:
+                event.update(duration=time.monotonic() - started, error=type(e).__name__)
+                self._emit(event)
+                if attempt < attempts:
+                    logger.warning(f"🔌 Сетевая ошибка Telegram API {method} (попытка {attempt}/{attempts}): {e}")
+                    self.sleep(self._backoff(attempt))
+                    continue
+                raise TelegramAPIError(str(e), method=method) from e
+            finally:
+                for field, handle in opened.items():
+                    if handle is not files[field]:
+                        handle.close()
+
+            event.update(duration=time.monotonic() - started, status=response.status_code)
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {'ok': False, 'description': response.text[:500]}
+
+            if payload.get('ok'):
+                event['ok'] = True
+                self._emit(event)
+                return payload.get('result')
+
+            description = payload.get('description') or f"HTTP {response.status_code}"
+            error_code = payload.get('error_code') or response.status_code
+            retry_after = (payload.get('parameters') or {}).get('retry_after')
+            event.update(retry_after=retry_after, error=description)
+            self._emit(event)
+
+            if error_code == 429 and retry_after is not None:
+                # Telegram сам говорит, сколько ждать: блокируем корзину, чтобы
+                # и параллельные вызовы в тот же чат (или бота) подождали
+                (chat_bucket or self.bucket).pause(retry_after)
+                if attempt < attempts and retry_after <= self.max_retry_after:
+                    logger.warning(f"⏳ Telegram API {method}: 429, повтор через {retry_after} с")
+                    continue
+            elif error_code >= 500 and attempt < attempts:
+                logger.warning(f"⚠️ Telegram API {method}: {error_code} (попытка {attempt}/{attempts})")
+                self.sleep(self._backoff(attempt))
+                continue
+
+            raise TelegramAPIError(description, error_code, retry_after, method)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(30.0, 2 ** (attempt - 1)) + random.uniform(0, 0.5)
+
+    def send_message(self, chat_id, text: str, parse_mode: Optional[str] = None,
+                     reply_markup: Optional[dict] = None, timeout: Optional[float] = None, **extra) -> Any:
+        return self.call('sendMessage', {
+            'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode,
+            'reply_markup': reply_markup, **extra
+        }, timeout=timeout)
+
+    def send_media(self, method: str, field: str, chat_id, media=None, media_path=None,
+                   caption: Optional[str] = None, parse_mode: Optional[str] = None,
+                   reply_markup: Optional[dict] = None, timeout: Optional[float] = None, **extra) -> Any:
+        """
+        Отправляет медиа по URL/file_id (media) или загружает файл (media_path).
+        """
+        params = {
+            'chat_id': chat_id, 'caption': caption,
+            'parse_mode': parse_mode if caption else None,
+            'reply_markup': reply_markup, **extra
+        }
+        if media_path:
+            return self.call(method, params, files={field: media_path}, timeout=timeout)
+        params[field] = media
+        return self.call(method, params, timeout=timeout)
+
+    def send_photo(self, chat_id, photo=None, photo_path=None, **kwargs) -> Any:
+        return self.send_media('sendPhoto', 'photo', chat_id, photo, photo_path, **kwargs)
+
+    def send_video(self, chat_id, video=None, video_path=None, **kwargs) -> Any:
+        return self.send_media('sendVideo', 'video', chat_id, video, video_path, **kwargs)
+
+    def send_animation(self, chat_id, animation=None, animation_path=None, **kwargs) -> Any:
+        return self.send_media('sendAnimation', 'animation', chat_id, animation, animation_path, **kwargs)
+
+    def delete_message(self, chat_id, message_id: int) -> Any:
+        return self.call('deleteMessage', {'chat_id': chat_id, 'message_id': message_id}, timeout=10)
+
+
+_clients: Dict[str, TelegramBotClient] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def _load_metrics_hook():
+    path = getattr(settings, 'TELEGRAM_API_METRICS_HOOK', None)
+    if not path:
+        return None
+    try:
+        return import_string(path)
+    except ImportError as e:
+        logger.error(f"Не удалось загрузить TELEGRAM_API_METRICS_HOOK={path!r}: {e}")
+        return None
+
+
+def get_bot_client(token: Optional[str] = None) -> Optional[TelegramBotClient]:
+    """
+    Возвращает общий клиент для токена (по умолчанию TELEGRAM_BOT_TOKEN)
+    или None, если токен не настроен.
+
+    После fork (prefork-воркеры Celery) клиенты создаются заново, чтобы
+    процессы не делили сокеты пула.
+    """
+    global _clients_pid
+    token = token or getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
+    if not token:
+        return None
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(token)
+        if client is None:
+            client = TelegramBotClient(token, metrics_hook=_load_metrics_hook())
+            _clients[token] = client
+        return client
+
+
+def reset_bot_clients():
+    """
+    Закрывает и забывает все клиенты (используется в тестах и при смене настроек).
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -121,10 +121,12 @@ def notify_admins_about_donation(sender, instance, created, **kwargs):
             related_object_id=instance.id,
             related_object_type='donation',
             request=None,
-            tenant=instance.tenant
+            tenant=instance.tenant,
+            # Сигнал срабатывает на каждое сохранение — уведомляем о донате один раз
+            dedup_key=f"donation:{instance.id}"
         )
         
-        logger.info(f"📤 Отправлено уведомление о донате #{instance.id} из Mini App")
+        logger.info(f"📤 Уведомление о донате #{instance.id} из Mini App поставлено в очередь")
         
     except Exception as e:
         logger.error(f"❌ Ошибка отправки уведомления о донате: {e}")
@@ -1,7 +1,7 @@
 import logging
-import requests
 from django.conf import settings
 from django.utils import timezone
+from config.telegram_client import TelegramAPIError, get_bot_client
 from .models import FeedbackReply
 
 logger = logging.getLogger(__name__)
@@ -18,7 +18,7 @@ class TelegramService:
             logger.error("TELEGRAM_BOT_TOKEN не настроен в settings")
             raise ValueError("TELEGRAM_BOT_TOKEN не настроен")
         
-        self.api_base_url = f"https://api.telegram.org/bot{self.bot_token}"
+        self.client = get_bot_client(self.bot_token)
     
     def send_message(self, chat_id, text, parse_mode='HTML'):
         """
@@ -33,26 +33,11 @@ class TelegramService:
             dict: Ответ от Telegram API или None в случае ошибки
         """
         try:
-            url = f"{self.api_base_url}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': text,
-                'parse_mode': parse_mode
-            }
-            
-            response = requests.post(url, data=data, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            if result.get('ok'):
-                logger.info(f"Сообщение успешно отправлено пользователю {chat_id}")
-                return result
-            else:
-                logger.error(f"Ошибка отправки сообщения пользователю {chat_id}: {result}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка сети при отправке сообщения пользователю {chat_id}: {e}")
+            result = self.client.send_message(chat_id, text, parse_mode=parse_mode, timeout=10)
+            logger.info(f"Сообщение успешно отправлено пользователю {chat_id}")
+            return {'ok': True, 'result': result}
+        except TelegramAPIError as e:
+            logger.error(f"Ошибка отправки сообщения пользователю {chat_id}: {e.description}")
             return None
         except Exception as e:
             logger.error(f"Неожиданная ошибка при отправке сообщения пользователю {chat_id}: {e}")
@@ -72,29 +57,13 @@ class TelegramService:
             dict: Ответ от Telegram API или None в случае ошибки
         """
         try:
-            url = f"{self.api_base_url}/sendPhoto"
-            data = {
-                'chat_id': chat_id,
-                'photo': photo_url,
-            }
-            
-            if caption:
-                data['caption'] = caption
-                data['parse_mode'] = parse_mode
-            
-            response = requests.post(url, data=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            if result.get('ok'):
-                logger.info(f"Фото успешно отправлено пользователю {chat_id}")
-                return result
-            else:
-                logger.error(f"Ошибка отправки фото пользователю {chat_id}: {result}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка сети при отправке фото пользователю {chat_id}: {e}")
+            result = self.client.send_photo(
+                chat_id, photo=photo_url, caption=caption, parse_mode=parse_mode
+            )
+            logger.info(f"Фото успешно отправлено пользователю {chat_id}")
+            return {'ok': True, 'result': result}
+        except TelegramAPIError as e:
+            logger.error(f"Ошибка отправки фото пользователю {chat_id}: {e.description}")
             return None
         except Exception as e:
             logger.error(f"Неожиданная ошибка при отправке фото пользователю {chat_id}: {e}")
@@ -114,30 +83,13 @@ class TelegramService:
             dict: Ответ от Telegram API или None в случае ошибки
         """
         try:
-            url = f"{self.api_base_url}/sendPhoto"
-            data = {
-                'chat_id': chat_id,
-            }
-            
-            if caption:
-                data['caption'] = caption
-                data['parse_mode'] = parse_mode
-            
-            with open(photo_path, 'rb') as photo_file:
-                files = {'photo': photo_file}
-                response = requests.post(url, data=data, files=files, timeout=30)
-                response.raise_for_status()
-            
-            result = response.json()
-            if result.get('ok'):
-                logger.info(f"Фото из файла успешно отправлено пользователю {chat_id}")
-                return result
-            else:
-                logger.error(f"Ошибка отправки фото из файла пользователю {chat_id}: {result}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Ошибка сети при отправке фото из файла пользователю {chat_id}: {e}")
+            result = self.client.send_photo(
+                chat_id, photo_path=photo_path, caption=caption, parse_mode=parse_mode
+            )
+            logger.info(f"Фото из файла успешно отправлено пользователю {chat_id}")
+            return {'ok': True, 'result': result}
+        except TelegramAPIError as e:
+            logger.error(f"Ошибка отправки фото из файла пользователю {chat_id}: {e.description}")
             return None
         except Exception as e:
             logger.error(f"Неожиданная ошибка при отправке фото из файла пользователю {chat_id}: {e}")
@@ -5,11 +5,12 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAdminUser, AllowAny
 import logging
+from django.db import transaction
 
 from tenants.mixins import TenantFilteredViewMixin
+from tasks.pagination import KeysetPagination
 from .models import FeedbackMessage, FeedbackImage
 from .serializers import FeedbackSerializer
 from .filters import FeedbackFilter
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-class CustomPageNumberPagination(PageNumberPagination):
+class CustomPageNumberPagination(KeysetPagination):
     """
     Кастомная пагинация для API
     """
@@ -92,6 +93,7 @@ class FeedbackCreateView(generics.CreateAPIView):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@transaction.atomic
 def submit_feedback_from_mini_app(request):
     """
     API endpoint для отправки обратной связи из мини-аппа.
@@ -242,10 +244,11 @@ def submit_feedback_from_mini_app(request):
                 related_object_id=feedback.id,
                 related_object_type='feedback',
                 request=request,
-                tenant=tenant
+                tenant=tenant,
+                dedup_key=f"feedback:{feedback.id}"
             )
             
-            logger.info(f"✅ Уведомление о feedback #{feedback.id} отправлено админам")
+            logger.info(f"✅ Уведомление о feedback #{feedback.id} поставлено в очередь для админов")
             
         except Exception as e:
             logger.error(f"❌ Ошибка отправки уведомления о feedback: {e}", exc_info=True)
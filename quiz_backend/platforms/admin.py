@@ -5,8 +5,9 @@ from django.urls import path
 from django.template.response import TemplateResponse
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from .models import TelegramGroup
-from .services import send_telegram_post_sync, send_post_to_bot_subscribers
+from .models import BotBroadcast, TelegramGroup
+from .broadcast import create_bot_broadcast, start_bot_broadcast
+from .services import send_telegram_post_sync
 from topics.models import Topic
 from accounts.models import TelegramUser
 from tenants.mixins import TenantFilteredAdminMixin
@@ -234,7 +235,7 @@ class TelegramChannelAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                     # Отправляем пост во все выбранные каналы
                     success_count = 0
                     total_channels = len(channels) if channels else 0
-                    bot_subscribers_sent = 0
+                    broadcast = None
                     
                     # Отправка в выбранные каналы/группы
                     if channels:
@@ -251,16 +252,18 @@ class TelegramChannelAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                             if success:
                                 success_count += 1
                     
-                    # Отправка подписчикам бота
+                    # Отправка подписчикам бота идёт в фоне, прогресс виден в «Рассылки бота»
                     send_to_subscribers = form.cleaned_data.get('send_to_bot_subscribers', False)
                     if send_to_subscribers:
-                        bot_subscribers_sent = send_post_to_bot_subscribers(
+                        broadcast = create_bot_broadcast(
                             text=text if text else None,
                             photos=photos_list,
                             gifs=gifs_list,
                             videos=videos_list,
                             buttons=buttons if buttons else None
                         )
+                        if broadcast.total_recipients:
+                            start_bot_broadcast(broadcast)
                     
                     # Формируем сообщения об успехе
                     success_messages = []
@@ -272,11 +275,15 @@ class TelegramChannelAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                         else:
                             success_messages.append(_('Ошибка при отправке поста во все каналы.'))
                     
-                    if send_to_subscribers:
-                        if bot_subscribers_sent > 0:
-                            success_messages.append(_('Пост отправлен {} подписчикам бота.').format(bot_subscribers_sent))
+                    if broadcast is not None:
+                        if broadcast.total_recipients > 0:
+                            success_messages.append(
+                                _('Рассылка #{} запущена для {} подписчиков бота.').format(
+                                    broadcast.pk, broadcast.total_recipients
+                                )
+                            )
                         else:
-                            success_messages.append(_('Не удалось отправить пост подписчикам бота.'))
+                            success_messages.append(_('Не удалось отправить пост подписчикам бота: нет пользователей.'))
                     
                     if not channels and not send_to_subscribers:
                         messages.error(request, _('Необходимо выбрать хотя бы один канал/группу или включить отправку подписчикам бота.'))
@@ -466,3 +473,42 @@ class TelegramPostForm(forms.Form):
         return cleaned_data
 
 
+
+
+@admin.register(BotBroadcast)
+class BotBroadcastAdmin(admin.ModelAdmin):
+    """
+    Админка рассылок подписчикам бота: прогресс и повторный запуск.
+    """
+    list_display = (
+        'id', 'status', 'total_recipients', 'sent_count', 'blocked_count',
+        'failed_count', 'created_at', 'finished_at'
+    )
+    list_filter = ('status',)
+    ordering = ('-created_at',)
+    readonly_fields = (
+        'text', 'buttons', 'media', 'status', 'total_recipients', 'sent_count',
+        'blocked_count', 'failed_count', 'last_telegram_id', 'last_error',
+        'resume_attempts', 'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+    )
+
+    actions = ['resume_broadcasts_action']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="▶️ Продолжить рассылку с места остановки")
+    def resume_broadcasts_action(self, request, queryset):
+        """
+        Возвращает упавшие рассылки в очередь, отправка продолжится с last_telegram_id.
+        Счётчик продолжений после сбоя обнуляется.
+        """
+        resumed = 0
+        for broadcast in queryset.exclude(status=BotBroadcast.STATUS_COMPLETED):
+            if broadcast.status == BotBroadcast.STATUS_FAILED:
+                BotBroadcast.objects.filter(pk=broadcast.pk).update(
+                    status=BotBroadcast.STATUS_PENDING, resume_attempts=0
+                )
+            start_bot_broadcast(broadcast)
+            resumed += 1
+        self.message_user(request, f"✅ Рассылок поставлено в очередь: {resumed}")
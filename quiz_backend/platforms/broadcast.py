@@ -0,0 +1,348 @@
+"""
+Рассылка постов подписчикам бота.
+
+Как это работает:
+- медиа из формы сохраняется в хранилище один раз при создании рассылки;
+- в Telegram каждый файл загружается один раз — первому получателю,
+  возвращённый file_id сохраняется в BotBroadcast.media и используется
+  для всех остальных;
+- дальше получатели обрабатываются пачками параллельно, темп задают
+  лимиты общего клиента Bot API (~30 сообщений в секунду);
+- после каждой порции из BOT_BROADCAST_PROGRESS_BATCH получателей прогресс
+  (курсор last_telegram_id, счётчики и heartbeat) пишется в БД, поэтому упавшая
+  рассылка продолжается с места остановки. Повторно может уйти не больше
+  одной порции, а heartbeat не устаревает, пока идёт отправка;
+- упавшая рассылка продолжается не больше BOT_BROADCAST_MAX_RESUMES раз,
+  затем отмечается ошибкой (продолжить её можно действием в админке).
+"""
+import logging
+import os
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import TelegramUser
+from config.telegram_client import TelegramAPIError, get_bot_client
+from .models import BotBroadcast
+from .services import MEDIA_METHODS, build_inline_keyboard, get_telegram_bot_token, markdown_to_telegram_html
+
+logger = logging.getLogger(__name__)
+
+RESULT_SENT = 'sent'
+RESULT_BLOCKED = 'blocked'
+RESULT_FAILED = 'failed'
+
+# Telegram ограничение на длину caption
+MAX_CAPTION_LENGTH = 1024
+
+
+def broadcast_recipients():
+    """
+    Уникальные telegram_id всех пользователей бота по возрастанию.
+    """
+    return TelegramUser.objects.filter(
+        telegram_id__isnull=False
+    ).order_by('telegram_id').values_list('telegram_id', flat=True).distinct()
+
+
+def create_bot_broadcast(
+    text: Optional[str] = None,
+    photos=None,
+    gifs=None,
+    videos=None,
+    buttons: Optional[List[Dict[str, str]]] = None
+) -> BotBroadcast:
+    """
+    Создаёт рассылку и сохраняет её медиа в хранилище.
+    """
+    folder = f"broadcasts/{uuid.uuid4().hex}"
+    media = []
+    for kind, uploads in (('photo', photos), ('gif', gifs), ('video', videos)):
+        for upload in uploads or []:
+            if hasattr(upload, 'seek'):
+                upload.seek(0)
+            path = default_storage.save(f"{folder}/{os.path.basename(upload.name)}", upload)
+            media.append({'kind': kind, 'path': path, 'file_id': None})
+
+    return BotBroadcast.objects.create(
+        text=text or '',
+        buttons=buttons or [],
+        media=media,
+        total_recipients=broadcast_recipients().count(),
+    )
+
+
+def start_bot_broadcast(broadcast: BotBroadcast):
+    """
+    Запускает рассылку в Celery после коммита транзакции.
+    Если брокер недоступен, рассылку подхватит resume_bot_broadcasts.
+    """
+    def _kick():
+        try:
+            from config.tasks import run_bot_broadcast_task
+            run_bot_broadcast_task.apply_async((broadcast.pk,), retry=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось запустить рассылку #{broadcast.pk}: {e}")
+
+    transaction.on_commit(_kick)
+
+
+def build_broadcast_steps(text: str, media: List[dict], buttons: List[dict]) -> List[dict]:
+    """
+    Раскладывает пост на последовательность вызовов Bot API.
+    Текст идёт подписью к первому медиа (или отдельным сообщением, если
+    не помещается в caption), кнопки — к сообщению с текстом, а без текста —
+    к последнему медиа.
+    """
+    caption_text = markdown_to_telegram_html(text) if text else None
+    reply_markup = build_inline_keyboard(buttons)
+    separate_text = bool(caption_text) and (not media or len(caption_text) > MAX_CAPTION_LENGTH)
+
+    steps = []
+    for index, item in enumerate(media):
+        method, field, _suffix = MEDIA_METHODS[item['kind']]
+        caption = caption_text if index == 0 and not separate_text else None
+        attach_buttons = (
+            caption is not None
+            or (not caption_text and index == len(media) - 1)
+        )
+        steps.append({
+            'method': method,
+            'field': field,
+            'media_index': index,
+            'caption': caption,
+            'reply_markup': reply_markup if attach_buttons else None,
+        })
+    if separate_text:
+        steps.append({'method': 'sendMessage', 'text': caption_text, 'reply_markup': reply_markup})
+    return steps
+
+
+def _extract_file_id(result: dict, field: str) -> Optional[str]:
+    """
+    Достаёт file_id загруженного файла из ответа Bot API.
+    Для фото берётся самый большой размер, GIF может вернуться как document.
+    """
+    value = result.get(field) or result.get('document')
+    if isinstance(value, list):
+        value = value[-1] if value else None
+    return value.get('file_id') if value else None
+
+
+class BroadcastSender:
+    """
+    Отправляет пост рассылки одному получателю.
+
+    Пока у медиа нет file_id, отправка идёт с загрузкой файла, и
+    полученный file_id запоминается. Такие отправки выполняются
+    последовательно (send_many), параллельно — только по file_id.
+    """
+
+    def __init__(self, client, broadcast: BotBroadcast):
+        self.client = client
+        self.broadcast = broadcast
+        self.media = broadcast.media
+        self.steps = build_broadcast_steps(broadcast.text, broadcast.media, broadcast.buttons)
+        self.media_changed = False
+        # Последняя ошибка отправки в текущей пачке
+        self.last_error = ''
+
+    @property
+    def needs_upload(self) -> bool:
+        return any(not item.get('file_id') for item in self.media)
+
+    def send_to(self, telegram_id: int) -> str:
+        try:
+            for step in self.steps:
+                if step['method'] == 'sendMessage':
+                    self.client.send_message(
+                        telegram_id, step['text'], parse_mode='HTML', reply_markup=step['reply_markup']
+                    )
+                    continue
+                item = self.media[step['media_index']]
+                kwargs = {
+                    'caption': step['caption'],
+                    'parse_mode': 'HTML',
+                    'reply_markup': step['reply_markup'],
+                }
+                if item.get('file_id'):
+                    self.client.send_media(step['method'], step['field'], telegram_id, media=item['file_id'], **kwargs)
+                    continue
+                with default_storage.open(item['path'], 'rb') as media_file:
+                    result = self.client.send_media(
+                        step['method'], step['field'], telegram_id,
+                        media_path=media_file, timeout=120, **kwargs
+                    )
+                file_id = _extract_file_id(result or {}, step['field'])
+                if file_id:
+                    item['file_id'] = file_id
+                    self.media_changed = True
+            return RESULT_SENT
+        except TelegramAPIError as e:
+            if e.chat_unavailable or e.error_code == 403:
+                logger.debug(f"Пользователь {telegram_id} заблокировал бота или не найден: {e.description}")
+                return RESULT_BLOCKED
+            logger.warning(f"Ошибка рассылки #{self.broadcast.pk} пользователю {telegram_id}: {e.description}")
+            self.last_error = e.description
+            return RESULT_FAILED
+
+    def send_many(self, telegram_ids: List[int], executor: ThreadPoolExecutor) -> List[str]:
+        results = []
+        index = 0
+        # Пока файлы не загружены — по одному, чтобы загрузить каждый ровно раз
+        while self.needs_upload and index < len(telegram_ids):
+            results.append(self.send_to(telegram_ids[index]))
+            index += 1
+        results.extend(executor.map(self.send_to, telegram_ids[index:]))
+        return results
+
+
+def _claim_broadcast(broadcast_id: int) -> Optional[BotBroadcast]:
+    """
+    Переводит рассылку в running, если её не выполняет другой воркер.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.BOT_BROADCAST_STALE_SECONDS)
+    with transaction.atomic():
+        broadcast = BotBroadcast.objects.select_for_update(skip_locked=True).filter(pk=broadcast_id).first()
+        if broadcast is None:
+            return None
+        if broadcast.status in (BotBroadcast.STATUS_COMPLETED, BotBroadcast.STATUS_FAILED):
+            return None
+        now = timezone.now()
+        if broadcast.status == BotBroadcast.STATUS_RUNNING:
+            if broadcast.heartbeat_at and broadcast.heartbeat_at > stale_before:
+                logger.info(f"Рассылка #{broadcast_id} уже выполняется другим воркером")
+                return None
+            # Воркер упал посреди рассылки: продолжаем, но не бесконечно
+            if broadcast.resume_attempts >= settings.BOT_BROADCAST_MAX_RESUMES:
+                broadcast.status = BotBroadcast.STATUS_FAILED
+                broadcast.finished_at = now
+                broadcast.save(update_fields=['status', 'finished_at'])
+                logger.error(
+                    f"❌ Рассылка #{broadcast_id} падала {broadcast.resume_attempts + 1} раз подряд, "
+                    f"остановлена: {broadcast.last_error}"
+                )
+                return None
+            broadcast.resume_attempts += 1
+        broadcast.status = BotBroadcast.STATUS_RUNNING
+        broadcast.started_at = broadcast.started_at or now
+        broadcast.heartbeat_at = now
+        broadcast.save(update_fields=['status', 'started_at', 'heartbeat_at', 'resume_attempts'])
+    return broadcast
+
+
+def _cleanup_media(broadcast: BotBroadcast):
+    for item in broadcast.media:
+        try:
+            default_storage.delete(item['path'])
+        except Exception as e:
+            logger.debug(f"Не удалось удалить файл рассылки {item['path']}: {e}")
+
+
+def _send_batch(sender: BroadcastSender, telegram_ids: List[int], executor: ThreadPoolExecutor):
+    """Отправляет порцию получателей и сохраняет курсор, счётчики и heartbeat."""
+    broadcast = sender.broadcast
+    sender.last_error = ''
+    counts = Counter(sender.send_many(telegram_ids, executor))
+    broadcast.last_telegram_id = telegram_ids[-1]
+    updates = {
+        'sent_count': F('sent_count') + counts[RESULT_SENT],
+        'blocked_count': F('blocked_count') + counts[RESULT_BLOCKED],
+        'failed_count': F('failed_count') + counts[RESULT_FAILED],
+        'last_telegram_id': broadcast.last_telegram_id,
+        'last_error': sender.last_error,
+        'heartbeat_at': timezone.now(),
+    }
+    if sender.media_changed:
+        updates['media'] = sender.media
+        sender.media_changed = False
+    BotBroadcast.objects.filter(pk=broadcast.pk).update(**updates)
+    return counts
+
+
+def run_bot_broadcast(broadcast_id: int) -> Optional[BotBroadcast]:
+    """
+    Выполняет (или продолжает) рассылку.
+
+    Returns:
+        BotBroadcast или None, если рассылка уже завершена или выполняется
+    """
+    broadcast = _claim_broadcast(broadcast_id)
+    if broadcast is None:
+        return None
+
+    client = get_bot_client(get_telegram_bot_token())
+    if client is None:
+        BotBroadcast.objects.filter(pk=broadcast.pk).update(
+            status=BotBroadcast.STATUS_FAILED, last_error='TELEGRAM_BOT_TOKEN не настроен'
+        )
+        logger.error("Токен Telegram бота не настроен")
+        return broadcast
+
+    sender = BroadcastSender(client, broadcast)
+    chunk_size = settings.BOT_BROADCAST_CHUNK_SIZE
+    batch_size = max(1, settings.BOT_BROADCAST_PROGRESS_BATCH)
+    logger.info(
+        f"📣 Рассылка #{broadcast.pk}: старт с telegram_id > {broadcast.last_telegram_id}, "
+        f"получателей {broadcast.total_recipients}"
+    )
+
+    try:
+        with ThreadPoolExecutor(max_workers=settings.BOT_BROADCAST_CONCURRENCY) as executor:
+            while True:
+                recipients = broadcast_recipients()
+                if broadcast.last_telegram_id is not None:
+                    recipients = recipients.filter(telegram_id__gt=broadcast.last_telegram_id)
+                chunk = list(recipients[:chunk_size])
+                if not chunk:
+                    break
+
+                counts = Counter()
+                for start in range(0, len(chunk), batch_size):
+                    counts += _send_batch(sender, chunk[start:start + batch_size], executor)
+                logger.info(
+                    f"📣 Рассылка #{broadcast.pk}: пачка {len(chunk)}, "
+                    f"отправлено {counts[RESULT_SENT]}, заблокировали {counts[RESULT_BLOCKED]}, "
+                    f"ошибок {counts[RESULT_FAILED]}"
+                )
+    except Exception as e:
+        # Статус остаётся running: когда heartbeat устареет, resume_bot_broadcasts
+        # продолжит рассылку с сохранённого курсора (не больше BOT_BROADCAST_MAX_RESUMES раз)
+        logger.error(f"❌ Рассылка #{broadcast.pk} прервана, будет продолжена: {e}", exc_info=True)
+        BotBroadcast.objects.filter(pk=broadcast.pk).update(last_error=str(e))
+        broadcast.refresh_from_db()
+        return broadcast
+
+    BotBroadcast.objects.filter(pk=broadcast.pk).update(
+        status=BotBroadcast.STATUS_COMPLETED, finished_at=timezone.now()
+    )
+    _cleanup_media(broadcast)
+    broadcast.refresh_from_db()
+    logger.info(
+        f"✅ Рассылка #{broadcast.pk} завершена: отправлено {broadcast.sent_count} "
+        f"из {broadcast.total_recipients}"
+    )
+    return broadcast
+
+
+def resume_stale_broadcasts() -> List[int]:
+    """
+    Находит рассылки, которые не стартовали или чей воркер упал
+    (нет сохранения прогресса дольше BOT_BROADCAST_STALE_SECONDS).
+
+    Returns:
+        list: ID рассылок, которые нужно запустить
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.BOT_BROADCAST_STALE_SECONDS)
+    return list(BotBroadcast.objects.filter(
+        Q(status=BotBroadcast.STATUS_PENDING, created_at__lt=stale_before)
+        | Q(status=BotBroadcast.STATUS_RUNNING, heartbeat_at__lt=stale_before)
+    ).values_list('id', flat=True))
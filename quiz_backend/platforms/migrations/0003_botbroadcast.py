@@ -0,0 +1,126 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("platforms", "0002_telegramgroup_tenant"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BotBroadcast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "text",
+                    models.TextField(
+                        blank=True, default="", help_text="Текст поста (Markdown)"
+                    ),
+                ),
+                (
+                    "buttons",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text='Кнопки [{"text": ..., "url": ...}]',
+                    ),
+                ),
+                (
+                    "media",
+                    models.JSONField(
+                        blank=True,
+                        default=list,
+                        help_text='Медиа [{"kind": photo|gif|video, "path": ..., "file_id": ...}]',
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "В очереди"),
+                            ("running", "Отправляется"),
+                            ("completed", "Завершена"),
+                            ("failed", "Ошибка"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "total_recipients",
+                    models.PositiveIntegerField(default=0, verbose_name="Получателей"),
+                ),
+                (
+                    "sent_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Отправлено"),
+                ),
+                (
+                    "blocked_count",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Пользователи, заблокировавшие бота или удалившие чат",
+                        verbose_name="Заблокировали бота",
+                    ),
+                ),
+                (
+                    "failed_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Ошибок"),
+                ),
+                (
+                    "last_telegram_id",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="Последний обработанный получатель (курсор для продолжения)",
+                        null=True,
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Последняя ошибка"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Создана"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Начата"),
+                ),
+                (
+                    "heartbeat_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Время последнего сохранения прогресса; по нему находятся упавшие рассылки",
+                        null=True,
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Завершена"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Рассылка подписчикам бота",
+                "verbose_name_plural": "Рассылки подписчикам бота",
+                "db_table": "bot_broadcasts",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.11 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("platforms", "0003_botbroadcast"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="botbroadcast",
+            name="resume_attempts",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="После BOT_BROADCAST_MAX_RESUMES продолжений рассылка отмечается ошибкой",
+                verbose_name="Продолжений после сбоя",
+            ),
+        ),
+    ]
@@ -77,4 +77,83 @@ class TelegramGroup(models.Model):
         Returns:
             str: Имя столбца в базе данных.
         """
-        return self._meta.get_field('topic_id').column
\ No newline at end of file
+        return self._meta.get_field('topic_id').column
+
+class BotBroadcast(models.Model):
+    """
+    Рассылка поста подписчикам бота в личные сообщения.
+
+    Хранит прогресс, чтобы упавшая рассылка продолжилась с места остановки:
+    получатели обходятся по возрастанию telegram_id, last_telegram_id —
+    последний обработанный. Медиа загружается в Telegram один раз,
+    полученные file_id сохраняются в media и используются для остальных.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('В очереди')),
+        (STATUS_RUNNING, _('Отправляется')),
+        (STATUS_COMPLETED, _('Завершена')),
+        (STATUS_FAILED, _('Ошибка')),
+    ]
+
+    class Meta:
+        db_table = 'bot_broadcasts'
+        verbose_name = _('Рассылка подписчикам бота')
+        verbose_name_plural = _('Рассылки подписчикам бота')
+        ordering = ['-created_at']
+
+    text = models.TextField(
+        blank=True,
+        default='',
+        help_text=_('Текст поста (Markdown)')
+    )
+    buttons = models.JSONField(
+        default=list,
+        blank=True,
+        help_text=_('Кнопки [{"text": ..., "url": ...}]')
+    )
+    media = models.JSONField(
+        default=list,
+        blank=True,
+        help_text=_('Медиа [{"kind": photo|gif|video, "path": ..., "file_id": ...}]')
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+        verbose_name=_('Статус')
+    )
+    total_recipients = models.PositiveIntegerField(default=0, verbose_name=_('Получателей'))
+    sent_count = models.PositiveIntegerField(default=0, verbose_name=_('Отправлено'))
+    blocked_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Заблокировали бота'),
+        help_text=_('Пользователи, заблокировавшие бота или удалившие чат')
+    )
+    failed_count = models.PositiveIntegerField(default=0, verbose_name=_('Ошибок'))
+    last_telegram_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text=_('Последний обработанный получатель (курсор для продолжения)')
+    )
+    last_error = models.TextField(blank=True, default='', verbose_name=_('Последняя ошибка'))
+    resume_attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_('Продолжений после сбоя'),
+        help_text=_('После BOT_BROADCAST_MAX_RESUMES продолжений рассылка отмечается ошибкой')
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Создана'))
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Начата'))
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Время последнего сохранения прогресса; по нему находятся упавшие рассылки')
+    )
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Завершена'))
+
+    def __str__(self):
+        return f"Рассылка #{self.pk} ({self.get_status_display()})"
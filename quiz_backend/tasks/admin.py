@@ -11,10 +11,8 @@ from django.utils import timezone
 from .models import Task, TaskTranslation, TaskStatistics, TaskPoll, MiniAppTaskStatistics, TaskComment, TaskCommentImage, TaskCommentReport, SocialMediaPost, BackgroundMusic
 from .services.task_import_service import import_tasks_from_json
 from accounts.models import MiniAppUser
-from .services.s3_service import delete_image_from_s3
+from .services.image_render_cache import delete_task_images, get_or_create_task_image
 from .services.telegram_service import publish_task_to_telegram, delete_message
-from .services.image_generation_service import generate_image_for_task
-from .services.s3_service import upload_image_to_s3
 from webhooks.services import send_webhooks_for_task, send_webhooks_for_bulk_tasks
 import uuid
 import logging
@@ -862,6 +860,7 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
         Поддерживает генерацию для конкретного языка через параметр language=xx
         """
         from config.tasks import generate_video_for_task_async
+        from .services.video_job_service import enqueue_video_job
 
         try:
             task = Task.objects.get(pk=object_id)
@@ -920,9 +919,11 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
             task.save(update_fields=['video_generation_progress'])
 
             # Запускаем асинхронную генерацию видео для выбранных языков
-            celery_tasks = []
+            # (если такая уже идёт — присоединяемся к ней, а не запускаем вторую)
+            celery_task_ids = []
             for translation in translations:
-                celery_task = generate_video_for_task_async.delay(
+                celery_task_id, attached = enqueue_video_job(
+                    generate_video_for_task_async,
                     task_id=task.id,
                     task_question=translation.question,
                     topic_name=topic_name,
@@ -933,11 +934,13 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                     video_language=translation.language,  # Язык видео
                     expected_languages=languages_to_generate  # Все ожидаемые языки
                 )
-                celery_tasks.append(celery_task)
+                celery_task_ids.append(celery_task_id)
+                if attached:
+                    messages.warning(request, f'🔗 Видео ({translation.language}) уже генерируется задачей {celery_task_id}, новая генерация не запущена')
 
             languages_text = ", ".join(languages_to_generate)
             messages.success(request, f'✅ Генерация видео для задачи {task.id} запущена {mode_text}: {languages_text}!')
-            messages.info(request, f'📝 Celery tasks: {", ".join([str(task.id) for task in celery_tasks])}')
+            messages.info(request, f'📝 Celery tasks: {", ".join(celery_task_ids)}')
             messages.info(request, f'💡 Видео будет сгенерировано в фоне и отправлено админу в личку бота')
             messages.info(request, f'🔍 Статус генерации можно отследить в разделе "Видео" ниже')
 
@@ -1109,12 +1112,12 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
             
             # Собираем URL изображений ОДИН РАЗ
             image_urls = list(set([task.image_url for task in related_tasks if task.image_url]))
+            task_ids = list(related_tasks.values_list('id', flat=True))
             
             count = related_tasks.count()
             
-            # Удаляем изображения из S3
-            for image_url in image_urls:
-                delete_image_from_s3(image_url)
+            # Удаляем изображения из S3 (общие с другими задачами остаются)
+            delete_task_images(image_urls, task_ids)
             
             # Удаляем все связанные задачи
             related_tasks.delete()
@@ -1196,14 +1199,12 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
         
         # Собираем URL изображений ОДИН РАЗ (используем set для уникальности)
         image_urls = list(set([task.image_url for task in all_related_tasks if task.image_url]))
+        task_ids = list(all_related_tasks.values_list('id', flat=True))
         
         count = all_related_tasks.count()
         
-        # Удаляем изображения из S3
-        deleted_images = 0
-        for image_url in image_urls:
-            if delete_image_from_s3(image_url):
-                deleted_images += 1
+        # Удаляем изображения из S3 (общие с другими задачами остаются)
+        deleted_images = delete_task_images(image_urls, task_ids)
         
         # Удаляем все связанные задачи
         all_related_tasks.delete()
@@ -1305,42 +1306,30 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                         tenant = getattr(request, 'tenant', None)
                         image_theme = 'islamic' if tenant and tenant.slug == 'iqro-forum' else 'code'
                         image_logo_path = self._get_tenant_logo_path(request)
-                        image = generate_image_for_task(
-                            first_translation.question, 
-                            topic_name, 
+                        # Без изменений во входных данных берётся уже загруженное изображение
+                        image_url, cached = get_or_create_task_image(
+                            first_translation.question,
+                            topic_name,
                             theme=image_theme,
-                            custom_logo_path=image_logo_path
+                            custom_logo_path=image_logo_path,
+                            tenant_slug=tenant.slug if tenant else None,
+                            topic_slug=task.topic.name if task.topic else None,
                         )
                         
-                        if image:
-                            # Формируем имя файла в формате, как в боте (используем логику из generate_images)
-                            language_code = first_translation.language or "unknown"
-                            subtopic_name = task.subtopic.name if task.subtopic else 'general'
-                            image_name = f"{task.topic.name}_{subtopic_name}_{language_code}_{task.id}.png"
-                            image_name = image_name.replace(" ", "_").lower()
-                            
-                            self.message_user(request, f"☁️ Загрузка в S3: {image_name}...", messages.INFO)
-                            
-                            image_url = upload_image_to_s3(image, image_name)
-                            
-                            if image_url:
-                                task.image_url = image_url
-                                task.error = False  # Сбрасываем ошибку если генерация успешна
-                                task.save(update_fields=['image_url', 'error'])
-                                self.message_user(request, f"✅ Задача {task.id}: изображение загружено в S3", messages.SUCCESS)
-                                self.message_user(request, f"   URL: {image_url}", messages.INFO)
-                                logger.info(f"✅ Изображение успешно сгенерировано для задачи {task.id}")
+                        if image_url:
+                            task.image_url = image_url
+                            task.error = False  # Сбрасываем ошибку если генерация успешна
+                            task.save(update_fields=['image_url', 'error'])
+                            if cached:
+                                self.message_user(request, f"♻️ Задача {task.id}: изображение взято из кэша", messages.SUCCESS)
                             else:
-                                task.error = True
-                                task.save(update_fields=['error'])
-                                error_msg = f"Задача {task.id}: не удалось загрузить в S3"
-                                errors.append(error_msg)
-                                self.message_user(request, f"❌ {error_msg}", messages.ERROR)
-                                continue
+                                self.message_user(request, f"✅ Задача {task.id}: изображение загружено в S3", messages.SUCCESS)
+                            self.message_user(request, f"   URL: {image_url}", messages.INFO)
+                            logger.info(f"✅ Изображение успешно сгенерировано для задачи {task.id}")
                         else:
                             task.error = True
                             task.save(update_fields=['error'])
-                            error_msg = f"Задача {task.id}: не удалось сгенерировать изображение"
+                            error_msg = f"Задача {task.id}: не удалось сгенерировать или загрузить изображение"
                             errors.append(error_msg)
                             self.message_user(request, f"❌ {error_msg}", messages.ERROR)
                             continue
@@ -1458,6 +1447,7 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                 # Анализируем активные вебхуки для определения стратегии генерации видео
                 from webhooks.models import Webhook
                 from config.tasks import generate_video_for_task_async
+                from .services.video_job_service import enqueue_video_job
 
                 active_webhooks = list(Webhook.objects.filter(is_active=True))
                 webhook_types = set(webhook.webhook_type for webhook in active_webhooks)
@@ -1504,8 +1494,9 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                         for language in languages_to_generate:
                             translation = task.translations.filter(language=language).first()
                             if translation:
-                                # Запускаем генерацию видео для этого языка
-                                generate_video_for_task_async.delay(
+                                # Запускаем генерацию видео для этого языка (или присоединяемся к идущей)
+                                enqueue_video_job(
+                                    generate_video_for_task_async,
                                     task_id=task.id,
                                     task_question=translation.question,
                                     topic_name=task.topic.name,
@@ -1586,79 +1577,22 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                 'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
             })
 
-        # Тема выбрана, приступаем к генерации
+        # Тема выбрана: генерация идёт в Celery пакетом (пул процессов + параллельная загрузка)
+        from config.tasks import generate_task_images_batch
+
         image_theme = request.POST.get('image_theme', 'code')
-        generated_count = 0
-        skipped_count = 0
-        errors = []
-        total_tasks = queryset.count()
-        
-        self.message_user(request, f"📊 Начинаем генерацию изображений ({image_theme}) для {total_tasks} задач...", messages.INFO)
-        
-        for task in queryset:
-            # Получаем первый перевод для генерации
-            translation = task.translations.first()
-            if not translation:
-                error_msg = f"Задача {task.id}: отсутствуют переводы"
-                errors.append(error_msg)
-                self.message_user(request, f"⚠️ {error_msg}", messages.WARNING)
-                continue
-            
-            try:
-                topic_name = task.topic.name if task.topic else 'python'
-                
-                self.message_user(request, f"🎨 Генерация изображения для задачи {task.id} (тема: {image_theme})...", messages.INFO)
-                
-                # Получаем путь к логотипу тенанта
-                image_logo_path = self._get_tenant_logo_path(request)
-                
-                # Генерируем изображение с выбранной темой и логотипом
-                image = generate_image_for_task(
-                    translation.question, 
-                    topic_name, 
-                    theme=image_theme,
-                    custom_logo_path=image_logo_path
-                )
-                
-                if image:
-                    # Формируем имя файла в формате, как в боте
-                    language_code = translation.language or "unknown"
-                    subtopic_name = task.subtopic.name if task.subtopic else 'general'
-                    image_name = f"{task.topic.name}_{subtopic_name}_{language_code}_{task.id}.png"
-                    image_name = image_name.replace(" ", "_").lower()
-                    
-                    self.message_user(request, f"☁️ Загрузка в S3: {image_name}...", messages.INFO)
-                    
-                    image_url = upload_image_to_s3(image, image_name)
-                    
-                    if image_url:
-                        task.image_url = image_url
-                        task.error = False
-                        task.save(update_fields=['image_url', 'error'])
-                        generated_count += 1
-                        self.message_user(request, f"✅ Задача {task.id}: изображение загружено в S3", messages.SUCCESS)
-                    else:
-                        task.error = True
-                        task.save(update_fields=['error'])
-                        error_msg = f"Задача {task.id}: не удалось загрузить в S3"
-                        errors.append(error_msg)
-                        self.message_user(request, f"❌ {error_msg}", messages.ERROR)
-                else:
-                    task.error = True
-                    task.save(update_fields=['error'])
-                    error_msg = f"Задача {task.id}: не удалось сгенерировать изображение"
-                    errors.append(error_msg)
-                    self.message_user(request, f"❌ {error_msg}", messages.ERROR)
-            except Exception as e:
-                task.error = True
-                task.save(update_fields=['error'])
-                error_msg = f"Задача {task.id}: {str(e)}"
-                errors.append(error_msg)
-                self.message_user(request, f"❌ {error_msg}", messages.ERROR)
-        
-        # Итоговое сообщение
-        self.message_user(request, "=" * 60, messages.INFO)
-        self.message_user(request, f"🎉 ЗАВЕРШЕНО: Сгенерировано {generated_count}, ошибок {len(errors)}", messages.SUCCESS if generated_count > 0 else messages.INFO)
+        task_ids = list(queryset.values_list('id', flat=True))
+        generate_task_images_batch.delay(
+            task_ids,
+            theme=image_theme,
+            custom_logo_path=self._get_tenant_logo_path(request),
+        )
+        self.message_user(
+            request,
+            f"🎨 Генерация изображений ({image_theme}) для {len(task_ids)} задач запущена в фоне. "
+            f"Неизменившиеся изображения возьмутся из кэша, ошибки отметятся флагом «Ошибка» у задачи.",
+            messages.SUCCESS
+        )
     
     @admin.action(description='🎬 Сгенерировать видео')
     def generate_videos(self, request, queryset):
@@ -1667,6 +1601,7 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
         Каждая задача имеет один перевод, поэтому генерируется одно видео на задачу.
         """
         from config.tasks import generate_video_for_task_async
+        from .services.video_job_service import enqueue_video_job
 
         generated_count = 0
         skipped_count = 0
@@ -1712,8 +1647,9 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                 task.video_generation_progress = {language: False}
                 task.save(update_fields=['video_generation_logs', 'video_generation_progress'])
 
-                # Запускаем генерацию видео
-                celery_task = generate_video_for_task_async.delay(
+                # Запускаем генерацию видео (если такая уже идёт — присоединяемся к ней)
+                celery_task_id, attached = enqueue_video_job(
+                    generate_video_for_task_async,
                     task_id=task.id,
                     task_question=translation.question,
                     topic_name=topic_name,
@@ -1725,8 +1661,13 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                     expected_languages=[language]
                 )
 
+                if attached:
+                    skipped_count += 1
+                    self.message_user(request, f"🔗 Задача {task.id} ({language}): видео уже генерируется (Celery task: {celery_task_id})", messages.INFO)
+                    continue
+
                 generated_count += 1
-                self.message_user(request, f"✅ Задача {task.id} ({language}): генерация запущена (Celery task: {celery_task.id})", messages.SUCCESS)
+                self.message_user(request, f"✅ Задача {task.id} ({language}): генерация запущена (Celery task: {celery_task_id})", messages.SUCCESS)
 
             except Exception as e:
                 error_msg = f"Задача {task.id}: {str(e)}"
@@ -2074,6 +2015,7 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
         отправляет вебхуки с видео после завершения генерации.
         """
         from config.tasks import send_webhooks_async, generate_video_for_task_async
+        from .services.video_job_service import enqueue_video_job
 
         # Собираем все translation_group_id
         translation_group_ids = set(
@@ -2184,8 +2126,9 @@ class TaskAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
                     for language in languages_to_generate:
                         translation = task.translations.filter(language=language).first()
                         if translation:
-                            # Запускаем генерацию видео для этого языка
-                            generate_video_for_task_async.delay(
+                            # Запускаем генерацию видео для этого языка (или присоединяемся к идущей)
+                            enqueue_video_job(
+                                generate_video_for_task_async,
                                 task_id=task.id,
                                 task_question=translation.question,
                                 topic_name=task.topic.name,
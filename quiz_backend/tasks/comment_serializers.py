@@ -6,6 +6,22 @@ from rest_framework import serializers
 from .models import TaskComment, TaskCommentImage, TaskCommentReport
 
 
+def get_request_telegram_id(request):
+    """
+    Возвращает telegram_id текущего пользователя из запроса
+    (query params или атрибут request.telegram_id) либо None.
+    """
+    if not request:
+        return None
+    telegram_id = request.query_params.get('telegram_id')
+    if not telegram_id:
+        telegram_id = getattr(request, 'telegram_id', None)
+    try:
+        return int(telegram_id) if telegram_id else None
+    except (TypeError, ValueError):
+        return None
+
+
 class TaskCommentImageSerializer(serializers.ModelSerializer):
     """
     Сериализатор для изображений комментариев.
@@ -65,6 +81,8 @@ class TaskCommentSerializer(serializers.ModelSerializer):
             'replies',
             'replies_count',
             'depth',
+            'thread_replies_count',
+            'last_activity_at',
             'can_delete',
             'has_reported_by_current_user'
         ]
@@ -73,16 +91,24 @@ class TaskCommentSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
             'is_deleted',
-            'reports_count'
+            'reports_count',
+            'thread_replies_count',
+            'last_activity_at'
         ]
     
     def get_replies_count(self, obj):
-        """Возвращает количество ответов (не удалённых)"""
+        """
+        Возвращает количество ответов (не удалённых).
+        Использует аннотацию active_replies_count, если queryset её содержит.
+        """
+        annotated = getattr(obj, 'active_replies_count', None)
+        if annotated is not None:
+            return annotated
         return obj.get_replies_count()
     
     def get_depth(self, obj):
         """Возвращает глубину вложенности комментария"""
-        return obj.get_depth()
+        return obj.depth
     
     def get_can_delete(self, obj):
         """Проверяет, может ли текущий пользователь удалить комментарий"""
@@ -124,20 +150,20 @@ class TaskCommentSerializer(serializers.ModelSerializer):
             return obj.created_at.strftime('%d.%m.%Y')
     
     def get_has_reported_by_current_user(self, obj):
-        """Проверяет, подавал ли текущий пользователь жалобу на этот комментарий"""
-        request = self.context.get('request')
-        if not request:
-            return False
-        
-        # Получаем telegram_id из запроса
-        telegram_id = request.query_params.get('telegram_id')
-        if not telegram_id:
-            telegram_id = getattr(request, 'telegram_id', None)
+        """
+        Проверяет, подавал ли текущий пользователь жалобу на этот комментарий.
+        Если в контексте передан reported_comment_ids (один батч-запрос на страницу),
+        запрос к БД не выполняется.
+        """
+        reported_ids = self.context.get('reported_comment_ids')
+        if reported_ids is not None:
+            return obj.id in reported_ids
         
+        telegram_id = get_request_telegram_id(self.context.get('request'))
         if telegram_id:
             return TaskCommentReport.objects.filter(
                 comment=obj,
-                reporter_telegram_id=int(telegram_id)
+                reporter_telegram_id=telegram_id
             ).exists()
         return False
 
@@ -197,6 +223,11 @@ class TaskCommentCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     "Родительский комментарий должен относиться к той же задаче"
                 )
+
+            if value.depth >= TaskComment.MAX_DEPTH:
+                raise serializers.ValidationError(
+                    f"Слишком глубокая ветка: не больше {TaskComment.MAX_DEPTH} уровней ответов"
+                )
         
         return value
 
@@ -3,34 +3,132 @@ Views для системы комментариев к задачам.
 Поддерживает CRUD операции, древовидную структуру и модерацию.
 """
 import logging
+from collections import defaultdict
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.shortcuts import get_object_or_404
 from django.utils.translation import activate, gettext as _
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 from .models import TaskComment, TaskCommentReport, TaskTranslation, TaskCommentImage
 from tenants.mixins import TenantFilteredViewMixin
+from .pagination import KeysetPagination
 from .comment_serializers import (
     TaskCommentSerializer,
     TaskCommentListSerializer,
     TaskCommentCreateSerializer,
     TaskCommentUpdateSerializer,
-    TaskCommentReportSerializer
+    TaskCommentReportSerializer,
+    get_request_telegram_id
 )
 
 logger = logging.getLogger(__name__)
 
 
-class CommentPagination(PageNumberPagination):
+def annotate_replies_count(queryset):
+    """
+    Добавляет к queryset аннотацию active_replies_count —
+    количество неудалённых ответов, чтобы не делать COUNT на каждый комментарий.
+    """
+    return queryset.annotate(
+        active_replies_count=Count('replies', filter=Q(replies__is_deleted=False))
+    )
+
+
+def _set_replies_cache(comment, replies):
+    """
+    Кладёт список ответов в кэш prefetch `replies`, как это делает
+    prefetch_related, чтобы comment.replies.all() не обращался к БД.
+    """
+    queryset = comment.replies.all()
+    queryset._result_cache = replies
+    queryset._prefetch_done = True
+    if not hasattr(comment, '_prefetched_objects_cache'):
+        comment._prefetched_objects_cache = {}
+    comment._prefetched_objects_cache['replies'] = queryset
+
+
+def prefetch_reply_tree(comments, max_depth=None):
+    """
+    Загружает ответы всех уровней для переданных комментариев.
+
+    Все потомки читаются одним запросом по материализованному пути
+    (плюс запрос изображений) и раскладываются в кэш prefetch `replies`,
+    поэтому сериализатор не обращается к БД.
+
+    Args:
+        comments: Комментарии, для которых нужно загрузить ветки
+        max_depth: Сколько уровней ответов разворачивать (None — все).
+            У комментариев на границе replies пустой, а replies_count
+            показывает, что ответы есть.
+
+    Returns:
+        list: Все загруженные комментарии (исходные и ответы)
+    """
+    comments = list(comments)
+    if not comments:
+        return []
+
+    subtree_filter = Q()
+    for comment in comments:
+        if not comment.path:
+            continue
+        condition = Q(path__startswith=comment.path)
+        if max_depth is not None:
+            condition &= Q(depth__lte=comment.depth + max_depth)
+        subtree_filter |= condition
+
+    descendants = []
+    if subtree_filter:
+        descendants = list(
+            annotate_replies_count(
+                TaskComment.objects.filter(subtree_filter).exclude(
+                    pk__in=[comment.pk for comment in comments]
+                )
+            ).order_by('path').prefetch_related('images')
+        )
+
+    children = defaultdict(list)
+    for reply in descendants:
+        children[reply.parent_comment_id].append(reply)
+
+    loaded = comments + descendants
+    for comment in loaded:
+        # Сохраняем порядок ответов модели (новые сверху)
+        replies = sorted(children.get(comment.id, []), key=lambda c: c.created_at, reverse=True)
+        _set_replies_cache(comment, replies)
+    return loaded
+
+
+def get_reported_comment_ids(telegram_id, comments):
+    """
+    Возвращает множество id комментариев, на которые пользователь уже жаловался.
+    Один запрос на всю страницу вместо exists() на каждый комментарий.
+    """
+    if not telegram_id or not comments:
+        return set()
+    return set(
+        TaskCommentReport.objects.filter(
+            comment_id__in=[comment.id for comment in comments],
+            reporter_telegram_id=telegram_id
+        ).values_list('comment_id', flat=True)
+    )
+
+
+# Ограничение на количество переводов в одном запросе bulk_comments_count
+BULK_COUNTS_MAX_IDS = 100
+
+
+class CommentPagination(KeysetPagination):
     """
     Пагинация для комментариев.
+    При сортировке по дате страницы листаются курсором по (created_at, id).
     """
     page_size = 20
     page_size_query_param = 'page_size'
@@ -84,8 +182,20 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
         
         # Сортировка
         ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering in ['created_at', '-created_at', 'reports_count', '-reports_count']:
+        if ordering in ['created_at', '-created_at']:
+            # id — однозначный порядок при равном времени (нужен и для курсора)
+            queryset = queryset.order_by(ordering, ordering.replace('created_at', 'id'))
+        elif ordering in ['reports_count', '-reports_count']:
             queryset = queryset.order_by(ordering)
+        elif ordering in ['last_activity_at', '-last_activity_at']:
+            # Ветки с самой свежей активностью (по времени последнего ответа)
+            queryset = queryset.order_by(ordering, '-id')
+        
+        if self.action in ['list', 'thread']:
+            # Ответы всех уровней загружаются через prefetch_reply_tree
+            return annotate_replies_count(queryset).select_related(
+                'task_translation'
+            ).prefetch_related('images')
         
         return queryset.select_related(
             'task_translation',
@@ -109,10 +219,17 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
             openapi.Parameter(
                 'ordering',
                 openapi.IN_QUERY,
-                description="Сортировка (created_at, -created_at, reports_count, -reports_count)",
+                description="Сортировка (created_at, -created_at, reports_count, -reports_count, last_activity_at, -last_activity_at)",
                 type=openapi.TYPE_STRING,
                 required=False
             ),
+            openapi.Parameter(
+                'reply_depth',
+                openapi.IN_QUERY,
+                description="Сколько уровней ответов разворачивать (по умолчанию все)",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
             openapi.Parameter(
                 'language',
                 openapi.IN_QUERY,
@@ -135,13 +252,32 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
         queryset = self.filter_queryset(self.get_queryset())
         
         page = self.paginate_queryset(queryset)
+        comments = page if page is not None else list(queryset)
+        
+        # Ответы и жалобы текущего пользователя загружаются батчами на всю страницу
+        loaded_comments = prefetch_reply_tree(comments, max_depth=self._get_reply_depth())
+        context = {
+            'request': request,
+            'reported_comment_ids': get_reported_comment_ids(
+                get_request_telegram_id(request), loaded_comments
+            ),
+        }
+        
+        serializer = self.get_serializer(comments, many=True, context=context)
         if page is not None:
-            serializer = self.get_serializer(page, many=True, context={'request': request})
             return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(queryset, many=True, context={'request': request})
         return Response(serializer.data)
     
+    def _get_reply_depth(self, param='reply_depth'):
+        """Читает ограничение глубины разворачивания ответов из query params."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        try:
+            return max(int(value), 0)
+        except (TypeError, ValueError):
+            return None
+    
     @swagger_auto_schema(
         operation_description="Создать новый комментарий или ответ",
         request_body=TaskCommentCreateSerializer,
@@ -339,18 +475,41 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
             logger.error(f"Serializer validation errors: {serializer.errors}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        self.perform_create(serializer)
-        comment = serializer.instance
+        # Комментарий, счётчики и уведомления в outbox пишутся одной транзакцией:
+        # доставка в Telegram выполняется в фоне и не задерживает ответ
+        with transaction.atomic():
+            self.perform_create(serializer)
+            comment = serializer.instance
         
-        # Теперь добавляем изображения к созданному комментарию
-        if images:
-            for image in images:
-                TaskCommentImage.objects.create(
-                    comment=comment,
-                    image=image
-                )
+            # Теперь добавляем изображения к созданному комментарию
+            if images:
+                for image in images:
+                    TaskCommentImage.objects.create(
+                        comment=comment,
+                        image=image
+                    )
+            
+            try:
+                with transaction.atomic():
+                    self._enqueue_comment_notifications(request, comment)
+            except Exception as e:
+                logger.error(f"❌ Ошибка постановки уведомлений в очередь: {e}")
+        
+        response_serializer = TaskCommentSerializer(
+            comment,
+            context={'request': request}
+        )
         
-        # Отправляем уведомления
+        return Response(
+            response_serializer.data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    def _enqueue_comment_notifications(self, request, comment):
+        """
+        Ставит в outbox уведомления о новом комментарии: автору родительского
+        комментария и всем админам тенанта.
+        """
         try:
             from accounts.utils_folder.telegram_notifications import create_notification, notify_all_admins
             from accounts.models import MiniAppUser
@@ -565,25 +724,16 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
                     related_object_type='comment',
                     web_app_url=mini_app_url,
                     request=request,
-                    tenant=task_tenant
+                    tenant=task_tenant,
+                    dedup_key=f"comment:{comment.id}"
                 )
                 
-                logger.info(f"📝 Отправлено уведомление о комментарии #{comment.id} {sent_count} админам")
+                logger.info(f"📝 Уведомление о комментарии #{comment.id} поставлено в очередь для {sent_count} админов")
             except Exception as e:
                 logger.error(f"❌ Ошибка создания уведомления в админке: {e}")
         
         except Exception as e:
             logger.error(f"❌ Ошибка отправки уведомлений: {e}")
-        
-        response_serializer = TaskCommentSerializer(
-            comment,
-            context={'request': request}
-        )
-        
-        return Response(
-            response_serializer.data,
-            status=status.HTTP_201_CREATED
-        )
     
     @swagger_auto_schema(
         operation_description="Обновить текст комментария",
@@ -658,10 +808,8 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Мягкое удаление
-        comment.is_deleted = True
-        comment.text = "[Комментарий удалён]"
-        comment.save(update_fields=['is_deleted', 'text'])
+        # Мягкое удаление (со счётчиком ответов ветки)
+        comment.soft_delete()
         
         # Удаляем изображения
         comment.images.all().delete()
@@ -721,9 +869,16 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
         serializer = TaskCommentReportSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         
-        # Пытаемся сохранить и перехватываем IntegrityError
+        # Пытаемся сохранить и перехватываем IntegrityError.
+        # Жалоба и уведомления админам в outbox пишутся одной транзакцией.
         try:
-            report = serializer.save()
+            with transaction.atomic():
+                report = serializer.save()
+                try:
+                    with transaction.atomic():
+                        self._enqueue_report_notifications(request, comment, report)
+                except Exception as e:
+                    logger.error(f"❌ Ошибка постановки уведомления о жалобе в очередь: {e}", exc_info=True)
         except IntegrityError as e:
             # Перехватываем ошибки уникальности (unique_together)
             logger.warning(f"Попытка создать дубликат жалобы: {e}")
@@ -744,7 +899,15 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
             f"{data.get('reporter_telegram_id')}: {data.get('reason')}"
         )
         
-        # Уведомляем админов о новой жалобе
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    def _enqueue_report_notifications(self, request, comment, report):
+        """
+        Ставит в outbox уведомление всем админам тенанта о новой жалобе.
+        """
         try:
             from accounts.utils_folder.telegram_notifications import notify_all_admins, escape_markdown, escape_username_for_markdown, get_base_url, format_markdown_link
             from accounts.models import MiniAppUser
@@ -846,20 +1009,16 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
                     related_object_id=report.id,
                     related_object_type='report',
                     request=request,
-                    tenant=report_task_tenant
+                    tenant=report_task_tenant,
+                    dedup_key=f"report:{report.id}"
                 )
-                logger.info(f"✅ Уведомление о жалобе #{report.id} отправлено {sent_count} админам")
+                logger.info(f"✅ Уведомление о жалобе #{report.id} поставлено в очередь для {sent_count} админов")
             except Exception as notify_error:
                 logger.error(f"❌ Ошибка в notify_all_admins для жалобы #{report.id}: {notify_error}", exc_info=True)
                 # Не пробрасываем ошибку дальше, чтобы не сломать создание жалобы
             
         except Exception as e:
             logger.error(f"❌ Ошибка отправки уведомления о жалобе: {e}", exc_info=True)
-        
-        return Response(
-            serializer.data,
-            status=status.HTTP_201_CREATED
-        )
     
     @swagger_auto_schema(
         method='get',
@@ -872,13 +1031,25 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
         Получить детальную информацию о комментарии для deep link.
         Возвращает информацию о комментарии вместе с информацией о задаче, подтеме и теме.
         """
-        comment = get_object_or_404(TaskComment, pk=pk)
+        comment = get_object_or_404(
+            annotate_replies_count(TaskComment.objects.all()).select_related(
+                'task_translation__task'
+            ).prefetch_related('images'),
+            pk=pk
+        )
         
         # Получаем информацию о задаче
         task_translation = comment.task_translation
         task = task_translation.task
         
-        serializer = self.get_serializer(comment)
+        # Вся ветка комментария загружается одним запросом по пути
+        loaded_comments = prefetch_reply_tree([comment], max_depth=self._get_reply_depth('depth'))
+        serializer = self.get_serializer(comment, context={
+            'request': request,
+            'reported_comment_ids': get_reported_comment_ids(
+                get_request_telegram_id(request), loaded_comments
+            ),
+        })
         data = serializer.data
         
         # Добавляем информацию для deep link
@@ -893,6 +1064,36 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
         
         return Response(data)
     
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Получить ветку комментария (все ответы одним запросом)",
+        manual_parameters=[
+            openapi.Parameter(
+                'depth',
+                openapi.IN_QUERY,
+                description="Сколько уровней ответов разворачивать (по умолчанию все)",
+                type=openapi.TYPE_INTEGER,
+                required=False
+            ),
+        ],
+        responses={200: TaskCommentSerializer}
+    )
+    @action(detail=True, methods=['get'], url_path='thread')
+    def thread(self, request, pk=None, translation_id=None):
+        """
+        Получить комментарий вместе с его веткой ответов.
+        Используется для разворачивания ответов глубже первого уровня.
+        """
+        comment = self.get_object()
+        loaded_comments = prefetch_reply_tree([comment], max_depth=self._get_reply_depth('depth'))
+        serializer = TaskCommentSerializer(comment, context={
+            'request': request,
+            'reported_comment_ids': get_reported_comment_ids(
+                get_request_telegram_id(request), loaded_comments
+            ),
+        })
+        return Response(serializer.data)
+    
     @swagger_auto_schema(
         method='get',
         operation_description="Получить количество комментариев для перевода задачи",
@@ -910,11 +1111,50 @@ class TaskCommentViewSet(TenantFilteredViewMixin, viewsets.ModelViewSet):
     def comments_count(self, request, translation_id=None):
         """
         Получение количества комментариев для перевода задачи.
+        Берётся из денормализованного счётчика TaskTranslation.comments_count.
         """
-        count = TaskComment.objects.filter(
-            task_translation_id=translation_id,
-            is_deleted=False
-        ).count()
+        count = TaskTranslation.get_comments_counts([translation_id]).get(int(translation_id), 0)
         
         return Response({'count': count})
+    
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Получить количество комментариев для нескольких переводов задач",
+        manual_parameters=[
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="ID переводов через запятую (не более 100)",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+        ]
+    )
+    @action(detail=False, methods=['get'], url_path='counts')
+    def bulk_comments_count(self, request, translation_id=None):
+        """
+        Количество комментариев для списка переводов одним запросом.
+        Ответ: {"counts": {"<translation_id>": <count>, ...}}
+        """
+        raw_ids = request.query_params.get('ids', '')
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(',') if value.strip()))
+        except ValueError:
+            return Response(
+                {'error': 'ids должен быть списком чисел через запятую'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > BULK_COUNTS_MAX_IDS:
+            return Response(
+                {'error': f'Не более {BULK_COUNTS_MAX_IDS} id за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        translations = TaskTranslation.objects.filter(id__in=ids)
+        tenant = getattr(request, 'tenant', None)
+        if tenant is not None:
+            translations = translations.filter(task__tenant=tenant)
+        counts = dict(translations.values_list('id', 'comments_count'))
+        
+        return Response({'counts': {str(pk): counts.get(pk, 0) for pk in ids}})
 
@@ -0,0 +1,87 @@
+"""
+Django management команда для построения адаптивных копий (WebP/AVIF)
+уже загруженных изображений: картинок задач, аватаров Mini App и фото блога.
+
+Команду можно прервать и запустить снова: объекты с актуальными копиями
+(манифест построен из текущего оригинала) отсеиваются запросом к БД, поэтому
+повторный запуск продолжает с необработанных, а упавшие объекты пробует снова.
+
+Использование:
+    python manage.py backfill_image_variants
+    python manage.py backfill_image_variants --target tasks --batch-size 200 --limit 1000
+    python manage.py backfill_image_variants --target avatars --force
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.db.models.fields.json import KeyTextTransform
+
+from tasks.services.image_variant_service import TARGETS, generate_variants
+
+
+class Command(BaseCommand):
+    help = 'Строит копии WebP/AVIF для уже загруженных изображений (можно прерывать и продолжать)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=[*TARGETS, 'all'], default='all',
+            help='Какие изображения обработать'
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='Объектов за один запрос к БД')
+        parser.add_argument('--limit', type=int, default=None, help='Обработать не больше N объектов на цель')
+        parser.add_argument('--force', action='store_true', help='Перестроить и актуальные копии')
+
+    def pending(self, target_name: str, force: bool):
+        """Объекты с изображением, у которых копий нет или они от другого оригинала."""
+        target = TARGETS[target_name]
+        queryset = target.get_model().objects.exclude(
+            Q(**{f'{target.field}__isnull': True}) | Q(**{target.field: ''})
+        )
+        if not force:
+            queryset = queryset.annotate(
+                _variants_source=KeyTextTransform('source', target.variants_field)
+            ).filter(Q(_variants_source__isnull=True) | ~Q(_variants_source=F(target.field)))
+        return queryset.order_by('pk').values_list('pk', flat=True)
+
+    def handle(self, *args, **options):
+        targets = list(TARGETS) if options['target'] == 'all' else [options['target']]
+        for target_name in targets:
+            self.backfill(target_name, options['batch_size'], options['limit'], options['force'])
+
+    def backfill(self, target_name: str, batch_size: int, limit, force: bool):
+        pending = self.pending(target_name, force)
+        total = pending.count()
+        if limit:
+            total = min(total, limit)
+        self.stdout.write(f'{target_name}: объектов без актуальных копий: {total}')
+
+        done = failed = skipped = 0
+        last_pk = 0
+        started = time.monotonic()
+        while done + failed + skipped < total:
+            batch = list(pending.filter(pk__gt=last_pk)[:min(batch_size, total - done - failed - skipped)])
+            if not batch:
+                break
+            for pk in batch:
+                last_pk = pk
+                try:
+                    manifest = generate_variants(target_name, pk, force=force)
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f'  {target_name}#{pk}: {e}')
+                    continue
+                if manifest and len(manifest) > 1:
+                    done += 1
+                else:
+                    # Нет изображения, анимация или оригинал сменился во время работы
+                    skipped += 1
+            self.stdout.write(
+                f'  {target_name}: {done + failed + skipped}/{total} (последний id={last_pk}), ошибок: {failed}'
+            )
+
+        elapsed = time.monotonic() - started
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f'{target_name}: построено {done}, пропущено {skipped}, ошибок {failed} за {elapsed:.1f} с'
+        ))
@@ -0,0 +1,70 @@
+"""
+Django management команда для заполнения дневного ряда активности
+(UserDailyActivity) из истории TaskStatistics.
+
+TaskStatistics хранит только дату последней попытки, поэтому восстановленный
+ряд приблизительный. Дни, уже записанные в UserDailyActivity при ответах,
+не перезаписываются.
+
+Использование:
+    python manage.py backfill_user_activity
+    python manage.py backfill_user_activity --user-id 42
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+from tasks.models import TaskStatistics, UserDailyActivity
+
+
+class Command(BaseCommand):
+    help = 'Заполняет дневной ряд активности пользователей из TaskStatistics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Заполнить ряд только для указанного пользователя'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create (по умолчанию 1000)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = TaskStatistics.objects.filter(last_attempt_date__isnull=False)
+        if options['user_id']:
+            queryset = queryset.filter(user_id=options['user_id'])
+
+        # Считаем уникальные translation_group_id, чтобы не учитывать
+        # дубликаты от синхронизации статистики между языками
+        rows = queryset.annotate(
+            date=TruncDate('last_attempt_date')
+        ).values('user_id', 'date').annotate(
+            attempts=Count('task__translation_group_id', distinct=True),
+            successful=Count(
+                'task__translation_group_id',
+                distinct=True,
+                filter=Q(successful=True)
+            )
+        ).order_by()
+
+        batch = []
+        total = 0
+        for row in rows.iterator():
+            batch.append(UserDailyActivity(**row))
+            if len(batch) >= options['batch_size']:
+                total += self._flush(batch)
+                batch = []
+        if batch:
+            total += self._flush(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Обработано дней активности: {total}')
+        )
+
+    def _flush(self, batch):
+        UserDailyActivity.objects.bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
@@ -0,0 +1,90 @@
+"""
+Django management команда для замера скорости рассылки подписчикам бота
+на локальном фейковом Bot API (в Telegram ничего не уходит, БД не нужна).
+
+Показывает фактическую скорость отправки, число загрузок файлов
+(должно равняться числу медиа в посте) и оценку времени для большой аудитории.
+
+Использование:
+    python manage.py benchmark_bot_broadcast
+    python manage.py benchmark_bot_broadcast --recipients 50000 --rate 1000 --media photo --media video
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from config.telegram_client import TelegramBotClient
+from platforms.broadcast import RESULT_SENT, BroadcastSender
+from platforms.models import BotBroadcast
+from tasks.tests.support.fake_bot_api import FakeBotAPIServer
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость рассылки подписчикам бота на фейковом Bot API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=3000, help='Количество получателей')
+        parser.add_argument(
+            '--rate', type=float, default=30,
+            help='Глобальный лимит сообщений в секунду (Telegram допускает ~30)'
+        )
+        parser.add_argument('--concurrency', type=int, default=16, help='Параллельные отправки')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Размер пачки')
+        parser.add_argument(
+            '--media', action='append', choices=['photo', 'gif', 'video'],
+            help='Медиа в посте (можно указать несколько раз), по умолчанию одно фото'
+        )
+        parser.add_argument('--project', type=int, default=50000, help='Для какой аудитории оценить время')
+
+    def handle(self, *args, **options):
+        recipients = list(range(1, options['recipients'] + 1))
+        media_kinds = options['media'] or ['photo']
+        paths = [
+            default_storage.save(f'broadcasts/benchmark/{kind}.bin', ContentFile(b'0' * 64 * 1024))
+            for kind in media_kinds
+        ]
+        broadcast = BotBroadcast(
+            text='**Бенчмарк** рассылки',
+            buttons=[{'text': 'Открыть', 'url': 'https://example.com'}],
+            media=[{'kind': kind, 'path': path, 'file_id': None} for kind, path in zip(media_kinds, paths)],
+        )
+
+        try:
+            with FakeBotAPIServer(record=False) as server, override_settings(
+                TELEGRAM_API_GLOBAL_RATE=options['rate'],
+                TELEGRAM_API_POOL_SIZE=options['concurrency'],
+            ):
+                client = TelegramBotClient('BENCHMARK', base_url=server.base_url)
+                sender = BroadcastSender(client, broadcast)
+                sender.last_error = ''
+                sent = 0
+                chunk_size = options['chunk_size']
+
+                started = time.monotonic()
+                with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                    for offset in range(0, len(recipients), chunk_size):
+                        results = sender.send_many(recipients[offset:offset + chunk_size], executor)
+                        sent += results.count(RESULT_SENT)
+                elapsed = time.monotonic() - started
+                client.close()
+                requests_total = sum(server.calls.values())
+                uploads = server.uploads
+        finally:
+            for path in paths:
+                default_storage.delete(path)
+
+        throughput = sent / elapsed if elapsed else 0
+        self.stdout.write(f'Получателей: {len(recipients)}, доставлено: {sent}')
+        self.stdout.write(f'Запросов к Bot API: {requests_total}, загрузок файлов: {uploads}')
+        self.stdout.write(f'Время: {elapsed:.2f} с, скорость: {throughput:.1f} получателей/с')
+        if throughput:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ Оценка для {options['project']} получателей: "
+                    f"{options['project'] / throughput / 60:.1f} мин"
+                )
+            )
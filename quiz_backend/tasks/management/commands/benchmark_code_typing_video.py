@@ -0,0 +1,80 @@
+"""
+Django management команда для замера скорости отрисовки видео с набором кода.
+
+Для каждого фрагмента кода проигрывает ту же анимацию печати, что и
+generate_code_typing_video, и печатает кадров в секунду: только отрисовка
+(кадр rgb24 в памяти) и, с --encode, вместе с кодированием в ffmpeg.
+Ничего не сохраняется и не загружается в хранилище.
+
+Использование:
+    python manage.py benchmark_code_typing_video
+    python manage.py benchmark_code_typing_video --frames 240 --encode --preset veryfast
+"""
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.management.commands.benchmark_console_images import SAMPLES
+from tasks.services import image_generation_service as images
+from tasks.services.code_typing_renderer import CodeTypingRenderer
+from tasks.services.ffmpeg_service import FfmpegFrameWriter
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость отрисовки видео с набором кода (кадров в секунду)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frames', type=int, default=120, help='Кадров печати на фрагмент')
+        parser.add_argument('--encode', action='store_true', help='Кодировать кадры в ffmpeg')
+        parser.add_argument('--preset', default='medium', help='Пресет libx264 для --encode')
+
+    def play(self, renderer: CodeTypingRenderer, frames: int, write):
+        for frame_num in range(frames):
+            progress = ((frame_num + 1) / frames) ** 0.95
+            renderer.reveal(max(1, int(progress * renderer.total_chars)))
+            write(renderer.frame_bytes())
+
+    def handle(self, *args, **options):
+        logging.getLogger(images.__name__).setLevel(logging.WARNING)
+        frames = options['frames']
+        fps = getattr(settings, 'VIDEO_FPS', 24)
+        total_frames = 0
+        render_elapsed = encode_elapsed = setup_elapsed = 0.0
+
+        for language, code in SAMPLES:
+            formatted = images.wrap_text(code, max_line_length=50).rstrip('\n') + '\n\n'
+
+            started = time.perf_counter()
+            renderer = CodeTypingRenderer(formatted, language)
+            setup_elapsed += time.perf_counter() - started
+
+            started = time.perf_counter()
+            self.play(renderer, frames, lambda frame: None)
+            render_elapsed += time.perf_counter() - started
+            total_frames += frames
+
+            if options['encode']:
+                renderer = CodeTypingRenderer(formatted, language)
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    output_path = os.path.join(temp_dir, 'benchmark.mp4')
+                    started = time.perf_counter()
+                    with FfmpegFrameWriter(output_path, renderer.width, renderer.height, fps,
+                                           preset=options['preset']) as writer:
+                        self.play(renderer, frames, writer.write)
+                    encode_elapsed += time.perf_counter() - started
+
+        self.stdout.write(
+            f'Подготовка (разбор и раскладка кода, статичный кадр): '
+            f'{setup_elapsed / len(SAMPLES) * 1000:.0f} мс на фрагмент'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Отрисовка: {total_frames} кадров за {render_elapsed:.2f} с — {total_frames / render_elapsed:.1f} кадров/с'
+        ))
+        if options['encode']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Отрисовка + ffmpeg ({options["preset"]}): {total_frames / encode_elapsed:.1f} кадров/с'
+            ))
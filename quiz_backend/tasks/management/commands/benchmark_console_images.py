@@ -0,0 +1,70 @@
+"""
+Django management команда для замера скорости генерации консольных изображений задач.
+
+Рендерит набор фрагментов кода на разных языках (включая длинный, которому
+нужен уменьшенный шрифт) и печатает изображений в секунду. Отдельно показывает
+стоимость создания ImageFormatter, которую кэш форматтеров убирает из каждого рендера.
+Ничего не сохраняется и не загружается в хранилище.
+
+Использование:
+    python manage.py benchmark_console_images
+    python manage.py benchmark_console_images --rounds 20 --no-format
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from tasks.services import image_generation_service as images
+
+SAMPLES = [
+    ('python', "def fib(n):\n    a, b = 0, 1\n    for _ in range(n):\n        a, b = b, a + b\n    return a\n\nprint(fib(10))"),
+    ('javascript', "const items = [1, 2, 3];\nconst doubled = items.map(x => x * 2);\nconsole.log(doubled.filter(x => x > 2));"),
+    ('go', 'package main\n\nimport "fmt"\n\nfunc main() {\n\tch := make(chan int, 1)\n\tch <- 42\n\tfmt.Println(<-ch)\n}'),
+    ('sql', "SELECT u.id, COUNT(o.id) AS orders\nFROM users u\nLEFT JOIN orders o ON o.user_id = u.id\nGROUP BY u.id\nHAVING COUNT(o.id) > 2;"),
+    ('python', '\n'.join(f'value_{index} = {index} * {index}  # строка {index}' for index in range(60))),
+]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость генерации консольных изображений задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10, help='Сколько раз прогнать набор фрагментов')
+        parser.add_argument(
+            '--no-format', action='store_true',
+            help='Не форматировать код (black/autopep8), замерять только рендер'
+        )
+
+    def handle(self, *args, **options):
+        # Лог выбора шрифта на каждое изображение искажает замер
+        logging.getLogger(images.__name__).setLevel(logging.WARNING)
+        if options['no_format']:
+            images.smart_format_code = lambda code, language: code
+
+        # Первый прогон: создание форматтеров, поиск шрифтов, загрузка лексеров
+        started = time.perf_counter()
+        for language, code in SAMPLES:
+            images.generate_console_image(code, language)
+        cold = time.perf_counter() - started
+
+        count = 0
+        started = time.perf_counter()
+        for _ in range(options['rounds']):
+            for language, code in SAMPLES:
+                images.generate_console_image(code, language)
+                count += 1
+        elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        images.ImageFormatter(font_size=50, line_numbers=True)
+        formatter_cost = time.perf_counter() - started
+
+        self.stdout.write(f'Первый прогон ({len(SAMPLES)} изображений): {cold:.2f} с')
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} изображений за {elapsed:.2f} с: {count / elapsed:.1f} изображений/с'
+        ))
+        self.stdout.write(
+            f'Создание одного ImageFormatter без кэша: {formatter_cost * 1000:.0f} мс '
+            f'(раньше — на каждый рендер)'
+        )
@@ -0,0 +1,124 @@
+"""
+Django management команда для замера загрузок в R2/S3 на локальном фейковом S3
+(в облако ничего не уходит, БД не нужна).
+
+Сравнивает прежний путь (новый клиент boto3 на каждую загрузку, PNG с
+optimize=True, видео целиком в памяти и одним put_object) с текущим
+(общий клиент процесса, быстрое сжатие PNG, потоковая multipart-загрузка видео).
+Показывает время, число TCP-соединений к хранилищу и пик памяти Python при загрузке видео.
+
+Использование:
+    python manage.py benchmark_s3_uploads
+    python manage.py benchmark_s3_uploads --images 100 --video-mb 128 --part-size-mb 16 --concurrency 8
+"""
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from PIL import Image, ImageDraw
+
+from tasks.services import s3_service
+from tasks.services.s3_service import build_image_key, build_r2_key, upload_image_to_s3, upload_video_to_s3
+from tasks.tests.support.fake_s3 import FakeS3Server
+
+
+def make_console_image(seed: int, size: int) -> Image.Image:
+    """Картинка, похожая на консоль с кодом: тёмный фон и строки «текста»."""
+    rng = random.Random(seed)
+    image = Image.new('RGB', (size, size), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for line in range(size // 28):
+        x = 40 + rng.randint(0, 4) * 24
+        for _ in range(rng.randint(2, 8)):
+            word = rng.randint(30, 160)
+            color = rng.choice([(220, 220, 170), (86, 156, 214), (206, 145, 120), (212, 212, 212)])
+            draw.rectangle([x, 40 + line * 28, x + word, 40 + line * 28 + 14], fill=color)
+            x += word + 14
+    return image
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает загрузку картинок и видео в R2/S3 до и после общего клиента и multipart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=40, help='Количество картинок')
+        parser.add_argument('--image-size', type=int, default=1080, help='Сторона картинки в пикселях')
+        parser.add_argument('--video-mb', type=int, default=64, help='Размер видео в МБ')
+        parser.add_argument('--part-size-mb', type=int, default=8, help='Размер части multipart-загрузки')
+        parser.add_argument('--concurrency', type=int, default=4, help='Одновременных частей')
+
+    def handle(self, *args, **options):
+        images = [make_console_image(index, options['image_size']) for index in range(options['images'])]
+        video_file = tempfile.NamedTemporaryFile(suffix='.mp4', delete=False)
+        with video_file:
+            for _ in range(options['video_mb']):
+                video_file.write(os.urandom(1024 * 1024))
+
+        try:
+            with FakeS3Server(record=False) as server, override_settings(**server.settings(
+                S3_MULTIPART_PART_SIZE_MB=options['part_size_mb'],
+                S3_MULTIPART_CONCURRENCY=options['concurrency'],
+            )):
+                s3_service.reset_s3_clients()
+                bucket = server.bucket
+                rows = []
+
+                def measure(title, run):
+                    server.reset()
+                    tracemalloc.start()
+                    started = time.monotonic()
+                    run()
+                    elapsed = time.monotonic() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    rows.append((title, elapsed, len(server.client_ports), peak))
+
+                def legacy_images():
+                    for index, image in enumerate(images):
+                        buffer = io.BytesIO()
+                        image.save(buffer, format='PNG', optimize=True)
+                        s3_service._put_object_safe(
+                            s3_service._make_r2_client(), bucket,
+                            build_image_key(f'legacy_{index}.png'), buffer.getvalue(), 'image/png',
+                        )
+
+                def pooled_images():
+                    for index, image in enumerate(images):
+                        upload_image_to_s3(image, f'pooled_{index}.png')
+
+                def legacy_video():
+                    with open(video_file.name, 'rb') as f:
+                        video_bytes = f.read()
+                    s3_service._put_object_safe(
+                        s3_service._make_r2_client(), bucket,
+                        build_r2_key('legacy.mp4', 'videos'), video_bytes, 'video/mp4',
+                    )
+
+                def streamed_video():
+                    if not upload_video_to_s3(video_file.name, 'streamed.mp4'):
+                        raise RuntimeError('Видео не загружено')
+
+                measure('Картинки: клиент на загрузку, optimize=True', legacy_images)
+                measure('Картинки: общий клиент, быстрый PNG', pooled_images)
+                measure('Видео: целиком в памяти, put_object', legacy_video)
+                measure('Видео: поток с диска, multipart', streamed_video)
+                multipart_calls = server.calls['UploadPart']
+                s3_service.reset_s3_clients()
+        finally:
+            os.unlink(video_file.name)
+
+        self.stdout.write(f"Картинок: {len(images)} × {options['image_size']}px, видео: {options['video_mb']} МБ")
+        for title, elapsed, connections, peak in rows:
+            self.stdout.write(
+                f'{title}: {elapsed:.2f} с, соединений: {connections}, пик памяти: {peak / 1024 / 1024:.1f} МБ'
+            )
+        self.stdout.write(f'Частей multipart-загрузки видео: {multipart_calls}')
+        legacy_total = rows[0][1] + rows[2][1]
+        current_total = rows[1][1] + rows[3][1]
+        if current_total:
+            self.stdout.write(self.style.SUCCESS(f'✅ Ускорение: ×{legacy_total / current_total:.1f}'))
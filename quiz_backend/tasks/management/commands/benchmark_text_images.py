@@ -0,0 +1,126 @@
+"""
+Django management команда для замера раскладки текста в текстовых карточках и исламской теме.
+
+Берёт реальные тексты задач (вопросы и ответы переводов из базы и/или JSON-файлов
+в формате импорта задач) и сравнивает старую раскладку (textbbox на каждую пробную
+строку, shaping арабского на каждый рендер) с кэшированной: реестр шрифтов,
+мемоизированный shaping и кэш ширины слов. Печатает, сколько текстов разбиты на строки
+одинаково, и скорость полной отрисовки карточек. Ничего не сохраняется и не загружается.
+
+Использование:
+    python manage.py benchmark_text_images
+    python manage.py benchmark_text_images --file ../bot/uploads/khadis.json --rounds 5
+"""
+import json
+import logging
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageDraw
+
+from tasks.models import TaskTranslation
+from tasks.services import image_generation_service as images
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / 'examples' / 'example_tasks.json'
+
+
+def legacy_wrap_text_by_width(text, font, draw, max_width):
+    """Раскладка до кэширования: shaping без кэша и textbbox на каждую пробную строку."""
+    prepared_text = images.prepare_text_for_rendering.__wrapped__(text)
+    lines = []
+    for paragraph in prepared_text.split('\n'):
+        words = paragraph.split()
+        if not words:
+            lines.append('')
+            continue
+        current_line = words[0]
+        for word in words[1:]:
+            test_line = f"{current_line} {word}"
+            left, top, right, bottom = draw.textbbox((0, 0), test_line, font=font)
+            if right - left <= max_width:
+                current_line = test_line
+            else:
+                lines.append(current_line)
+                current_line = word
+        lines.append(current_line)
+    return lines
+
+
+def clear_layout_caches():
+    images.prepare_text_for_rendering.cache_clear()
+    images._shape_arabic_run.cache_clear()
+    images._text_widths.clear()
+
+
+class Command(BaseCommand):
+    help = 'Замеряет раскладку текста для текстовых карточек на реальных текстах задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=3, help='Сколько раз прогнать корпус')
+        parser.add_argument('--limit', type=int, default=500, help='Сколько переводов взять из базы')
+        parser.add_argument(
+            '--file', action='append', default=[],
+            help='JSON с задачами в формате импорта (можно указать несколько раз)'
+        )
+
+    def load_corpus(self, options):
+        texts = []
+        for question, answers in TaskTranslation.objects.values_list('question', 'answers')[:options['limit']]:
+            texts.append(question)
+            texts.extend(str(answer) for answer in answers or [])
+
+        files = options['file'] or ([] if texts else [str(DEFAULT_CORPUS)])
+        for path in files:
+            try:
+                data = json.loads(Path(path).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Не удалось прочитать {path}: {e}')
+            for task in data.get('tasks', []):
+                for translation in task.get('translations', []):
+                    texts.append(translation.get('question') or '')
+                    texts.extend(str(answer) for answer in translation.get('answers') or [])
+        return [text for text in texts if text.strip()]
+
+    def handle(self, *args, **options):
+        logging.getLogger(images.__name__).setLevel(logging.WARNING)
+        texts = self.load_corpus(options)
+        if not texts:
+            raise CommandError('Корпус пуст: нет переводов в базе, укажите --file')
+        arabic = sum(1 for text in texts if images.contains_arabic(text))
+        self.stdout.write(f'Корпус: {len(texts)} текстов, из них с арабским: {arabic}')
+
+        font = images.load_unicode_font(56, bold=True)
+        draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+        max_width = 1600 - 2 * (120 + 80)
+
+        started = time.perf_counter()
+        for _ in range(options['rounds']):
+            legacy = [legacy_wrap_text_by_width(text, font, draw, max_width) for text in texts]
+        legacy_elapsed = time.perf_counter() - started
+
+        clear_layout_caches()
+        started = time.perf_counter()
+        cached = [images.wrap_text_by_width(text, font, draw, max_width) for text in texts]
+        cold_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(options['rounds']):
+            cached = [images.wrap_text_by_width(text, font, draw, max_width) for text in texts]
+        warm_elapsed = time.perf_counter() - started
+
+        total = len(texts) * options['rounds']
+        same = sum(1 for old, new in zip(legacy, cached) if old == new)
+        self.stdout.write(f'Старая раскладка: {total / legacy_elapsed:.0f} текстов/с')
+        self.stdout.write(f'Кэшированная, первый проход: {len(texts) / cold_elapsed:.0f} текстов/с')
+        self.stdout.write(self.style.SUCCESS(
+            f'Кэшированная, повторно: {total / warm_elapsed:.0f} текстов/с '
+            f'(x{legacy_elapsed / warm_elapsed:.1f})'
+        ))
+        self.stdout.write(f'Одинаковое разбиение на строки: {same} из {len(texts)}')
+
+        sample = texts[:50]
+        started = time.perf_counter()
+        for text in sample:
+            images.generate_text_card_image(text)
+        card_elapsed = time.perf_counter() - started
+        self.stdout.write(f'Текстовые карточки: {len(sample) / card_elapsed:.1f} изображений/с')
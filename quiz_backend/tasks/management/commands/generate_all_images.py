@@ -3,15 +3,18 @@ Django management команда для массовой генерации из
 
 Генерирует изображения для всех задач в БД, которые еще не имеют изображений,
 или регенерирует их принудительно. Включает паузы между генерациями для избежания ошибок.
+С --workers N рисует батчами в пуле из N процессов и загружает параллельно.
 """
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from tasks.models import Task
-from tasks.services.image_generation_service import generate_image_for_task
-from tasks.services.s3_service import upload_image_to_s3
+from tasks.services.image_batch_service import generate_task_images
+from tasks.services.image_render_cache import get_or_create_task_image, release_task_image
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +69,14 @@ class Command(BaseCommand):
             default=100,
             help='Размер батча для обработки (по умолчанию: 100)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help=(
+                'Рисовать батчами в N процессах с параллельной загрузкой '
+                '(по умолчанию — по одной задаче в текущем процессе)'
+            ),
+        )
         parser.add_argument(
             '--check-urls',
             action='store_true',
@@ -103,6 +114,7 @@ class Command(BaseCommand):
         batch_test = options.get('batch_test', False)
         batch_size = options.get('batch_size', 100)
         check_urls = options.get('check_urls', False)
+        workers = options.get('workers')
         
         # Автоматически включаем проверку URL при batch-test, если не указано явно
         if batch_test and not check_urls and not force:
@@ -114,7 +126,7 @@ class Command(BaseCommand):
             )
 
         # Формируем queryset
-        queryset = Task.objects.select_related('topic', 'subtopic').prefetch_related('translations')
+        queryset = Task.objects.select_related('topic', 'subtopic', 'tenant').prefetch_related('translations')
 
         # Фильтр по task_ids
         if task_ids_str:
@@ -207,6 +219,10 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING('❌ Операция отменена'))
                 return
 
+        if workers and not dry_run:
+            self._process_with_workers(list(queryset), workers, batch_size, force, check_urls)
+            return
+
         # Обработка
         generated_count = 0
         skipped_count = 0
@@ -314,7 +330,8 @@ class Command(BaseCommand):
         
         Returns:
             'generated' - изображение успешно сгенерировано
-            'skipped' - задача пропущена (изображение уже есть и работает)
+            'skipped' - задача пропущена (изображение уже есть и работает
+                        или входные данные не изменились с прошлой отрисовки)
             'error' - произошла ошибка
         """
         # Проверяем наличие изображения
@@ -357,47 +374,45 @@ class Command(BaseCommand):
             )
 
             if not dry_run:
-                # Генерируем изображение
-                image = generate_image_for_task(translation.question, topic_name)
-
-                if image:
-                    # Формируем имя файла в формате, как в боте
-                    subtopic_name = task.subtopic.name if task.subtopic else 'general'
-                    image_name = f"{task.topic.name}_{subtopic_name}_{language_code}_{task.id}.png"
-                    image_name = image_name.replace(" ", "_").lower()
-
-                    self.stdout.write(f'☁️  [{idx}/{total_tasks}] Загрузка в S3: {image_name}...')
-
-                    image_url = upload_image_to_s3(image, image_name)
+                # Генерируем изображение; без изменений во входных данных
+                # (код, язык, шаблон, логотип) берётся уже загруженное
+                image_url, cached = get_or_create_task_image(
+                    translation.question,
+                    topic_name,
+                    tenant_slug=task.tenant.slug if task.tenant else None,
+                    topic_slug=task.topic.name if task.topic else None,
+                )
 
-                    if image_url:
+                if image_url:
+                    if task.image_url != image_url or task.error:
+                        old_url = task.image_url
                         task.image_url = image_url
                         task.error = False
                         task.save(update_fields=['image_url', 'error'])
+                        release_task_image(old_url, image_url)
+                    if cached:
                         self.stdout.write(
-                            self.style.SUCCESS(
-                                f'✅ [{idx}/{total_tasks}] Задача {task.id}: изображение загружено в S3'
-                            )
+                            f'♻️  [{idx}/{total_tasks}] Задача {task.id}: входные данные не изменились, '
+                            f'изображение взято из кэша'
                         )
-                        self.stdout.write(f'   URL: {image_url}')
-                        
-                        # Пауза между генерациями (кроме последней)
-                        if idx < total_tasks:
-                            time.sleep(pause)
-                        
-                        return 'generated'
-                    else:
-                        task.error = True
-                        task.save(update_fields=['error'])
-                        error_msg = f"Задача {task.id}: не удалось загрузить в S3"
-                        self.stdout.write(
-                            self.style.ERROR(f'❌ [{idx}/{total_tasks}] {error_msg}')
+                        return 'skipped'
+
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f'✅ [{idx}/{total_tasks}] Задача {task.id}: изображение загружено в S3'
                         )
-                        return 'error'
+                    )
+                    self.stdout.write(f'   URL: {image_url}')
+
+                    # Пауза между генерациями (кроме последней)
+                    if idx < total_tasks:
+                        time.sleep(pause)
+
+                    return 'generated'
                 else:
                     task.error = True
                     task.save(update_fields=['error'])
-                    error_msg = f"Задача {task.id}: не удалось сгенерировать изображение"
+                    error_msg = f"Задача {task.id}: не удалось сгенерировать или загрузить изображение"
                     self.stdout.write(
                         self.style.ERROR(f'❌ [{idx}/{total_tasks}] {error_msg}')
                     )
@@ -421,6 +436,36 @@ class Command(BaseCommand):
             logger.error(f"Ошибка при генерации изображения для задачи {task.id}: {e}", exc_info=True)
             return 'error'
 
+    def _process_with_workers(self, tasks, workers, batch_size, force, check_urls):
+        """
+        Генерирует изображения батчами в пуле процессов (см. image_batch_service)
+        и печатает скорость по каждому батчу.
+        """
+        skipped_count = 0
+        if check_urls and not force:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                working = list(executor.map(lambda task: bool(task.image_url) and self.check_url(task.image_url), tasks))
+            skipped_count = sum(working)
+            tasks = [task for task, ok in zip(tasks, working) if not ok]
+            self.stdout.write(f'🔍 Рабочих изображений: {skipped_count}, к генерации: {len(tasks)}')
+
+        generated_count = 0
+        error_count = 0
+        total_tasks = len(tasks)
+        for batch_start in range(0, total_tasks, batch_size):
+            batch = tasks[batch_start:batch_start + batch_size]
+            self.stdout.write(
+                f'\n📦 Батч {batch_start // batch_size + 1}: задачи {batch_start + 1}-'
+                f'{batch_start + len(batch)} из {total_tasks}, воркеров: {workers}'
+            )
+            result = generate_task_images(batch, workers=workers)
+            generated_count += result.rendered
+            skipped_count += result.cached
+            error_count += result.failed
+            self.stdout.write(self.style.SUCCESS(f'   {result.summary()}'))
+
+        self._print_summary(False, total_tasks + skipped_count, generated_count, skipped_count, error_count, [])
+
     def _print_summary(self, dry_run, total_tasks, generated_count, skipped_count, error_count, errors):
         """Выводит итоговую статистику."""
         self.stdout.write('=' * 60)
@@ -0,0 +1,33 @@
+"""
+Django management команда для пересчёта денормализованного счётчика
+комментариев (TaskTranslation.comments_count).
+
+Счётчик обновляется автоматически при создании, удалении и восстановлении
+комментариев; команда нужна только для исправления расхождений.
+
+Использование:
+    python manage.py recalculate_comments_count
+    python manage.py recalculate_comments_count --translation-id 12 --translation-id 13
+"""
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskTranslation
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает количество комментариев у переводов задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--translation-id',
+            type=int,
+            action='append',
+            dest='translation_ids',
+            help='Пересчитать только указанные переводы (можно указать несколько раз)'
+        )
+
+    def handle(self, *args, **options):
+        updated = TaskTranslation.recalculate_comments_count(options['translation_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Пересчитано переводов: {updated}')
+        )
@@ -10,8 +10,8 @@ import requests
 from typing import List, Optional
 
 from tasks.models import Task, TaskTranslation
-from tasks.services.image_generation_service import generate_image_for_task
-from tasks.services.s3_service import upload_image_to_s3
+from tasks.services.image_batch_service import generate_task_images
+from tasks.services.image_render_cache import get_or_create_task_image, release_task_image
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +40,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Регенерировать даже если URL рабочий',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Рисовать в пуле из N процессов с параллельной загрузкой',
+        )
         parser.add_argument(
             '--check-s3-domain',
             type=str,
@@ -112,6 +117,7 @@ class Command(BaseCommand):
         task_ids_str = options.get('task_ids')
         force = options.get('force', False)
         check_s3_domain = options.get('check_s3_domain')
+        workers = options.get('workers')
         
         self.stdout.write("🔄 Начинаем регенерацию изображений для задач с нерабочими ссылками")
         
@@ -144,6 +150,14 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS("✅ Нет задач для регенерации"))
             return
         
+        if workers and not dry_run:
+            # Локальному индексу кэша не доверяем — URL битый
+            result = generate_task_images(
+                tasks_to_process, workers=workers, verify=True, prefer_language='ru'
+            )
+            self.stdout.write(self.style.SUCCESS(f"\n✅ Регенерация завершена: {result.summary()}"))
+            return
+
         success_count = 0
         error_count = 0
         skipped_count = 0
@@ -178,37 +192,34 @@ class Command(BaseCommand):
                     success_count += 1
                     continue
                 
-                # Генерируем новое изображение
+                # Генерируем новое изображение (с теми же входными данными берётся
+                # уже загруженное; локальному индексу не доверяем — URL битый)
                 self.stdout.write(f"   🎨 Генерация изображения для задачи {task.id}...")
-                image = generate_image_for_task(translation.question, topic_name)
-                
-                if not image:
-                    error_count += 1
-                    logger.error(f"Не удалось сгенерировать изображение для задачи {task.id}")
-                    self.stdout.write(f"   ❌ Задача {task.id}: ошибка генерации изображения")
-                    continue
-                
-                # Формируем имя файла
-                subtopic_name = task.subtopic.name if task.subtopic else 'general'
-                image_name = f"{topic_name}_{subtopic_name}_{translation.language}_{task.id}.png"
-                image_name = image_name.replace(" ", "_").lower()
-                
-                # Загружаем в R2/S3
-                new_image_url = upload_image_to_s3(image, image_name)
+                new_image_url, cached = get_or_create_task_image(
+                    translation.question,
+                    topic_name,
+                    tenant_slug=task.tenant.slug if task.tenant else None,
+                    topic_slug=task.topic.name if task.topic else None,
+                    verify=True,
+                )
                 
                 if not new_image_url:
                     error_count += 1
-                    logger.error(f"Не удалось загрузить изображение для задачи {task.id}")
-                    self.stdout.write(f"   ❌ Задача {task.id}: ошибка загрузки изображения")
+                    logger.error(f"Не удалось сгенерировать или загрузить изображение для задачи {task.id}")
+                    self.stdout.write(f"   ❌ Задача {task.id}: ошибка генерации или загрузки изображения")
                     continue
                 
                 # Обновляем URL в базе данных
                 old_url = task.image_url
                 task.image_url = new_image_url
                 task.save(update_fields=['image_url'])
+                release_task_image(old_url, new_image_url)
                 
                 logger.info(f"Регенерировано изображение для задачи {task.id}: {old_url} -> {new_image_url}")
-                self.stdout.write(f"   ✅ Задача {task.id}: изображение регенерировано")
+                self.stdout.write(
+                    f"   ✅ Задача {task.id}: "
+                    f"{'найдено готовое изображение' if cached else 'изображение регенерировано'}"
+                )
                 success_count += 1
                 
                 if success_count % 10 == 0:
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0025_alter_tasktranslation_source_link"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserDailyActivity",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("date", models.DateField(help_text="День активности (UTC)")),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Количество ответов за день"
+                    ),
+                ),
+                (
+                    "successful",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Количество правильных ответов за день"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        help_text="Пользователь",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_activity",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Дневная активность пользователя",
+                "verbose_name_plural": "Дневная активность пользователей",
+                "db_table": "user_daily_activity",
+                "ordering": ["date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "date"), name="unique_user_daily_activity"
+                    )
+                ],
+            },
+        ),
+    ]
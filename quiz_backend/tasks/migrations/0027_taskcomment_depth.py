@@ -0,0 +1,41 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:16
+
+from django.db import migrations, models
+
+
+def fill_comment_depth(apps, schema_editor):
+    """
+    Заполняет глубину вложенности для существующих комментариев.
+    Проходит по уровням: на шаге N ответам на комментарии глубины N-1
+    проставляется глубина N.
+    """
+    TaskComment = apps.get_model('tasks', 'TaskComment')
+
+    level = 1
+    while TaskComment.objects.filter(
+        parent_comment__isnull=False,
+        parent_comment__depth=level - 1
+    ).update(depth=level):
+        level += 1
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0026_userdailyactivity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskcomment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(
+                default=0, help_text="Глубина вложенности (0 — корневой комментарий)"
+            ),
+        ),
+        migrations.RunPython(fill_comment_depth, noop),
+    ]
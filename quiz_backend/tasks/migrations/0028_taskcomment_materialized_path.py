@@ -0,0 +1,101 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:20
+
+from django.db import migrations, models
+from django.db.models import CharField, Count, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad, Substr
+
+PATH_STEP = 10
+
+
+def fill_comment_paths(apps, schema_editor):
+    """
+    Заполняет материализованные пути, счётчики ответов веток и время
+    последней активности для существующих комментариев.
+    """
+    TaskComment = apps.get_model('tasks', 'TaskComment')
+
+    segment = LPad(Cast('id', CharField()), PATH_STEP, Value('0'))
+
+    # Корневые комментарии: путь — собственный сегмент
+    TaskComment.objects.filter(parent_comment__isnull=True).update(path=segment)
+
+    # Ответы: путь родителя + собственный сегмент, по уровням глубины
+    parent_path = TaskComment.objects.filter(
+        pk=OuterRef('parent_comment_id')
+    ).values('path')[:1]
+    level = 1
+    while TaskComment.objects.filter(depth=level).exists():
+        TaskComment.objects.filter(depth=level).update(
+            path=Concat(Subquery(parent_path), segment, output_field=CharField())
+        )
+        level += 1
+
+    # Счётчики и активность веток (сегмент корня — первые PATH_STEP символов пути)
+    threads = TaskComment.objects.annotate(
+        root_segment=Substr('path', 1, PATH_STEP)
+    ).values('root_segment').annotate(
+        replies=Count('id', filter=Q(parent_comment__isnull=False, is_deleted=False)),
+        last_activity=Max('created_at'),
+    ).order_by()
+    for thread in threads.iterator():
+        TaskComment.objects.filter(pk=int(thread['root_segment'])).update(
+            thread_replies_count=thread['replies'],
+            last_activity_at=thread['last_activity'],
+        )
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0027_taskcomment_depth"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="taskcomment",
+            name="last_activity_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Время последнего ответа в ветке (только у корневого комментария)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="taskcomment",
+            name="path",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Материализованный путь: id предков и самого комментария с ведущими нулями",
+                max_length=500,
+            ),
+        ),
+        migrations.AddField(
+            model_name="taskcomment",
+            name="thread_replies_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Количество неудалённых ответов во всей ветке (только у корневого комментария)",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskcomment",
+            index=models.Index(
+                fields=["task_translation", "-last_activity_at"],
+                name="task_commen_task_tr_2d7e1d_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="taskcomment",
+            index=models.Index(
+                fields=["path"],
+                name="task_comments_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(fill_comment_paths, noop),
+    ]
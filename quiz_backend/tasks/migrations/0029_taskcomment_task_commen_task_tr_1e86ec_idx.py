@@ -0,0 +1,20 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0028_taskcomment_materialized_path"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="taskcomment",
+            index=models.Index(
+                fields=["task_translation", "-created_at", "-id"],
+                name="task_commen_task_tr_1e86ec_idx",
+            ),
+        ),
+    ]
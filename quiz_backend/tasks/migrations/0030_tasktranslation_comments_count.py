@@ -0,0 +1,46 @@
+# Generated by Django 5.1.11 on 2026-10-19 10:34
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_count(apps, schema_editor):
+    """
+    Заполняет счётчик неудалённых комментариев для существующих переводов.
+    """
+    TaskTranslation = apps.get_model('tasks', 'TaskTranslation')
+    TaskComment = apps.get_model('tasks', 'TaskComment')
+
+    active_comments = TaskComment.objects.filter(
+        task_translation=OuterRef('pk'),
+        is_deleted=False
+    ).order_by().values('task_translation').annotate(
+        total=Count('id')
+    ).values('total')
+    TaskTranslation.objects.update(
+        comments_count=Coalesce(Subquery(active_comments, output_field=IntegerField()), 0)
+    )
+
+
+def noop(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0029_taskcomment_task_commen_task_tr_1e86ec_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tasktranslation",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Количество неудалённых комментариев (обновляется при создании, удалении и восстановлении)",
+            ),
+        ),
+        migrations.RunPython(fill_comments_count, noop),
+    ]
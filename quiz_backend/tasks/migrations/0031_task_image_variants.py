@@ -0,0 +1,22 @@
+# Generated by Django 5.1.11 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tasks", "0030_tasktranslation_comments_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Копии изображения WebP/AVIF по ширинам для srcset (image_variant_service)",
+            ),
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.core.exceptions import ValidationError
 from django.core.cache import cache
 from django.db.models import Count, Q
 import logging
-from django.db.models.functions import TruncDate
+from django.db.models.functions import Coalesce
 from django.core.validators import FileExtensionValidator
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
@@ -86,6 +86,11 @@ class Task(models.Model):
         null=True,
         help_text='URL изображения задачи'
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Копии изображения WebP/AVIF по ширинам для srcset (image_variant_service)'
+    )
     video_url = models.URLField(
         max_length=255,
         null=True,
@@ -282,10 +287,48 @@ class TaskTranslation(models.Model):
     )
     publish_date = models.DateTimeField(
         null=True, blank=True)
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Количество неудалённых комментариев (обновляется при создании, удалении и восстановлении)'
+    )
 
     def __str__(self):
         return f"Перевод задачи {self.task_id} ({self.language})"
 
+    @classmethod
+    def get_comments_counts(cls, translation_ids):
+        """
+        Возвращает {translation_id: comments_count} для списка переводов
+        одним запросом по денормализованному счётчику.
+        """
+        return dict(
+            cls.objects.filter(id__in=translation_ids).values_list('id', 'comments_count')
+        )
+
+    @classmethod
+    def recalculate_comments_count(cls, translation_ids=None):
+        """
+        Пересчитывает счётчик комментариев по таблице комментариев.
+        Нужен для исправления расхождений (например, после удаления из БД вручную).
+
+        Returns:
+            int: Количество обновлённых переводов
+        """
+        active_comments = TaskComment.objects.filter(
+            task_translation=models.OuterRef('pk'),
+            is_deleted=False
+        ).order_by().values('task_translation').annotate(
+            total=Count('id')
+        ).values('total')
+        queryset = cls.objects.all()
+        if translation_ids is not None:
+            queryset = queryset.filter(id__in=translation_ids)
+        return queryset.update(
+            comments_count=Coalesce(
+                models.Subquery(active_comments, output_field=models.IntegerField()), 0
+            )
+        )
+
 
 
 class TaskStatistics(models.Model):
@@ -375,24 +418,8 @@ class TaskStatistics(models.Model):
             # Подсчет очков
             total_points = user_stats['successful_attempts'] * 10
             
-            # Серия (streak)
-            recent_attempts = cls.objects.filter(user=user).order_by('-last_attempt_date')[:10]
-            current_streak = 0
-            best_streak = 0
-            temp_streak = 0
-            
-            for attempt in recent_attempts:
-                if attempt.successful:
-                    temp_streak += 1
-                    if current_streak == 0:
-                        current_streak = temp_streak
-                else:
-                    if temp_streak > best_streak:
-                        best_streak = temp_streak
-                    temp_streak = 0
-            
-            if temp_streak > best_streak:
-                best_streak = temp_streak
+            # Серия (streak) по дневному ряду активности
+            current_streak, best_streak = UserDailyActivity.get_streaks(user)
                 
             # Информация о пользователе
             user_info = {
@@ -447,17 +474,10 @@ class TaskStatistics(models.Model):
             ) if stats['total_attempts'] > 0 else 0
 
             # Статистика активности для графика
-            activity_stats = cls.objects.filter(
-                user=user,
-                last_attempt_date__isnull=False
-            ).annotate(
-                date=TruncDate('last_attempt_date')
-            ).values('date').annotate(
-                count=Count('id')
-            ).order_by('date')
+            activity_stats = UserDailyActivity.get_series(user)
 
             activity_dates = [stat['date'].strftime('%d.%m') for stat in activity_stats] or ['No data']
-            activity_data = [stat['count'] for stat in activity_stats] or [0]
+            activity_data = [stat['attempts'] for stat in activity_stats] or [0]
             
             # Статистика по категориям для графика
             category_stats = cls.objects.filter(user=user).values(
@@ -534,7 +554,7 @@ class TaskStatistics(models.Model):
         return cls.objects.filter(user=user).values(
             'task__difficulty'
         ).annotate(
-            total=models.Count('id'),
+            total=Count('id'),
             successful=models.Count('id', filter=models.Q(successful=True)),
             success_rate=models.ExpressionWrapper(
                 models.F('successful') * 100.0 / models.F('total'),
@@ -548,7 +568,7 @@ class TaskStatistics(models.Model):
         return cls.objects.filter(user=user).values(
             'task__topic__name'
         ).annotate(
-            total=models.Count('id'),
+            total=Count('id'),
             successful=models.Count('id', filter=models.Q(successful=True)),
             success_rate=models.ExpressionWrapper(
                 models.F('successful') * 100.0 / models.F('total'),
@@ -588,17 +608,8 @@ class TaskStatistics(models.Model):
 
     @classmethod
     def get_activity_stats(cls, user):
-        """Статистика активности по дням"""
-        last_30_days = timezone.now() - timezone.timedelta(days=30)
-        return cls.objects.filter(
-            user=user,
-            attempt_date__gte=last_30_days
-        ).annotate(
-            date=models.functions.TruncDate('attempt_date')
-        ).values('date').annotate(
-            attempts=models.Count('id'),
-            successful=models.Count('id', filter=models.Q(successful=True))
-        ).order_by('date')
+        """Статистика активности по дням за последние 30 дней"""
+        return UserDailyActivity.get_series(user, days=30)
 
     @classmethod
     def get_favorite_topic(cls, user):
@@ -647,6 +658,128 @@ class TaskStatistics(models.Model):
                         cache.delete(difficulty_cache_key)
 
 
+class UserDailyActivity(models.Model):
+    """
+    Компактный дневной ряд активности пользователя.
+
+    Одна строка на пару (пользователь, день). Обновляется при каждом ответе,
+    поэтому графики, серии и активность за 30 дней читаются за O(дней)
+    без группировок по TaskStatistics.
+    """
+    class Meta:
+        db_table = 'user_daily_activity'
+        verbose_name = 'Дневная активность пользователя'
+        verbose_name_plural = 'Дневная активность пользователей'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'date'],
+                name='unique_user_daily_activity'
+            )
+        ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        'accounts.CustomUser',
+        on_delete=models.CASCADE,
+        related_name='daily_activity',
+        help_text='Пользователь'
+    )
+    date = models.DateField(
+        help_text='День активности (UTC)'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='Количество ответов за день'
+    )
+    successful = models.PositiveIntegerField(
+        default=0,
+        help_text='Количество правильных ответов за день'
+    )
+
+    def __str__(self):
+        return f"Активность: Пользователь {self.user_id}, {self.date} ({self.attempts})"
+
+    @classmethod
+    def record(cls, user, successful=False, when=None, attempts=1):
+        """
+        Учитывает ответ пользователя в дневном ряду.
+
+        Инкремент выполняется через F(), поэтому параллельные ответы
+        не теряются. Строка дня создаётся при первом ответе.
+        attempts > 1 — перенос нескольких попыток разом (слияние статистики
+        мини-аппа), успешной из них считается не больше одной.
+        """
+        from django.db import IntegrityError, transaction
+
+        day = timezone.localdate(when) if when else timezone.localdate()
+        increments = {
+            'attempts': models.F('attempts') + attempts,
+            'successful': models.F('successful') + (1 if successful else 0),
+        }
+        if cls.objects.filter(user=user, date=day).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user=user,
+                    date=day,
+                    attempts=attempts,
+                    successful=1 if successful else 0
+                )
+        except IntegrityError:
+            # Строку дня успел создать параллельный запрос
+            cls.objects.filter(user=user, date=day).update(**increments)
+
+    @classmethod
+    def get_series(cls, user, days=None):
+        """
+        Возвращает дневной ряд пользователя в виде списка словарей
+        {'date', 'attempts', 'successful'}, отсортированного по дате.
+
+        Args:
+            user: Пользователь
+            days: Если указано, только последние N дней (включая сегодня)
+        """
+        queryset = cls.objects.filter(user=user)
+        if days:
+            start = timezone.localdate() - timezone.timedelta(days=days - 1)
+            queryset = queryset.filter(date__gte=start)
+        return list(queryset.order_by('date').values('date', 'attempts', 'successful'))
+
+    @staticmethod
+    def compute_streaks(series, today=None):
+        """
+        Считает текущую и лучшую серию дней подряд с активностью.
+
+        Текущая серия не прерывается, если сегодня пользователь ещё не отвечал,
+        но отвечал вчера.
+
+        Returns:
+            tuple: (current_streak, best_streak)
+        """
+        today = today or timezone.localdate()
+        active_days = [row['date'] for row in series if row['attempts'] > 0]
+        if not active_days:
+            return 0, 0
+
+        best_streak = 1
+        run = 1
+        for previous, current in zip(active_days, active_days[1:]):
+            run = run + 1 if (current - previous).days == 1 else 1
+            best_streak = max(best_streak, run)
+
+        last_day = active_days[-1]
+        if (today - last_day).days > 1:
+            return 0, best_streak
+        return run, best_streak
+
+    @classmethod
+    def get_streaks(cls, user):
+        """Текущая и лучшая серия дней подряд с активностью."""
+        return cls.compute_streaks(cls.get_series(user))
+
+
 class MiniAppTaskStatistics(models.Model):
     """
     Статистика решения задач пользователями Mini App.
@@ -706,6 +839,8 @@ class MiniAppTaskStatistics(models.Model):
     def merge_to_main_statistics(self, custom_user):
         """
         Объединяет статистику мини-аппа с основной статистикой пользователя.
+        Дневной ряд (UserDailyActivity) не трогает: ответ связанного пользователя
+        учитывается в нём один раз — при отправке (submit_mini_app_task_answer).
         
         Args:
             custom_user: Объект CustomUser для объединения
@@ -815,8 +950,22 @@ class TaskComment(models.Model):
             models.Index(fields=['author_telegram_id']),
             models.Index(fields=['created_at']),
             models.Index(fields=['is_deleted']),
+            models.Index(fields=['task_translation', '-last_activity_at']),
+            # Курсорная пагинация корневых комментариев по (created_at, id)
+            models.Index(fields=['task_translation', '-created_at', '-id']),
+            # varchar_pattern_ops нужен PostgreSQL для LIKE 'prefix%' по индексу
+            models.Index(
+                fields=['path'],
+                name='task_comments_path_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
         ]
 
+    # Ширина одного сегмента материализованного пути (id с ведущими нулями)
+    PATH_STEP = 10
+    # Путь ограничен max_length поля path: глубже ответить нельзя (0 — корневой)
+    MAX_DEPTH = 500 // PATH_STEP - 1
+
     id = models.AutoField(primary_key=True)
     task_translation = models.ForeignKey(
         TaskTranslation,
@@ -858,9 +1007,119 @@ class TaskComment(models.Model):
         default=0,
         help_text='Количество жалоб на комментарий'
     )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Глубина вложенности (0 — корневой комментарий)'
+    )
+    path = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        help_text='Материализованный путь: id предков и самого комментария с ведущими нулями'
+    )
+    thread_replies_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Количество неудалённых ответов во всей ветке (только у корневого комментария)'
+    )
+    last_activity_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Время последнего ответа в ветке (только у корневого комментария)'
+    )
 
     def __str__(self):
         return f"Комментарий {self.id} от {self.author_username}"
+
+    @classmethod
+    def make_path_segment(cls, comment_id):
+        """Сегмент пути для id комментария."""
+        return str(comment_id).zfill(cls.PATH_STEP)
+
+    @property
+    def thread_root_id(self):
+        """ID корневого комментария ветки (из материализованного пути)."""
+        if self.path:
+            return int(self.path[:self.PATH_STEP])
+        return self.id if not self.parent_comment_id else None
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        from django.db import transaction
+
+        # Глубина и путь вычисляются один раз при создании, чтобы не обходить
+        # цепочку parent_comment при каждой сериализации
+        parent = self.parent_comment if self.parent_comment_id else None
+        self.depth = parent.depth + 1 if parent else 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.path = (parent.path if parent else '') + self.make_path_segment(self.id)
+            if parent:
+                TaskComment.objects.filter(pk=self.pk).update(path=self.path)
+                # Счётчик и время активности ветки хранятся у корневого комментария
+                TaskComment.objects.filter(pk=self.thread_root_id).update(
+                    thread_replies_count=models.F('thread_replies_count') + 1,
+                    last_activity_at=self.created_at
+                )
+            else:
+                self.last_activity_at = self.created_at
+                TaskComment.objects.filter(pk=self.pk).update(
+                    path=self.path,
+                    last_activity_at=self.last_activity_at
+                )
+            if not self.is_deleted:
+                TaskTranslation.objects.filter(pk=self.task_translation_id).update(
+                    comments_count=models.F('comments_count') + 1
+                )
+
+    def soft_delete(self):
+        """
+        Мягко удаляет комментарий и уменьшает счётчики ветки и перевода.
+
+        Returns:
+            bool: False, если комментарий уже был удалён
+        """
+        from django.db import transaction
+
+        with transaction.atomic():
+            locked = TaskComment.objects.select_for_update().get(pk=self.pk)
+            if locked.is_deleted:
+                return False
+            self.is_deleted = True
+            self.text = "[Комментарий удалён]"
+            self.save(update_fields=['is_deleted', 'text', 'updated_at'])
+            self._update_counters(-1)
+        return True
+
+    def _update_counters(self, delta):
+        """Сдвигает счётчик комментариев перевода и счётчик ответов ветки на delta."""
+        counters = [(TaskTranslation.objects.filter(pk=self.task_translation_id), 'comments_count')]
+        if self.parent_comment_id:
+            counters.append((TaskComment.objects.filter(pk=self.thread_root_id), 'thread_replies_count'))
+        for queryset, field in counters:
+            if delta < 0:
+                # Не уходим в минус при расхождении счётчика
+                queryset = queryset.filter(**{f'{field}__gte': -delta})
+            queryset.update(**{field: models.F(field) + delta})
+
+    def get_subtree(self, max_depth=None, include_self=True):
+        """
+        Возвращает ветку комментария одним упорядоченным запросом.
+
+        Порядок по path соответствует обходу дерева в глубину.
+
+        Args:
+            max_depth: Сколько уровней ответов включать (None — все)
+            include_self: Включать ли сам комментарий
+        """
+        queryset = TaskComment.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=self.depth + max_depth)
+        return queryset.order_by('path')
     
     def get_replies_count(self):
         """Возвращает количество ответов на комментарий"""
@@ -868,12 +1127,7 @@ class TaskComment(models.Model):
     
     def get_depth(self):
         """Возвращает глубину вложенности комментария"""
-        depth = 0
-        current = self.parent_comment
-        while current is not None:
-            depth += 1
-            current = current.parent_comment
-        return depth
+        return self.depth
 
 
 class TaskCommentImage(models.Model):
@@ -9,7 +9,7 @@ import logging
 from typing import Optional
 from django.conf import settings
 from accounts.models import TelegramAdmin, MiniAppUser
-from accounts.utils_folder.telegram_notifications import send_telegram_notification_sync
+from accounts.utils_folder.telegram_notifications import send_telegram_notifications_parallel
 
 logger = logging.getLogger(__name__)
 
@@ -260,6 +260,7 @@ def send_to_all_admins(
             return 0
         
         recipient_ids = set()
+        recipients = []
         for admin in admins:
             try:
                 # Проверяем настройку notifications_enabled из MiniAppUser
@@ -286,23 +287,10 @@ def send_to_all_admins(
                 if admin.telegram_id in recipient_ids:
                     continue
                 recipient_ids.add(admin.telegram_id)
-
-                success = send_telegram_notification_sync(
-                    telegram_id=admin.telegram_id,
-                    message=message,
-                    parse_mode=parse_mode,
-                    web_app_url=web_app_url,
-                    tenant=tenant,
-                )
-                
-                if success:
-                    sent_count += 1
-                    logger.info(f"Уведомление отправлено админу {admin.telegram_id}")
-                else:
-                    logger.warning(f"Не удалось отправить уведомление админу {admin.telegram_id}")
+                recipients.append(admin.telegram_id)
                     
             except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin.telegram_id}: {e}")
+                logger.error(f"Ошибка подготовки уведомления админу {admin.telegram_id}: {e}")
         
         # Дополнительный получатель из .env/settings для аварийного мониторинга
         env_admin_chat_id = (
@@ -313,21 +301,29 @@ def send_to_all_admins(
             try:
                 env_chat_id = int(str(env_admin_chat_id).strip())
                 if env_chat_id not in recipient_ids:
-                    success = send_telegram_notification_sync(
-                        telegram_id=env_chat_id,
-                        message=message,
-                        parse_mode=parse_mode,
-                        web_app_url=web_app_url,
-                        tenant=tenant,
-                    )
-                    if success:
-                        sent_count += 1
-                        logger.info(f"Уведомление отправлено env-админу {env_chat_id}")
-                    else:
-                        logger.warning(f"Не удалось отправить уведомление env-админу {env_chat_id}")
+                    recipient_ids.add(env_chat_id)
+                    recipients.append(env_chat_id)
             except (TypeError, ValueError):
                 logger.warning(f"Некорректный TELEGRAM_ADMIN_CHAT_ID/ADMIN_TELEGRAM_ID: {env_admin_chat_id!r}")
 
+        # Один запрос на админа, параллельно и с ограничением одновременных отправок
+        results = send_telegram_notifications_parallel([
+            {
+                'telegram_id': telegram_id,
+                'message': message,
+                'parse_mode': parse_mode,
+                'web_app_url': web_app_url,
+                'tenant': tenant,
+            }
+            for telegram_id in recipients
+        ])
+        for telegram_id, (success, error) in zip(recipients, results):
+            if success:
+                sent_count += 1
+                logger.info(f"Уведомление отправлено админу {telegram_id}")
+            else:
+                logger.warning(f"Не удалось отправить уведомление админу {telegram_id}: {error}")
+
         logger.info(f"Уведомления отправлены {sent_count} (tenant={tenant})")
         
     except Exception as e:
@@ -1,7 +1,212 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(payload):
+    """
+    Кодирует позицию курсора в непрозрачную строку для query-параметра.
+    """
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Декодирует курсор, созданный encode_cursor.
+    Возвращает None, если строка повреждена.
+    """
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        payload['c'] = datetime.fromisoformat(payload['c'])
+        payload['i'] = int(payload['i'])
+        return payload
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        return None
+
+
+def keyset_filter(queryset, created_at, pk, descending=True, field='created_at'):
+    """
+    Оставляет записи строго после позиции (created_at, id) в порядке сортировки.
+    Сравнение по паре полей идёт по индексу и не требует OFFSET.
+    """
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(**{f'{field}__{op}': created_at})
+        | Q(**{field: created_at, f'pk__{op}': pk})
+    )
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Курсорная пагинация по паре (created_at, id).
+
+    Если queryset отсортирован по created_at, страницы выбираются условием
+    по ключу вместо OFFSET, а общее количество считается один раз на первой
+    странице и дальше передаётся внутри курсора. Ссылки next/previous
+    содержат параметр cursor.
+
+    Запросы с ?page=N > 1 и списки с другой сортировкой обрабатываются
+    обычной постраничной пагинацией — поля ответа одинаковы в обоих режимах.
+    """
+    cursor_query_param = 'cursor'
+    keyset_field = 'created_at'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = False
+
+        descending = self._get_keyset_direction(queryset)
+        cursor_value = request.query_params.get(self.cursor_query_param)
+        page_number = request.query_params.get(self.page_query_param)
+        if descending is None or (not cursor_value and page_number not in (None, '', '1')):
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.keyset = True
+        self.descending = descending
+        self.page_size = page_size
+
+        cursor = None
+        if cursor_value:
+            cursor = decode_cursor(cursor_value)
+            if cursor is None:
+                raise NotFound(self.invalid_cursor_message)
+
+        field = self.keyset_field
+        prefix = '-' if descending else ''
+        ordering = (f'{prefix}{field}', f'{prefix}id')
+
+        if cursor is None:
+            self.count = queryset.order_by().count()
+            self.page_number = 1
+            reverse = False
+            window = queryset.order_by(*ordering)
+        else:
+            self.count = cursor.get('n', 0)
+            self.page_number = cursor.get('p', 1)
+            reverse = bool(cursor.get('r'))
+            # Для ссылки previous выбираем записи «назад» и разворачиваем
+            scan_descending = descending != reverse
+            window = keyset_filter(
+                queryset, cursor['c'], cursor['i'], scan_descending, field
+            )
+            if reverse:
+                window = window.order_by(*(
+                    name[1:] if name.startswith('-') else f'-{name}' for name in ordering
+                ))
+            else:
+                window = window.order_by(*ordering)
+
+        rows = list(window[:page_size + 1])
+        has_extra = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next = True
+            self.has_previous = has_extra
+        else:
+            self.has_next = has_extra
+            self.has_previous = cursor is not None
+
+        self.page_rows = rows
+        return rows
+
+    def _get_keyset_direction(self, queryset):
+        """
+        Возвращает True/False (по убыванию/возрастанию), если список можно
+        листать по ключу, иначе None. Без сортировки используется -created_at,
+        если такое поле у модели есть.
+        """
+        order_by = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        if not order_by:
+            return True if self._has_keyset_field(queryset.model) else None
+        first = order_by[0]
+        if not isinstance(first, str):
+            return None
+        if first == self.keyset_field:
+            return False
+        if first == f'-{self.keyset_field}':
+            return True
+        return None
+
+    def _has_keyset_field(self, model):
+        try:
+            field = model._meta.get_field(self.keyset_field)
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.is_relation
+
+    def _make_cursor_link(self, row, reverse, page_number):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        token = encode_cursor({
+            'c': getattr(row, self.keyset_field).isoformat(),
+            'i': row.pk,
+            'n': self.count,
+            'p': page_number,
+            'r': 1 if reverse else 0,
+        })
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self._make_cursor_link(self.page_rows[-1], False, self.page_number + 1)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        if self.page_number <= 2 or not self.page_rows:
+            # Первая страница открывается без курсора
+            url = self.request.build_absolute_uri()
+            url = remove_query_param(url, self.page_query_param)
+            return remove_query_param(url, self.cursor_query_param)
+        return self._make_cursor_link(self.page_rows[0], True, self.page_number - 1)
+
+    def get_total_count(self):
+        if not self.keyset:
+            return self.page.paginator.count
+        return self.count
+
+    def get_current_page(self):
+        if not self.keyset:
+            return self.page.number
+        return self.page_number
+
+    def get_total_pages(self):
+        if not self.keyset:
+            return self.page.paginator.num_pages
+        return max(1, math.ceil(self.count / self.page_size))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.get_total_count(),
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
 
-class CustomPageNumberPagination(PageNumberPagination):
+class CustomPageNumberPagination(KeysetPagination):
     """
     Кастомная пагинация с дополнительной метаинформацией.
     """
@@ -15,9 +220,9 @@ class CustomPageNumberPagination(PageNumberPagination):
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link()
             },
-            'total_pages': self.page.paginator.num_pages,
-            'current_page': self.page.number,
-            'total_items': self.page.paginator.count,
+            'total_pages': self.get_total_pages(),
+            'current_page': self.get_current_page(),
+            'total_items': self.get_total_count(),
             'page_size': self.page_size,
             'results': data
-        }) 
\ No newline at end of file
+        })
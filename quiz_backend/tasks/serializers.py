@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Task, TaskStatistics, TaskTranslation
+from .services.image_variant_service import image_srcset
 from topics.serializers import TopicSerializer, SubtopicSerializer
 
 class TaskTranslationSerializer(serializers.ModelSerializer):
@@ -19,6 +20,7 @@ class TaskSerializer(serializers.ModelSerializer):
     success_rate = serializers.FloatField(read_only=True)
     translations = TaskTranslationSerializer(many=True)
     is_solved = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Task
@@ -31,6 +33,7 @@ class TaskSerializer(serializers.ModelSerializer):
             'create_date',
             'publish_date',
             'image_url',
+            'image_srcset',
             'video_url',
             'external_link',
             'translations',
@@ -44,6 +47,10 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'topic', 'subtopic', 'create_date', 'publish_date', 'success_rate']
 
+    def get_image_srcset(self, obj):
+        """srcset копий картинки по форматам ({"webp": "url 320w, ..."}) или None."""
+        return image_srcset(obj.image_variants, obj.image_url)
+
     def get_is_solved(self, obj):
         """Проверяет, решена ли задача текущим пользователем.
         Проверяет по translation_group_id, чтобы учитывать задачи на всех языках как одну.
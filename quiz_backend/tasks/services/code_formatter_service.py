@@ -0,0 +1,287 @@
+"""
+Долгоживущие форматтеры кода (prettier, gofmt) для картинок и видео задач.
+
+Раньше на каждую картинку запускался `npx prettier` / `gofmt`, и старт Node
+занимал больше времени, чем сама отрисовка. Теперь на язык держится пул
+процессов-воркеров (formatters/*_worker.*), которые общаются JSON-строками
+через stdin/stdout:
+
+- процесс запускается один раз и переиспользуется;
+- у каждого вызова свой таймаут, зависший воркер убивается и перезапускается;
+- простаивающий воркер перед выдачей проверяется ping-запросом;
+- если воркера нет, пул не дёргает его до CODE_FORMATTER_RETRY_AFTER:
+  для gofmt вызывается обычный бинарник `gofmt` (процесс на вызов, как раньше),
+  иначе вызывающий код откатывается на базовое форматирование.
+
+gofmt-воркер — скомпилированный formatters/gofmt_worker.go, Go в рантайме
+не нужен. Docker-образ собирает его отдельной стадией в /usr/local/bin/gofmt-worker,
+локально: go build -o /usr/local/bin/gofmt-worker tasks/services/formatters/gofmt_worker.go
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import select
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+WORKERS_DIR = Path(__file__).resolve().parent / 'formatters'
+
+# Команды запуска воркеров по имени форматтера
+FORMATTER_COMMANDS = {
+    'prettier': ['node', str(WORKERS_DIR / 'prettier_worker.js')],
+    'gofmt': ['gofmt-worker'],
+}
+
+# Разовый запуск инструмента (код в stdin, результат в stdout), если воркер недоступен
+ONE_SHOT_COMMANDS = {
+    'gofmt': ['gofmt'],
+}
+
+
+class FormatterUnavailable(Exception):
+    """Воркер не запустился или перестал отвечать."""
+
+
+class FormatterWorker:
+    """
+    Один процесс форматтера: запрос и ответ — JSON-строки.
+    Не потокобезопасен, выдаётся из FormatterPool по одному вызывающему.
+    """
+
+    def __init__(self, name: str, command: List[str]):
+        self.name = name
+        self.command = command
+        self.process: Optional[subprocess.Popen] = None
+        self.last_used = 0.0
+        self._buffer = b''
+        self._request_id = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout: float):
+        """Запускает процесс и ждёт {"ready": true}."""
+        try:
+            self.process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise FormatterUnavailable(f"{self.name}: не удалось запустить {self.command[0]}: {e}")
+        self._buffer = b''
+        message = self._read_message(timeout)
+        if not message.get('ready'):
+            self.close()
+            raise FormatterUnavailable(f"{self.name}: {message.get('error') or 'воркер не готов'}")
+        self.last_used = time.monotonic()
+        logger.info(f"✅ Запущен воркер форматтера {self.name} (pid {self.process.pid})")
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        """Отправляет запрос и ждёт ответ; при таймауте или падении воркер закрывается."""
+        self._request_id += 1
+        payload = dict(payload, id=self._request_id)
+        try:
+            self.process.stdin.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.process.stdin.flush()
+            message = self._read_message(timeout)
+        except (OSError, FormatterUnavailable):
+            self.close()
+            raise
+        if message.get('id') != self._request_id:
+            self.close()
+            raise FormatterUnavailable(f"{self.name}: ответ не на тот запрос")
+        self.last_used = time.monotonic()
+        return message
+
+    def _read_message(self, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        stdout = self.process.stdout
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise FormatterUnavailable(f"{self.name}: таймаут {timeout} с")
+            ready, _, _ = select.select([stdout], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(stdout.fileno(), 65536)
+            if not chunk:
+                self.close()
+                raise FormatterUnavailable(f"{self.name}: воркер завершился")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        try:
+            return json.loads(line)
+        except ValueError:
+            self.close()
+            raise FormatterUnavailable(f"{self.name}: некорректный ответ воркера")
+
+    def close(self):
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+class FormatterPool:
+    """
+    Пул воркеров одного форматтера. Процессы запускаются лениво,
+    не больше size одновременно.
+    """
+
+    def __init__(self, name: str, command: List[str], size: int):
+        self.name = name
+        self.size = size
+        self.unavailable_until = 0.0
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(FormatterWorker(name, command))
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.unavailable_until
+
+    def format(self, code: str, timeout: float, **options) -> Optional[str]:
+        """
+        Отформатированный код или None (инструмента нет, ошибка синтаксиса, таймаут).
+        """
+        if not self.available:
+            return None
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            logger.warning(f"⚠️ Все воркеры {self.name} заняты дольше {timeout} с")
+            return None
+        try:
+            self._ensure_healthy(worker, timeout)
+            message = worker.request(dict(options, op='format', code=code), timeout)
+        except FormatterUnavailable as e:
+            if not worker.alive and worker.last_used == 0.0:
+                # Воркер ни разу не поднялся — инструмента нет, не пробуем каждый вызов
+                self.unavailable_until = time.monotonic() + getattr(settings, 'CODE_FORMATTER_RETRY_AFTER', 300)
+            logger.warning(f"⚠️ Форматтер недоступен: {e}")
+            return None
+        finally:
+            self._idle.put(worker)
+
+        if not message.get('ok'):
+            logger.debug(f"{self.name} не смог отформатировать: {message.get('error')}")
+            return None
+        return message.get('code')
+
+    def _ensure_healthy(self, worker: FormatterWorker, timeout: float):
+        if not worker.alive:
+            worker.start(getattr(settings, 'CODE_FORMATTER_STARTUP_TIMEOUT', 20))
+            return
+        idle_for = time.monotonic() - worker.last_used
+        if idle_for > getattr(settings, 'CODE_FORMATTER_HEALTHCHECK_INTERVAL', 60):
+            try:
+                worker.request({'op': 'ping'}, timeout)
+            except FormatterUnavailable:
+                logger.warning(f"⚠️ Воркер {self.name} не ответил на ping, перезапуск")
+                worker.start(getattr(settings, 'CODE_FORMATTER_STARTUP_TIMEOUT', 20))
+
+    def close(self):
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.close()
+            self._idle.put(worker)
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_formatter_pool(name: str) -> FormatterPool:
+    """
+    Пул воркеров форматтера для текущего процесса.
+    После fork (пул процессов пакетной генерации) пайпы родителя не используются:
+    у дочернего процесса свои воркеры.
+    """
+    global _pools, _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools = {}
+            _pools_pid = os.getpid()
+        commands = getattr(settings, 'CODE_FORMATTER_COMMANDS', None) or FORMATTER_COMMANDS
+        key = (name, tuple(commands[name]))
+        pool = _pools.get(key)
+        if pool is None:
+            pool = FormatterPool(name, commands[name], getattr(settings, 'CODE_FORMATTER_POOL_SIZE', 2))
+            _pools[key] = pool
+        return pool
+
+
+_one_shot_unavailable_until = {}
+
+
+def format_once(name: str, code: str, timeout: float) -> Optional[str]:
+    """Форматирует код отдельным процессом инструмента (ONE_SHOT_COMMANDS)."""
+    commands = getattr(settings, 'CODE_FORMATTER_ONE_SHOT_COMMANDS', None) or ONE_SHOT_COMMANDS
+    command = commands.get(name)
+    if not command or time.monotonic() < _one_shot_unavailable_until.get(name, 0.0):
+        return None
+    try:
+        result = subprocess.run(command, input=code.encode('utf-8'), capture_output=True, timeout=timeout)
+    except OSError as e:
+        _one_shot_unavailable_until[name] = time.monotonic() + getattr(settings, 'CODE_FORMATTER_RETRY_AFTER', 300)
+        logger.debug(f"{command[0]} недоступен: {e}")
+        return None
+    except subprocess.TimeoutExpired:
+        logger.warning(f"⚠️ {command[0]}: таймаут {timeout} с")
+        return None
+    if result.returncode != 0:
+        logger.debug(f"{command[0]} не смог отформатировать: {result.stderr.decode('utf-8', 'replace')}")
+        return None
+    return result.stdout.decode('utf-8')
+
+
+def format_with(name: str, code: str, **options) -> Optional[str]:
+    """
+    Форматирует код долгоживущим воркером, а если его нет — разовым запуском
+    инструмента. None — откатиться на базовое форматирование.
+    """
+    timeout = getattr(settings, 'CODE_FORMATTER_TIMEOUT', 5)
+    pool = get_formatter_pool(name)
+    if pool.available:
+        formatted = pool.format(code, timeout, **options)
+        # Ошибка синтаксиса или таймаут у живого воркера — разовый запуск не поможет
+        if formatted is not None or pool.available:
+            return formatted
+    return format_once(name, code, timeout)
+
+
+@atexit.register
+def close_formatter_pools():
+    if _pools_pid != os.getpid():
+        return
+    for pool in list(_pools.values()):
+        pool.close()
+    _one_shot_unavailable_until.clear()
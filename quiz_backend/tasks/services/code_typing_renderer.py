@@ -0,0 +1,366 @@
+"""
+Инкрементальная отрисовка видео с набором кода.
+
+Раньше каждый кадр рисовался заново: Pygments разбирал весь видимый префикс
+кода, собиралась полная картинка, сохранялась в PNG с optimize=True, а MoviePy
+потом читал все PNG обратно с диска. Теперь:
+
+- код разбирается лексером и раскладывается один раз (геометрия та же,
+  что у ImageFormatter, поэтому последний кадр совпадает с картинкой Pygments);
+- фон, консоль, логотип и текст вопроса рисуются один раз на постоянном кадре,
+  а в каждом следующем кадре дорисовываются только новые символы;
+- кадры в виде сырых RGB-байтов идут прямо в stdin ffmpeg (см. ffmpeg_service),
+  без промежуточных файлов.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from PIL.Image import Resampling
+from pygments.formatters import ImageFormatter
+from pygments.styles import get_style_by_name
+from django.conf import settings
+
+from .image_generation_service import get_lexer, load_logo
+
+logger = logging.getLogger(__name__)
+
+# Размеры шрифта кода в видео, от крупного к мелкому
+VIDEO_CODE_FONT_SIZES = tuple(range(55, 33, -2))
+# Минимальная ширина консоли и отступы кода внутри неё
+MIN_CONSOLE_WIDTH = 950
+CODE_PADDING_TOP, CODE_PADDING_BOTTOM = 100, 70
+# Кнопки окна консоли
+WINDOW_BUTTON_COLORS = ((255, 59, 48), (255, 204, 0), (40, 205, 65))
+BACKGROUND_COLOR = (173, 216, 230)
+CONSOLE_COLOR = (40, 40, 40)
+QUESTION_FONT_SIZE = 45
+QUESTION_TEXT_GAP = 30
+QUESTION_FONT_PATHS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+)
+
+
+@lru_cache(maxsize=None)
+def _get_video_code_formatter(font_size: int) -> ImageFormatter:
+    """
+    ImageFormatter для кода в видео (используются только шрифты, стиль и геометрия).
+    """
+    return ImageFormatter(
+        font_size=font_size,
+        style=get_style_by_name('monokai'),
+        line_numbers=True,
+        line_number_start=1,
+        line_number_fg='#888888',
+        line_number_bg='#272822',
+        image_pad=8,
+        line_pad=4,
+        background_color='#272822'
+    )
+
+
+@lru_cache(maxsize=1)
+def _load_question_font() -> ImageFont.ImageFont:
+    for font_path in QUESTION_FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                return ImageFont.truetype(font_path, QUESTION_FONT_SIZE)
+            except Exception:
+                continue
+    return ImageFont.load_default()
+
+
+@dataclass
+class GlyphRun:
+    """
+    Кусок строки кода одного стиля: смещение в потоке символов и место на картинке кода.
+    """
+    start: int
+    text: str
+    position: Tuple[int, int]
+    font: ImageFont.ImageFont
+    fill: str
+    background: Optional[str]
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+
+@dataclass
+class CodeLayout:
+    """
+    Раскладка кода для одного размера шрифта.
+    """
+    formatter: ImageFormatter
+    runs: List[GlyphRun]
+    line_starts: List[int]
+    size: Tuple[int, int]
+    total_chars: int
+
+
+def layout_code(tokens: list, formatter: ImageFormatter) -> CodeLayout:
+    """
+    Раскладывает токены так же, как ImageFormatter._create_drawables, но без рисования.
+    Смещения считаются в потоке символов токенов (табы уже развёрнуты).
+    """
+    runs: List[GlyphRun] = []
+    line_starts = [0]
+    offset = lineno = linelength = maxlinelength = 0
+
+    for ttype, value in tokens:
+        while ttype not in formatter.styles:
+            ttype = ttype.parent
+        style = formatter.styles[ttype]
+        value = value.expandtabs(4)
+        for line in value.splitlines(True):
+            text = line.rstrip('\n')
+            if text:
+                runs.append(GlyphRun(
+                    start=offset,
+                    text=text,
+                    position=formatter._get_text_pos(linelength, lineno),
+                    font=formatter._get_style_font(style),
+                    fill=formatter._get_text_color(style),
+                    background=formatter._get_text_bg_color(style),
+                ))
+                linelength += formatter.fonts.get_text_size(text)[0]
+                maxlinelength = max(maxlinelength, linelength)
+            offset += len(line)
+            if line.endswith('\n'):
+                linelength = 0
+                lineno += 1
+                line_starts.append(offset)
+
+    return CodeLayout(
+        formatter=formatter,
+        runs=runs,
+        line_starts=line_starts[:lineno],
+        size=formatter._get_image_size(maxlinelength, lineno),
+        total_chars=offset,
+    )
+
+
+def wrap_question_text(text: str, font: ImageFont.ImageFont, draw: ImageDraw.ImageDraw, max_width: int) -> List[str]:
+    """Разбивает текст на строки, которые помещаются в max_width."""
+    words = text.split()
+    lines = []
+    current_line = []
+
+    for word in words:
+        test_line = ' '.join(current_line + [word])
+        bbox = draw.textbbox((0, 0), test_line, font=font)
+        if bbox[2] - bbox[0] <= max_width:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [word]
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    # Одно длинное слово без пробелов — режем по символам
+    if not lines:
+        chars_per_line = max(1, int(max_width / (QUESTION_FONT_SIZE * 0.6)))
+        lines = [text[i:i + chars_per_line] for i in range(0, len(text), chars_per_line)]
+
+    return lines
+
+
+class CodeTypingRenderer:
+    """
+    Кадры анимации набора кода в вертикальном формате (9:16).
+
+    Раскладка консоли считается по всему коду, поэтому консоль не меняет
+    размер во время печати. reveal(n) дорисовывает символы до n-го,
+    frame_bytes() отдаёт текущий кадр в формате rgb24 для ffmpeg.
+    С question_text=None кадр не зависит от языка задачи, а вопрос
+    накладывается отдельно (question_overlay).
+    """
+
+    def __init__(
+        self,
+        formatted_code: str,
+        language: str,
+        logo_path: Optional[str] = None,
+        question_text: Optional[str] = "Каким будет результат кода?",
+        width: int = None,
+        height: int = None,
+    ):
+        self.width = width or getattr(settings, 'VIDEO_WIDTH', 1080)
+        self.height = height or getattr(settings, 'VIDEO_HEIGHT', 1920)
+
+        tokens = list(get_lexer(language).get_tokens(formatted_code))
+        self.layout = self._choose_layout(tokens)
+        self.total_chars = self.layout.total_chars
+        self.revealed = 0
+        self._next_run = 0
+        self._next_line = 0
+
+        code_width, code_height = self.layout.size
+        max_code_width = MIN_CONSOLE_WIDTH - 120
+        self.scale = max_code_width / code_width if code_width > max_code_width else None
+        if self.scale:
+            # Код шире консоли даже мелким шрифтом: рисуем в натуральную величину и сжимаем
+            self.scaled_size = (int(code_width * self.scale), int(code_height * self.scale))
+            logger.debug(f"Код масштабирован по ширине: {self.scaled_size[0]}x{self.scaled_size[1]}")
+            visible_size = self.scaled_size
+        else:
+            visible_size = self.layout.size
+
+        self.frame = Image.new("RGB", (self.width, self.height), BACKGROUND_COLOR)
+        self.code_origin = self._draw_static(visible_size, logo_path, question_text)
+
+        code_background = Image.new('RGB', self.layout.size, self.layout.formatter.background_color)
+        self.layout.formatter._paint_line_number_bg(code_background)
+        if self.scale:
+            self.code_canvas = code_background
+            self._target, self._offset = code_background, (0, 0)
+        else:
+            self.frame.paste(code_background, self.code_origin)
+            self._target, self._offset = self.frame, self.code_origin
+        self._draw = ImageDraw.Draw(self._target)
+        self._sync_scaled()
+
+    def _choose_layout(self, tokens: list) -> CodeLayout:
+        """Крупнейший шрифт, при котором весь код помещается в консоль."""
+        max_code_width = MIN_CONSOLE_WIDTH - 120
+        max_code_height = self.height - 400
+        layout = None
+        for font_size in VIDEO_CODE_FONT_SIZES:
+            layout = layout_code(tokens, _get_video_code_formatter(font_size))
+            code_width, code_height = layout.size
+            if code_width <= max_code_width and code_height <= max_code_height:
+                return layout
+        return layout
+
+    def _draw_static(self, code_size: Tuple[int, int], logo_path: Optional[str], question_text: Optional[str]) -> Tuple[int, int]:
+        """Фон, консоль, логотип и текст вопроса (если есть). Возвращает позицию кода на кадре."""
+        draw = ImageDraw.Draw(self.frame)
+        code_width, code_height = code_size
+
+        console_width = min(self.width - 100, max(MIN_CONSOLE_WIDTH, code_width + 140))
+        console_height = code_height + CODE_PADDING_TOP + CODE_PADDING_BOTTOM
+        question_text_height = 80
+        top_margin, bottom_margin = 50, 50
+        available_height = self.height - question_text_height - QUESTION_TEXT_GAP - top_margin - bottom_margin
+        console_x0 = (self.width - console_width) // 2
+        console_y0 = top_margin + (available_height - console_height) // 2
+        console_x1 = console_x0 + console_width
+        console_y1 = console_y0 + console_height
+
+        draw.rounded_rectangle((console_x0, console_y0, console_x1, console_y1), radius=30, fill=CONSOLE_COLOR)
+        circle_radius, circle_spacing = 15, 25
+        circle_y = console_y0 + 30
+        for i, color in enumerate(WINDOW_BUTTON_COLORS):
+            circle_x = console_x0 + (2 * i + 1) * circle_spacing
+            draw.ellipse((circle_x, circle_y, circle_x + 2 * circle_radius, circle_y + 2 * circle_radius), fill=color)
+
+        if logo_path and os.path.exists(logo_path):
+            try:
+                logo = load_logo(logo_path, (180, 180))
+                logo_x = self.width - logo.width - 20
+                # Логотип на 30px выше консоли, но не ближе 50px к верху кадра
+                logo_y = max(console_y0 - logo.height - 30, 50)
+                self.frame.paste(logo, (logo_x, logo_y), logo)
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке логотипа: {e}")
+
+        self.console_bottom = console_y1
+        if question_text:
+            self._draw_question(draw, question_text)
+
+        shift_left = 40
+        code_x = console_x0 + (console_width - code_width) // 2 - shift_left
+        return code_x, console_y0 + CODE_PADDING_TOP
+
+    def _draw_question(self, draw: ImageDraw.ImageDraw, question_text: str):
+        """Текст вопроса под консолью, с белым контуром для читаемости."""
+        font = _load_question_font()
+        line_spacing = 5
+        text_lines = wrap_question_text(question_text, font, draw, self.width - 100)
+        bbox = draw.textbbox((0, 0), "Ag", font=font)
+        line_height = bbox[3] - bbox[1]
+        total_text_height = len(text_lines) * line_height + (len(text_lines) - 1) * line_spacing
+        text_y = self.console_bottom + QUESTION_TEXT_GAP
+        if text_y + total_text_height > self.height - 20:
+            text_y = self.height - total_text_height - 20
+        for line_idx, line in enumerate(text_lines):
+            bbox = draw.textbbox((0, 0), line, font=font)
+            line_x = (self.width - (bbox[2] - bbox[0])) // 2
+            line_y = text_y + line_idx * (line_height + line_spacing)
+            for dx, dy in ((-2, -2), (-2, 2), (2, -2), (2, 2), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+                draw.text((line_x + dx, line_y + dy), line, font=font, fill=(255, 255, 255))
+            draw.text((line_x, line_y), line, font=font, fill=(30, 30, 30))
+
+    def question_overlay(self, question_text: str) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+        """
+        Текст вопроса отдельным слоем для кадров без вопроса (question_text=None):
+        (прямоугольник фона с текстом, его позиция на кадре) или None.
+        Вопрос стоит под консолью на однотонном фоне, поэтому наложение слоя
+        даёт тот же кадр, что и отрисовка вопроса прямо в нём.
+        """
+        if not question_text:
+            return None
+        background = Image.new("RGB", (self.width, self.height), BACKGROUND_COLOR)
+        layer = background.copy()
+        self._draw_question(ImageDraw.Draw(layer), question_text)
+        bbox = ImageChops.difference(layer, background).getbbox()
+        if not bbox:
+            return None
+        return layer.crop(bbox), bbox[:2]
+
+    def reveal(self, visible_chars: int):
+        """Дорисовывает символы кода до visible_chars (назад анимация не идёт)."""
+        target = min(max(visible_chars, 0), self.total_chars)
+        if target <= self.revealed:
+            return
+        formatter = self.layout.formatter
+        ox, oy = self._offset
+
+        # Номер строки появляется, когда курсор на неё переходит
+        line_starts = self.layout.line_starts
+        while self._next_line < len(line_starts) and line_starts[self._next_line] <= target:
+            x, y = formatter._get_linenumber_pos(self._next_line)
+            self._draw.text(
+                (x + ox, y + oy),
+                str(self._next_line + formatter.line_number_start).rjust(formatter.line_number_chars),
+                font=formatter.fonts.get_font(formatter.line_number_bold, formatter.line_number_italic),
+                fill=formatter.line_number_fg,
+            )
+            self._next_line += 1
+
+        runs = self.layout.runs
+        while self._next_run < len(runs) and runs[self._next_run].start < target:
+            run = runs[self._next_run]
+            first = max(self.revealed, run.start) - run.start
+            last = min(target, run.end) - run.start
+            x, y = run.position
+            if first:
+                # Дробное смещение по advance шрифта: так же Pillow ставит глифы внутри строки
+                x += run.font.getlength(run.text[:first])
+            text = run.text[first:last]
+            if run.background:
+                right, bottom = run.font.getbbox(text)[2:]
+                self._draw.rectangle([x + ox, y + oy, x + ox + right, y + oy + bottom], fill=run.background)
+            self._draw.text((x + ox, y + oy), text, font=run.font, fill=run.fill)
+            if run.end > target:
+                break
+            self._next_run += 1
+
+        self.revealed = target
+        self._sync_scaled()
+
+    def _sync_scaled(self):
+        if self.scale:
+            self.frame.paste(self.code_canvas.resize(self.scaled_size, Resampling.LANCZOS), self.code_origin)
+
+    def frame_bytes(self) -> bytes:
+        """Текущий кадр, rgb24."""
+        return self.frame.tobytes()
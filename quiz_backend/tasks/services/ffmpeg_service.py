@@ -0,0 +1,254 @@
+"""
+Кодирование видео задач через ffmpeg.
+
+- FfmpegFrameWriter: кадры rgb24 из памяти в stdin ffmpeg;
+- encode_still_frame: один кадр, повторённый нужное число раз (ffmpeg -loop 1),
+  для статичных участков видео;
+- concat_videos: склейка частей без перекодирования (concat demuxer, -c copy)
+  и подмешивание аудиодорожки;
+- overlay_video: наложение статичного слоя (текст вопроса) на готовый клип
+  с перекодированием и подмешиванием аудио;
+- decode_audio: декодирование аудиофайла в сырые float32-сэмплы.
+
+Все части кодируются с одинаковыми параметрами (VIDEO_CODEC_ARGS), поэтому
+склеиваются копированием потоков.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Общие параметры H.264: части видео должны совпадать, чтобы склеиваться через -c copy
+VIDEO_CODEC_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p']
+# Промежуточные клипы, которые ещё будут перекодированы, пишутся без потерь
+LOSSLESS_ARGS = ['-qp', '0']
+
+
+def get_ffmpeg_binary() -> str:
+    """
+    ffmpeg из PATH (ставится в Docker-образе), иначе бинарник imageio-ffmpeg.
+    """
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return 'ffmpeg'
+
+
+def _codec_args(preset: str, threads: Optional[int], lossless: bool = False) -> List[str]:
+    args = VIDEO_CODEC_ARGS + ['-preset', preset]
+    if lossless:
+        args += LOSSLESS_ARGS
+    if threads:
+        args += ['-threads', str(threads)]
+    return args
+
+
+def _run_ffmpeg(args: List[str], description: str) -> bytes:
+    """Запускает ffmpeg и возвращает stdout; при ошибке RuntimeError с хвостом stderr."""
+    result = subprocess.run(
+        [get_ffmpeg_binary(), '-y', '-loglevel', 'error'] + args,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', 'replace').strip()[-2000:]
+        raise RuntimeError(f"ffmpeg ({description}) завершился с кодом {result.returncode}: {error}")
+    return result.stdout
+
+
+class FfmpegFrameWriter:
+    """
+    Кодирует кадры rgb24 из stdin в H.264 (yuv420p), с дорожкой из аудиофайла, если он есть.
+
+    Использование:
+        with FfmpegFrameWriter(path, 1080, 1920, 24, audio_path) as writer:
+            writer.write(renderer.frame_bytes())
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        width: int,
+        height: int,
+        fps: int,
+        audio_path: Optional[str] = None,
+        preset: str = 'medium',
+        threads: Optional[int] = None,
+        lossless: bool = False,
+    ):
+        self.output_path = output_path
+        self.frame_size = width * height * 3
+        self.frames_written = 0
+        command = [
+            get_ffmpeg_binary(), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+        ]
+        if audio_path:
+            command += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'aac', '-shortest']
+        self.command = command + _codec_args(preset, threads, lossless) + [output_path]
+        self.process: Optional[subprocess.Popen] = None
+        self._stderr = None
+
+    def __enter__(self):
+        # stderr во временный файл: pipe мог бы заполниться и остановить ffmpeg
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stderr=self._stderr)
+        return self
+
+    def write(self, frame: bytes):
+        if len(frame) != self.frame_size:
+            raise ValueError(f"Размер кадра {len(frame)} байт, ожидалось {self.frame_size}")
+        try:
+            self.process.stdin.write(frame)
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"ffmpeg завершился при записи кадра {self.frames_written}: {self._error_output()}")
+        self.frames_written += 1
+
+    def _error_output(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode('utf-8', 'replace').strip()[-2000:]
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None:
+                self.process.kill()
+                self.process.wait()
+                return False
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+            if self.process.wait() != 0:
+                raise RuntimeError(f"ffmpeg завершился с кодом {self.process.returncode}: {self._error_output()}")
+        finally:
+            self._stderr.close()
+        return False
+
+
+def encode_still_frame(
+    image: Image.Image,
+    frames: int,
+    output_path: str,
+    fps: int,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+    lossless: bool = False,
+):
+    """
+    Кодирует один кадр, повторённый frames раз: кадр рисуется и передаётся один раз,
+    а статичные кадры x264 почти ничего не стоят.
+    """
+    still_path = f"{output_path}.png"
+    # Быстрое сжатие: файл временный и читается один раз
+    image.save(still_path, 'PNG', compress_level=1)
+    try:
+        _run_ffmpeg(
+            ['-loop', '1', '-framerate', str(fps), '-i', still_path, '-frames:v', str(frames), '-r', str(fps)]
+            + _codec_args(preset, threads, lossless) + [output_path],
+            'статичный кадр',
+        )
+    finally:
+        os.remove(still_path)
+
+
+def concat_videos(parts: List[str], output_path: str, audio_path: Optional[str] = None):
+    """
+    Склеивает части (закодированные с одинаковыми параметрами) без перекодирования
+    и подмешивает аудиодорожку, если она есть.
+    """
+    if len(parts) == 1 and not audio_path:
+        os.replace(parts[0], output_path)
+        return
+
+    list_path = f"{output_path}.txt"
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for part in parts:
+            # Экранирование путей для concat demuxer
+            escaped = os.path.abspath(part).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    args = ['-f', 'concat', '-safe', '0', '-i', list_path]
+    if audio_path:
+        args += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'aac', '-shortest']
+    try:
+        _run_ffmpeg(args + ['-c:v', 'copy', output_path], 'склейка частей')
+    finally:
+        os.remove(list_path)
+
+
+def overlay_video(
+    input_path: str,
+    output_path: str,
+    overlay: Optional[Image.Image] = None,
+    position: Tuple[int, int] = (0, 0),
+    audio_path: Optional[str] = None,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+    frame_range: Optional[Tuple[int, int]] = None,
+    fps: Optional[int] = None,
+):
+    """
+    Перекодирует клип, накладывая статичную картинку в position
+    и подмешивая аудиодорожку, если она есть.
+    frame_range=(start, end) — только кадры [start, end) клипа с частотой fps
+    (для кодирования по кускам).
+    """
+    args = ['-i', input_path]
+    if frame_range and frame_range[0]:
+        # Вход перематывается к началу куска (-ss до -i): декодируется только
+        # кусок от ближайшего ключевого кадра, а не весь клип с начала.
+        # Точка на полкадра раньше start, чтобы округление времени не сдвинуло границу
+        args = ['-ss', f'{(frame_range[0] - 0.5) / fps:.6f}'] + args
+    overlay_path = None
+    if overlay is not None:
+        overlay_path = f"{output_path}.overlay.png"
+        overlay.save(overlay_path, 'PNG', compress_level=1)
+        # Одна картинка во втором входе: overlay держит её до конца клипа
+        args += ['-i', overlay_path]
+    audio_input = 2 if overlay is not None else 1
+    if audio_path:
+        args += ['-i', audio_path]
+
+    filters = []
+    video = '[0:v]'
+    if frame_range:
+        # После перемотки первый кадр входа — start; trim отрезает точный конец куска
+        start, end = frame_range
+        filters.append(f'{video}trim=end_frame={end - start},setpts=PTS-STARTPTS[trimmed]')
+        video = '[trimmed]'
+    if overlay is not None:
+        x, y = position
+        filters.append(f'{video}[1:v]overlay={x}:{y}[v]')
+        video = '[v]'
+    if filters:
+        args += ['-filter_complex', ';'.join(filters), '-map', video]
+    else:
+        args += ['-map', '0:v']
+    if audio_path:
+        args += ['-map', f'{audio_input}:a', '-c:a', 'aac', '-shortest']
+    try:
+        _run_ffmpeg(args + _codec_args(preset, threads) + [output_path], 'наложение слоя')
+    finally:
+        if overlay_path and os.path.exists(overlay_path):
+            os.remove(overlay_path)
+
+
+def decode_audio(path: str, sample_rate: int, channels: int, max_seconds: Optional[float] = None) -> bytes:
+    """
+    Декодирует аудиофайл любого формата в сырые float32-сэмплы (f32le, каналы чередуются).
+    """
+    args = ['-i', path]
+    if max_seconds:
+        args += ['-t', f'{max_seconds:.3f}']
+    args += ['-vn', '-f', 'f32le', '-acodec', 'pcm_f32le', '-ac', str(channels), '-ar', str(sample_rate), '-']
+    return _run_ffmpeg(args, 'декодирование аудио')
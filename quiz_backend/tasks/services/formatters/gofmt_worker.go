@@ -0,0 +1,53 @@
+// Долгоживущий процесс gofmt для tasks/services/code_formatter_service.py.
+//
+// Протокол тот же, что у prettier_worker.js: одна JSON-строка на запрос
+// в stdin, одна JSON-строка на ответ в stdout. Форматирование — go/format,
+// то есть ровно то, что делает gofmt, но без запуска процесса на каждый вызов.
+package main
+
+import (
+	"bufio"
+	"encoding/json"
+	"go/format"
+	"os"
+)
+
+type request struct {
+	ID   int    `json:"id"`
+	Op   string `json:"op"`
+	Code string `json:"code"`
+}
+
+type response struct {
+	ID    int    `json:"id,omitempty"`
+	Ready bool   `json:"ready,omitempty"`
+	OK    bool   `json:"ok"`
+	Code  string `json:"code,omitempty"`
+	Error string `json:"error,omitempty"`
+}
+
+func main() {
+	out := json.NewEncoder(os.Stdout)
+	out.SetEscapeHTML(false)
+	out.Encode(response{Ready: true, OK: true})
+
+	scanner := bufio.NewScanner(os.Stdin)
+	scanner.Buffer(make([]byte, 64*1024), 16*1024*1024)
+	for scanner.Scan() {
+		var req request
+		if err := json.Unmarshal(scanner.Bytes(), &req); err != nil {
+			out.Encode(response{Error: err.Error()})
+			continue
+		}
+		if req.Op == "ping" {
+			out.Encode(response{ID: req.ID, OK: true})
+			continue
+		}
+		formatted, err := format.Source([]byte(req.Code))
+		if err != nil {
+			out.Encode(response{ID: req.ID, Error: err.Error()})
+			continue
+		}
+		out.Encode(response{ID: req.ID, OK: true, Code: string(formatted)})
+	}
+}
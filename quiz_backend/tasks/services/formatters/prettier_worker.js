@@ -0,0 +1,65 @@
+'use strict';
+/**
+ * Долгоживущий процесс prettier для tasks/services/code_formatter_service.py.
+ *
+ * Протокол: одна JSON-строка на запрос в stdin, одна JSON-строка на ответ в stdout.
+ *   старт:   <- {"ready": true}  (или {"ready": false, "error": ...} и выход)
+ *   запрос:  -> {"id": 1, "op": "format", "code": "...", "parser": "babel"}
+ *            <- {"id": 1, "ok": true, "code": "..."}
+ *   здоровье: -> {"id": 2, "op": "ping"}  <- {"id": 2, "ok": true}
+ */
+const path = require('path');
+const readline = require('readline');
+const { execSync } = require('child_process');
+
+function loadPrettier() {
+  try {
+    return require('prettier');
+  } catch (e) {
+    // Не в node_modules проекта — пробуем глобальную установку (npm install -g prettier)
+  }
+  try {
+    const globalRoot = execSync('npm root -g', {
+      encoding: 'utf8',
+      stdio: ['ignore', 'pipe', 'ignore'],
+    }).trim();
+    return require(path.join(globalRoot, 'prettier'));
+  } catch (e) {
+    return null;
+  }
+}
+
+const send = (message) => process.stdout.write(JSON.stringify(message) + '\n');
+
+const prettier = loadPrettier();
+if (!prettier) {
+  send({ ready: false, error: 'prettier не установлен' });
+  process.exit(1);
+}
+send({ ready: true });
+
+const lines = readline.createInterface({ input: process.stdin });
+// prettier 3 форматирует асинхронно: цепочка сохраняет порядок ответов
+let queue = Promise.resolve();
+
+lines.on('line', (line) => {
+  queue = queue.then(async () => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (e) {
+      send({ ok: false, error: String(e) });
+      return;
+    }
+    if (request.op === 'ping') {
+      send({ id: request.id, ok: true });
+      return;
+    }
+    try {
+      const code = await prettier.format(request.code, { parser: request.parser || 'babel' });
+      send({ id: request.id, ok: true, code });
+    } catch (e) {
+      send({ id: request.id, ok: false, error: String((e && e.message) || e) });
+    }
+  });
+});
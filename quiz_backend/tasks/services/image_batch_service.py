@@ -0,0 +1,275 @@
+"""
+Пакетная генерация картинок задач.
+
+Отрисовка (PIL/Pygments) упирается в CPU, поэтому картинки рисуются в пуле
+процессов: каждый воркер один раз прогревает шрифты, форматтеры и лексеры
+и держит их между задачами. Готовый PNG сразу уходит на загрузку в R2/S3
+в пуле потоков, пока воркеры рисуют следующие картинки.
+
+Кэш отрисовок (image_render_cache) проверяется до отрисовки, а задачи
+с одинаковыми входными данными рисуются один раз.
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from .image_generation_service import (
+    CONSOLE_FONT_SIZES,
+    ImageRenderSpec,
+    _get_console_formatter,
+    build_image_render_spec,
+    get_lexer,
+    render_task_image,
+)
+from .image_render_cache import lookup_task_image, release_task_image, remember_task_image, task_image_name
+from .image_variant_service import schedule_image_variants
+from .s3_service import encode_png, upload_png_to_s3
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImageJob:
+    """
+    Картинка для одной задачи.
+    """
+    task_id: int
+    question: str
+    topic_name: str
+    theme: str = 'code'
+    custom_logo_path: Optional[str] = None
+    tenant_slug: Optional[str] = None
+    topic_slug: Optional[str] = None
+
+
+@dataclass
+class ImageBatchResult:
+    """
+    Итог пакета: URL по ID задачи (None — ошибка) и счётчики.
+    """
+    urls: Dict[int, Optional[str]] = field(default_factory=dict)
+    rendered: int = 0
+    cached: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    workers: int = 1
+
+    @property
+    def images_per_second(self) -> float:
+        return (self.rendered + self.cached) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.urls)} задач за {self.elapsed:.1f} с ({self.images_per_second:.1f} изобр./с, "
+            f"воркеров: {self.workers}): отрисовано {self.rendered}, из кэша {self.cached}, ошибок {self.failed}"
+        )
+
+
+def _warm_worker():
+    """Прогрев кэшей воркера: шрифты Pygments (fc-list) и частые лексеры."""
+    try:
+        _get_console_formatter(CONSOLE_FONT_SIZES[0])
+        for language in ('python', 'javascript', 'go', 'java', 'sql'):
+            get_lexer(language)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось прогреть воркер генерации картинок: {e}")
+
+
+def _render_png(spec: ImageRenderSpec) -> Optional[bytes]:
+    """Отрисовка и кодирование PNG (выполняется в процессе-воркере)."""
+    try:
+        return encode_png(render_task_image(spec))
+    except Exception as e:
+        logger.error(f"Ошибка при генерации изображения: {e}")
+        return None
+
+
+def _render_in_pool(specs: List[ImageRenderSpec], workers: int):
+    """
+    Итератор (индекс, PNG) в порядке готовности.
+    Если пул процессов недоступен (например, внутри демонического процесса),
+    рисует в текущем процессе.
+    """
+    if workers > 1 and len(specs) > 1:
+        try:
+            # fork: воркеры наследуют настройки Django и уже прогретые кэши
+            executor = ProcessPoolExecutor(
+                max_workers=min(workers, len(specs)),
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_warm_worker,
+            )
+            futures = {executor.submit(_render_png, spec): index for index, spec in enumerate(specs)}
+        except (AssertionError, OSError, ValueError) as e:
+            logger.warning(f"⚠️ Пул процессов недоступен ({e}), картинки рисуются в текущем процессе")
+        else:
+            with executor:
+                for future in as_completed(futures):
+                    try:
+                        png = future.result()
+                    except Exception as e:
+                        logger.error(f"Ошибка воркера генерации картинок: {e}")
+                        png = None
+                    yield futures[future], png
+            return
+
+    for index, spec in enumerate(specs):
+        yield index, _render_png(spec)
+
+
+def render_images_batch(
+    jobs: List[ImageJob],
+    workers: int = None,
+    upload_concurrency: int = None,
+    verify: bool = False,
+    on_result: Callable[[ImageJob, Optional[str], bool], None] = None,
+) -> ImageBatchResult:
+    """
+    Генерирует и загружает картинки для пакета задач.
+
+    Args:
+        jobs: Задачи
+        workers: Процессов для отрисовки (по умолчанию IMAGE_BATCH_WORKERS)
+        upload_concurrency: Одновременных загрузок (по умолчанию IMAGE_BATCH_UPLOAD_CONCURRENCY)
+        verify: Не доверять локальному индексу кэша (см. lookup_task_image)
+        on_result: Вызывается для каждой задачи: (job, url или None, взята ли из кэша)
+
+    Returns:
+        ImageBatchResult
+    """
+    workers = workers or getattr(settings, 'IMAGE_BATCH_WORKERS', 1)
+    upload_concurrency = upload_concurrency or getattr(settings, 'IMAGE_BATCH_UPLOAD_CONCURRENCY', 8)
+    result = ImageBatchResult(workers=workers)
+    started = time.monotonic()
+
+    def finish(job: ImageJob, url: Optional[str], cached: bool):
+        result.urls[job.task_id] = url
+        if url is None:
+            result.failed += 1
+        elif cached:
+            result.cached += 1
+        else:
+            result.rendered += 1
+        if on_result:
+            on_result(job, url, cached)
+
+    specs = {}
+    for job in jobs:
+        try:
+            specs[job.task_id] = build_image_render_spec(
+                job.question, job.topic_name, job.theme, job.custom_logo_path
+            )
+        except Exception as e:
+            logger.error(f"Задача {job.task_id}: ошибка подготовки картинки: {e}")
+            finish(job, None, False)
+    jobs = [job for job in jobs if job.task_id in specs]
+
+    # 1. Кэш отрисовок (локальный индекс и HEAD в хранилище) — параллельно
+    with ThreadPoolExecutor(max_workers=upload_concurrency) as executor:
+        found = list(executor.map(
+            lambda job: lookup_task_image(specs[job.task_id], job.tenant_slug, job.topic_slug, verify),
+            jobs
+        ))
+
+    # 2. Промахи с одинаковым объектом рисуем один раз
+    pending: Dict[tuple, List[ImageJob]] = {}
+    for job, url in zip(jobs, found):
+        if url:
+            finish(job, url, True)
+        else:
+            object_id = (specs[job.task_id].render_key, job.tenant_slug, job.topic_slug)
+            pending.setdefault(object_id, []).append(job)
+    groups = list(pending.values())
+    render_specs = [specs[group[0].task_id] for group in groups]
+
+    # 3. Отрисовка в пуле процессов, загрузка готовых PNG — в пуле потоков
+    def upload(group: List[ImageJob], png: Optional[bytes]):
+        first = group[0]
+        spec = specs[first.task_id]
+        url = upload_png_to_s3(png, task_image_name(spec), first.tenant_slug, first.topic_slug) if png else None
+        if url:
+            remember_task_image(spec, url, first.tenant_slug, first.topic_slug)
+        return group, url
+
+    # Пул процессов создаётся до потоков загрузки: fork при живых потоках небезопасен
+    rendered = _render_in_pool(render_specs, workers)
+    first_ready = next(rendered, None)
+    with ThreadPoolExecutor(max_workers=upload_concurrency) as executor:
+        uploads = []
+        if first_ready is not None:
+            uploads.append(executor.submit(upload, groups[first_ready[0]], first_ready[1]))
+            for index, png in rendered:
+                uploads.append(executor.submit(upload, groups[index], png))
+        for future in as_completed(uploads):
+            group, url = future.result()
+            for position, job in enumerate(group):
+                # Первая задача группы получила свежую отрисовку, остальные — её копию
+                finish(job, url, cached=position > 0)
+
+    result.elapsed = time.monotonic() - started
+    logger.info(f"🖼️ Пакетная генерация картинок: {result.summary()}")
+    return result
+
+
+def generate_task_images(
+    tasks,
+    theme: str = 'code',
+    custom_logo_path: Optional[str] = None,
+    workers: int = None,
+    verify: bool = False,
+    prefer_language: Optional[str] = None,
+) -> ImageBatchResult:
+    """
+    Генерирует картинки для задач (Task) и сохраняет image_url.
+
+    Args:
+        tasks: Задачи (лучше с select_related('topic', 'tenant'))
+        theme: Тема оформления ('code', 'islamic')
+        custom_logo_path: Логотип тенанта
+        workers: Процессов для отрисовки
+        verify: Не доверять локальному индексу кэша
+        prefer_language: Язык перевода, по которому рисовать (иначе первый перевод)
+    """
+    from tasks.models import Task
+
+    tasks = {task.id: task for task in tasks}
+    jobs = []
+    missing = []
+    for task in tasks.values():
+        # Выбираем из .all(), чтобы использовать prefetch_related('translations') без запроса на задачу
+        translations = sorted(task.translations.all(), key=lambda item: item.pk)
+        translation = next((item for item in translations if item.language == prefer_language), None)
+        translation = translation or next(iter(translations), None)
+        if not translation or not translation.question:
+            logger.warning(f"Задача {task.id}: нет перевода с вопросом, картинка не сгенерирована")
+            missing.append(task.id)
+            continue
+        jobs.append(ImageJob(
+            task_id=task.id,
+            question=translation.question,
+            topic_name=task.topic.name if task.topic else 'python',
+            theme=theme,
+            custom_logo_path=custom_logo_path,
+            tenant_slug=task.tenant.slug if task.tenant else None,
+            topic_slug=task.topic.name if task.topic else None,
+        ))
+
+    def save(job: ImageJob, url: Optional[str], cached: bool):
+        task = tasks[job.task_id]
+        if url is None:
+            Task.objects.filter(id=task.id).update(error=True)
+        elif task.image_url != url or task.error:
+            Task.objects.filter(id=task.id).update(image_url=url, error=False)
+            if task.image_url != url:
+                schedule_image_variants('tasks', task.id)
+                release_task_image(task.image_url, url)
+
+    result = render_images_batch(jobs, workers=workers, verify=verify, on_result=save)
+    for task_id in missing:
+        result.urls[task_id] = None
+        result.failed += 1
+    return result
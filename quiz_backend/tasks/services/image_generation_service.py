@@ -2,22 +2,29 @@
 Сервис генерации изображений с кодом для задач.
 Портирован из bot/services/image_service.py.
 """
+import copy
+import hashlib
 import io
+import json
 import logging
 import os
 import re
-import subprocess
 import textwrap
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple, Optional, List
 
 from PIL import Image, ImageDraw, ImageFont
 from PIL.Image import Resampling
-from pygments import highlight
 from pygments.formatters import ImageFormatter
 from pygments.lexers import get_lexer_by_name, TextLexer
 from pygments.styles import get_style_by_name
 from django.conf import settings
+from django.core.cache import cache
+
+from .code_formatter_service import format_with
 
 logger = logging.getLogger(__name__)
 
@@ -109,6 +116,16 @@ def extract_code_from_markdown(text: str) -> Tuple[str, str]:
 # УМНОЕ ФОРМАТИРОВАНИЕ КОДА
 # ============================================================================
 
+# Отмечает, что форматтер языка откатился на базовое форматирование:
+# такой результат smart_format_code не кэширует
+_format_state = threading.local()
+
+
+def _basic_fallback(formatted: str) -> str:
+    _format_state.fallback = True
+    return formatted
+
+
 def format_python_code(code: str) -> str:
     """
     Форматирование Python с приоритетом: black > autopep8 > базовое
@@ -149,55 +166,41 @@ def format_python_code(code: str) -> str:
     
     # Попытка 3: базовое форматирование (безопасное)
     logger.info("⚠️ Использовано базовое форматирование для Python")
-    return safe_basic_format(code)
+    return _basic_fallback(safe_basic_format(code))
 
 
-def format_javascript_typescript(code: str) -> str:
+def format_javascript_typescript(code: str, parser: str = 'babel') -> str:
     """
-    Форматирование JS/TS через prettier или базовое
+    Форматирование JS/TS через prettier (долгоживущий воркер) или базовое
     """
-    # Попытка 1: prettier (если установлен Node.js)
-    try:
-        result = subprocess.run(
-            ['npx', '--yes', 'prettier', '--stdin-filepath', 'code.js'],
-            input=code.encode(),
-            capture_output=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            logger.info("✅ Использован prettier для JS/TS")
-            return result.stdout.decode()
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        logger.debug("prettier недоступен (npx не найден или timeout)")
-    except Exception as e:
-        logger.warning(f"prettier ошибка: {e}")
-    
+    formatted = format_with('prettier', code, parser=parser)
+    if formatted:
+        logger.info("✅ Использован prettier для JS/TS")
+        return formatted
+
     # Базовое форматирование
     logger.info("⚠️ Использовано базовое форматирование для JS/TS")
-    return format_curly_braces_language(code)
+    return _basic_fallback(format_curly_braces_language(code))
+
+
+def format_typescript_code(code: str) -> str:
+    """
+    Форматирование TypeScript: prettier с парсером typescript
+    """
+    return format_javascript_typescript(code, parser='typescript')
 
 
 def format_golang_code(code: str) -> str:
     """
-    Форматирование Go через gofmt
+    Форматирование Go через gofmt (долгоживущий воркер)
     """
-    try:
-        result = subprocess.run(
-            ['gofmt'],
-            input=code.encode(),
-            capture_output=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            logger.info("✅ Использован gofmt")
-            return result.stdout.decode()
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        logger.debug("gofmt недоступен")
-    except Exception as e:
-        logger.warning(f"gofmt ошибка: {e}")
-    
+    formatted = format_with('gofmt', code)
+    if formatted:
+        logger.info("✅ Использован gofmt")
+        return formatted
+
     logger.info("⚠️ Использовано базовое форматирование для Go")
-    return format_curly_braces_language(code)
+    return _basic_fallback(format_curly_braces_language(code))
 
 
 def format_sql_code(code: str) -> str:
@@ -220,7 +223,7 @@ def format_sql_code(code: str) -> str:
         logger.warning(f"sqlparse ошибка: {e}")
     
     logger.info("⚠️ SQL код оставлен без изменений")
-    return code
+    return _basic_fallback(code)
 
 
 def format_curly_braces_language(code: str) -> str:
@@ -297,8 +300,8 @@ def smart_format_code(code: str, language: str) -> str:
         
         'javascript': format_javascript_typescript,
         'js': format_javascript_typescript,
-        'typescript': format_javascript_typescript,
-        'ts': format_javascript_typescript,
+        'typescript': format_typescript_code,
+        'ts': format_typescript_code,
         
         'go': format_golang_code,
         'golang': format_golang_code,
@@ -319,11 +322,29 @@ def smart_format_code(code: str, language: str) -> str:
     
     # Выбираем форматтер
     formatter_func = formatters.get(lang, safe_basic_format)
+
+    # Уже виденный фрагмент берём из кэша, не запуская форматтер
+    _format_state.fallback = False
+    cache_key = f"code_format:{lang}:{hashlib.sha256(code.encode('utf-8')).hexdigest()}"
+    try:
+        formatted = cache.get(cache_key)
+    except Exception as e:
+        logger.debug(f"Кэш форматирования недоступен: {e}")
+        formatted = None
+    if formatted:
+        return formatted
     
     try:
         formatted = formatter_func(code)
         # Проверяем что форматирование сработало
         if formatted and formatted.strip():
+            if _format_state.fallback:
+                # Форматтер был недоступен: когда он появится, результат будет другим
+                return formatted
+            try:
+                cache.set(cache_key, formatted, getattr(settings, 'CODE_FORMAT_CACHE_TIMEOUT', 7 * 24 * 3600))
+            except Exception as e:
+                logger.debug(f"Кэш форматирования недоступен: {e}")
             return formatted
     except Exception as e:
         logger.error(f"Ошибка форматирования {language}: {e}")
@@ -355,9 +376,11 @@ def wrap_text(task_text: str, max_line_length: int = 79) -> str:
     return '\n'.join(wrapped_lines)
 
 
+@lru_cache(maxsize=64)
 def get_lexer(language: str):
     """
-    Автоматическое определение лексера Pygments для любого языка
+    Автоматическое определение лексера Pygments для любого языка.
+    Лексеры не хранят состояние между разборами, поэтому кэшируются.
     """
     # Нормализуем название
     lang = language.lower().strip()
@@ -410,6 +433,7 @@ def _can_connect_after(char: str) -> bool:
     return bool(forms and forms[2])
 
 
+@lru_cache(maxsize=4096)
 def _shape_arabic_run(text: str) -> str:
     chars = list(text)
     shaped = []
@@ -447,10 +471,12 @@ def _shape_arabic_run(text: str) -> str:
     return ''.join(shaped)[::-1]
 
 
+@lru_cache(maxsize=1024)
 def prepare_text_for_rendering(text: str) -> str:
     """
     Подготавливает текст для рендера в PIL.
     Для арабского делает простое shaping и визуальный RTL порядок без внешних зависимостей.
+    Результат кэшируется: один и тот же текст рисуется в нескольких размерах и темах.
     """
     if not contains_arabic(text):
         return text
@@ -462,9 +488,10 @@ def prepare_text_for_rendering(text: str) -> str:
     return ARABIC_RUN_RE.sub(replace_run, normalized)
 
 
-def load_unicode_font(font_size: int, bold: bool = True) -> ImageFont.FreeTypeFont:
+@lru_cache(maxsize=2)
+def _unicode_font_path(bold: bool = True) -> Optional[str]:
     """
-    Загружает шрифт с поддержкой Unicode/Arabic.
+    Путь к первому доступному шрифту с поддержкой Unicode/Arabic (ищется один раз).
     """
     font_candidates = [
         "/Users/user/quiz_project/bot/fonts/Arial Unicode.ttf",
@@ -477,18 +504,50 @@ def load_unicode_font(font_size: int, bold: bool = True) -> ImageFont.FreeTypeFo
     for path in font_candidates:
         if path and os.path.exists(path):
             try:
-                return ImageFont.truetype(path, font_size)
+                ImageFont.truetype(path, 12)
+                return path
             except Exception:
                 continue
+    return None
+
 
+@lru_cache(maxsize=32)
+def load_unicode_font(font_size: int, bold: bool = True) -> ImageFont.FreeTypeFont:
+    """
+    Загружает шрифт с поддержкой Unicode/Arabic (один раз на размер).
+    """
+    path = _unicode_font_path(bold)
+    if path:
+        return ImageFont.truetype(path, font_size)
     return ImageFont.load_default()
 
 
+# Кэш ширины слов: (шрифт, размер, слово) -> ширина в пикселях
+TEXT_WIDTH_CACHE_SIZE = 50000
+_text_widths = {}
+
+
+def text_width(font: ImageFont.ImageFont, text: str) -> float:
+    """
+    Ширина текста (advance) с кэшем по (шрифт, размер, текст).
+    """
+    key = (getattr(font, 'path', None) or id(font), getattr(font, 'size', None), text)
+    width = _text_widths.get(key)
+    if width is None:
+        if len(_text_widths) >= TEXT_WIDTH_CACHE_SIZE:
+            _text_widths.clear()
+        width = _text_widths[key] = font.getlength(text)
+    return width
+
+
 def wrap_text_by_width(text: str, font: ImageFont.ImageFont, draw: ImageDraw.ImageDraw, max_width: int) -> List[str]:
     """
     Разбивает текст на строки с учетом реальной ширины.
+    Ширина строки складывается из закэшированных ширин слов и пробелов,
+    поэтому шрифт измеряет каждое слово один раз, а не каждую пробную строку.
     """
     prepared_text = prepare_text_for_rendering(text)
+    space_width = text_width(font, ' ')
     lines: List[str] = []
 
     for paragraph in prepared_text.split('\n'):
@@ -497,27 +556,138 @@ def wrap_text_by_width(text: str, font: ImageFont.ImageFont, draw: ImageDraw.Ima
             lines.append('')
             continue
 
-        current_line = words[0]
+        current_words = [words[0]]
+        current_width = text_width(font, words[0])
         for word in words[1:]:
-            test_line = f"{current_line} {word}"
-            left, top, right, bottom = draw.textbbox((0, 0), test_line, font=font)
-            if right - left <= max_width:
-                current_line = test_line
+            word_width = text_width(font, word)
+            if current_width + space_width + word_width <= max_width:
+                current_words.append(word)
+                current_width += space_width + word_width
             else:
-                lines.append(current_line)
-                current_line = word
-        lines.append(current_line)
+                lines.append(' '.join(current_words))
+                current_words = [word]
+                current_width = word_width
+        lines.append(' '.join(current_words))
 
     return lines
 
 
-def generate_console_image(task_text: str, language: str, logo_path: Optional[str] = None) -> Image.Image:
+# Версия отрисовки: увеличить при любом изменении внешнего вида изображений
+# (шрифты, цвета, раскладка), чтобы кэш отрисовок перестал их переиспользовать
+IMAGE_RENDERER_VERSION = 3
+CONSOLE_STYLE = 'monokai'
+
+
+# Размеры шрифта кода, от крупного к мелкому
+CONSOLE_FONT_SIZES = tuple(range(50, 22, -2))
+# Область, в которую должен поместиться код; больший код рисуется
+# мельче, а при минимальном шрифте консоль просто растягивается
+MAX_CODE_WIDTH, MAX_CODE_HEIGHT = 2600, 2600
+
+
+@lru_cache(maxsize=None)
+def _get_console_formatter(font_size: int) -> ImageFormatter:
+    """
+    Прототип ImageFormatter для размера шрифта.
+    Pygments ищет шрифты через fc-list при каждом создании форматтера,
+    поэтому прототип создаётся один раз, а для рендера берётся его копия.
+    """
+    return ImageFormatter(
+        font_size=font_size,
+        style=get_style_by_name(CONSOLE_STYLE),
+        line_numbers=True,
+        line_number_start=1,
+        line_number_fg='#888888',
+        line_number_bg='#272822',  # Цвет фона из темы monokai
+        image_pad=20,
+        line_pad=10,
+        background_color='#272822'  # Цвет фона из темы monokai
+    )
+
+
+def tokenize_code(code: str, lexer) -> Tuple[list, List[List[str]]]:
+    """
+    Разбирает код лексером один раз.
+
+    Returns:
+        (токены для рендера, фрагменты текста по строкам для замеров)
+        Разбиение повторяет ImageFormatter, чтобы замеры совпадали с рендером.
+    """
+    tokens = list(lexer.get_tokens(code))
+    lines: List[List[str]] = [[]]
+    for _ttype, value in tokens:
+        for line in value.expandtabs(4).splitlines(True):
+            text = line.rstrip('\n')
+            if text:
+                lines[-1].append(text)
+            if line.endswith('\n'):
+                lines.append([])
+    return tokens, lines
+
+
+def measure_code_image(formatter: ImageFormatter, lines: List[List[str]]) -> Tuple[int, int]:
+    """
+    Размер картинки кода, которую нарисует formatter, без рендера.
+    Последний элемент lines — строка после завершающего перевода строки.
+    """
+    text_width = formatter.fonts.get_text_size
+    max_line_length = max(
+        (sum(text_width(fragment)[0] for fragment in fragments) for fragments in lines),
+        default=0
+    )
+    width = max_line_length + formatter.line_number_width + 2 * formatter.image_pad
+    height = (len(lines) - 1) * (formatter.fonth + formatter.line_pad) + 2 * formatter.image_pad
+    return width, height
+
+
+def choose_console_font_size(lines: List[List[str]]) -> int:
+    """
+    Самый крупный шрифт, при котором код помещается в MAX_CODE_WIDTH x MAX_CODE_HEIGHT.
+    """
+    for font_size in CONSOLE_FONT_SIZES:
+        width, height = measure_code_image(_get_console_formatter(font_size), lines)
+        if width <= MAX_CODE_WIDTH and height <= MAX_CODE_HEIGHT:
+            return font_size
+    return CONSOLE_FONT_SIZES[-1]
+
+
+def render_code_image(tokens: list, font_size: int) -> Image.Image:
+    """Один финальный рендер подсвеченного кода."""
+    formatter = copy.copy(_get_console_formatter(font_size))
+    formatter.drawables = []
+    code_image_io = io.BytesIO()
+    formatter.format(tokens, code_image_io)
+    code_image_io.seek(0)
+    return Image.open(code_image_io).convert("RGBA")
+
+
+@lru_cache(maxsize=16)
+def _load_resized_logo(logo_path: str, size: Tuple[int, int], mtime: float) -> Image.Image:
+    logo = Image.open(logo_path).convert("RGBA")
+    return logo.resize(size, Resampling.LANCZOS)
+
+
+def load_logo(logo_path: str, size: Tuple[int, int]) -> Image.Image:
+    """
+    Логотип нужного размера. Кэшируется по пути и времени изменения файла,
+    поэтому замена логотипа тенанта подхватывается без перезапуска.
+    """
+    return _load_resized_logo(logo_path, size, os.path.getmtime(logo_path))
+
+
+def generate_console_image(
+    task_text: str,
+    language: str,
+    logo_path: Optional[str] = None,
+    formatted: bool = False,
+) -> Image.Image:
     """
     Генерация «консольного» изображения с подсветкой кода/текста и логотипом.
-    Использует умное форматирование и нумерацию строк.
+    Использует умное форматирование (если код ещё не отформатирован — formatted=False)
+    и нумерацию строк.
     """
     # Умное форматирование кода
-    formatted_text = smart_format_code(task_text, language)
+    formatted_text = task_text if formatted else smart_format_code(task_text, language)
     
     # Дополнительно оборачиваем длинные строки если нужно
     formatted_text = wrap_text(formatted_text, max_line_length=50)
@@ -528,41 +698,11 @@ def generate_console_image(task_text: str, language: str, logo_path: Optional[st
 
     lexer = get_lexer(language)
 
-    # Начинаем с более крупного шрифта
-    font_size = 50
-    code_img = None
-    while font_size >= 24:
-        formatter = ImageFormatter(
-            font_size=font_size,
-            style=get_style_by_name('monokai'),
-            line_numbers=True,
-            line_number_start=1,
-            line_number_fg='#888888',
-            line_number_bg='#272822',  # Цвет фона из темы monokai
-            image_pad=20,
-            line_pad=10,
-            background_color='#272822'  # Цвет фона из темы monokai
-        )
-        code_image_io = io.BytesIO()
-        highlight(formatted_text.strip(), lexer, formatter, outfile=code_image_io)
-        code_image_io.seek(0)
-        tmp_code_img = Image.open(code_image_io).convert("RGBA")
-
-        console_width = max(MIN_CONSOLE_WIDTH, tmp_code_img.width + 160)
-        console_height = max(MIN_CONSOLE_HEIGHT, tmp_code_img.height + 240)
-        width = max(MIN_WIDTH, console_width + 300)
-        height = max(MIN_HEIGHT, console_height + 300)
-
-        if (tmp_code_img.width <= (console_width - 160)
-                and tmp_code_img.height <= (console_height - 240)):
-            code_img = tmp_code_img
-            logger.info(f"✅ Выбран размер шрифта: {font_size}")
-            break
-
-        font_size -= 2
-
-    if code_img is None:
-        code_img = tmp_code_img
+    # Разбираем код один раз, размер шрифта подбираем по замерам строк
+    tokens, lines = tokenize_code(formatted_text.strip(), lexer)
+    font_size = choose_console_font_size(lines)
+    logger.info(f"✅ Выбран размер шрифта: {font_size}")
+    code_img = render_code_image(tokens, font_size)
 
     console_width = max(MIN_CONSOLE_WIDTH, code_img.width + 160)
     console_height = max(MIN_CONSOLE_HEIGHT, code_img.height + 240)
@@ -601,9 +741,7 @@ def generate_console_image(task_text: str, language: str, logo_path: Optional[st
 
     if logo_path and os.path.exists(logo_path):
         try:
-            logo = Image.open(logo_path).convert("RGBA")
-            fixed_logo_size = (240, 240)
-            logo = logo.resize(fixed_logo_size, Resampling.LANCZOS)
+            logo = load_logo(logo_path, (240, 240))
             logo_x = width - logo.width - 30
             logo_y = 10
             image.paste(logo, (logo_x, logo_y), logo)
@@ -659,9 +797,7 @@ def generate_islamic_image(text: str, logo_path: Optional[str] = None) -> Image.
     # Логотип
     if logo_path and os.path.exists(logo_path):
         try:
-            logo = Image.open(logo_path).convert("RGBA")
-            fixed_logo_size = (200, 200)
-            logo = logo.resize(fixed_logo_size, Resampling.LANCZOS)
+            logo = load_logo(logo_path, (200, 200))
             # Помещаем логотип в правый верхний угол (как в quiz-code)
             logo_x = WIDTH - logo.width - border_padding - 20
             logo_y = border_padding + 20
@@ -724,8 +860,7 @@ def generate_text_card_image(text: str, logo_path: Optional[str] = None) -> Imag
 
     if logo_path and os.path.exists(logo_path):
         try:
-            logo = Image.open(logo_path).convert("RGBA")
-            logo = logo.resize((180, 180), Resampling.LANCZOS)
+            logo = load_logo(logo_path, (180, 180))
             logo_x = WIDTH - logo.width - 40
             logo_y = 30
             image.paste(logo, (logo_x, logo_y), logo)
@@ -753,6 +888,138 @@ def generate_text_card_image(text: str, logo_path: Optional[str] = None) -> Imag
 
 
 
+@dataclass
+class ImageRenderSpec:
+    """
+    Всё, от чего зависит картинка задачи: по этим полям строится ключ кэша.
+    Для консольного шаблона text — уже отформатированный код: если форматтер
+    был недоступен, ключ другой, и такая отрисовка не выдаётся вместо нормальной.
+    """
+    kind: str  # 'console' | 'islamic' | 'text_card'
+    text: str
+    language: str
+    logo_path: Optional[str]
+
+    @property
+    def render_key(self) -> str:
+        """
+        Детерминированный ключ отрисовки: хэш нормализованного текста (для кода —
+        результата форматирования), языка, шаблона, стиля, логотипа и версии рендерера.
+        """
+        normalized = '\n'.join(line.rstrip() for line in self.text.replace('\r\n', '\n').strip().split('\n'))
+        payload = json.dumps({
+            'kind': self.kind,
+            'text': normalized,
+            'language': self.language.lower().strip() if self.kind == 'console' else '',
+            'style': CONSOLE_STYLE,
+            'logo': _file_digest(self.logo_path) if self.logo_path else None,
+            'version': IMAGE_RENDERER_VERSION,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=32)
+def _file_digest_cached(path: str, mtime: float, size: int) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _file_digest(path: str) -> str:
+    """Хэш содержимого файла (пересчитывается только при изменении файла)."""
+    stat = os.stat(path)
+    return _file_digest_cached(path, stat.st_mtime, stat.st_size)
+
+
+def resolve_logo_path(custom_logo_path: Optional[str] = None) -> Optional[str]:
+    """
+    Путь к логотипу: логотип тенанта, затем LOGO_PATH, затем ассеты бота.
+    """
+    logo_path = None
+
+    # 1. Если передан кастомный путь (из админки тенанта), используем его в приоритете
+    if custom_logo_path and os.path.exists(custom_logo_path):
+        logo_path = custom_logo_path
+        logger.info(f"🖼️ Использован кастомный логотип тенанта: {logo_path}")
+
+    # 2. Если кастомного нет или он недоступен, пробуем глобальные настройки
+    if not logo_path:
+        logo_path = os.getenv('LOGO_PATH')
+        if not logo_path:
+            logo_path = getattr(settings, 'LOGO_PATH', None)
+
+        # Если путь из настроек есть, но файл не существует - пробуем fallback
+        if logo_path and not os.path.exists(logo_path):
+            logger.warning(f"⚠️ Логотип по пути из настроек не найден: {logo_path}, пробуем fallback...")
+            logo_path = None
+
+    # 3. Fallback поиск в ассетах
+    if not logo_path:
+        # Fallback: ищем логотип в bot/assets/logo.png (как в боте)
+        # Список возможных путей в порядке приоритета
+        possible_paths = [
+            '/quiz_project/bot/assets/logo.png',  # Docker контейнер (volume)
+            '/app/../bot/assets/logo.png',  # Относительно /app
+            str(settings.BASE_DIR.parent / 'bot' / 'assets' / 'logo.png'),  # Локальная разработка
+        ]
+
+        for path in possible_paths:
+            if os.path.exists(path):
+                logo_path = path
+                logger.info(f"🔍 Использован путь к логотипу: {logo_path}")
+                break
+
+        if not logo_path:
+            logger.warning(f"⚠️ Логотип не найден. Проверены пути: {', '.join(possible_paths)}")
+
+    if logo_path and os.path.exists(logo_path):
+        logger.info(f"🖼️ Путь к логотипу: {logo_path}")
+        return logo_path
+
+    logger.warning("⚠️ Путь к логотипу не установлен или файл не существует, изображение будет создано без логотипа")
+    return None
+
+
+def build_image_render_spec(
+    task_question: str,
+    topic_name: str,
+    theme: str = 'code',
+    custom_logo_path: Optional[str] = None
+) -> ImageRenderSpec:
+    """
+    Определяет шаблон, текст, язык и логотип картинки задачи без отрисовки.
+    """
+    # Извлекаем код из markdown блоков и определяем язык
+    code, detected_language = extract_code_from_markdown(task_question)
+
+    # Если язык не определён из markdown, используем topic
+    if detected_language == 'python' and topic_name:
+        topic_lower = topic_name.lower()
+        # Пытаемся использовать topic как fallback для языка
+        if topic_lower in ['python', 'java', 'javascript', 'go', 'golang', 'rust', 'sql', 'php']:
+            detected_language = topic_lower
+
+    logo_path = resolve_logo_path(custom_logo_path)
+
+    if theme == 'islamic':
+        return ImageRenderSpec('islamic', task_question, detected_language, logo_path)
+    if contains_arabic(task_question):
+        return ImageRenderSpec('text_card', task_question, detected_language, logo_path)
+    return ImageRenderSpec('console', smart_format_code(code, detected_language), detected_language, logo_path)
+
+
+def render_task_image(spec: ImageRenderSpec) -> Image.Image:
+    """Отрисовывает картинку задачи по спецификации."""
+    if spec.kind == 'islamic':
+        logger.info("🕌 Используется исламская тематика")
+        return generate_islamic_image(spec.text, spec.logo_path)
+    if spec.kind == 'text_card':
+        logger.info("📝 Обнаружен арабский текст, используется текстовая карточка с Unicode-шрифтом")
+        return generate_text_card_image(spec.text, spec.logo_path)
+    # По умолчанию используем 'code' (консоль)
+    logger.info(f"💻 Используется консольная тематика, язык: {spec.language}")
+    return generate_console_image(spec.text, spec.language, spec.logo_path, formatted=True)
+
+
 def generate_image_for_task(task_question: str, topic_name: str, theme: str = 'code', custom_logo_path: Optional[str] = None) -> Optional[Image.Image]:
     """
     Генерирует изображение для задачи, используя выбранную тему.
@@ -767,77 +1034,8 @@ def generate_image_for_task(task_question: str, topic_name: str, theme: str = 'c
         PIL Image объект или None при ошибке
     """
     try:
-        # Извлекаем код из markdown блоков и определяем язык
-        code, detected_language = extract_code_from_markdown(task_question)
-        
-        # Если язык не определён из markdown, используем topic
-        if detected_language == 'python' and topic_name:
-            topic_lower = topic_name.lower()
-            # Пытаемся использовать topic как fallback для языка
-            if topic_lower in ['python', 'java', 'javascript', 'go', 'golang', 'rust', 'sql', 'php']:
-                detected_language = topic_lower
-
-        logger.info(f"Генерация изображения, язык: {detected_language}")
-        
-        # Резолвим логотип
-        logo_path = None
-        
-        # 1. Если передан кастомный путь (из админки тенанта), используем его в приоритете
-        if custom_logo_path and os.path.exists(custom_logo_path):
-            logo_path = custom_logo_path
-            logger.info(f"🖼️ Использован кастомный логотип тенанта: {logo_path}")
-        
-        # 2. Если кастомного нет или он недоступен, пробуем глобальные настройки
-        if not logo_path:
-            logo_path = os.getenv('LOGO_PATH')
-            if not logo_path:
-                logo_path = getattr(settings, 'LOGO_PATH', None)
-            
-            # Если путь из настроек есть, но файл не существует - пробуем fallback
-            if logo_path and not os.path.exists(logo_path):
-                logger.warning(f"⚠️ Логотип по пути из настроек не найден: {logo_path}, пробуем fallback...")
-                logo_path = None
-        
-        # 3. Fallback поиск в ассетах
-        if not logo_path:
-            # Fallback: ищем логотип в bot/assets/logo.png (как в боте)
-            # Список возможных путей в порядке приоритета
-            possible_paths = [
-                '/quiz_project/bot/assets/logo.png',  # Docker контейнер (volume)
-                '/app/../bot/assets/logo.png',  # Относительно /app
-                str(settings.BASE_DIR.parent / 'bot' / 'assets' / 'logo.png'),  # Локальная разработка
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path):
-                    logo_path = path
-                    logger.info(f"🔍 Использован путь к логотипу: {logo_path}")
-                    break
-            
-            if not logo_path:
-                logger.warning(f"⚠️ Логотип не найден. Проверены пути: {', '.join(possible_paths)}")
-        
-        if logo_path and os.path.exists(logo_path):
-            logger.info(f"🖼️ Путь к логотипу: {logo_path}")
-        else:
-            logger.warning("⚠️ Путь к логотипу не установлен или файл не существует, изображение будет создано без логотипа")
-            logo_path = None  # Убеждаемся, что None если файла нет
-        
-        has_arabic_text = contains_arabic(task_question)
-
-        if theme == 'islamic':
-            logger.info(f"🕌 Используется исламская тематика (тема: {theme})")
-            image = generate_islamic_image(task_question, logo_path)
-        elif has_arabic_text:
-            logger.info("📝 Обнаружен арабский текст, используется текстовая карточка с Unicode-шрифтом")
-            image = generate_text_card_image(task_question, logo_path)
-        else:
-            # По умолчанию используем 'code' (консоль)
-            logger.info(f"💻 Используется консольная тематика (тема: {theme})")
-            image = generate_console_image(code, detected_language, logo_path)
-            
-        return image
-        
+        spec = build_image_render_spec(task_question, topic_name, theme, custom_logo_path)
+        return render_task_image(spec)
     except Exception as e:
         logger.error(f"Ошибка при генерации изображения: {e}")
         return None
@@ -0,0 +1,197 @@
+"""
+Кэш отрисованных изображений задач по содержимому.
+
+Картинка задачи полностью определяется отформатированным кодом/текстом, языком,
+шаблоном, стилем, логотипом и версией рендерера (см. ImageRenderSpec.render_key).
+Изображение сохраняется в хранилище под именем {render_key}.png, поэтому
+повторная генерация с теми же входными данными (массовая регенерация,
+переводы одной задачи с одинаковым кодом) не рисует и не загружает его заново.
+
+Порядок поиска:
+  1. локальный индекс на диске (IMAGE_RENDER_CACHE_DIR, общий volume media);
+  2. HEAD-запрос к R2/S3 по ключу объекта;
+  3. отрисовка и загрузка.
+
+Один объект может быть общим для нескольких задач, поэтому удалять картинки
+нужно через delete_task_images: она не трогает объекты, на которые ещё
+ссылаются другие задачи, удаляет вместе с оригиналом его копии WebP/AVIF
+и убирает удалённые из локального индекса. Прежняя картинка задачи после
+регенерации удаляется так же (release_task_image).
+"""
+import logging
+import os
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from .image_generation_service import ImageRenderSpec, build_image_render_spec, render_task_image
+from .image_variant_service import delete_variants
+from .s3_service import (
+    build_image_key,
+    delete_image_from_s3,
+    extract_s3_key_from_url,
+    find_uploaded_image,
+    upload_image_to_s3,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _index_path(object_key: str) -> str:
+    cache_dir = getattr(settings, 'IMAGE_RENDER_CACHE_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'render_cache')
+    return os.path.join(cache_dir, f'{object_key}.url')
+
+
+def _read_index(object_key: str) -> Optional[str]:
+    try:
+        with open(_index_path(object_key), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _write_index(object_key: str, url: str):
+    path = _index_path(object_key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(url)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось записать индекс кэша отрисовок {path}: {e}")
+
+
+def _forget_index(object_key: str):
+    try:
+        os.remove(_index_path(object_key))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"⚠️ Не удалось удалить запись индекса кэша отрисовок {object_key}: {e}")
+
+
+def task_image_name(spec: ImageRenderSpec) -> str:
+    """Имя объекта картинки в хранилище."""
+    return f'{spec.render_key}.png'
+
+
+def lookup_task_image(
+    spec: ImageRenderSpec,
+    tenant_slug: str = None,
+    topic_slug: str = None,
+    verify: bool = False,
+) -> Optional[str]:
+    """
+    URL уже загруженной картинки с такими входными данными или None.
+    При verify=True локальный индекс пропускается и проверяется хранилище.
+    """
+    image_name = task_image_name(spec)
+    object_key = build_image_key(image_name, tenant_slug, topic_slug)
+
+    if not verify:
+        url = _read_index(object_key)
+        if url:
+            logger.info(f"♻️ Изображение взято из кэша отрисовок: {url}")
+            return url
+
+    url = find_uploaded_image(image_name, tenant_slug, topic_slug)
+    if url:
+        logger.info(f"♻️ Изображение уже есть в хранилище: {url}")
+        _write_index(object_key, url)
+    return url
+
+
+def remember_task_image(spec: ImageRenderSpec, url: str, tenant_slug: str = None, topic_slug: str = None):
+    """Записывает загруженную картинку в локальный индекс."""
+    _write_index(build_image_key(task_image_name(spec), tenant_slug, topic_slug), url)
+
+
+def get_or_create_task_image(
+    task_question: str,
+    topic_name: str,
+    theme: str = 'code',
+    custom_logo_path: Optional[str] = None,
+    tenant_slug: str = None,
+    topic_slug: str = None,
+    verify: bool = False,
+) -> Tuple[Optional[str], bool]:
+    """
+    Возвращает URL картинки задачи, рисуя и загружая её только при промахе кэша.
+
+    Args:
+        task_question: Текст вопроса задачи
+        topic_name: Название темы (fallback для языка кода)
+        theme: Тема оформления ('code', 'islamic')
+        custom_logo_path: Логотип тенанта
+        tenant_slug: Slug тенанта для иерархии R2
+        topic_slug: Название темы для иерархии R2
+        verify: Не доверять локальному индексу и проверить объект в хранилище
+            (для починки битых изображений)
+
+    Returns:
+        (URL или None при ошибке, True если отрисовка и загрузка пропущены)
+    """
+    try:
+        spec = build_image_render_spec(task_question, topic_name, theme, custom_logo_path)
+        url = lookup_task_image(spec, tenant_slug, topic_slug, verify)
+        if url:
+            return url, True
+        image = render_task_image(spec)
+    except Exception as e:
+        logger.error(f"Ошибка при генерации изображения: {e}")
+        return None, False
+
+    url = upload_image_to_s3(image, task_image_name(spec), tenant_slug=tenant_slug, topic_slug=topic_slug)
+    if url:
+        remember_task_image(spec, url, tenant_slug, topic_slug)
+    return url, False
+
+
+def delete_task_images(image_urls: Iterable[str], deleted_task_ids: Iterable[int]) -> int:
+    """
+    Удаляет картинки удаляемых задач и их копии из хранилища и из локального
+    индекса. Вызывается до удаления задач: манифесты копий берутся из них.
+    Объект, на который ссылается задача не из deleted_task_ids (перевод или
+    задача с тем же кодом), остаётся на месте.
+
+    Returns:
+        Количество удалённых объектов
+    """
+    from tasks.models import Task
+
+    deleted_task_ids = list(deleted_task_ids)
+    image_urls = list(dict.fromkeys(url for url in image_urls if url))
+    # Копии от прежней картинки задачи (манифест другого source) могут быть общими — не трогаем
+    manifests = {
+        url: manifest for url, manifest in Task.objects.filter(
+            pk__in=deleted_task_ids, image_url__in=image_urls
+        ).values_list('image_url', 'image_variants')
+        if manifest and manifest.get('source') == url
+    }
+    deleted = 0
+    for url in image_urls:
+        if Task.objects.filter(image_url=url).exclude(pk__in=deleted_task_ids).exists():
+            logger.info(f"♻️ Картинка используется другими задачами, не удаляем: {url}")
+            continue
+        delete_variants('tasks', manifests.get(url))
+        if delete_image_from_s3(url):
+            object_key = extract_s3_key_from_url(url)
+            if object_key:
+                _forget_index(object_key)
+            deleted += 1
+    return deleted
+
+
+def release_task_image(old_url: Optional[str], new_url: Optional[str]) -> bool:
+    """
+    Удаляет прежнюю картинку задачи после смены image_url, если на неё больше
+    не ссылается ни одна задача. Вызывается после сохранения нового URL.
+    Копии прежней картинки удаляет generate_variants при построении новых.
+
+    Returns:
+        True, если объект удалён
+    """
+    if not old_url or old_url == new_url:
+        return False
+    return delete_task_images([old_url], []) > 0
@@ -0,0 +1,334 @@
+"""
+Адаптивные копии изображений (WebP, AVIF) для srcset.
+
+Картинки задач, аватарки Mini App и фото блога отдавались одним полноразмерным
+PNG/JPEG даже там, где мини-приложение показывает миниатюру. Теперь после
+загрузки из оригинала строятся копии в WebP (и AVIF, если Pillow умеет его
+кодировать — плагин pillow-avif-plugin) по ширинам IMAGE_VARIANT_WIDTHS, без
+увеличения. Копии лежат рядом с оригиналом ({имя}_w{ширина}.{формат}),
+а их URL записываются в JSON-поле модели:
+
+    {"source": <URL или имя файла оригинала>, "width": 1080, "height": 1350,
+     "webp": {"320": url, "640": url, "1080": url}, "avif": {...}}
+
+"source" привязывает копии к оригиналу: после замены картинки старые копии
+не отдаются (image_srcset вернёт None), пока не построены новые, а при
+построении новых удаляются из хранилища (копии картинки задачи — когда их
+манифест не остался ни у одной другой задачи). Копии удаляемой картинки задачи
+удаляет delete_task_images вместе с оригиналом (delete_variants).
+
+Копии строит Celery-задача generate_image_variants_async (schedule_image_variants
+ставит её после коммита); пропущенное — например, при недоступном брокере —
+доделывает команда backfill_image_variants.
+"""
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from .s3_service import delete_objects_from_s3, extract_s3_key_from_url, get_s3_client, upload_object_to_s3
+
+try:
+    import pillow_avif  # noqa: F401 — регистрирует кодек AVIF в Pillow до 11.2
+except ImportError:
+    pass
+Image.init()
+AVIF_AVAILABLE = 'AVIF' in Image.SAVE
+
+logger = logging.getLogger(__name__)
+
+PIL_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+# Порядок в srcset-ответе: сначала более компактный формат
+FORMAT_PRIORITY = ('avif', 'webp')
+
+
+@dataclass(frozen=True)
+class VariantTarget:
+    """
+    Поле модели с изображением и JSON-поле с его копиями.
+
+    Attributes:
+        model: Модель в виде 'app_label.Model'
+        field: URL-поле (картинка в R2/S3) или FileField/ImageField (storage)
+        variants_field: JSON-поле для манифеста копий
+    """
+    model: str
+    field: str
+    variants_field: str
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    @property
+    def is_file_field(self) -> bool:
+        return self.get_model()._meta.get_field(self.field).get_internal_type() in ('FileField', 'ImageField')
+
+
+TARGETS = {
+    'tasks': VariantTarget('tasks.Task', 'image_url', 'image_variants'),
+    'avatars': VariantTarget('accounts.MiniAppUser', 'avatar', 'avatar_variants'),
+    'blog': VariantTarget('blog.PostImage', 'photo', 'photo_variants'),
+}
+
+
+def variant_widths() -> List[int]:
+    return sorted(set(getattr(settings, 'IMAGE_VARIANT_WIDTHS', [320, 640, 960])))
+
+
+def variant_formats() -> List[str]:
+    """Форматы из IMAGE_VARIANT_FORMATS, которые доступны в этом окружении."""
+    formats = []
+    for fmt in getattr(settings, 'IMAGE_VARIANT_FORMATS', ['webp', 'avif']):
+        if fmt == 'avif' and not AVIF_AVAILABLE:
+            continue
+        if fmt in PIL_FORMATS:
+            formats.append(fmt)
+    return formats
+
+
+def variant_name(name: str, fmt: str, width: int) -> str:
+    """Имя копии рядом с оригиналом: path/task.png -> path/task_w320.webp."""
+    root, _ = os.path.splitext(name)
+    return f'{root}_w{width}.{fmt}'
+
+
+def source_of(instance, target: VariantTarget) -> Optional[str]:
+    """URL или имя файла оригинала; None, если изображения нет."""
+    value = getattr(instance, target.field)
+    if target.is_file_field:
+        return value.name if value else None
+    return value or None
+
+
+def is_current(manifest: Optional[Dict], source: Optional[str]) -> bool:
+    """Копии построены из этого оригинала."""
+    return bool(source and manifest and manifest.get('source') == source)
+
+
+def render_variants(image: Image.Image) -> List[Tuple[str, int, bytes]]:
+    """
+    Кодирует копии изображения: (формат, ширина, байты).
+    Ширины больше оригинала не строятся; полная ширина — всегда.
+    """
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    source_width, source_height = image.size
+    widths = sorted({width for width in variant_widths() if width < source_width} | {source_width})
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+
+    variants = []
+    for width in widths:
+        if width == source_width:
+            resized = image
+        else:
+            height = max(1, round(source_height * width / source_width))
+            resized = image.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        for fmt in variant_formats():
+            buffer = io.BytesIO()
+            options = {'quality': quality}
+            if fmt == 'webp':
+                options['method'] = 4
+            resized.save(buffer, format=PIL_FORMATS[fmt], **options)
+            variants.append((fmt, width, buffer.getvalue()))
+    return variants
+
+
+def _open_image(data: bytes) -> Optional[Image.Image]:
+    image = Image.open(io.BytesIO(data))
+    if getattr(image, 'is_animated', False):
+        # Анимированные GIF отдаются как есть
+        return None
+    image.load()
+    return image
+
+
+def _store_variants(
+    image: Image.Image,
+    source: str,
+    save: Callable[[str, int, bytes], Optional[str]],
+) -> Dict:
+    """Кодирует и сохраняет копии; save(fmt, width, body) возвращает URL копии."""
+    manifest = {'source': source, 'width': image.width, 'height': image.height}
+    for fmt, width, body in render_variants(image):
+        url = save(fmt, width, body)
+        if not url:
+            raise RuntimeError(f'Не удалось сохранить копию {fmt} {width}px для {source}')
+        manifest.setdefault(fmt, {})[str(width)] = url
+    return manifest
+
+
+def build_url_variants(image_url: str, image: Optional[Image.Image] = None) -> Optional[Dict]:
+    """
+    Копии картинки из R2/S3 (картинка задачи). Оригинал скачивается по ключу из URL,
+    если не передан уже открытый image.
+    """
+    key = extract_s3_key_from_url(image_url)
+    if not key:
+        return None
+    if image is None:
+        body = get_s3_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)['Body'].read()
+        image = _open_image(body)
+        if image is None:
+            return None
+
+    def save(fmt, width, body):
+        return upload_object_to_s3(body, variant_name(key, fmt, width), CONTENT_TYPES[fmt])
+    return _store_variants(image, image_url, save)
+
+
+def build_file_variants(field_file) -> Optional[Dict]:
+    """Копии файла из storage (аватарка, фото поста) рядом с оригиналом."""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as f:
+        image = _open_image(f.read())
+    if image is None:
+        return None
+
+    def save(fmt, width, body):
+        name = variant_name(field_file.name, fmt, width)
+        if storage.exists(name):
+            storage.delete(name)
+        return storage.url(storage.save(name, ContentFile(body)))
+    return _store_variants(image, field_file.name, save)
+
+
+def delete_variants(target_name: str, manifest: Optional[Dict]) -> int:
+    """
+    Удаляет из хранилища копии по манифесту (оригинал не трогает).
+
+    Returns:
+        Количество удалённых копий
+    """
+    target = TARGETS[target_name]
+    if not manifest or not manifest.get('source'):
+        return 0
+    if not target.is_file_field:
+        keys = [extract_s3_key_from_url(url) for fmt in PIL_FORMATS for url in (manifest.get(fmt) or {}).values()]
+        deleted, errors = delete_objects_from_s3(keys)
+        for key, error in list(errors.items())[:10]:
+            logger.warning(f"⚠️ Не удалось удалить копию {key}: {error}")
+        return len(deleted)
+
+    storage = target.get_model()._meta.get_field(target.field).storage
+    deleted = 0
+    for fmt in PIL_FORMATS:
+        for width in manifest.get(fmt) or {}:
+            name = variant_name(manifest['source'], fmt, int(width))
+            try:
+                storage.delete(name)
+                deleted += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось удалить копию {name}: {e}")
+    return deleted
+
+
+def generate_variants(target_name: str, pk: int, force: bool = False) -> Optional[Dict]:
+    """
+    Строит копии изображения объекта и записывает манифест.
+    Уже актуальные копии не перестраиваются (если не force).
+
+    Returns:
+        Манифест или None (нет изображения, анимация, объект удалён)
+    """
+    target = TARGETS[target_name]
+    model = target.get_model()
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    source = source_of(instance, target)
+    manifest = getattr(instance, target.variants_field) or {}
+    if not source:
+        return None
+    if is_current(manifest, source) and not force:
+        return manifest
+
+    if target.is_file_field:
+        if manifest.get('source') and manifest['source'] != source:
+            # Файл заменён: копии старого больше не отдаются. Удаляем до построения
+            # новых — при том же имени без расширения их имена совпадают
+            delete_variants(target_name, manifest)
+        manifest = build_file_variants(getattr(instance, target.field))
+    else:
+        old_source = manifest.get('source')
+        if old_source and old_source != source and not model.objects.filter(
+            **{f'{target.variants_field}__source': old_source}
+        ).exclude(pk=pk).exists():
+            # Картинку задачи заменили: копии прежней больше никому не нужны
+            delete_variants(target_name, manifest)
+        # Картинки задач адресуются по содержимому: у задач с тем же URL копии общие
+        shared = None if force else model.objects.filter(
+            **{target.field: source, f'{target.variants_field}__source': source}
+        ).exclude(pk=pk).values_list(target.variants_field, flat=True).first()
+        manifest = shared or build_url_variants(source)
+    manifest = manifest or {'source': source}
+
+    # Оригинал могли заменить, пока строились копии: тогда манифест не записываем
+    updated = model.objects.filter(pk=pk, **{target.field: source}).update(**{target.variants_field: manifest})
+    if updated:
+        counts = ', '.join(f'{fmt}: {len(manifest[fmt])}' for fmt in FORMAT_PRIORITY if fmt in manifest)
+        logger.info(f"🖼️ Копии изображения {target.model}#{pk}: {counts or 'не нужны'}")
+    return manifest
+
+
+def schedule_image_variants(target_name: str, pk: int):
+    """
+    Ставит построение копий в Celery после коммита текущей транзакции.
+    Если брокер недоступен, копии построит backfill_image_variants.
+    """
+    if not getattr(settings, 'IMAGE_VARIANTS_ENABLED', True):
+        return
+
+    def _kick():
+        try:
+            from config.tasks import generate_image_variants_async
+            generate_image_variants_async.apply_async((target_name, pk), retry=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось запустить построение копий {target_name}#{pk}: {e}")
+
+    transaction.on_commit(_kick)
+
+
+def schedule_if_stale(target_name: str, instance, update_fields=None):
+    """Для post_save: ставит построение копий, если оригинал новый или копий нет."""
+    target = TARGETS[target_name]
+    if update_fields is not None and target.field not in update_fields:
+        return
+    source = source_of(instance, target)
+    if source and not is_current(getattr(instance, target.variants_field), source):
+        schedule_image_variants(target_name, instance.pk)
+
+
+def image_srcset(
+    manifest: Optional[Dict],
+    source: Optional[str],
+    absolute: Optional[Callable[[str], str]] = None,
+) -> Optional[Dict[str, str]]:
+    """
+    srcset по форматам для ответа API: {"avif": "url 320w, url 640w", "webp": "..."}.
+    None, если копий нет или они построены из другого оригинала.
+
+    Args:
+        manifest: JSON-поле с копиями
+        source: Текущий URL или имя файла оригинала
+        absolute: Преобразование относительного URL в абсолютный
+    """
+    if not is_current(manifest, source):
+        return None
+    result = {}
+    for fmt in FORMAT_PRIORITY:
+        widths = manifest.get(fmt)
+        if not widths:
+            continue
+        result[fmt] = ', '.join(
+            f'{absolute(url) if absolute else url} {width}w'
+            for width, url in sorted(widths.items(), key=lambda item: int(item[0]))
+        )
+    return result or None
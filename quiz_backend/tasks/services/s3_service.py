@@ -8,15 +8,25 @@
   {env}/{tenant_slug}/tasks/{topic_slug}/videos/{file}
   {env}/{tenant_slug}/tasks/json/{file}
   {env}/images/{file}   ← fallback для legacy / без тенанта
+
+Клиент boto3 один на процесс (get_s3_client): создание клиента и TLS-рукопожатие
+стоили дороже загрузки небольшой картинки, а пул соединений клиента
+(S3_MAX_POOL_CONNECTIONS) переиспользуется между загрузками и потоками.
+Видео загружаются потоково с диска: файлы больше S3_MULTIPART_PART_SIZE_MB
+уходят multipart-загрузкой по S3_MULTIPART_CONCURRENCY частей одновременно.
 """
 import io
 import logging
 import os
 import re
-from typing import Optional
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
 from urllib.parse import urlparse
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from PIL import Image
 from django.conf import settings
@@ -65,13 +75,38 @@ def build_r2_key(
     return f"{env}/{file_type}/{file_name}"
 
 
+MB = 1024 * 1024
+# Минимальный размер части multipart-загрузки в S3/R2 (кроме последней)
+MIN_MULTIPART_PART_SIZE = 5 * MB
+# Предел ключей в одном запросе DeleteObjects (S3 и R2)
+DELETE_OBJECTS_BATCH_SIZE = 1000
+ADDRESSING_STYLES = ('auto', 'virtual', 'path')
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _client_config() -> Config:
+    """Настройки клиента: пул соединений, стандартные повторы, keep-alive."""
+    options = {
+        'max_pool_connections': int(getattr(settings, 'S3_MAX_POOL_CONNECTIONS', 20)),
+        'retries': {'max_attempts': 3, 'mode': 'standard'},
+        'tcp_keepalive': True,
+    }
+    addressing_style = getattr(settings, 'AWS_S3_ADDRESSING_STYLE', None)
+    if addressing_style in ADDRESSING_STYLES:
+        options['s3'] = {'addressing_style': addressing_style}
+    return Config(**options)
+
+
 def _make_r2_client():
-    """Создаёт и возвращает boto3-клиент для R2/S3."""
+    """Создаёт и возвращает новый boto3-клиент для R2/S3 (обычно нужен get_s3_client)."""
     use_r2 = getattr(settings, 'USE_R2_STORAGE', False)
     client_kwargs = {
         'service_name': 's3',
         'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
         'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
+        'config': _client_config(),
     }
     if use_r2 and getattr(settings, 'AWS_S3_ENDPOINT_URL', None):
         client_kwargs['endpoint_url'] = settings.AWS_S3_ENDPOINT_URL
@@ -80,6 +115,48 @@ def _make_r2_client():
     return boto3.client(**client_kwargs)
 
 
+def get_s3_client():
+    """
+    Общий boto3-клиент процесса для R2/S3.
+
+    Клиенты boto3 потокобезопасны; после fork (воркеры Celery, пулы процессов)
+    создаётся новый клиент, чтобы не делить сокеты с родителем. Ключ учитывает
+    настройки хранилища, поэтому override_settings в тестах получает свой клиент.
+    """
+    key = (
+        os.getpid(),
+        getattr(settings, 'USE_R2_STORAGE', False),
+        getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
+        getattr(settings, 'AWS_S3_REGION_NAME', None),
+        settings.AWS_ACCESS_KEY_ID,
+    )
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _make_r2_client()
+                _clients[key] = client
+    return client
+
+
+def reset_s3_clients():
+    """Сбрасывает общие клиенты (тесты, смена учётных данных)."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def _transfer_config() -> TransferConfig:
+    """Размер части и число одновременных частей для multipart-загрузки."""
+    part_size = max(MIN_MULTIPART_PART_SIZE, int(getattr(settings, 'S3_MULTIPART_PART_SIZE_MB', 8)) * MB)
+    return TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max(1, int(getattr(settings, 'S3_MULTIPART_CONCURRENCY', 4))),
+        use_threads=True,
+    )
+
+
 def _put_object_safe(client, bucket: str, key: str, body: bytes, content_type: str):
     """Загружает объект в R2/S3, при необходимости повторяет без ACL."""
     try:
@@ -95,6 +172,74 @@ def _put_object_safe(client, bucket: str, key: str, body: bytes, content_type: s
             raise
 
 
+def _upload_file_safe(client, bucket: str, key: str, source: Union[str, bytes], content_type: str):
+    """
+    Загружает файл (путь) или байты через менеджер передачи boto3: больше части —
+    multipart-загрузкой, файл читается с диска по частям. Небольшие байты
+    уходят одним put_object. При необходимости повторяет без ACL.
+    """
+    config = _transfer_config()
+    if isinstance(source, (bytes, bytearray)) and len(source) < config.multipart_threshold:
+        _put_object_safe(client, bucket, key, source, content_type)
+        return
+
+    def upload(extra_args: dict):
+        if isinstance(source, (bytes, bytearray)):
+            client.upload_fileobj(io.BytesIO(source), bucket, key, ExtraArgs=extra_args, Config=config)
+        else:
+            client.upload_file(source, bucket, key, ExtraArgs=extra_args, Config=config)
+
+    try:
+        upload({'ContentType': content_type, 'ACL': 'public-read'})
+    except (ClientError, S3UploadFailedError) as e:
+        # upload_file заворачивает ClientError в S3UploadFailedError с кодом в тексте
+        if 'AccessControlListNotSupported' not in str(e):
+            raise
+        logger.warning(f"Бакет {bucket} не поддерживает ACL — повтор без ACL.")
+        upload({'ContentType': content_type})
+
+
+def build_image_key(image_name: str, tenant_slug: str = None, topic_slug: str = None) -> str:
+    """Ключ объекта изображения: иерархия тенанта для R2, images/ для S3."""
+    if getattr(settings, 'USE_R2_STORAGE', False):
+        return build_r2_key(image_name, 'images', tenant_slug, topic_slug)
+    return f'images/{image_name}'
+
+
+def find_uploaded_image(
+    image_name: str,
+    tenant_slug: str = None,
+    topic_slug: str = None,
+) -> Optional[str]:
+    """
+    Проверяет (HEAD-запросом), что изображение уже лежит в хранилище.
+
+    Returns:
+        Публичный URL изображения или None, если объекта нет
+        или хранилище не настроено.
+    """
+    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY,
+                settings.AWS_STORAGE_BUCKET_NAME]):
+        return None
+
+    domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
+    if not domain:
+        return None
+
+    image_key = build_image_key(image_name, tenant_slug, topic_slug)
+    try:
+        get_s3_client().head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=image_key)
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+        if error_code not in ('404', 'NoSuchKey', 'NotFound'):
+            logger.warning(f"⚠️ Не удалось проверить изображение {image_key}: {error_code}")
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось проверить изображение {image_key}: {e}")
+        return None
+    return f"https://{domain}/{image_key}"
+
+
 def upload_json_to_r2(
     json_content: str,
     file_name: str,
@@ -127,8 +272,7 @@ def upload_json_to_r2(
         body = json_content.encode('utf-8')
         bucket = settings.AWS_STORAGE_BUCKET_NAME
 
-        client = _make_r2_client()
-        _put_object_safe(client, bucket, key, body, 'application/json; charset=utf-8')
+        _put_object_safe(get_s3_client(), bucket, key, body, 'application/json; charset=utf-8')
 
         domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or \
                  getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
@@ -145,6 +289,23 @@ def upload_json_to_r2(
         return None
 
 
+def upload_object_to_s3(body: bytes, object_key: str, content_type: str) -> Optional[str]:
+    """
+    Загружает объект под готовым ключом (например, копию рядом с оригиналом)
+    и возвращает публичный URL или None при ошибке.
+    """
+    domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
+    if not domain or not settings.AWS_STORAGE_BUCKET_NAME:
+        logger.error("❌ Хранилище R2/S3 или его публичный домен не настроены.")
+        return None
+    try:
+        _put_object_safe(get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, object_key, body, content_type)
+    except Exception as e:
+        logger.error(f"❌ Ошибка загрузки {object_key}: {e}")
+        return None
+    return f"https://{domain}/{object_key}"
+
+
 def extract_s3_key_from_url(url: str) -> Optional[str]:
     """
     Извлекает ключ S3/R2 из URL изображения.
@@ -184,6 +345,17 @@ def extract_s3_key_from_url(url: str) -> Optional[str]:
         return None
 
 
+def encode_png(image: Image.Image) -> bytes:
+    """
+    PNG для R2 с уровнем сжатия IMAGE_PNG_COMPRESS_LEVEL.
+    optimize=True перебирал фильтры и сжимал в несколько раз дольше
+    ради нескольких процентов размера.
+    """
+    image_bytes = io.BytesIO()
+    image.save(image_bytes, format='PNG', compress_level=int(getattr(settings, 'IMAGE_PNG_COMPRESS_LEVEL', 3)))
+    return image_bytes.getvalue()
+
+
 def upload_image_to_s3(
     image: Image.Image,
     image_name: str,
@@ -204,7 +376,19 @@ def upload_image_to_s3(
     if not isinstance(image, Image.Image):
         logger.error(f"Ожидался объект Image, получен тип {type(image)}")
         return None
-    
+    return upload_png_to_s3(encode_png(image), image_name, tenant_slug, topic_slug)
+
+
+def upload_png_to_s3(
+    png_bytes: bytes,
+    image_name: str,
+    tenant_slug: str = None,
+    topic_slug: str = None,
+) -> Optional[str]:
+    """
+    Загружает готовый PNG в S3 или R2 и возвращает публичный URL.
+    Используется пакетной генерацией, где PNG кодируется в процессах-воркерах.
+    """
     # Определяем используемое хранилище
     use_r2 = getattr(settings, 'USE_R2_STORAGE', False)
     storage_name = 'R2' if use_r2 else 'S3'
@@ -224,23 +408,10 @@ def upload_image_to_s3(
         return None
     
     try:
-        # Преобразуем изображение в байты с оптимизацией для R2 (экономия хранения)
-        image_bytes = io.BytesIO()
-        # Используем оптимизацию PNG для уменьшения размера файла
-        image.save(image_bytes, format='PNG', optimize=True)
-        image_bytes.seek(0)
-        
         # Формируем путь с иерархией тенанта (SaaS) или fallback
-        use_r2 = getattr(settings, 'USE_R2_STORAGE', False)
-        if use_r2:
-            image_key = build_r2_key(image_name, 'images', tenant_slug, topic_slug)
-        else:
-            image_key = f'images/{image_name}'
+        image_key = build_image_key(image_name, tenant_slug, topic_slug)
         
-        # Создаем клиент S3/R2
-        s3_client = _make_r2_client()
-        
-        _put_object_safe(s3_client, settings.AWS_STORAGE_BUCKET_NAME, image_key, image_bytes.read(), 'image/png')
+        _put_object_safe(get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, image_key, png_bytes, 'image/png')
         
         # Конструируем и возвращаем полный URL
         domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
@@ -301,24 +472,7 @@ def delete_image_from_s3(image_url: str) -> bool:
             logger.warning("Не удалось извлечь ключ из URL")
             return False
         
-        # Создаем клиент S3/R2
-        client_kwargs = {
-            'service_name': 's3',
-            'aws_access_key_id': settings.AWS_ACCESS_KEY_ID,
-            'aws_secret_access_key': settings.AWS_SECRET_ACCESS_KEY,
-        }
-        
-        # Для R2 добавляем endpoint URL
-        if use_r2 and hasattr(settings, 'AWS_S3_ENDPOINT_URL') and settings.AWS_S3_ENDPOINT_URL:
-            client_kwargs['endpoint_url'] = settings.AWS_S3_ENDPOINT_URL
-        # Для S3 добавляем region
-        elif not use_r2:
-            client_kwargs['region_name'] = getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
-        
-        s3_client = boto3.client(**client_kwargs)
-        
-        # Удаляем объект
-        s3_client.delete_object(
+        get_s3_client().delete_object(
             Bucket=settings.AWS_STORAGE_BUCKET_NAME,
             Key=s3_key
         )
@@ -331,6 +485,50 @@ def delete_image_from_s3(image_url: str) -> bool:
         return False
 
 
+def delete_objects_from_s3(keys: Iterable[str]) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Удаляет объекты пачками DeleteObjects по DELETE_OBJECTS_BATCH_SIZE ключей
+    вместо отдельного запроса на каждый объект.
+    Отсутствующий объект считается удалённым (как и в DeleteObject).
+
+    Args:
+        keys: Ключи объектов в бакете
+
+    Returns:
+        (удалённые ключи, {ключ: ошибка} для неудалённых)
+    """
+    keys = list(dict.fromkeys(key for key in keys if key))
+    deleted: Set[str] = set()
+    errors: Dict[str, str] = {}
+    if not keys:
+        return deleted, errors
+    if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY,
+                settings.AWS_STORAGE_BUCKET_NAME]):
+        logger.error("Настройки R2/S3 не сконфигурированы")
+        return deleted, {key: 'storage not configured' for key in keys}
+
+    client = get_s3_client()
+    for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+        batch = keys[start:start + DELETE_OBJECTS_BATCH_SIZE]
+        try:
+            response = client.delete_objects(
+                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка пакетного удаления {len(batch)} объектов: {e}")
+            errors.update({key: str(e) for key in batch})
+            continue
+        # В режиме Quiet ответ содержит только ошибки
+        batch_errors = {
+            error['Key']: f"{error.get('Code')}: {error.get('Message')}"
+            for error in response.get('Errors', [])
+        }
+        errors.update(batch_errors)
+        deleted.update(key for key in batch if key not in batch_errors)
+    return deleted, errors
+
+
 def upload_video_to_s3(
     video_path: str,
     video_name: str,
@@ -373,10 +571,6 @@ def upload_video_to_s3(
         return None
     
     try:
-        # Читаем видео файл
-        with open(video_path, 'rb') as f:
-            video_bytes = f.read()
-        
         # Формируем путь с иерархией тенанта (SaaS) или fallback
         if use_r2:
             video_key = build_r2_key(video_name, 'videos', tenant_slug, topic_slug)
@@ -391,10 +585,8 @@ def upload_video_to_s3(
         else:
             content_type = 'video/mp4'  # По умолчанию
         
-        # Создаем клиент S3/R2
-        s3_client = _make_r2_client()
-        
-        _put_object_safe(s3_client, settings.AWS_STORAGE_BUCKET_NAME, video_key, video_bytes, content_type)
+        # Файл читается с диска по частям, а не целиком в память
+        _upload_file_safe(get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, video_key, video_path, content_type)
         
         # Конструируем и возвращаем полный URL
         domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
@@ -478,10 +670,7 @@ def upload_video_to_r2(
         else:
             content_type = 'video/mp4'  # По умолчанию
         
-        # Создаем клиент S3/R2
-        s3_client = _make_r2_client()
-        
-        _put_object_safe(s3_client, settings.AWS_STORAGE_BUCKET_NAME, video_key, video_bytes, content_type)
+        _upload_file_safe(get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, video_key, video_bytes, content_type)
         
         # Конструируем и возвращаем полный URL
         domain = getattr(settings, 'AWS_PUBLIC_MEDIA_DOMAIN', None) or getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
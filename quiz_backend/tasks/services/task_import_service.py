@@ -14,8 +14,7 @@ from topics.models import Topic, Subtopic, TopicTranslation, SubtopicTranslation
 from topics.utils import normalize_subtopic_name
 from platforms.models import TelegramGroup
 from tasks.models import Task, TaskTranslation
-from .s3_service import upload_image_to_s3
-from .image_generation_service import generate_image_for_task
+from .image_render_cache import get_or_create_task_image
 from .telegram_service import publish_task_to_telegram
 
 logger = logging.getLogger(__name__)
@@ -522,39 +521,28 @@ def import_tasks_from_json(file_path: str, publish: bool = False, tenant=None, i
                                 detailed_logs.append(f"🎨 Генерация изображения для задачи {task.id} (язык кода: {topic_name})")
                                 
                                 try:
-                                    # Генерируем изображение
-                                    image = generate_image_for_task(
-                                        question, 
-                                        topic_name, 
+                                    # Генерируем изображение; переводы с тем же кодом
+                                    # получают уже загруженное (кэш отрисовок)
+                                    image_url, cached = get_or_create_task_image(
+                                        question,
+                                        topic_name,
                                         theme=image_theme,
-                                        custom_logo_path=image_logo_path
+                                        custom_logo_path=image_logo_path,
+                                        tenant_slug=tenant.slug if tenant else None,
+                                        topic_slug=topic.name,
                                     )
                                     
-                                    if image:
-                                        # Формируем имя файла в формате, как в боте
-                                        subtopic_name_for_file = task.subtopic.name if task.subtopic else 'general'
-                                        image_name = f"{task.topic.name}_{subtopic_name_for_file}_{language}_{task.id}.png"
-                                        image_name = image_name.replace(" ", "_").lower()
-                                        
-                                        image_url = upload_image_to_s3(
-                                            image,
-                                            image_name,
-                                            tenant_slug=tenant.slug if tenant else None,
-                                            topic_slug=topic.name,
-                                        )
-                                        
-                                        if image_url:
-                                            task.image_url = image_url
-                                            task.save(update_fields=['image_url'])
-                                            logger.info(f"✅ Изображение загружено: {image_url}")
-                                            detailed_logs.append(f"✅ Изображение загружено в S3 для задачи {task.id}")
-                                            detailed_logs.append(f"   URL: {image_url}")
+                                    if image_url:
+                                        task.image_url = image_url
+                                        task.save(update_fields=['image_url'])
+                                        logger.info(f"✅ Изображение загружено: {image_url}")
+                                        if cached:
+                                            detailed_logs.append(f"♻️ Изображение для задачи {task.id} взято из кэша отрисовок")
                                         else:
-                                            error_msg = f"⚠️ Не удалось загрузить изображение в S3 для задачи {task.id}. Проверьте логи Django для деталей."
-                                            logger.warning(error_msg)
-                                            detailed_logs.append(error_msg)
+                                            detailed_logs.append(f"✅ Изображение загружено в S3 для задачи {task.id}")
+                                        detailed_logs.append(f"   URL: {image_url}")
                                     else:
-                                        error_msg = f"⚠️ Не удалось сгенерировать изображение для задачи {task.id}. Проверьте логи Django для деталей."
+                                        error_msg = f"⚠️ Не удалось сгенерировать или загрузить изображение для задачи {task.id}. Проверьте логи Django для деталей."
                                         logger.warning(error_msg)
                                         detailed_logs.append(error_msg)
                                         
@@ -6,13 +6,13 @@ import json
 import logging
 import os
 import random
-import time
 from typing import Dict, List, Optional
 
-import requests
 from django.conf import settings
 from django.utils.text import slugify
 
+from config.telegram_client import TelegramAPIError, get_bot_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -175,6 +175,16 @@ def escape_markdown_v2(text: str) -> str:
     return text
 
 
+def _get_client():
+    """
+    Возвращает общий клиент Bot API или None, если токен не настроен.
+    """
+    if not settings.TELEGRAM_BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+        return None
+    return get_bot_client(settings.TELEGRAM_BOT_TOKEN)
+
+
 def send_photo(chat_id: str, photo_url: str, caption: str = None) -> Optional[Dict]:
     """
     Отправляет фото в Telegram канал.
@@ -187,63 +197,17 @@ def send_photo(chat_id: str, photo_url: str, caption: str = None) -> Optional[Di
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendPhoto"
-    
-    data = {
-        'chat_id': chat_id,
-        'photo': photo_url,
-    }
-    
-    if caption:
-        data['caption'] = caption
-    
-    max_retries = 5
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.post(url, data=data, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Фото успешно отправлено в {chat_id}")
-                return result['result']
-            else:
-                logger.error(f"❌ Ошибка отправки фото: {result.get('description')}")
-                if attempt < max_retries:
-                    time.sleep(1 + attempt * 0.3)
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения при отправке фото (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            logger.error(f"❌ Ошибка подключения при отправке фото: {e}")
-            logger.error(f"   Это сетевая ошибка - возможно, Telegram API недоступен или проблемы с интернетом")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Таймаут при отправке фото (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(3)
-                continue
-            return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ HTTP ошибка при отправке фото: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    logger.error(f"   Response: {error_data}")
-                except:
-                    logger.error(f"   Response text: {e.response.text[:500]}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке фото: {e}")
-            return None
+    try:
+        result = client.send_photo(chat_id, photo=photo_url, caption=caption, timeout=60)
+        logger.info(f"✅ Фото успешно отправлено в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки фото в {chat_id}: {e.description}")
+        return None
 
 
 def send_video(chat_id: str, video_url: str, caption: str = None) -> Optional[Dict]:
@@ -258,65 +222,17 @@ def send_video(chat_id: str, video_url: str, caption: str = None) -> Optional[Di
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendVideo"
-    
-    data = {
-        'chat_id': chat_id,
-        'video': video_url,
-    }
-    
-    if caption:
-        data['caption'] = caption
-    
-    max_retries = 5
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.post(url, data=data, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Видео успешно отправлено в {chat_id}")
-                return result['result']
-            else:
-                logger.error(f"❌ Ошибка отправки видео: {result.get('description')}")
-                if attempt < max_retries:
-                    time.sleep(1 + attempt * 0.3)
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения при отправке видео (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            logger.error(f"❌ Ошибка подключения при отправке видео: {e}")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Таймаут при отправке видео (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(3)
-                continue
-            return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ HTTP ошибка при отправке видео: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    logger.error(f"   Response: {error_data}")
-                except:
-                    logger.error(f"   Response text: {e.response.text[:500]}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке видео (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.3)
-                continue
-            return None
+    try:
+        result = client.send_video(chat_id, video=video_url, caption=caption, timeout=60)
+        logger.info(f"✅ Видео успешно отправлено в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки видео в {chat_id}: {e.description}")
+        return None
 
 
 def send_video_file(chat_id: str, video_path: str, caption: str = None) -> Optional[Dict]:
@@ -331,72 +247,22 @@ def send_video_file(chat_id: str, video_path: str, caption: str = None) -> Optio
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
     if not os.path.exists(video_path):
         logger.error(f"❌ Файл видео не найден: {video_path}")
         return None
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendVideo"
-    
-    data = {
-        'chat_id': chat_id,
-    }
-    
-    if caption:
-        data['caption'] = caption
-    
-    max_retries = 5
-    for attempt in range(1, max_retries + 1):
-        try:
-            with open(video_path, 'rb') as video_file:
-                files = {'video': video_file}
-                response = requests.post(url, data=data, files=files, timeout=120)  # Увеличен таймаут для загрузки файла
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Видео файл успешно отправлен в {chat_id}")
-                return result['result']
-            else:
-                logger.error(f"❌ Ошибка отправки видео файла: {result.get('description')}")
-                logger.error(f"   Детали ответа: {result}")
-                if attempt < max_retries:
-                    time.sleep(1 + attempt * 0.3)
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения при отправке видео файла (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            logger.error(f"❌ Ошибка подключения при отправке видео файла: {e}")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Таймаут при отправке видео файла (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(3)
-                continue
-            return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ HTTP ошибка при отправке видео файла: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    logger.error(f"   Response: {error_data}")
-                except:
-                    logger.error(f"   Response text: {e.response.text[:500]}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке видео файла (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.3)
-                continue
-            return None
+    try:
+        # Увеличенный таймаут для загрузки файла
+        result = client.send_video(chat_id, video_path=video_path, caption=caption, timeout=120)
+        logger.info(f"✅ Видео файл успешно отправлен в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки видео файла в {chat_id}: {e.description}")
+        return None
 
 
 def send_message(chat_id: str, text: str, parse_mode: str = "MarkdownV2") -> Optional[Dict]:
@@ -411,62 +277,17 @@ def send_message(chat_id: str, text: str, parse_mode: str = "MarkdownV2") -> Opt
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    
-    data = {
-        'chat_id': chat_id,
-        'text': text,
-    }
-    
-    if parse_mode:
-        data['parse_mode'] = parse_mode
-    
-    max_retries = 5
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.post(url, data=data, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Сообщение успешно отправлено в {chat_id}")
-                return result['result']
-            else:
-                logger.error(f"❌ Ошибка отправки сообщения: {result.get('description')}")
-                if attempt < max_retries:
-                    time.sleep(1 + attempt * 0.3)
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения при отправке сообщения (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            logger.error(f"   Это сетевая ошибка - возможно, Telegram API недоступен или проблемы с интернетом")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Таймаут при отправке сообщения (попытка {attempt}/{max_retries}): {e}")
-            if attempt < max_retries:
-                time.sleep(3)
-                continue
-            return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ HTTP ошибка при отправке сообщения: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    logger.error(f"   Response: {error_data}")
-                except:
-                    logger.error(f"   Response text: {e.response.text[:500]}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке сообщения: {e}")
-            return None
+    try:
+        result = client.send_message(chat_id, text, parse_mode=parse_mode)
+        logger.info(f"✅ Сообщение успешно отправлено в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки сообщения в {chat_id}: {e.description}")
+        return None
 
 
 def send_poll(chat_id: str, question: str, options: List[str], 
@@ -486,8 +307,8 @@ def send_poll(chat_id: str, question: str, options: List[str],
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
     # Telegram API ограничения
@@ -504,78 +325,28 @@ def send_poll(chat_id: str, question: str, options: List[str],
         logger.warning(f"Объяснение слишком длинное ({len(explanation)} символов), обрезаем до {MAX_EXPLANATION_LENGTH}")
         explanation = explanation[:MAX_EXPLANATION_LENGTH - 3] + '...'
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendPoll"
-    
-    # Telegram API требует JSON payload, а не form data для опросов
     payload = {
         'chat_id': chat_id,
         'question': question,
-        'options': options,  # Передаем как list, не как JSON string
+        'options': options,
         'type': 'quiz',
         'correct_option_id': correct_option_id,
         'is_anonymous': is_anonymous,
+        'explanation': explanation,
     }
     
-    if explanation:
-        payload['explanation'] = explanation
-    
-    max_retries = 5
-    for attempt in range(1, max_retries + 1):
-        try:
-            # Отправляем как JSON
-            response = requests.post(url, json=payload, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Опрос успешно отправлен в {chat_id}")
-                return result['result']
-            else:
-                error_desc = result.get('description', 'Unknown error')
-                logger.error(f"❌ Ошибка отправки опроса: {error_desc}")
-                logger.error(f"   Детали: question length={len(question)}, question={question[:100]}..., options={options}, correct={correct_option_id}")
-                # Если ошибка связана с длиной вопроса, логируем это явно
-                if 'question' in error_desc.lower() or 'length' in error_desc.lower() or '300' in error_desc:
-                    logger.error(f"   ⚠️ Проблема с длиной вопроса: {len(question)} символов (макс: 300)")
-                if attempt < max_retries:
-                    time.sleep(1 + attempt * 0.3)
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения при отправке опроса (попытка {attempt}/{max_retries}): {e}")
-            logger.error(f"   Question length: {len(question)}, Question preview: {question[:100]}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            logger.error(f"❌ Ошибка подключения при отправке опроса: {e}")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Таймаут при отправке опроса (попытка {attempt}/{max_retries}): {e}")
-            logger.error(f"   Question length: {len(question)}, Question preview: {question[:100]}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.5)
-                continue
-            return None
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"❌ HTTP ошибка при отправке опроса: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    logger.error(f"   Response: {error_data}")
-                except:
-                    logger.error(f"   Response text: {e.response.text[:500]}")
-            else:
-                logger.error(f"   Response: N/A")
-            logger.error(f"   Question length: {len(question)}, Question preview: {question[:100]}")
-            if attempt < max_retries:
-                time.sleep(1 + attempt * 0.3)
-                continue
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке опроса: {e}")
-            logger.error(f"   Question length: {len(question)}, Question preview: {question[:100]}")
-            return None
+    try:
+        result = client.call('sendPoll', payload, timeout=60)
+        logger.info(f"✅ Опрос успешно отправлен в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки опроса: {e.description}")
+        logger.error(f"   Детали: question length={len(question)}, question={question[:100]}..., options={options}, correct={correct_option_id}")
+        error_desc = (e.description or '').lower()
+        # Если ошибка связана с длиной вопроса, логируем это явно
+        if 'question' in error_desc or 'length' in error_desc or '300' in error_desc:
+            logger.error(f"   ⚠️ Проблема с длиной вопроса: {len(question)} символов (макс: 300)")
+        return None
 
 
 def delete_message(chat_id: str, message_id: int) -> bool:
@@ -589,41 +360,23 @@ def delete_message(chat_id: str, message_id: int) -> bool:
     Returns:
         True если удаление успешно, False при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return False
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/deleteMessage"
-    
-    data = {
-        'chat_id': chat_id,
-        'message_id': message_id,
-    }
-    
     try:
-        response = requests.post(url, data=data, timeout=10)
-        response.raise_for_status()
-        result = response.json()
-        
-        if result.get('ok'):
-            logger.info(f"✅ Сообщение {message_id} успешно удалено из канала {chat_id}")
-            return True
+        client.delete_message(chat_id, message_id)
+        logger.info(f"✅ Сообщение {message_id} успешно удалено из канала {chat_id}")
+        return True
+    except TelegramAPIError as e:
+        error_description = (e.description or 'Unknown error').lower()
+        # Не логируем как ошибку, если сообщение уже удалено или нет прав
+        if 'message to delete not found' in error_description or \
+           'not enough rights' in error_description or \
+           'message can\'t be deleted' in error_description:
+            logger.warning(f"⚠️ Не удалось удалить сообщение {message_id} из {chat_id}: {e.description}")
         else:
-            error_description = result.get('description', 'Unknown error')
-            # Не логируем как ошибку, если сообщение уже удалено или нет прав
-            if 'message to delete not found' in error_description.lower() or \
-               'not enough rights' in error_description.lower() or \
-               'message can\'t be deleted' in error_description.lower():
-                logger.warning(f"⚠️ Не удалось удалить сообщение {message_id} из {chat_id}: {error_description}")
-            else:
-                logger.error(f"❌ Ошибка удаления сообщения {message_id} из {chat_id}: {error_description}")
-            return False
-            
-    except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Исключение при удалении сообщения {message_id} из {chat_id}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"❌ Неожиданная ошибка при удалении сообщения {message_id} из {chat_id}: {e}")
+            logger.error(f"❌ Ошибка удаления сообщения {message_id} из {chat_id}: {e.description}")
         return False
 
 
@@ -642,12 +395,10 @@ def send_message_with_button(chat_id: str, text: str, button_text: str,
     Returns:
         Результат отправки или None при ошибке
     """
-    if not settings.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+    client = _get_client()
+    if client is None:
         return None
     
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    
     # Формируем inline keyboard
     inline_keyboard = {
         'inline_keyboard': [[
@@ -655,56 +406,13 @@ def send_message_with_button(chat_id: str, text: str, button_text: str,
         ]]
     }
     
-    data = {
-        'chat_id': chat_id,
-        'text': text,
-        'reply_markup': json.dumps(inline_keyboard),
-    }
-    
-    if parse_mode:
-        data['parse_mode'] = parse_mode
-    
-    # Retry механизм: 3 попытки с увеличенным timeout
-    max_retries = 3
-    for attempt in range(1, max_retries + 1):
-        try:
-            logger.debug(f"🔄 Попытка {attempt}/{max_retries} отправки кнопки...")
-            response = requests.post(url, data=data, timeout=60)  # Увеличен timeout до 60 сек
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('ok'):
-                logger.info(f"✅ Сообщение с кнопкой успешно отправлено в {chat_id}")
-                return result['result']
-            else:
-                logger.error(f"❌ Ошибка отправки сообщения с кнопкой: {result.get('description')}")
-                if attempt < max_retries:
-                    time.sleep(2)  # Задержка перед повтором
-                    continue
-                return None
-                
-        except requests.exceptions.ConnectionError as e:
-            logger.warning(f"🔌 Ошибка подключения на попытке {attempt}/{max_retries}: {e}")
-            if attempt < max_retries:
-                time.sleep(3)  # Задержка перед повтором
-                continue
-            logger.error(f"❌ Исключение при отправке сообщения с кнопкой (попытка {attempt}): {e}")
-            return None
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"⏱️ Timeout на попытке {attempt}/{max_retries}: {e}")
-            if attempt < max_retries:
-                time.sleep(3)  # Увеличенная задержка после timeout
-                continue
-            logger.error(f"❌ Все попытки отправки кнопки исчерпаны (timeout)")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Исключение при отправке сообщения с кнопкой (попытка {attempt}): {e}")
-            if attempt < max_retries:
-                time.sleep(2)
-                continue
-            return None
-    
-    return None
+    try:
+        result = client.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=inline_keyboard)
+        logger.info(f"✅ Сообщение с кнопкой успешно отправлено в {chat_id}")
+        return result
+    except TelegramAPIError as e:
+        logger.error(f"❌ Ошибка отправки сообщения с кнопкой в {chat_id}: {e.description}")
+        return None
 
 
 def publish_task_to_telegram(task, translation, telegram_group) -> Dict:
@@ -742,7 +450,6 @@ def publish_task_to_telegram(task, translation, telegram_group) -> Dict:
         if task.image_url:
             result['detailed_logs'].append(f"📷 Отправка изображения: {task.image_url[:50]}...")
             photo_result = send_photo(chat_id, task.image_url, caption=None)  # Без caption - вопрос будет в опросе
-            time.sleep(1)
             if photo_result:
                 result['image_sent'] = True
                 result['detailed_logs'].append(f"✅ Изображение отправлено (message_id: {photo_result.get('message_id')})")
@@ -781,7 +488,6 @@ def publish_task_to_telegram(task, translation, telegram_group) -> Dict:
         
         result['detailed_logs'].append(f"📝 Отправка деталей задачи")
         text_result = send_message(chat_id, task_details_text, "MarkdownV2")
-        time.sleep(0.2)
         if text_result:
             result['text_sent'] = True
             result['detailed_logs'].append(f"✅ Детали задачи отправлены")
@@ -836,7 +542,6 @@ def publish_task_to_telegram(task, translation, telegram_group) -> Dict:
             correct_option_id=correct_option_id,
             explanation=poll_explanation
         )
-        time.sleep(0.2)
         
         if poll_result:
             result['poll_sent'] = True
@@ -946,7 +651,6 @@ def publish_task_to_telegram(task, translation, telegram_group) -> Dict:
             button_url=final_link,
             parse_mode=None  # Без форматирования
         )
-        time.sleep(0.2)
         
         if button_result:
             result['button_sent'] = True
@@ -0,0 +1,200 @@
+"""
+Аудиодорожка видео с набором кода.
+
+Раньше каждое видео (и каждый язык) заново открывало звук клавиатуры и фоновую
+музыку через MoviePy, собирало из них CompositeAudioClip и сводило его при
+записи. Теперь:
+
+- звуковые файлы декодируются ffmpeg в numpy один раз на воркер
+  (кэш по пути, размеру и времени изменения файла);
+- дорожка клавиатуры строится по таймлайну видео: звук идёт в сегментах
+  печати и стихает в статичных (остановки при медленной печати, пауза в конце);
+- готовая дорожка сводится в numpy и пишется одним WAV в VIDEO_AUDIO_CACHE_DIR
+  под ключом (форма таймлайна, версия звуков) — языковые версии задачи и
+  видео с тем же таймлайном берут готовый файл.
+"""
+import hashlib
+import logging
+import math
+import os
+import wave
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .ffmpeg_service import decode_audio
+from .video_code_clip_cache import cleanup_expired_files
+from .video_timeline import HoldSegment, Segment
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+# Меняется при изменении сведения: старые дорожки перестают совпадать по ключу
+AUDIO_BED_VERSION = 1
+# Плавное нарастание/затухание звука клавиатуры на границах сегментов печати (с)
+KEYSTROKE_FADE_SECONDS = 0.02
+AUDIO_CACHE_SUFFIXES = ('.wav', '.mp3', '.m4a', '.aac', '.ogg', '.flac', '.tmp')
+
+
+def _cache_dir() -> str:
+    return getattr(settings, 'VIDEO_AUDIO_CACHE_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'video_audio_cache')
+
+
+@lru_cache(maxsize=8)
+def _decoded_asset(path: str, size: int, mtime_ns: int, max_seconds: float) -> np.ndarray:
+    """Сэмплы файла (float32, [кадров, CHANNELS]); размер и mtime — часть ключа кэша."""
+    samples = np.frombuffer(decode_audio(path, SAMPLE_RATE, CHANNELS, max_seconds), dtype=np.float32)
+    samples = samples.reshape(-1, CHANNELS)
+    logger.info(f"🎵 Декодирован звук {os.path.basename(path)}: {len(samples) / SAMPLE_RATE:.1f} с")
+    return samples
+
+
+def load_audio_asset(path: str, max_seconds: float) -> Tuple[np.ndarray, str]:
+    """
+    Декодированный звук (не больше max_seconds) и его версия для ключа дорожки.
+    Массив общий для всех вызовов воркера — его нельзя изменять.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    samples = _decoded_asset(path, stat.st_size, stat.st_mtime_ns, max_seconds)
+    return samples, f'{path}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def _local_background_path(background) -> str:
+    """
+    Локальный путь к фоновой музыке: путь как есть, а файл BackgroundMusic
+    скачивается из storage один раз и лежит в кэше рядом с дорожками.
+    """
+    if not hasattr(background, 'audio_file'):
+        return str(background)
+
+    file_name = background.audio_file.name
+    digest = hashlib.sha256(f'{background.pk}:{file_name}:{background.updated_at}'.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(_cache_dir(), f'bgm_{background.pk}_{digest}{os.path.splitext(file_name)[1]}')
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with default_storage.open(file_name, 'rb') as source, open(tmp_path, 'wb') as target:
+        for chunk in iter(lambda: source.read(1024 * 1024), b''):
+            target.write(chunk)
+    os.replace(tmp_path, path)
+    logger.info(f"🎵 Фоновая музыка id={background.pk} скачана из storage: {file_name}")
+    return path
+
+
+def timeline_signature(segments: List[Segment]) -> str:
+    """Форма таймлайна, от которой зависит дорожка: виды сегментов и их длины в кадрах."""
+    return ','.join(f"{'H' if isinstance(segment, HoldSegment) else 'T'}{segment.frames}" for segment in segments)
+
+
+def keystroke_gain(segments: List[Segment], fps: int, total_samples: int) -> np.ndarray:
+    """
+    Громкость клавиатуры по сэмплам: 1 в сегментах печати, 0 в статичных,
+    с короткими линейными переходами на границах.
+    """
+    frame_gain = np.concatenate([
+        np.full(segment.frames, 0.0 if isinstance(segment, HoldSegment) else 1.0, dtype=np.float32)
+        for segment in segments
+    ]) if segments else np.zeros(1, dtype=np.float32)
+    frame_index = np.minimum(np.arange(total_samples) * fps // SAMPLE_RATE, len(frame_gain) - 1)
+    gain = frame_gain[frame_index]
+
+    fade = int(KEYSTROKE_FADE_SECONDS * SAMPLE_RATE)
+    if fade > 1 and total_samples > fade:
+        gain = np.convolve(gain, np.full(fade, 1.0 / fade, dtype=np.float32), mode='same').astype(np.float32)
+    return gain
+
+
+def _fit(samples: np.ndarray, total_samples: int, loop: bool) -> np.ndarray:
+    """Обрезает до total_samples; короткий звук зацикливается (loop) или дополняется тишиной."""
+    if len(samples) >= total_samples:
+        return samples[:total_samples]
+    if loop and len(samples):
+        repeats = math.ceil(total_samples / len(samples))
+        return np.tile(samples, (repeats, 1))[:total_samples]
+    return np.concatenate([samples, np.zeros((total_samples - len(samples), CHANNELS), dtype=np.float32)])
+
+
+def _write_wav(path: str, samples: np.ndarray):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(CHANNELS)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(pcm.tobytes())
+
+
+def build_audio_bed(
+    segments: List[Segment],
+    fps: int,
+    keyboard_path: Optional[str] = None,
+    background=None,
+) -> Optional[str]:
+    """
+    WAV с аудиодорожкой видео (фон + клавиатура по таймлайну) из кэша или сведённый сейчас.
+
+    Args:
+        segments: Таймлайн видео (video_timeline.build_typing_timeline)
+        fps: Частота кадров видео
+        keyboard_path: Звук клавиатуры (локальный путь)
+        background: Фоновая музыка: экземпляр BackgroundMusic или локальный путь
+
+    Returns:
+        Путь к WAV в кэше (файл не удалять) или None, если звуков нет
+    """
+    total_frames = sum(segment.frames for segment in segments)
+    total_samples = int(round(total_frames / fps * SAMPLE_RATE))
+    if total_samples <= 0 or not (keyboard_path or background):
+        return None
+    max_seconds = math.ceil(total_frames / fps)
+    background_volume = getattr(settings, 'BACKGROUND_AUDIO_VOLUME', 0.3)
+
+    tracks = []
+    if background:
+        try:
+            samples, stamp = load_audio_asset(_local_background_path(background), max_seconds)
+            tracks.append(('background', samples, stamp))
+        except Exception as e:
+            logger.error(f"Не удалось загрузить фоновую музыку {background}: {e}")
+    if keyboard_path:
+        try:
+            samples, stamp = load_audio_asset(keyboard_path, max_seconds)
+            tracks.append(('keyboard', samples, stamp))
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить аудио клавиатуры: {e}")
+    if not tracks:
+        return None
+
+    key_payload = '\0'.join([
+        str(AUDIO_BED_VERSION), str(SAMPLE_RATE), str(fps), str(background_volume), timeline_signature(segments),
+    ] + [f'{kind}={stamp}' for kind, _, stamp in tracks])
+    cache_dir = _cache_dir()
+    path = os.path.join(cache_dir, f'{hashlib.sha256(key_payload.encode("utf-8")).hexdigest()}.wav')
+    if os.path.exists(path):
+        os.utime(path)
+        logger.info(f"♻️ Аудиодорожка взята из кэша: {os.path.basename(path)}")
+        return path
+
+    mix = np.zeros((total_samples, CHANNELS), dtype=np.float32)
+    for kind, samples, _ in tracks:
+        if kind == 'background':
+            mix += _fit(samples, total_samples, loop=True) * background_volume
+        else:
+            if len(samples) < total_samples:
+                logger.info(f"Аудио клавиатуры короче видео: {len(samples) / SAMPLE_RATE:.1f} с, дальше тишина")
+            mix += _fit(samples, total_samples, loop=False) * keystroke_gain(segments, fps, total_samples)[:, None]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cleanup_expired_files(cache_dir, getattr(settings, 'VIDEO_AUDIO_CACHE_TTL', 24 * 3600), AUDIO_CACHE_SUFFIXES)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    _write_wav(tmp_path, mix)
+    os.replace(tmp_path, path)
+    logger.info(f"🎵 Аудиодорожка сведена: {', '.join(kind for kind, _, _ in tracks)}, {total_samples / SAMPLE_RATE:.1f} с")
+    return path
@@ -0,0 +1,192 @@
+"""
+Параллельное кодирование видео по кускам.
+
+Длинный код кодируется минутами на одном ядре. В этом режиме таймлайн
+делится на непрерывные куски по кадрам. Каждый кусок рисует свой рендерер
+(CodeTypingRenderer сразу дорисовывает код до первого кадра куска) и кодирует
+свой процесс ffmpeg. Части склеиваются по порядку без перекодирования
+(concat demuxer, -c copy), поэтому результат не теряет в качестве.
+
+Куски ведут потоки, а не процессы: основная работа — кодирование libx264 —
+и так идёт в отдельных процессах ffmpeg, а пул процессов нельзя создать
+внутри демонического воркера Celery (prefork).
+
+Сколько кусков кодируется одновременно, ограничивают VIDEO_CHUNK_WORKERS и
+бюджет памяти на задачу VIDEO_CHUNK_MEMORY_BUDGET_MB: каждый кусок держит
+кадры рендерера и буфер кадров x264, который зависит от пресета.
+"""
+import logging
+import math
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+from PIL import Image
+
+from .code_typing_renderer import CodeTypingRenderer
+from .ffmpeg_service import concat_videos, overlay_video
+from .video_timeline import HoldSegment, Segment, TypingSegment, encode_segments, encode_timeline
+
+logger = logging.getLogger(__name__)
+
+# Статичный сегмент кодируется из одного кадра: по цене он как несколько кадров печати
+HOLD_SEGMENT_COST = 4
+# Примерно сколько кадров держит x264 в памяти (lookahead, B-кадры, опорные) по пресету
+X264_BUFFERED_FRAMES = {
+    'ultrafast': 4,
+    'superfast': 8,
+    'veryfast': 16,
+    'faster': 24,
+    'fast': 32,
+    'medium': 44,
+    'slow': 64,
+}
+# Кадр рендерера, его байты для ffmpeg и холст кода
+RENDER_FRAME_COPIES = 3
+
+
+def estimate_chunk_memory(width: int, height: int, preset: str) -> int:
+    """Оценка памяти одного куска в байтах: кадры rgb24 в Python и кадры yuv420p в x264."""
+    buffered = X264_BUFFERED_FRAMES.get(preset, 80)
+    return width * height * 3 * RENDER_FRAME_COPIES + width * height * 3 // 2 * buffered
+
+
+def chunk_parallelism(total_frames: int, width: int, height: int, preset: str) -> int:
+    """
+    Сколько кусков кодировать одновременно для видео задачи (1 — без деления).
+    """
+    workers = getattr(settings, 'VIDEO_CHUNK_WORKERS', 1)
+    min_frames = getattr(settings, 'VIDEO_CHUNK_MIN_FRAMES', 96)
+    budget = getattr(settings, 'VIDEO_CHUNK_MEMORY_BUDGET_MB', 768) * 1024 * 1024
+    by_memory = max(1, budget // estimate_chunk_memory(width, height, preset))
+    by_length = max(1, total_frames // max(1, min_frames))
+    return max(1, min(workers, by_memory, by_length))
+
+
+def split_timeline(segments: List[Segment], chunks: int) -> List[List[Segment]]:
+    """
+    Делит таймлайн на до chunks непрерывных кусков примерно равной стоимости.
+    Сегменты печати режутся по кадрам, статичные сегменты не режутся.
+    """
+    costs = sum(HOLD_SEGMENT_COST if isinstance(segment, HoldSegment) else segment.frames for segment in segments)
+    target = costs / max(1, chunks)
+    result: List[List[Segment]] = [[]]
+    spent = 0.0
+
+    def next_chunk_if_full():
+        nonlocal spent
+        if spent >= target and result[-1] and len(result) < chunks:
+            result.append([])
+            spent = 0.0
+
+    for segment in segments:
+        if isinstance(segment, HoldSegment):
+            next_chunk_if_full()
+            result[-1].append(segment)
+            spent += HOLD_SEGMENT_COST
+            continue
+        chars = segment.visible_chars
+        while chars:
+            next_chunk_if_full()
+            take = max(1, min(len(chars), math.ceil(target - spent)))
+            result[-1].append(TypingSegment(chars[:take]))
+            spent += take
+            chars = chars[take:]
+    return [chunk for chunk in result if chunk]
+
+
+def frame_ranges(total_frames: int, chunks: int) -> List[Tuple[int, int]]:
+    """Делит [0, total_frames) на до chunks непрерывных диапазонов."""
+    chunks = max(1, min(chunks, total_frames))
+    bounds = [round(total_frames * index / chunks) for index in range(chunks + 1)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _run_ordered(jobs: List[Callable[[], List[str]]], workers: int) -> List[str]:
+    """Выполняет куски в пуле потоков; пути частей — в порядке кусков."""
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='video-chunk') as executor:
+        futures = [executor.submit(job) for job in jobs]
+        parts = []
+        for future in futures:
+            parts.extend(future.result())
+    return parts
+
+
+def encode_timeline_chunked(
+    renderer: CodeTypingRenderer,
+    make_renderer: Callable[[], CodeTypingRenderer],
+    segments: List[Segment],
+    output_path: str,
+    fps: int,
+    audio_path: Optional[str] = None,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+    lossless: bool = False,
+) -> str:
+    """
+    encode_timeline с параллельным кодированием кусков.
+    Первый кусок рисует renderer, остальные — новые рендереры из make_renderer.
+    """
+    total_frames = sum(segment.frames for segment in segments)
+    workers = chunk_parallelism(total_frames, renderer.width, renderer.height, preset)
+    chunks = split_timeline(segments, workers) if workers > 1 else [segments]
+    if len(chunks) == 1:
+        return encode_timeline(renderer, segments, output_path, fps, audio_path, preset, threads, lossless)
+
+    logger.info(f"🧩 Кодирование {total_frames} кадров кусками: {len(chunks)}, одновременно {workers}")
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        def job(index: int, chunk: List[Segment]):
+            chunk_renderer = renderer if index == 0 else make_renderer()
+            return lambda: encode_segments(chunk_renderer, chunk, work_dir, fps, preset, threads,
+                                           lossless, prefix=f'chunk{index:02d}')
+
+        parts = _run_ordered([job(index, chunk) for index, chunk in enumerate(chunks)], workers)
+        concat_videos(parts, output_path, audio_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def overlay_video_chunked(
+    input_path: str,
+    output_path: str,
+    total_frames: int,
+    width: int,
+    height: int,
+    fps: int,
+    overlay: Optional[Image.Image] = None,
+    position: Tuple[int, int] = (0, 0),
+    audio_path: Optional[str] = None,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+) -> str:
+    """
+    overlay_video с параллельным кодированием диапазонов кадров:
+    каждый кусок перематывает клип к своему началу; аудио подмешивается при склейке.
+    """
+    workers = chunk_parallelism(total_frames, width, height, preset)
+    ranges = frame_ranges(total_frames, workers) if workers > 1 else []
+    if len(ranges) <= 1:
+        overlay_video(input_path, output_path, overlay, position, audio_path, preset, threads)
+        return output_path
+
+    logger.info(f"🧩 Наложение слоя на {total_frames} кадров кусками: {len(ranges)}")
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        def job(index: int, frame_range: Tuple[int, int]):
+            part_path = os.path.join(work_dir, f'chunk{index:02d}.mp4')
+
+            def run():
+                overlay_video(input_path, part_path, overlay, position, None, preset, threads, frame_range, fps)
+                return [part_path]
+            return run
+
+        parts = _run_ordered([job(index, frame_range) for index, frame_range in enumerate(ranges)], workers)
+        concat_videos(parts, output_path, audio_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
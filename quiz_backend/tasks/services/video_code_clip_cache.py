@@ -0,0 +1,135 @@
+"""
+Кэш клипа с набором кода, общий для языковых версий видео задачи.
+
+Переводы задачи отличаются только текстом вопроса под консолью, а код,
+консоль, логотип и тайминг печати у них одинаковые. Поэтому видео собирается
+в два шага:
+  1. клип без вопроса рисуется и кодируется один раз (без потерь) и кладётся
+     в VIDEO_CODE_CLIP_CACHE_DIR под ключом по содержимому (CodeClipSpec.cache_key);
+  2. для каждого языка на клип накладывается слой с вопросом и подмешивается
+     аудио (ffmpeg_service.overlay_video).
+
+Генерации разных языков одной задачи идут параллельными задачами Celery:
+первая рисует клип под файловой блокировкой, остальные ждут и берут готовый.
+Старые клипы удаляются по VIDEO_CODE_CLIP_CACHE_TTL.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from django.conf import settings
+
+from .code_typing_renderer import CodeTypingRenderer
+from .video_chunking import encode_timeline_chunked
+from .video_timeline import build_typing_timeline
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении отрисовки кадров: старые клипы перестают совпадать по ключу
+CODE_CLIP_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CodeClipSpec:
+    """
+    Всё, от чего зависят кадры клипа без вопроса.
+    """
+    formatted_code: str
+    language: str
+    logo_path: Optional[str]
+    width: int
+    height: int
+    fps: int
+    typing_frames: int
+    pause_frames: int
+
+    @property
+    def cache_key(self) -> str:
+        logo_stamp = ''
+        if self.logo_path and os.path.exists(self.logo_path):
+            stat = os.stat(self.logo_path)
+            logo_stamp = f'{os.path.abspath(self.logo_path)}:{stat.st_size}:{stat.st_mtime_ns}'
+        payload = '\0'.join(str(part) for part in (
+            CODE_CLIP_VERSION, self.language, self.width, self.height, self.fps,
+            self.typing_frames, self.pause_frames, logo_stamp, self.formatted_code,
+        ))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def make_renderer(self) -> CodeTypingRenderer:
+        """Новый рендерер кадров клипа (для параллельных кусков)."""
+        return CodeTypingRenderer(self.formatted_code, self.language, self.logo_path,
+                                  question_text=None, width=self.width, height=self.height)
+
+
+def _cache_dir() -> str:
+    return getattr(settings, 'VIDEO_CODE_CLIP_CACHE_DIR', None) or os.path.join(settings.MEDIA_ROOT, 'video_clip_cache')
+
+
+def cleanup_expired_files(cache_dir: str, ttl: int, suffixes: Tuple[str, ...] = ('.mp4',)):
+    """
+    Удаляет из cache_dir файлы с такими окончаниями, не тронутые дольше ttl секунд.
+
+    Файлы .lock не удаляются: процесс, ждущий блокировку на удалённом файле,
+    и процесс, создавший новый файл под тем же именем, рисовали бы клип
+    одновременно. Файлы блокировок пустые, по одному на клип.
+    """
+    threshold = time.time() - ttl
+    try:
+        entries = os.scandir(cache_dir)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(suffixes) or entry.name.endswith('.lock'):
+                continue
+            try:
+                if entry.stat().st_mtime < threshold:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def get_or_render_code_clip(
+    spec: CodeClipSpec,
+    renderer: CodeTypingRenderer,
+    threads: Optional[int] = None,
+) -> str:
+    """
+    Путь к клипу без вопроса: из кэша или отрисованный сейчас.
+
+    renderer должен быть создан по тем же данным, что и spec, с question_text=None;
+    при промахе кэша он проигрывается до конца.
+    """
+    cache_dir = _cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    clip_path = os.path.join(cache_dir, f'{spec.cache_key}.mp4')
+
+    with open(f'{clip_path}.lock', 'w') as lock_file:
+        # Второй язык той же задачи ждёт, пока первый дорисует клип
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(clip_path):
+                # Продлеваем жизнь клипа: он ещё нужен другим языкам
+                os.utime(clip_path)
+                logger.info(f"♻️ Клип с набором кода взят из кэша: {spec.cache_key[:12]}")
+                return clip_path
+
+            cleanup_expired_files(cache_dir, getattr(settings, 'VIDEO_CODE_CLIP_CACHE_TTL', 6 * 3600))
+            segments = build_typing_timeline(renderer.total_chars, spec.typing_frames, spec.pause_frames)
+            tmp_path = f'{clip_path}.{os.getpid()}.tmp.mp4'
+            logger.info(f"🎞️ Отрисовка клипа с набором кода: {len(segments)} сегментов, ключ {spec.cache_key[:12]}")
+            try:
+                # ultrafast без потерь: клип ещё перекодируется при наложении вопроса
+                encode_timeline_chunked(renderer, spec.make_renderer, segments, tmp_path, spec.fps,
+                                        preset='ultrafast', threads=threads, lossless=True)
+                os.replace(tmp_path, clip_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            return clip_path
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
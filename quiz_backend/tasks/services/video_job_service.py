@@ -0,0 +1,280 @@
+"""
+Блокировки и дедупликация задач генерации видео.
+
+Генерацию видео одной задачи на одном языке запускают разные действия админки
+и повторы Celery. Параллельные запуски тратили минуты CPU на одно и то же
+и затирали друг другу video_urls / video_generation_progress.
+
+Ключ блокировки — (задача, язык, версия рендерера) в общем кэше (Redis):
+  - enqueue_video_job ставит метку «в очереди» с заранее выбранным ID задачи
+    Celery; повторный запрос получает ID уже запущенной задачи и ничего не ставит;
+  - воркер, получив задачу, превращает метку в аренду (VideoJobLock) и продлевает
+    её из фонового потока, пока идёт генерация;
+  - если воркер упал, аренда истекает через VIDEO_JOB_LOCK_LEASE секунд
+    (метка «в очереди» — через VIDEO_JOB_QUEUED_TTL), и следующий запрос
+    снимает устаревшую метку;
+  - задача, завершившаяся без аренды (circuit breaker, задачи нет, видео уже
+    есть), снимает свою метку «в очереди» (discard_queued_video_job).
+
+Проверка владельца и запись метки (продление, перехват, снятие) идут под
+блокировкой ключа: в Redis — cache.lock из django_redis, поэтому продление не
+затрёт метку, которую между чтением и записью перехватил другой воркер.
+
+Результат записывается под select_for_update (record_video_result), поэтому
+языки одной задачи, которые генерируются параллельно, не теряют друг друга.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .video_audio_service import AUDIO_BED_VERSION
+from .video_code_clip_cache import CODE_CLIP_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Видео с другой версией рендерера — другая работа, её не нужно ждать
+VIDEO_RENDERER_VERSION = f'{CODE_CLIP_VERSION}.{AUDIO_BED_VERSION}'
+
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+
+# Для кэшей без распределённых блокировок (locmem): метки видны только этому процессу
+_local_guard = threading.Lock()
+
+
+def _lease() -> int:
+    return getattr(settings, 'VIDEO_JOB_LOCK_LEASE', 120)
+
+
+def _queued_ttl() -> int:
+    return getattr(settings, 'VIDEO_JOB_QUEUED_TTL', 1800)
+
+
+def video_job_key(task_id: int, language: str) -> str:
+    return f'video_job:{task_id}:{language}:{VIDEO_RENDERER_VERSION}'
+
+
+def _marker(owner: str, state: str) -> Dict:
+    return {
+        'owner': owner,
+        'state': state,
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'heartbeat': time.time(),
+    }
+
+
+@contextmanager
+def _guarded(key: str):
+    """Критическая секция «прочитать метку, проверить владельца, записать»."""
+    make_lock = getattr(cache, 'lock', None)
+    guard = make_lock(f'{key}:guard', timeout=10, blocking_timeout=5) if make_lock else _local_guard
+    with guard:
+        yield
+
+
+def _is_stale(marker: Dict) -> bool:
+    """Метка без продления дольше своего срока (на случай бэкенда кэша без TTL)."""
+    ttl = _lease() if marker.get('state') == STATE_RUNNING else _queued_ttl()
+    return time.time() - marker.get('heartbeat', 0) > ttl
+
+
+def find_inflight_video_job(task_id: int, language: str) -> Optional[Dict]:
+    """
+    Метка задачи, которая уже генерирует (или ждёт в очереди) это видео, или None.
+    Устаревшая метка снимается.
+    """
+    key = video_job_key(task_id, language)
+    marker = cache.get(key)
+    if not marker or not _is_stale(marker):
+        return marker or None
+    with _guarded(key):
+        # Пока ждали блокировку, метку могли продлить или перехватить
+        marker = cache.get(key)
+        if not marker or not _is_stale(marker):
+            return marker or None
+        logger.warning(
+            f"♻️ Снята устаревшая блокировка видео {key}: владелец {marker.get('owner')} "
+            f"({marker.get('host')}:{marker.get('pid')}, {marker.get('state')})"
+        )
+        cache.delete(key)
+    return None
+
+
+def discard_queued_video_job(task_id: int, language: str, owner: str):
+    """Снимает метку «в очереди» задачи Celery owner, если та завершилась без аренды."""
+    key = video_job_key(task_id, language)
+    try:
+        with _guarded(key):
+            marker = cache.get(key)
+            if marker and marker.get('owner') == owner and marker.get('state') == STATE_QUEUED:
+                cache.delete(key)
+    except Exception as e:
+        logger.warning(f"⚠️ Не удалось снять метку очереди видео {key}: {e}")
+
+
+def enqueue_video_job(celery_task, task_id: int, video_language: str, **kwargs) -> Tuple[str, bool]:
+    """
+    Ставит генерацию видео в очередь, если такая же ещё не идёт.
+
+    Args:
+        celery_task: generate_video_for_task_async
+        task_id: ID задачи
+        video_language: Язык видео
+        **kwargs: Остальные аргументы generate_video_for_task_async
+
+    Returns:
+        (ID задачи Celery, True если запрос присоединён к уже идущей генерации)
+    """
+    key = video_job_key(task_id, video_language)
+    celery_id = str(uuid.uuid4())
+    for _ in range(2):
+        if cache.add(key, _marker(celery_id, STATE_QUEUED), _queued_ttl()):
+            break
+        inflight = find_inflight_video_job(task_id, video_language)
+        if inflight:
+            logger.info(f"🔗 Видео задачи {task_id} ({video_language}) уже генерируется: {inflight['owner']}")
+            return inflight['owner'], True
+    else:
+        inflight = find_inflight_video_job(task_id, video_language)
+        if inflight:
+            return inflight['owner'], True
+
+    try:
+        celery_task.apply_async(
+            kwargs={'task_id': task_id, 'video_language': video_language, **kwargs},
+            task_id=celery_id,
+        )
+    except Exception:
+        cache.delete(key)
+        raise
+    return celery_id, False
+
+
+class VideoJobLock:
+    """
+    Аренда генерации видео (задача, язык) для воркера.
+
+    Использование:
+        lock = VideoJobLock(task_id, 'ru', owner=self.request.id)
+        if not lock.acquire():
+            ...  # видео уже генерирует lock.holder['owner']
+        try:
+            ...
+        finally:
+            lock.release()
+    """
+
+    def __init__(self, task_id: int, language: str, owner: Optional[str] = None, lease: Optional[int] = None):
+        self.key = video_job_key(task_id, language)
+        self.owner = owner or str(uuid.uuid4())
+        self.lease = lease or _lease()
+        self.holder: Optional[Dict] = None
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        """
+        Берёт аренду: свою метку из очереди, свободный ключ или устаревшую чужую метку.
+        Иначе False, а holder — метка владельца.
+        """
+        running = _marker(self.owner, STATE_RUNNING)
+        with _guarded(self.key):
+            marker = cache.get(self.key)
+            if marker and marker.get('owner') != self.owner:
+                if not _is_stale(marker):
+                    self.holder = marker
+                    return False
+                logger.warning(f"♻️ Перехват устаревшей блокировки видео {self.key} у {marker.get('owner')}")
+                cache.delete(self.key)
+                marker = None
+
+            if marker:
+                # Своя метка «в очереди» (или после повтора задачи Celery)
+                cache.set(self.key, running, self.lease)
+            elif not cache.add(self.key, running, self.lease):
+                self.holder = cache.get(self.key)
+                return False
+
+        self.holder = running
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._renew_loop, name=f'video-lock-{self.key}', daemon=True)
+        self._thread.start()
+        return True
+
+    def renew(self) -> bool:
+        """Продлевает аренду; False, если ключ уже у другого владельца."""
+        with _guarded(self.key):
+            marker = cache.get(self.key)
+            if marker and marker.get('owner') != self.owner:
+                self.lost = True
+                logger.error(f"❌ Блокировка видео {self.key} перехвачена: {marker.get('owner')}")
+                return False
+            cache.set(self.key, _marker(self.owner, STATE_RUNNING), self.lease)
+        return True
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.lease / 3):
+            try:
+                if not self.renew():
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось продлить блокировку видео {self.key}: {e}")
+
+    def _stop_renewal(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def release(self):
+        """Снимает аренду, если она ещё наша."""
+        self._stop_renewal()
+        try:
+            with _guarded(self.key):
+                marker = cache.get(self.key)
+                if marker and marker.get('owner') == self.owner:
+                    cache.delete(self.key)
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось снять блокировку видео {self.key}: {e}")
+
+    def requeue(self):
+        """
+        Возвращает метку в состояние «в очереди» перед повтором задачи Celery:
+        повтор с тем же ID снова возьмёт аренду, а новые запросы к нему присоединятся.
+        """
+        self._stop_renewal()
+        try:
+            with _guarded(self.key):
+                marker = cache.get(self.key)
+                if not marker or marker.get('owner') == self.owner:
+                    cache.set(self.key, _marker(self.owner, STATE_QUEUED), _queued_ttl())
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось вернуть блокировку видео {self.key} в очередь: {e}")
+
+
+def record_video_result(task_id: int, language: str, video_url: str) -> Tuple[Dict, Dict]:
+    """
+    Записывает URL видео и отметку готовности языка под блокировкой строки.
+    Возвращает актуальные (video_urls, video_generation_progress).
+    """
+    from ..models import Task
+
+    with transaction.atomic():
+        task = Task.objects.select_for_update().only('id', 'video_urls', 'video_generation_progress').get(pk=task_id)
+        video_urls = dict(task.video_urls or {})
+        progress = dict(task.video_generation_progress or {})
+        video_urls[language] = video_url
+        progress[language] = True
+        Task.objects.filter(pk=task_id).update(video_urls=video_urls, video_generation_progress=progress)
+    return video_urls, progress
@@ -0,0 +1,154 @@
+"""
+Удаление старых видео задач из R2/S3 (Celery-задача delete_old_videos_from_r2).
+
+Раньше каждое видео удалялось отдельным DeleteObject, а каждая задача —
+отдельным save(): тысячи видео стоили тысяч запросов к R2 и записей в БД.
+Теперь задачи обходятся пачками по id (VIDEO_RETENTION_BATCH_SIZE): ключи всех
+видео пачки (video_url и video_urls по языкам) удаляются через DeleteObjects
+по 1000 ключей, а видео-поля задач, у которых удалены все видео, очищаются
+одним UPDATE.
+
+Прогресс запуска — курсор по id, дата отсечки и счётчики — хранится в кэше
+после каждой пачки. Если воркер упал посреди запуска, следующий запуск
+продолжает с курсора с той же датой отсечки и дописывает счётчики в ту же
+сводку. Задачи, видео которых не удалось удалить, пробуются снова в следующем
+полном запуске.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tasks.models import Task
+from .s3_service import DELETE_OBJECTS_BATCH_SIZE, delete_objects_from_s3, extract_s3_key_from_url
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = 'video_retention:checkpoint'
+# Незавершённый запуск продолжается, только если упал не раньше этого срока
+CHECKPOINT_TIMEOUT = 2 * 24 * 3600
+# Логи генерации видео хранятся меньше самих видео
+LOGS_RETENTION_DAYS = 7
+
+COUNTERS = ('tasks', 'tasks_cleared', 'objects', 'objects_deleted', 'objects_failed', 'delete_requests', 'batches')
+
+
+def _older_than(cutoff) -> Q:
+    """Задача опубликована (или создана, если не публиковалась) раньше cutoff."""
+    return Q(publish_date__lt=cutoff) | Q(publish_date__isnull=True, create_date__lt=cutoff)
+
+
+def old_video_tasks(cutoff):
+    """Задачи старше cutoff, у которых есть хотя бы одно видео."""
+    has_video = (Q(video_url__isnull=False) & ~Q(video_url='')) | ~Q(video_urls={})
+    return Task.objects.filter(has_video).filter(_older_than(cutoff))
+
+
+def task_video_urls(video_url, video_urls) -> List[str]:
+    """Все URL видео задачи без повторов (video_url обычно совпадает с одним из video_urls)."""
+    urls = [video_url, *(video_urls or {}).values()]
+    return list(dict.fromkeys(url for url in urls if url))
+
+
+def _new_checkpoint() -> Dict:
+    now = timezone.now()
+    checkpoint = {
+        'cutoff': (now - timedelta(days=settings.VIDEO_RETENTION_DAYS)).isoformat(),
+        'started_at': now.isoformat(),
+        'cursor': 0,
+    }
+    checkpoint.update(dict.fromkeys(COUNTERS, 0))
+    return checkpoint
+
+
+def _clean_batch(rows: List[Tuple[int, str, Dict]], checkpoint: Dict):
+    """Удаляет видео пачки задач одним DeleteObjects на 1000 ключей и очищает поля задач."""
+    keys_by_task = {}
+    for pk, video_url, video_urls in rows:
+        urls = task_video_urls(video_url, video_urls)
+        keys = [extract_s3_key_from_url(url) for url in urls]
+        if not all(keys):
+            logger.warning(f"⚠️ Не удалось извлечь ключи видео задачи {pk}: {urls}")
+        keys_by_task[pk] = keys
+
+    all_keys = {key for keys in keys_by_task.values() for key in keys if key}
+    deleted, errors = delete_objects_from_s3(all_keys)
+    for key, error in list(errors.items())[:10]:
+        logger.warning(f"⚠️ Не удалось удалить {key}: {error}")
+
+    snapshot = {pk: (video_url, video_urls) for pk, video_url, video_urls in rows}
+    cleaned = [pk for pk, keys in keys_by_task.items() if all(key in deleted for key in keys)]
+    with transaction.atomic():
+        # Задачу могли перегенерировать, пока удалялись старые видео: новые ссылки не затираем
+        unchanged = [
+            pk for pk, video_url, video_urls in Task.objects.select_for_update()
+            .filter(pk__in=cleaned).values_list('pk', 'video_url', 'video_urls')
+            if snapshot[pk] == (video_url, video_urls)
+        ]
+        cleared = Task.objects.filter(pk__in=unchanged).update(
+            video_url=None, video_urls={}, video_generation_progress={}
+        )
+
+    checkpoint['tasks'] += len(rows)
+    checkpoint['tasks_cleared'] += cleared
+    checkpoint['objects'] += len(all_keys)
+    checkpoint['objects_deleted'] += len(deleted)
+    checkpoint['objects_failed'] += len(all_keys) - len(deleted)
+    checkpoint['delete_requests'] += -(-len(all_keys) // DELETE_OBJECTS_BATCH_SIZE)
+    checkpoint['batches'] += 1
+
+
+def cleanup_old_videos() -> Dict:
+    """
+    Удаляет видео задач старше VIDEO_RETENTION_DAYS и старые логи генерации.
+    Продолжает незавершённый запуск, если в кэше остался его прогресс.
+
+    Returns:
+        Сводка запуска: счётчики задач, объектов и запросов, время, resumed
+    """
+    started = time.monotonic()
+    checkpoint = cache.get(CHECKPOINT_KEY)
+    resumed = checkpoint is not None
+    if not resumed:
+        checkpoint = _new_checkpoint()
+    cutoff = parse_datetime(checkpoint['cutoff'])
+    pending = old_video_tasks(cutoff).order_by('pk').values_list('pk', 'video_url', 'video_urls')
+
+    logger.info(f"🗑️ Удаление видео старше {cutoff:%Y-%m-%d %H:%M:%S}"
+                + (f", продолжение с задачи {checkpoint['cursor']}" if resumed else ''))
+
+    batch_size = settings.VIDEO_RETENTION_BATCH_SIZE
+    while True:
+        rows = list(pending.filter(pk__gt=checkpoint['cursor'])[:batch_size])
+        if not rows:
+            break
+        _clean_batch(rows, checkpoint)
+        checkpoint['cursor'] = rows[-1][0]
+        cache.set(CHECKPOINT_KEY, checkpoint, CHECKPOINT_TIMEOUT)
+
+    logs_cutoff = timezone.now() - timedelta(days=LOGS_RETENTION_DAYS)
+    logs_cleared = Task.objects.filter(
+        video_generation_logs__isnull=False
+    ).exclude(video_generation_logs='').filter(_older_than(logs_cutoff)).update(video_generation_logs=None)
+    cache.delete(CHECKPOINT_KEY)
+
+    summary = {key: checkpoint[key] for key in COUNTERS}
+    summary.update({
+        'logs_cleared': logs_cleared,
+        'resumed': resumed,
+        'seconds': round(time.monotonic() - started, 2),
+    })
+    logger.info(
+        f"🎉 Удаление видео завершено: задач {summary['tasks']} (очищено {summary['tasks_cleared']}), "
+        f"объектов удалено {summary['objects_deleted']} из {summary['objects']}, "
+        f"ошибок {summary['objects_failed']}, запросов DeleteObjects {summary['delete_requests']}, "
+        f"логов очищено {logs_cleared}, {summary['seconds']} с"
+    )
+    return summary
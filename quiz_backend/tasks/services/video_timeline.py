@@ -0,0 +1,142 @@
+"""
+Видео с набором кода как последовательность сегментов.
+
+- TypingSegment: кадры, в которых код дописывается (для каждого кадра —
+  сколько символов видно);
+- HoldSegment: один и тот же кадр заданное число кадров (пауза после набора,
+  долгие остановки во время медленной печати).
+
+Статичный сегмент рисуется один раз и кодируется из одного кадра
+(ffmpeg_service.encode_still_frame); части склеиваются без перекодирования.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+
+from .code_typing_renderer import CodeTypingRenderer
+from .ffmpeg_service import FfmpegFrameWriter, concat_videos, encode_still_frame
+
+logger = logging.getLogger(__name__)
+
+# Повторы кадра короче этого остаются в сегменте печати: отдельная часть
+# стоит запуска ffmpeg и ключевого кадра, что дороже нескольких повторов
+MIN_HOLD_FRAMES = 12
+
+
+@dataclass
+class TypingSegment:
+    """Кадры печати: видимых символов в каждом кадре."""
+    visible_chars: List[int] = field(default_factory=list)
+
+    @property
+    def frames(self) -> int:
+        return len(self.visible_chars)
+
+
+@dataclass
+class HoldSegment:
+    """Статичный кадр: видимых символов и сколько кадров он держится."""
+    visible_chars: int
+    frames: int
+
+
+Segment = Union[TypingSegment, HoldSegment]
+
+
+def typing_progress(total_chars: int, typing_frames: int) -> List[int]:
+    """
+    Видимых символов в каждом кадре печати (с лёгким замедлением к концу).
+    """
+    chars = []
+    for frame_num in range(typing_frames):
+        progress = (frame_num + 1) / typing_frames
+        chars.append(max(1, int(progress ** 0.95 * total_chars)))
+    return chars
+
+
+def build_typing_timeline(
+    total_chars: int,
+    typing_frames: int,
+    pause_frames: int,
+    min_hold_frames: int = MIN_HOLD_FRAMES,
+) -> List[Segment]:
+    """
+    Сегменты видео: печать (повторы одного кадра от min_hold_frames — отдельные
+    статичные сегменты) и пауза с полным кодом.
+    """
+    frames = typing_progress(total_chars, typing_frames) + [total_chars] * pause_frames
+    segments: List[Segment] = []
+    start = 0
+    while start < len(frames):
+        end = start
+        while end < len(frames) and frames[end] == frames[start]:
+            end += 1
+        if end - start >= min_hold_frames:
+            segments.append(HoldSegment(frames[start], end - start))
+        else:
+            if not segments or not isinstance(segments[-1], TypingSegment):
+                segments.append(TypingSegment())
+            segments[-1].visible_chars.extend(frames[start:end])
+        start = end
+    return segments
+
+
+def timeline_frames(segments: List[Segment]) -> int:
+    return sum(segment.frames for segment in segments)
+
+
+def encode_timeline(
+    renderer: CodeTypingRenderer,
+    segments: List[Segment],
+    output_path: str,
+    fps: int,
+    audio_path: Optional[str] = None,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+    lossless: bool = False,
+) -> str:
+    """
+    Кодирует сегменты по частям и склеивает их в output_path (с аудио, если есть).
+    Части пишутся во временную папку рядом с output_path и удаляются.
+    lossless=True — для промежуточного клипа, который потом перекодируется.
+    """
+    work_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        parts = encode_segments(renderer, segments, work_dir, fps, preset, threads, lossless)
+        concat_videos(parts, output_path, audio_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output_path
+
+
+def encode_segments(
+    renderer: CodeTypingRenderer,
+    segments: List[Segment],
+    work_dir: str,
+    fps: int,
+    preset: str = 'medium',
+    threads: Optional[int] = None,
+    lossless: bool = False,
+    prefix: str = 'part',
+) -> List[str]:
+    """
+    Кодирует каждый сегмент в отдельную часть в work_dir, возвращает пути частей по порядку.
+    """
+    parts = []
+    for index, segment in enumerate(segments):
+        part_path = os.path.join(work_dir, f'{prefix}_{index:03d}.mp4')
+        if isinstance(segment, HoldSegment):
+            renderer.reveal(segment.visible_chars)
+            encode_still_frame(renderer.frame, segment.frames, part_path, fps, preset, threads, lossless)
+        else:
+            with FfmpegFrameWriter(part_path, renderer.width, renderer.height, fps,
+                                   preset=preset, threads=threads, lossless=lossless) as writer:
+                for visible_chars in segment.visible_chars:
+                    renderer.reveal(visible_chars)
+                    writer.write(renderer.frame_bytes())
+        parts.append(part_path)
+        logger.info(f"Сегмент {prefix} {index + 1}/{len(segments)}: {type(segment).__name__}, кадров: {segment.frames}")
+    return parts
@@ -171,97 +171,110 @@ def create_full_webhook_data(task: Task, video_language: str = None) -> Dict[str
     return payload
 
 
-def create_russian_only_webhook_data(tasks: List[Task]) -> Dict[str, Any]:
+def build_full_webhook_data(tasks: List[Task]) -> List[Dict[str, Any]]:
     """
-    Формирует payload для вебхука с данными только на русском языке.
+    Формирует полный payload для каждой задачи один раз.
+    Результат передаётся в create_*_webhook_data, чтобы сводный и языковые
+    вебхуки не сериализовали одни и те же задачи повторно.
     """
-    logger.debug("Формируем русский вебхук для %s задач", len(tasks))
+    return [create_full_webhook_data(task) for task in tasks]
+
+
+def _language_task_payload(task: Task, full_data: Dict[str, Any], language: str) -> Optional[Dict[str, Any]]:
+    """
+    Оставляет в полном payload задачи только переводы на language
+    и видео на этом языке. None, если перевода нет.
+    """
+    translations = [trans for trans in full_data.get("translations", []) if trans.get("language") == language]
+    if not translations:
+        return None
+    task_data = dict(full_data.get("task") or {})
+    task_data["video_url"] = (task.video_urls or {}).get(language)
+    return {"task": task_data, "translations": translations}
 
-    tasks_payload = []
-    for task in tasks:
-        full_data = create_full_webhook_data(task, 'ru')
-        # Фильтруем переводы, оставляя только русский язык
-        russian_translations = [trans for trans in full_data.get("translations", []) if trans.get("language") == "ru"]
-        if russian_translations:  # Отправляем задачу только если есть русский перевод
-            tasks_payload.append({
-                "task": full_data.get("task"),
-                "translations": russian_translations
-            })
 
+def _bulk_payload(payload_type: str, tasks_payload: List[Dict[str, Any]]) -> Dict[str, Any]:
     # Get global custom links
     global_links = GlobalWebhookLink.objects.filter(is_active=True).values('name', 'url')
 
-    bulk_payload = {
-        "type": "quiz_published_russian_only",
+    return {
+        "type": payload_type,
         "id": str(uuid.uuid4()),
         "timestamp": timezone.now().isoformat(),
         "published_tasks": tasks_payload,
         "global_custom_links": list(global_links),
     }
 
+
+def _language_only_webhook_data(
+    tasks: List[Task],
+    language: str,
+    payload_type: str,
+    full_data: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    if full_data is None:
+        full_data = build_full_webhook_data(tasks)
+
+    tasks_payload = []
+    for task, task_data in zip(tasks, full_data):
+        # Отправляем задачу только если есть перевод на нужный язык
+        language_payload = _language_task_payload(task, task_data, language)
+        if language_payload:
+            tasks_payload.append(language_payload)
+    return _bulk_payload(payload_type, tasks_payload)
+
+
+def create_russian_only_webhook_data(
+    tasks: List[Task],
+    full_data: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Формирует payload для вебхука с данными только на русском языке.
+    """
+    logger.debug("Формируем русский вебхук для %s задач", len(tasks))
+    bulk_payload = _language_only_webhook_data(tasks, 'ru', "quiz_published_russian_only", full_data)
     logger.debug("Русский payload готов.")
     return bulk_payload
 
 
-def create_english_only_webhook_data(tasks: List[Task]) -> Dict[str, Any]:
+def create_english_only_webhook_data(
+    tasks: List[Task],
+    full_data: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     """
     Формирует payload для вебхука с данными только на английском языке.
     """
     logger.debug("Формируем английский вебхук для %s задач", len(tasks))
-
-    tasks_payload = []
-    for task in tasks:
-        full_data = create_full_webhook_data(task, 'en')
-        # Фильтруем переводы, оставляя только английский язык
-        english_translations = [trans for trans in full_data.get("translations", []) if trans.get("language") == "en"]
-        if english_translations:  # Отправляем задачу только если есть английский перевод
-            tasks_payload.append({
-                "task": full_data.get("task"),
-                "translations": english_translations
-            })
-
-    # Get global custom links
-    global_links = GlobalWebhookLink.objects.filter(is_active=True).values('name', 'url')
-
-    bulk_payload = {
-        "type": "quiz_published_english_only",
-        "id": str(uuid.uuid4()),
-        "timestamp": timezone.now().isoformat(),
-        "published_tasks": tasks_payload,
-        "global_custom_links": list(global_links),
-    }
-
+    bulk_payload = _language_only_webhook_data(tasks, 'en', "quiz_published_english_only", full_data)
     logger.debug("Английский payload готов.")
     return bulk_payload
 
 
-def create_bulk_webhook_data(tasks: List[Task], include_video: bool = False) -> Dict[str, Any]:
+def create_bulk_webhook_data(
+    tasks: List[Task],
+    include_video: bool = False,
+    full_data: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     """
     Формирует агрегированный payload для списка опубликованных задач.
     """
     logger.debug("Формируем сводный вебхук для %s задач", len(tasks))
+    if full_data is None:
+        full_data = build_full_webhook_data(tasks)
 
     tasks_payload = []
-    for task in tasks:
-        # Для общего хука передаем все переводы, включая видео если оно есть
-        full_data = create_full_webhook_data(task, include_video=include_video)
+    for task_data in full_data:
+        # Для общего хука передаем все переводы, видео — только если запрошено
+        task_payload = dict(task_data.get("task") or {})
+        if not include_video:
+            task_payload["video_url"] = None
         # Убираем внешнюю обертку, оставляя только 'task' и 'translations'
         tasks_payload.append({
-            "task": full_data.get("task"),
-            "translations": full_data.get("translations")
+            "task": task_payload,
+            "translations": task_data.get("translations")
         })
 
-    # Get global custom links
-    global_links = GlobalWebhookLink.objects.filter(is_active=True).values('name', 'url')
-
-    bulk_payload = {
-        "type": "quiz_published_bulk",
-        "id": str(uuid.uuid4()),
-        "timestamp": timezone.now().isoformat(),
-        "published_tasks": tasks_payload,
-        "global_custom_links": list(global_links),
-    }
-
+    bulk_payload = _bulk_payload("quiz_published_bulk", tasks_payload)
     logger.debug("Сводный payload готов.")
     return bulk_payload
 
@@ -6,7 +6,7 @@
 """
 
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from .models import Task, TaskComment, TaskCommentReport
 
@@ -31,6 +31,16 @@ def comment_created_notification(sender, instance, created, **kwargs):
     pass
 
 
+@receiver(post_delete, sender=TaskComment)
+def comment_deleted_update_counters(sender, instance, **kwargs):
+    """
+    Уменьшает денормализованные счётчики при физическом удалении комментария
+    (мягкое удаление обновляет их в TaskComment.soft_delete).
+    """
+    if not instance.is_deleted:
+        instance._update_counters(-1)
+
+
 @receiver(post_save, sender=TaskCommentReport)
 def report_created_notification(sender, instance, created, **kwargs):
     """
@@ -101,3 +111,14 @@ def auto_publish_to_social_media(sender, instance, created, **kwargs):
             
     except Exception as e:
         logger.error(f"❌ Ошибка автопубликации задачи {instance.id}: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Task)
+def schedule_task_image_variants(sender, instance, update_fields=None, **kwargs):
+    """
+    Строит копии картинки задачи (WebP/AVIF) после смены image_url.
+    Пути, которые пишут image_url через update(), вызывают schedule_image_variants сами.
+    """
+    from .services.image_variant_service import schedule_if_stale
+
+    schedule_if_stale('tasks', instance, update_fields)
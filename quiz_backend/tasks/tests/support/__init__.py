@@ -0,0 +1,3 @@
+"""
+Тестовые двойники внешних сервисов (фейковые серверы Bot API, S3) для тестов и бенчмарков.
+"""
@@ -0,0 +1,146 @@
+"""
+Локальный фейковый Telegram Bot API для тестов и бенчмарков.
+
+Сервер принимает любые методы, отвечает правдоподобными result
+(message_id, file_id для загруженных медиа) и считает запросы.
+Пример:
+
+    with FakeBotAPIServer() as server, override_settings(TELEGRAM_API_BASE_URL=server.base_url):
+        ...
+"""
+import json
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Set, Tuple
+
+CHAT_ID_FORM_RE = re.compile(rb'name="chat_id"\r\n\r\n(-?\d+)')
+
+# Поле результата, в котором Telegram возвращает загруженное медиа
+MEDIA_RESULT_FIELDS = {
+    'sendPhoto': 'photo',
+    'sendVideo': 'video',
+    'sendAnimation': 'animation',
+    'sendDocument': 'document',
+}
+
+
+class _FakeBotAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        content_type = self.headers.get('Content-Type', '')
+        method = self.path.rsplit('/', 1)[-1]
+        status, payload = self.server.fake.handle(
+            method, content_type, body, self.path, self.client_address[1]
+        )
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBotAPIServer:
+    """
+    Фейковый Bot API в отдельном потоке.
+
+    Attributes:
+        responses: Очередь ответов (status, payload), которые вернутся вместо успешных
+        blocked_chats: Чаты, для которых возвращается 403 «bot was blocked by the user»
+        requests: Записанные запросы (если record=True)
+        calls: Счётчик вызовов по методам
+        uploads: Количество multipart-запросов с загрузкой файла
+    """
+
+    def __init__(self, record: bool = True, blocked_chats: Optional[Set[int]] = None):
+        self.record = record
+        self.blocked_chats = set(blocked_chats or ())
+        self.responses: List[Tuple[int, dict]] = []
+        self.requests: List[dict] = []
+        self.calls = Counter()
+        self.uploads = 0
+        self._lock = threading.Lock()
+        self._message_id = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeBotAPIHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        with self._lock:
+            self.responses.clear()
+            self.requests.clear()
+            self.calls.clear()
+            self.uploads = 0
+            self._message_id = 0
+
+    @staticmethod
+    def _chat_id(content_type: str, body: bytes):
+        if 'application/json' in content_type:
+            try:
+                return json.loads(body or b'{}').get('chat_id')
+            except ValueError:
+                return None
+        match = CHAT_ID_FORM_RE.search(body)
+        return int(match.group(1)) if match else None
+
+    def handle(self, method: str, content_type: str, body: bytes, path: str, client_port: int):
+        is_upload = 'multipart/form-data' in content_type
+        chat_id = self._chat_id(content_type, body)
+        with self._lock:
+            self.calls[method] += 1
+            if is_upload:
+                self.uploads += 1
+            if self.record:
+                self.requests.append({
+                    'method': method,
+                    'path': path,
+                    'content_type': content_type,
+                    'body': body,
+                    'chat_id': chat_id,
+                    'client_port': client_port,
+                })
+            if self.responses:
+                return self.responses.pop(0)
+            self._message_id += 1
+            message_id = self._message_id
+
+        if chat_id is not None and int(chat_id) in self.blocked_chats:
+            return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+
+        result = {'message_id': message_id, 'chat': {'id': chat_id}}
+        field = MEDIA_RESULT_FIELDS.get(method)
+        if field:
+            file_id = f'{field}-{message_id}'
+            result[field] = [{'file_id': f'{file_id}-thumb'}, {'file_id': file_id}] if field == 'photo' else {'file_id': file_id}
+        return 200, {'ok': True, 'result': result}
@@ -0,0 +1,237 @@
+"""
+Локальный фейковый S3/R2 для тестов и бенчмарков.
+
+Поддерживает то, чем пользуется s3_service: PutObject, GetObject, HeadObject,
+DeleteObject, DeleteObjects и multipart-загрузку (Create/UploadPart/
+Complete/Abort). Объекты хранятся в памяти, запросы считаются по операциям.
+Адресация — path-style (http://127.0.0.1:port/bucket/key). С record=False
+тела запросов читаются по кусочкам и не хранятся (для замеров памяти). Пример:
+
+    with FakeS3Server() as server, override_settings(**server.settings()):
+        ...
+"""
+import hashlib
+import re
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+DELETE_KEY_RE = re.compile(rb'<Key>(.*?)</Key>', re.S)
+
+
+class _FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _dispatch(self, method: str):
+        parsed = urlparse(self.path)
+        bucket, _, key = parsed.path.lstrip('/').partition('/')
+        query = parse_qs(parsed.query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        fake = self.server.fake
+        if fake.record or method == 'POST':
+            body = self.rfile.read(length) if length else b''
+        else:
+            remaining = length
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+            body = b''
+        fake.client_ports.add(self.client_address[1])
+        status, headers, payload = fake.handle(
+            method, bucket, unquote(key), query, body, length, self.headers.get('Content-Type'),
+        )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if method != 'HEAD':
+            self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if method != 'HEAD' and payload:
+            self.wfile.write(payload)
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeS3Server:
+    """
+    Фейковый S3 в отдельном потоке.
+
+    Attributes:
+        objects: Загруженные объекты {(bucket, key): байты} (пустые, если record=False)
+        sizes: Размеры объектов
+        content_types: ContentType объектов
+        calls: Счётчик запросов по операциям
+        client_ports: Порты клиентов (сколько соединений открывалось)
+        max_part_size: Наибольшая принятая часть multipart-загрузки
+    """
+
+    def __init__(self, bucket: str = 'fake-bucket', record: bool = True):
+        self.bucket = bucket
+        self.record = record
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.sizes: Dict[Tuple[str, str], int] = {}
+        self.content_types: Dict[Tuple[str, str], str] = {}
+        self.calls = Counter()
+        self.client_ports = set()
+        self.max_part_size = 0
+        self._uploads: Dict[str, Dict[int, Tuple[bytes, int]]] = {}
+        self._upload_types: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def settings(self, **overrides) -> dict:
+        """Настройки Django, направляющие s3_service на этот сервер."""
+        values = {
+            'USE_R2_STORAGE': True,
+            'AWS_ACCESS_KEY_ID': 'fake-key',
+            'AWS_SECRET_ACCESS_KEY': 'fake-secret',
+            'AWS_STORAGE_BUCKET_NAME': self.bucket,
+            'AWS_S3_ENDPOINT_URL': self.base_url,
+            'AWS_S3_REGION_NAME': 'auto',
+            'AWS_S3_ADDRESSING_STYLE': 'path',
+            'AWS_PUBLIC_MEDIA_DOMAIN': 'cdn.fake-s3.local',
+            'AWS_S3_CUSTOM_DOMAIN': 'cdn.fake-s3.local',
+            'R2_ENVIRONMENT_PREFIX': 'test',
+        }
+        values.update(overrides)
+        return values
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeS3Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        with self._lock:
+            self.objects.clear()
+            self.sizes.clear()
+            self.content_types.clear()
+            self.calls.clear()
+            self.client_ports.clear()
+            self.max_part_size = 0
+            self._uploads.clear()
+            self._upload_types.clear()
+
+    @staticmethod
+    def _etag(data: bytes) -> str:
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    @staticmethod
+    def _xml(body: str) -> Tuple[dict, bytes]:
+        return {'Content-Type': 'application/xml'}, f'<?xml version="1.0" encoding="UTF-8"?>{body}'.encode('utf-8')
+
+    def _store(self, bucket: str, key: str, body: bytes, size: int, content_type: Optional[str]):
+        self.objects[(bucket, key)] = body
+        self.sizes[(bucket, key)] = size
+        self.content_types[(bucket, key)] = content_type
+
+    def _remove(self, bucket: str, key: str):
+        self.objects.pop((bucket, key), None)
+        self.sizes.pop((bucket, key), None)
+        self.content_types.pop((bucket, key), None)
+
+    def handle(self, method: str, bucket: str, key: str, query: dict, body: bytes, size: int,
+               content_type: Optional[str] = None):
+        upload_id = query.get('uploadId', [None])[0]
+        with self._lock:
+            if method == 'PUT' and upload_id:
+                self.calls['UploadPart'] += 1
+                self._uploads[upload_id][int(query['partNumber'][0])] = (body, size)
+                self.max_part_size = max(self.max_part_size, size)
+                return 200, {'ETag': self._etag(body)}, b''
+            if method == 'PUT':
+                self.calls['PutObject'] += 1
+                self._store(bucket, key, body, size, content_type)
+                return 200, {'ETag': self._etag(body)}, b''
+            if method == 'POST' and 'uploads' in query:
+                self.calls['CreateMultipartUpload'] += 1
+                upload_id = uuid.uuid4().hex
+                self._uploads[upload_id] = {}
+                self._upload_types[upload_id] = content_type
+                headers, payload = self._xml(
+                    f'<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>'
+                    f'<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>'
+                )
+                return 200, headers, payload
+            if method == 'POST' and upload_id:
+                self.calls['CompleteMultipartUpload'] += 1
+                parts = self._uploads.pop(upload_id)
+                data = b''.join(parts[number][0] for number in sorted(parts))
+                self._store(bucket, key, data, sum(part_size for _, part_size in parts.values()),
+                            self._upload_types.pop(upload_id, None))
+                headers, payload = self._xml(
+                    f'<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>'
+                    f'<ETag>{self._etag(data)}</ETag></CompleteMultipartUploadResult>'
+                )
+                return 200, headers, payload
+            if method == 'POST' and 'delete' in query:
+                self.calls['DeleteObjects'] += 1
+                deleted = []
+                for raw_key in DELETE_KEY_RE.findall(body):
+                    object_key = raw_key.decode('utf-8').replace('&amp;', '&').replace('&lt;', '<').replace('&gt;', '>')
+                    self._remove(bucket, object_key)
+                    deleted.append(f'<Deleted><Key>{raw_key.decode("utf-8")}</Key></Deleted>')
+                headers, payload = self._xml(f'<DeleteResult>{"".join(deleted)}</DeleteResult>')
+                return 200, headers, payload
+            if method == 'DELETE' and upload_id:
+                self.calls['AbortMultipartUpload'] += 1
+                self._uploads.pop(upload_id, None)
+                self._upload_types.pop(upload_id, None)
+                return 204, {}, b''
+            if method == 'DELETE':
+                self.calls['DeleteObject'] += 1
+                self._remove(bucket, key)
+                return 204, {}, b''
+            if method == 'GET':
+                self.calls['GetObject'] += 1
+                if (bucket, key) not in self.objects:
+                    headers, payload = self._xml('<Error><Code>NoSuchKey</Code></Error>')
+                    return 404, headers, payload
+                return 200, {'Content-Type': self.content_types[(bucket, key)] or 'binary/octet-stream',
+                             'ETag': self._etag(self.objects[(bucket, key)])}, self.objects[(bucket, key)]
+            if method == 'HEAD':
+                self.calls['HeadObject'] += 1
+                if (bucket, key) not in self.sizes:
+                    return 404, {'Content-Length': '0'}, b''
+                return 200, {'Content-Length': str(self.sizes[(bucket, key)]),
+                             'ETag': self._etag(self.objects[(bucket, key)])}, b''
+        return 400, {}, b''
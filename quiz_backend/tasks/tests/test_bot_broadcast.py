@@ -0,0 +1,175 @@
+"""
+Тесты рассылки подписчикам бота на локальном фейковом Bot API.
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import TelegramUser
+from config.telegram_client import reset_bot_clients
+from platforms.broadcast import BroadcastSender, create_bot_broadcast, resume_stale_broadcasts, run_bot_broadcast
+from platforms.models import BotBroadcast
+from tasks.tests.support.fake_bot_api import FakeBotAPIServer
+
+
+class BotBroadcastTestCase(TestCase):
+    """
+    Загрузка медиа один раз, учёт заблокировавших бота и продолжение с курсора.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeBotAPIServer(blocked_chats={1005}).start()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(
+            TELEGRAM_API_BASE_URL=cls.server.base_url,
+            TELEGRAM_BOT_TOKEN='BROADCAST',
+            MEDIA_ROOT=cls.media_root,
+            BOT_BROADCAST_CHUNK_SIZE=10,
+            BOT_BROADCAST_PROGRESS_BATCH=5,
+            BOT_BROADCAST_CONCURRENCY=4,
+            BOT_BROADCAST_MAX_RESUMES=2,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.stop()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_bot_clients()
+        self.server.reset()
+        self.telegram_ids = list(range(1001, 1031))
+        for telegram_id in self.telegram_ids:
+            TelegramUser.objects.create(telegram_id=telegram_id)
+        # Дубликат пользователя (другой тенант) не должен получить пост дважды
+        TelegramUser.objects.create(telegram_id=1001)
+
+    def tearDown(self):
+        reset_bot_clients()
+
+    def _create_broadcast(self):
+        return create_bot_broadcast(
+            text='**Новый** пост',
+            photos=[ContentFile(b'\x89PNG fake', name='post.png')],
+            buttons=[{'text': 'Открыть', 'url': 'https://example.com'}],
+        )
+
+    def test_media_is_uploaded_once_and_reused(self):
+        broadcast = self._create_broadcast()
+        self.assertEqual(broadcast.total_recipients, 30)
+        path = broadcast.media[0]['path']
+
+        broadcast = run_bot_broadcast(broadcast.pk)
+
+        self.assertEqual(broadcast.status, BotBroadcast.STATUS_COMPLETED)
+        self.assertEqual(broadcast.sent_count, 29)
+        self.assertEqual(broadcast.blocked_count, 1)
+        self.assertEqual(broadcast.failed_count, 0)
+        self.assertEqual(broadcast.last_telegram_id, 1030)
+        self.assertEqual(self.server.calls['sendPhoto'], 30)
+        self.assertEqual(self.server.uploads, 1)
+        self.assertTrue(broadcast.media[0]['file_id'].startswith('photo-'))
+        self.assertEqual(
+            sorted(request['chat_id'] for request in self.server.requests),
+            self.telegram_ids
+        )
+        # Подпись и кнопки уходят вместе с фото
+        self.assertIn(b'<b>', self.server.requests[0]['body'])
+        self.assertIn(b'inline_keyboard', self.server.requests[0]['body'])
+        self.assertFalse(default_storage.exists(path))
+
+    def test_stalled_broadcast_resumes_from_cursor(self):
+        broadcast = self._create_broadcast()
+        BotBroadcast.objects.filter(pk=broadcast.pk).update(
+            status=BotBroadcast.STATUS_RUNNING,
+            heartbeat_at=timezone.now(),
+            last_telegram_id=1020,
+            sent_count=19,
+            blocked_count=1,
+            media=[dict(broadcast.media[0], file_id='photo-known')],
+        )
+
+        # Воркер ещё жив — второй запуск ничего не делает
+        self.assertIsNone(run_bot_broadcast(broadcast.pk))
+        self.assertEqual(self.server.calls['sendPhoto'], 0)
+
+        BotBroadcast.objects.filter(pk=broadcast.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        broadcast = run_bot_broadcast(broadcast.pk)
+
+        self.assertEqual(broadcast.status, BotBroadcast.STATUS_COMPLETED)
+        self.assertEqual(broadcast.sent_count, 29)
+        self.assertEqual(broadcast.blocked_count, 1)
+        self.assertEqual(self.server.uploads, 0)
+        self.assertEqual(
+            sorted(request['chat_id'] for request in self.server.requests),
+            list(range(1021, 1031))
+        )
+
+    def test_crashed_broadcast_stays_resumable(self):
+        broadcast = self._create_broadcast()
+        send_many = BroadcastSender.send_many
+        calls = []
+
+        def crash_on_third_batch(sender, telegram_ids, executor):
+            calls.append(telegram_ids)
+            if len(calls) == 3:
+                raise RuntimeError('database went away')
+            return send_many(sender, telegram_ids, executor)
+
+        with patch.object(BroadcastSender, 'send_many', crash_on_third_batch):
+            broadcast = run_bot_broadcast(broadcast.pk)
+
+        # Курсор сохраняется после каждой порции, а не только после пачки из БД
+        self.assertEqual(calls[:2], [list(range(1001, 1006)), list(range(1006, 1011))])
+        self.assertEqual(broadcast.status, BotBroadcast.STATUS_RUNNING)
+        self.assertEqual(broadcast.last_telegram_id, 1010)
+        self.assertEqual(broadcast.last_error, 'database went away')
+
+        BotBroadcast.objects.filter(pk=broadcast.pk).update(
+            heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertIn(broadcast.pk, resume_stale_broadcasts())
+        broadcast = run_bot_broadcast(broadcast.pk)
+
+        self.assertEqual(broadcast.status, BotBroadcast.STATUS_COMPLETED)
+        self.assertEqual(broadcast.sent_count, 29)
+        self.assertEqual(broadcast.last_error, '')
+        self.assertEqual(self.server.calls['sendPhoto'], 30)
+        self.assertEqual(broadcast.resume_attempts, 1)
+
+    def test_broadcast_crashing_on_every_run_fails_after_max_resumes(self):
+        broadcast = self._create_broadcast()
+
+        def crash(sender, telegram_ids, executor):
+            raise RuntimeError('database went away')
+
+        runs = 0
+        with patch.object(BroadcastSender, 'send_many', crash):
+            while run_bot_broadcast(broadcast.pk) is not None:
+                runs += 1
+                self.assertLessEqual(runs, 10)
+                BotBroadcast.objects.filter(pk=broadcast.pk).update(
+                    heartbeat_at=timezone.now() - timedelta(hours=1)
+                )
+
+        broadcast.refresh_from_db()
+        # Первый запуск и BOT_BROADCAST_MAX_RESUMES продолжений
+        self.assertEqual(runs, 3)
+        self.assertEqual(broadcast.status, BotBroadcast.STATUS_FAILED)
+        self.assertEqual(broadcast.last_error, 'database went away')
+        self.assertIsNone(broadcast.last_telegram_id)
+        self.assertNotIn(broadcast.pk, resume_stale_broadcasts())
+        self.assertEqual(self.server.calls['sendPhoto'], 0)
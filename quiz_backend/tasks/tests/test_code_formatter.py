@@ -0,0 +1,125 @@
+"""
+Тесты долгоживущих форматтеров кода.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from tasks.services.code_formatter_service import WORKERS_DIR, FormatterPool, close_formatter_pools, format_with
+from tasks.services.image_generation_service import smart_format_code
+
+# Воркер по тому же протоколу: переводит код в верхний регистр, "sleep" зависает
+ECHO_WORKER = textwrap.dedent('''
+    import json, sys, time
+    print(json.dumps({"ready": True}), flush=True)
+    for line in sys.stdin:
+        request = json.loads(line)
+        if request.get("code") == "sleep":
+            time.sleep(10)
+        print(json.dumps({"id": request["id"], "ok": True, "code": request.get("code", "").upper()}), flush=True)
+''')
+
+# Разовый форматтер: код из stdin в верхнем регистре
+UPPER_ONCE = [sys.executable, '-c', 'import sys; sys.stdout.write(sys.stdin.read().upper())']
+MISSING = ['formatter-that-does-not-exist']
+
+
+class FormatterPoolTestCase(TestCase):
+    """
+    Процесс переиспользуется, зависший воркер перезапускается,
+    отсутствующий инструмент не ломает форматирование.
+    """
+
+    def make_pool(self, command, size=1):
+        pool = FormatterPool('echo', command, size)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_worker_is_reused_between_calls(self):
+        pool = self.make_pool([sys.executable, '-c', ECHO_WORKER])
+
+        self.assertEqual(pool.format('a', timeout=5), 'A')
+        worker = pool._idle.queue[0]
+        pid = worker.process.pid
+        self.assertEqual(pool.format('b', timeout=5), 'B')
+        self.assertEqual(worker.process.pid, pid)
+
+    def test_hung_worker_is_killed_and_restarted(self):
+        pool = self.make_pool([sys.executable, '-c', ECHO_WORKER])
+
+        self.assertIsNone(pool.format('sleep', timeout=0.5))
+        self.assertFalse(pool._idle.queue[0].alive)
+        self.assertEqual(pool.format('c', timeout=5), 'C')
+
+    def test_missing_tool_is_not_retried(self):
+        pool = self.make_pool(['formatter-that-does-not-exist'])
+
+        self.assertIsNone(pool.format('x', timeout=1))
+        self.assertGreater(pool.unavailable_until, 0)
+        self.assertIsNone(pool.format('x', timeout=1))
+
+    @override_settings(CODE_FORMATTER_COMMANDS={
+        'prettier': ['formatter-that-does-not-exist'],
+        'gofmt': ['formatter-that-does-not-exist'],
+    })
+    def test_missing_tool_falls_back_to_basic_format(self):
+        cache.clear()
+        formatted = smart_format_code('function f() {\nreturn 1;\n}', 'javascript')
+        self.assertEqual(formatted, 'function f() {\n    return 1;\n}')
+
+    @override_settings(CODE_FORMATTER_COMMANDS={'gofmt': MISSING}, CODE_FORMATTER_ONE_SHOT_COMMANDS={'gofmt': UPPER_ONCE})
+    def test_missing_worker_falls_back_to_one_shot_binary(self):
+        self.addCleanup(close_formatter_pools)
+
+        self.assertEqual(format_with('gofmt', 'package once'), 'PACKAGE ONCE')
+        self.assertEqual(format_with('gofmt', 'package twice'), 'PACKAGE TWICE')
+
+    def test_basic_fallback_is_not_cached(self):
+        cache.clear()
+        self.addCleanup(close_formatter_pools)
+        with override_settings(CODE_FORMATTER_COMMANDS={'prettier': MISSING}):
+            self.assertEqual(smart_format_code('let x', 'javascript'), 'let x')
+        # Когда prettier появился, результат базового форматирования не мешает
+        with override_settings(CODE_FORMATTER_COMMANDS={'prettier': [sys.executable, '-c', ECHO_WORKER]}):
+            self.assertEqual(smart_format_code('let x', 'javascript'), 'LET X')
+
+    def test_formatted_code_is_cached_by_hash(self):
+        cache.clear()
+        self.addCleanup(close_formatter_pools)
+        with override_settings(CODE_FORMATTER_COMMANDS={'gofmt': [sys.executable, '-c', ECHO_WORKER]}):
+            self.assertEqual(smart_format_code('package cached', 'go'), 'PACKAGE CACHED')
+        # Второй раз форматтер не нужен: результат берётся по хэшу кода
+        with override_settings(CODE_FORMATTER_COMMANDS={'gofmt': MISSING}, CODE_FORMATTER_ONE_SHOT_COMMANDS={'gofmt': MISSING}):
+            self.assertEqual(smart_format_code('package cached', 'go'), 'PACKAGE CACHED')
+
+
+class GofmtWorkerTestCase(TestCase):
+    """
+    Настоящий gofmt-воркер, собранный из formatters/gofmt_worker.go (нужен Go).
+    """
+
+    def setUp(self):
+        if not shutil.which('go'):
+            self.skipTest('Go не установлен')
+        build_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, build_dir)
+        self.binary = os.path.join(build_dir, 'gofmt-worker')
+        subprocess.run(
+            ['go', 'build', '-o', self.binary, str(WORKERS_DIR / 'gofmt_worker.go')],
+            check=True, capture_output=True, timeout=300,
+        )
+
+    def test_formats_go_source(self):
+        pool = FormatterPool('gofmt', [self.binary], 1)
+        self.addCleanup(pool.close)
+
+        formatted = pool.format('package main\nfunc main(){\nx:=1\n_ = x}\n', timeout=5)
+
+        self.assertEqual(formatted, 'package main\n\nfunc main() {\n\tx := 1\n\t_ = x\n}\n')
+        self.assertIsNone(pool.format('package main\nfunc {', timeout=5))
@@ -0,0 +1,74 @@
+"""
+Тесты инкрементальной отрисовки видео с набором кода.
+"""
+import copy
+import io
+
+from django.test import TestCase
+from PIL import Image, ImageChops
+from pygments import highlight
+from pygments.formatters.img import FontNotFound
+
+from tasks.services.code_typing_renderer import CodeTypingRenderer, _get_video_code_formatter
+from tasks.services.image_generation_service import get_lexer
+
+CODE = "def greet(name):\n\tprint('Привет', name)  # ок\n\ngreet('мир')\n\n"
+
+
+class CodeTypingRendererTestCase(TestCase):
+    """
+    Дорисовка по символам должна давать ту же картинку, что и Pygments.
+    """
+
+    def setUp(self):
+        try:
+            _get_video_code_formatter(55)
+        except (FontNotFound, OSError):
+            # Pygments ищет шрифты через fc-list, которого может не быть в окружении
+            self.skipTest('Моноширинный шрифт для Pygments не найден')
+
+    def code_area(self, renderer):
+        x, y = renderer.code_origin
+        width, height = renderer.layout.size
+        return renderer.frame.crop((x, y, x + width, y + height))
+
+    def test_full_reveal_matches_pygments(self):
+        renderer = CodeTypingRenderer(CODE, 'python')
+        for visible_chars in range(0, renderer.total_chars + 7, 7):
+            renderer.reveal(visible_chars)
+
+        formatter = copy.copy(renderer.layout.formatter)
+        formatter.drawables = []
+        expected = io.BytesIO()
+        highlight(CODE, get_lexer('python'), formatter, outfile=expected)
+        expected = Image.open(expected).convert('RGB')
+
+        self.assertIsNone(renderer.scale)
+        self.assertIsNone(ImageChops.difference(self.code_area(renderer), expected).getbbox())
+
+    def test_partial_reveal_shows_only_typed_lines(self):
+        renderer = CodeTypingRenderer(CODE, 'python')
+        empty = self.code_area(renderer)
+
+        renderer.reveal(len('def greet'))
+        first_line = self.code_area(renderer)
+        # Хвосты букв могут заходить на следующую строку, но не дальше
+        third_line_y = renderer.layout.formatter._get_line_y(2)
+
+        changed = ImageChops.difference(first_line, empty).getbbox()
+        self.assertIsNotNone(changed)
+        self.assertLess(changed[3], third_line_y)
+        self.assertEqual(len(renderer.frame_bytes()), renderer.width * renderer.height * 3)
+
+    def test_question_overlay_matches_drawn_question(self):
+        with_question = CodeTypingRenderer(CODE, 'python', question_text='Что выведет код?')
+        without_question = CodeTypingRenderer(CODE, 'python', question_text=None)
+        overlay, position = without_question.question_overlay('Что выведет код?')
+
+        composed = without_question.frame.copy()
+        composed.paste(overlay, position)
+
+        # Вопрос не задевает консоль, а кадр с наложенным слоем совпадает с нарисованным
+        self.assertGreaterEqual(position[1], without_question.console_bottom)
+        self.assertIsNone(ImageChops.difference(composed, with_question.frame).getbbox())
+        self.assertIsNone(without_question.question_overlay(''))
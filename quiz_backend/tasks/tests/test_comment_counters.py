@@ -0,0 +1,107 @@
+"""
+Тесты денормализованного счётчика комментариев перевода.
+"""
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from tasks.comment_views import TaskCommentViewSet
+from tasks.models import Task, TaskComment, TaskTranslation
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+class CommentCountersTestCase(TestCase):
+    """
+    Счётчик обновляется при создании, мягком удалении и восстановлении.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            slug='counters-tenant',
+            name='Counters Tenant',
+            domain='counters.example.com',
+            site_name='Counters Tenant'
+        )
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=self.tenant)
+        self.translation = TaskTranslation.objects.create(
+            task=task,
+            language='en',
+            question='Question?',
+            answers=['A', 'B'],
+            correct_answer='A'
+        )
+        self.other_translation = TaskTranslation.objects.create(
+            task=task,
+            language='ru',
+            question='Вопрос?',
+            answers=['A', 'B'],
+            correct_answer='A'
+        )
+
+    def _comment(self, parent=None):
+        return TaskComment.objects.create(
+            task_translation=self.translation,
+            author_telegram_id=1,
+            author_username='user1',
+            text='Comment text',
+            parent_comment=parent
+        )
+
+    def _count(self):
+        self.translation.refresh_from_db(fields=['comments_count'])
+        return self.translation.comments_count
+
+    def test_counter_follows_create_and_delete(self):
+        root = self._comment()
+        reply = self._comment(parent=root)
+        other = self._comment(parent=root)
+        self.assertEqual(self._count(), 3)
+
+        self.assertTrue(reply.soft_delete())
+        self.assertFalse(reply.soft_delete())
+        self.assertEqual(self._count(), 2)
+        root.refresh_from_db()
+        self.assertEqual(root.thread_replies_count, 1)
+
+        # Физическое удаление уже мягко удалённого комментария счётчики не трогает
+        reply.delete()
+        self.assertEqual(self._count(), 2)
+
+        other.delete()
+        self.assertEqual(self._count(), 1)
+        root.refresh_from_db()
+        self.assertEqual(root.thread_replies_count, 0)
+
+    def test_recalculate_fixes_drift(self):
+        self._comment()
+        TaskTranslation.objects.filter(pk=self.translation.pk).update(comments_count=10)
+
+        TaskTranslation.recalculate_comments_count([self.translation.pk, self.other_translation.pk])
+
+        self.assertEqual(self._count(), 1)
+        self.other_translation.refresh_from_db()
+        self.assertEqual(self.other_translation.comments_count, 0)
+
+    def test_bulk_counts_endpoint(self):
+        self._comment()
+        self._comment()
+        view = TaskCommentViewSet.as_view({'get': 'bulk_comments_count'})
+        request = APIRequestFactory().get(
+            '/api/tasks/comments/counts/',
+            {'ids': f'{self.translation.pk},{self.other_translation.pk},999999'}
+        )
+        request.tenant = self.tenant
+
+        with self.assertNumQueries(1):
+            response = view(request)
+
+        self.assertEqual(response.data['counts'], {
+            str(self.translation.pk): 2,
+            str(self.other_translation.pk): 0,
+            '999999': 0,
+        })
+
+        bad_request = APIRequestFactory().get('/api/tasks/comments/counts/', {'ids': 'a,b'})
+        bad_request.tenant = self.tenant
+        self.assertEqual(view(bad_request).status_code, 400)
@@ -0,0 +1,106 @@
+"""
+Тесты количества SQL-запросов при выдаче списка комментариев.
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from tasks.comment_views import TaskCommentViewSet
+from tasks.models import Task, TaskComment, TaskCommentReport, TaskTranslation
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+class CommentListQueriesTestCase(TestCase):
+    """
+    Список комментариев не должен выполнять запросы на каждый комментарий.
+    """
+
+    READER_TELEGRAM_ID = 555
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            slug='comments-tenant',
+            name='Comments Tenant',
+            domain='comments.example.com',
+            site_name='Comments Tenant'
+        )
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=self.tenant)
+        self.translation = TaskTranslation.objects.create(
+            task=task,
+            language='en',
+            question='Question?',
+            answers=['A', 'B'],
+            correct_answer='A'
+        )
+        self.factory = APIRequestFactory()
+        self.view = TaskCommentViewSet.as_view({'get': 'list'})
+
+    def _comment(self, parent=None, author=1):
+        return TaskComment.objects.create(
+            task_translation=self.translation,
+            author_telegram_id=author,
+            author_username=f'user{author}',
+            text='Comment text',
+            parent_comment=parent
+        )
+
+    def _create_threads(self, count):
+        """Создаёт count веток: корень -> 2 ответа -> по 1 ответу на каждый."""
+        for _ in range(count):
+            root = self._comment()
+            for _ in range(2):
+                reply = self._comment(parent=root, author=2)
+                nested = self._comment(parent=reply, author=3)
+                TaskCommentReport.objects.create(
+                    comment=nested,
+                    reporter_telegram_id=self.READER_TELEGRAM_ID,
+                    reason='spam'
+                )
+
+    def _get_list(self):
+        request = self.factory.get(
+            f'/api/tasks/translations/{self.translation.id}/comments/',
+            {'telegram_id': self.READER_TELEGRAM_ID}
+        )
+        request.tenant = self.tenant
+        with CaptureQueriesContext(connection) as queries:
+            response = self.view(request, translation_id=self.translation.id)
+            response.render()
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self._create_threads(1)
+        _, small_page_queries = self._get_list()
+
+        self._create_threads(19)
+        response, full_page_queries = self._get_list()
+
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertEqual(small_page_queries, full_page_queries)
+
+    def test_list_query_count_is_pinned(self):
+        self._create_threads(20)
+        # count + корни + изображения корней + все ответы по пути
+        # + изображения ответов + жалобы
+        with self.assertNumQueries(6):
+            request = self.factory.get(
+                f'/api/tasks/translations/{self.translation.id}/comments/',
+                {'telegram_id': self.READER_TELEGRAM_ID}
+            )
+            request.tenant = self.tenant
+            response = self.view(request, translation_id=self.translation.id)
+            response.render()
+
+        root = response.data['results'][0]
+        self.assertEqual(root['depth'], 0)
+        self.assertEqual(root['replies_count'], 2)
+        self.assertFalse(root['has_reported_by_current_user'])
+        reply = root['replies'][0]
+        self.assertEqual(reply['depth'], 1)
+        self.assertEqual(reply['replies_count'], 1)
+        nested = reply['replies'][0]
+        self.assertEqual(nested['depth'], 2)
+        self.assertTrue(nested['has_reported_by_current_user'])
@@ -0,0 +1,117 @@
+"""
+Тесты материализованного пути комментариев и счётчиков веток.
+"""
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from tasks.comment_serializers import TaskCommentCreateSerializer
+from tasks.comment_views import TaskCommentViewSet
+from tasks.models import Task, TaskComment, TaskTranslation
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+class CommentTreeTestCase(TestCase):
+    """
+    Проверка пути, глубины, загрузки веток и счётчиков ответов.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            slug='tree-tenant',
+            name='Tree Tenant',
+            domain='tree.example.com',
+            site_name='Tree Tenant'
+        )
+        topic = Topic.objects.create(name='Go', description='Go programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=self.tenant)
+        self.translation = TaskTranslation.objects.create(
+            task=task,
+            language='en',
+            question='Question?',
+            answers=['A', 'B'],
+            correct_answer='A'
+        )
+
+    def _comment(self, parent=None):
+        return TaskComment.objects.create(
+            task_translation=self.translation,
+            author_telegram_id=1,
+            author_username='user',
+            text='Comment text',
+            parent_comment=parent
+        )
+
+    def test_reply_depth_is_limited_by_path_length(self):
+        parent = self._comment()
+        for _ in range(TaskComment.MAX_DEPTH):
+            parent = self._comment(parent=parent)
+        # Самый глубокий допустимый путь помещается в поле
+        self.assertEqual(parent.depth, TaskComment.MAX_DEPTH)
+        self.assertEqual(len(parent.path), TaskComment._meta.get_field('path').max_length)
+
+        serializer = TaskCommentCreateSerializer(data={
+            'task_translation': self.translation.pk,
+            'author_telegram_id': 1,
+            'author_username': 'user',
+            'text': 'Too deep',
+            'parent_comment': parent.pk,
+        })
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('parent_comment', serializer.errors)
+
+    def test_path_depth_and_thread_counters(self):
+        root = self._comment()
+        reply = self._comment(parent=root)
+        nested = self._comment(parent=reply)
+
+        self.assertEqual(root.path, TaskComment.make_path_segment(root.id))
+        self.assertEqual(nested.path, root.path + reply.path[-10:] + nested.path[-10:])
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(nested.thread_root_id, root.id)
+
+        root.refresh_from_db()
+        self.assertEqual(root.thread_replies_count, 2)
+        self.assertEqual(root.last_activity_at, nested.created_at)
+
+        self.assertTrue(reply.soft_delete())
+        self.assertFalse(reply.soft_delete())
+        root.refresh_from_db()
+        self.assertEqual(root.thread_replies_count, 1)
+
+    def test_get_subtree_is_single_ordered_query(self):
+        root = self._comment()
+        first = self._comment(parent=root)
+        second = self._comment(parent=root)
+        nested = self._comment(parent=first)
+        self._comment()  # другая ветка
+
+        with self.assertNumQueries(1):
+            subtree = list(root.get_subtree())
+        self.assertEqual([c.id for c in subtree], [root.id, first.id, nested.id, second.id])
+
+        limited = list(root.get_subtree(max_depth=1, include_self=False))
+        self.assertEqual({c.id for c in limited}, {first.id, second.id})
+
+    def test_list_orders_by_thread_activity_and_limits_depth(self):
+        old_thread = self._comment()
+        new_thread = self._comment()
+        reply = self._comment(parent=old_thread)
+        self._comment(parent=reply)
+
+        request = APIRequestFactory().get(
+            f'/api/tasks/translations/{self.translation.id}/comments/',
+            {'ordering': '-last_activity_at', 'reply_depth': 1}
+        )
+        request.tenant = self.tenant
+        response = TaskCommentViewSet.as_view({'get': 'list'})(
+            request, translation_id=self.translation.id
+        )
+
+        results = response.data['results']
+        self.assertEqual([c['id'] for c in results], [old_thread.id, new_thread.id])
+        first_reply = results[0]['replies'][0]
+        self.assertEqual(first_reply['id'], reply.id)
+        self.assertEqual(first_reply['replies'], [])
+        self.assertEqual(first_reply['replies_count'], 1)
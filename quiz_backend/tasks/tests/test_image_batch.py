@@ -0,0 +1,125 @@
+"""
+Тесты пакетной генерации картинок задач.
+"""
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from tasks.models import Task, TaskTranslation
+from tasks.services.image_batch_service import ImageJob, generate_task_images, render_images_batch
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+def fake_render(spec):
+    """Картинка с размером, зависящим от кода: без шрифтов Pygments."""
+    return Image.new('RGB', (10 + len(spec.text), 10), 'black')
+
+
+def fake_upload(png, name, tenant_slug=None, topic_slug=None):
+    Image.open(io.BytesIO(png)).verify()
+    return f'https://cdn.example.com/{tenant_slug}/{name}'
+
+
+def code_question(value):
+    return f"Что выведет код?\n```python\nprint({value})\n```"
+
+
+class ImageBatchTestCase(TestCase):
+    """
+    Одинаковые картинки рисуются один раз, рисование идёт в пуле процессов,
+    результат сохраняется в задачи.
+    """
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(IMAGE_RENDER_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        for target, kwargs in (
+            ('tasks.services.image_batch_service.render_task_image', {'side_effect': fake_render}),
+            ('tasks.services.image_batch_service.upload_png_to_s3', {'side_effect': fake_upload}),
+            ('tasks.services.image_render_cache.find_uploaded_image', {'return_value': None}),
+            ('tasks.services.image_generation_service.resolve_logo_path', {'return_value': None}),
+        ):
+            patcher = patch(target, **kwargs)
+            self.addCleanup(patcher.stop)
+            setattr(self, target.rsplit('.', 1)[1], patcher.start())
+
+    def test_identical_inputs_are_rendered_and_uploaded_once(self):
+        jobs = [ImageJob(task_id, code_question(task_id % 2), 'Python') for task_id in range(1, 5)]
+
+        result = render_images_batch(jobs, workers=1)
+
+        self.assertEqual((result.rendered, result.cached, result.failed), (2, 2, 0))
+        self.assertEqual(self.render_task_image.call_count, 2)
+        self.assertEqual(self.upload_png_to_s3.call_count, 2)
+        self.assertEqual(result.urls[1], result.urls[3])
+        self.assertNotEqual(result.urls[1], result.urls[2])
+
+        # Повторный пакет целиком берётся из кэша
+        result = render_images_batch(jobs, workers=1)
+        self.assertEqual((result.rendered, result.cached), (0, 4))
+        self.assertEqual(self.render_task_image.call_count, 2)
+
+    def test_process_pool_renders_every_image(self):
+        jobs = [ImageJob(task_id, code_question(task_id), 'Python') for task_id in range(1, 7)]
+
+        result = render_images_batch(jobs, workers=3)
+
+        self.assertEqual(result.rendered, 6)
+        self.assertEqual(len(set(result.urls.values())), 6)
+        self.assertGreater(result.images_per_second, 0)
+
+    def test_generate_task_images_saves_urls(self):
+        tenant = Tenant.objects.create(
+            slug='batch-tenant', name='Batch Tenant', domain='batch.example.com', site_name='Batch Tenant'
+        )
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=tenant, error=True)
+        TaskTranslation.objects.create(
+            task=task, language='ru', question=code_question(1), answers=['1', '2'], correct_answer='1'
+        )
+        without_translation = Task.objects.create(topic=topic, difficulty='easy', tenant=tenant)
+
+        result = generate_task_images(
+            Task.objects.filter(id__in=[task.id, without_translation.id]), workers=1
+        )
+
+        self.assertEqual((result.rendered, result.failed), (1, 1))
+        task.refresh_from_db()
+        self.assertTrue(task.image_url.startswith('https://cdn.example.com/batch-tenant/'))
+        self.assertFalse(task.error)
+        self.assertIsNone(result.urls[without_translation.id])
+
+    def test_generate_task_images_uses_prefetched_translations(self):
+        tenant = Tenant.objects.create(
+            slug='batch-prefetch', name='Batch Prefetch', domain='batch-prefetch.example.com', site_name='Batch Prefetch'
+        )
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        tasks = [Task.objects.create(topic=topic, difficulty='easy', tenant=tenant) for _ in range(3)]
+        for index, task in enumerate(tasks):
+            for language in ('ru', 'en'):
+                TaskTranslation.objects.create(
+                    task=task, language=language, question=code_question(index * 10 + len(language)),
+                    answers=['1', '2'], correct_answer='1'
+                )
+        queryset = Task.objects.filter(id__in=[task.id for task in tasks]).select_related(
+            'topic', 'tenant'
+        ).prefetch_related('translations')
+
+        with CaptureQueriesContext(connection) as queries:
+            result = generate_task_images(queryset, workers=1, prefer_language='en')
+
+        self.assertEqual(result.rendered, 3)
+        translation_queries = [query for query in queries.captured_queries if 'task_translations' in query['sql']]
+        # Только сам prefetch, без запроса перевода на каждую задачу
+        self.assertEqual(len(translation_queries), 1)
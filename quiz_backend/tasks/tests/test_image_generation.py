@@ -2,14 +2,24 @@
 Тесты для сервиса генерации изображений.
 """
 from django.test import TestCase
-from PIL import Image
+from PIL import Image, ImageDraw
+from pygments.formatters.img import FontNotFound
 from tasks.services.image_generation_service import (
+    CONSOLE_FONT_SIZES,
+    _get_console_formatter,
+    choose_console_font_size,
     contains_arabic,
     extract_code_from_markdown,
     smart_format_code,
     generate_image_for_task,
     get_lexer,
+    load_unicode_font,
+    measure_code_image,
     prepare_text_for_rendering,
+    render_code_image,
+    text_width,
+    tokenize_code,
+    wrap_text_by_width,
 )
 
 
@@ -167,3 +177,63 @@ class ImageGenerationServiceTestCase(TestCase):
         # Проверяем цвет фона (должен быть изумрудным (6, 78, 59))
         pixel = image.getpixel((WIDTH // 2, HEIGHT // 2)) if 'WIDTH' in locals() else image.getpixel((800, 500))
         self.assertEqual(pixel, (6, 78, 59))
+
+
+class ConsoleFontFitTestCase(TestCase):
+    """
+    Подбор шрифта по замерам должен совпадать с тем, что рисует Pygments.
+    """
+
+    def setUp(self):
+        try:
+            _get_console_formatter(CONSOLE_FONT_SIZES[0])
+        except (FontNotFound, OSError):
+            # Pygments ищет шрифты через fc-list, которого может не быть в окружении
+            self.skipTest('Моноширинный шрифт для Pygments не найден')
+
+    def test_measured_size_matches_rendered_image(self):
+        code = "def f(x):\n\tif x:\n        return 'привет'\n    return None\n"
+        tokens, lines = tokenize_code(code.strip(), get_lexer('python'))
+        for font_size in (CONSOLE_FONT_SIZES[0], CONSOLE_FONT_SIZES[-1]):
+            measured = measure_code_image(_get_console_formatter(font_size), lines)
+            self.assertEqual(render_code_image(tokens, font_size).size, measured)
+
+    def test_long_code_gets_smaller_font(self):
+        _, short_lines = tokenize_code('x = 1', get_lexer('python'))
+        _, long_lines = tokenize_code('\n'.join('x = 1' for _ in range(80)), get_lexer('python'))
+
+        self.assertEqual(choose_console_font_size(short_lines), CONSOLE_FONT_SIZES[0])
+        self.assertLess(choose_console_font_size(long_lines), CONSOLE_FONT_SIZES[0])
+
+
+class TextLayoutTestCase(TestCase):
+    """
+    Раскладка текста по закэшированным ширинам слов.
+    """
+
+    def setUp(self):
+        self.font = load_unicode_font(56, bold=True)
+        self.draw = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+
+    def test_lines_fit_and_keep_all_words(self):
+        text = ("Пророк сказал: «Поистине, дела оцениваются по намерениям». "
+                "إنما الأعمال بالنيات وإنما لكل امرئ ما نوى\nWhich statement is correct?")
+        max_width = 800
+
+        lines = wrap_text_by_width(text, self.font, self.draw, max_width)
+
+        self.assertGreater(len(lines), 2)
+        for line in lines:
+            left, _, right, _ = self.draw.textbbox((0, 0), line, font=self.font)
+            self.assertLessEqual(right - left, max_width)
+        self.assertEqual(' '.join(lines).split(), prepare_text_for_rendering(text).split())
+
+    def test_word_width_is_measured_once(self):
+        text_width(self.font, 'намерениям')
+        original = self.font.getlength
+        self.font.getlength = lambda text: self.fail(f'ширина «{text}» измерена повторно')
+        try:
+            self.assertEqual(text_width(self.font, 'намерениям'), original('намерениям'))
+        finally:
+            del self.font.getlength
+
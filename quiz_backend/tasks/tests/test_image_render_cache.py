@@ -0,0 +1,169 @@
+"""
+Тесты кэша отрисованных изображений задач.
+"""
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from tasks.services import image_generation_service
+from tasks.services.image_generation_service import build_image_render_spec
+from tasks.models import Task
+from tasks.services.image_render_cache import delete_task_images, get_or_create_task_image, release_task_image
+from tenants.models import Tenant
+from topics.models import Topic
+
+QUESTION_RU = "Что выведет код?\n```python\nx = [1, 2, 3]\nprint(x[::-1])\n```"
+QUESTION_EN = "What will the code print?\n```python\nx = [1, 2, 3]\nprint(x[::-1])\n```"
+
+
+class ImageRenderCacheTestCase(TestCase):
+    """
+    Повторная генерация с теми же входными данными не рисует и не загружает картинку.
+    """
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        settings_override = override_settings(IMAGE_RENDER_CACHE_DIR=self.cache_dir, LOGO_PATH=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.render = self._patch('render_task_image', return_value=Image.new('RGB', (10, 10)))
+        self.find = self._patch('find_uploaded_image', return_value=None)
+        self.upload = self._patch(
+            'upload_image_to_s3',
+            side_effect=lambda image, name, **kwargs: f'https://cdn.example.com/images/{name}'
+        )
+        self._patch_logo = patch(
+            'tasks.services.image_generation_service.resolve_logo_path', return_value=None
+        )
+        self._patch_logo.start()
+        self.addCleanup(self._patch_logo.stop)
+
+    def _patch(self, name, **kwargs):
+        patcher = patch(f'tasks.services.image_render_cache.{name}', **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_translations_with_same_code_share_one_render(self):
+        url_ru, cached_ru = get_or_create_task_image(QUESTION_RU, 'Python')
+        url_en, cached_en = get_or_create_task_image(QUESTION_EN, 'Python')
+
+        self.assertFalse(cached_ru)
+        self.assertTrue(cached_en)
+        self.assertEqual(url_ru, url_en)
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(self.upload.call_count, 1)
+        # Второй раз даже хранилище не спрашиваем — хватает локального индекса
+        self.assertEqual(self.find.call_count, 1)
+
+    def test_changed_code_is_rendered_again(self):
+        url_before, _ = get_or_create_task_image(QUESTION_RU, 'Python')
+        url_after, cached = get_or_create_task_image(QUESTION_RU.replace('[::-1]', '[0]'), 'Python')
+
+        self.assertFalse(cached)
+        self.assertNotEqual(url_before, url_after)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_object_already_in_storage_is_not_uploaded(self):
+        self.find.return_value = 'https://cdn.example.com/images/existing.png'
+
+        url, cached = get_or_create_task_image(QUESTION_RU, 'Python')
+
+        self.assertTrue(cached)
+        self.assertEqual(url, 'https://cdn.example.com/images/existing.png')
+        self.render.assert_not_called()
+        self.upload.assert_not_called()
+
+    def test_verify_ignores_local_index(self):
+        get_or_create_task_image(QUESTION_RU, 'Python')
+
+        url, cached = get_or_create_task_image(QUESTION_RU, 'Python', verify=True)
+
+        self.assertFalse(cached)
+        self.assertEqual(self.find.call_count, 2)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_render_key_depends_on_template_logo_and_version(self):
+        spec = build_image_render_spec(QUESTION_RU, 'Python')
+        islamic = build_image_render_spec(QUESTION_RU, 'Python', theme='islamic')
+        self.assertNotEqual(spec.render_key, islamic.render_key)
+
+        # Пробелы в конце строк кода ключ не меняют
+        trailing = build_image_render_spec(QUESTION_RU.replace('3]\n', '3]   \n'), 'Python')
+        self.assertEqual(spec.render_key, trailing.render_key)
+
+        logo_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, logo_dir)
+        logo_path = os.path.join(logo_dir, 'logo.png')
+        Image.new('RGB', (4, 4), 'red').save(logo_path)
+        spec.logo_path = logo_path
+        red_key = spec.render_key
+        Image.new('RGB', (4, 4), 'blue').save(logo_path)
+        os.utime(logo_path, (0, 0))
+        blue_key = spec.render_key
+        self.assertNotEqual(red_key, blue_key)
+
+        with patch.object(image_generation_service, 'IMAGE_RENDERER_VERSION', 999):
+            self.assertNotEqual(spec.render_key, blue_key)
+
+    def test_render_key_follows_formatted_code(self):
+        # Форматтер был недоступен: отрисовка базового форматирования получает свой ключ
+        with patch.object(image_generation_service, 'smart_format_code', return_value='x = [1,2,3]\nprint(x[::-1])'):
+            fallback = build_image_render_spec(QUESTION_RU, 'Python')
+        with patch.object(image_generation_service, 'smart_format_code', return_value='x = [1, 2, 3]\nprint(x[::-1])'):
+            formatted = build_image_render_spec(QUESTION_RU, 'Python')
+
+        self.assertEqual(formatted.text, 'x = [1, 2, 3]\nprint(x[::-1])')
+        self.assertNotEqual(fallback.render_key, formatted.render_key)
+
+    def test_shared_image_is_kept_until_last_task_is_deleted(self):
+        delete = self._patch('delete_image_from_s3', return_value=True)
+        delete_variants = self._patch('delete_variants', return_value=1)
+        url, _ = get_or_create_task_image(QUESTION_RU, 'Python')
+        manifest = {'source': url, 'webp': {'320': url.replace('.png', '_w320.webp')}}
+        tenant = Tenant.objects.create(slug='render-cache', name='Render Cache', domain='render-cache.example.com', site_name='Render Cache')
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task_ru, task_en = (
+            Task.objects.create(topic=topic, difficulty='easy', tenant=tenant, image_url=url, image_variants=manifest)
+            for _ in range(2)
+        )
+
+        # Перевод с тем же кодом ещё ссылается на объект
+        self.assertEqual(delete_task_images([url], [task_ru.pk]), 0)
+        delete.assert_not_called()
+        delete_variants.assert_not_called()
+
+        self.assertEqual(delete_task_images([url], [task_ru.pk, task_en.pk]), 1)
+        delete.assert_called_once_with(url)
+        delete_variants.assert_called_once_with('tasks', manifest)
+
+        # Запись индекса удалена вместе с объектом: картинка рисуется заново
+        _, cached = get_or_create_task_image(QUESTION_RU, 'Python')
+        self.assertFalse(cached)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_replaced_image_is_deleted_when_no_task_references_it(self):
+        delete = self._patch('delete_image_from_s3', return_value=True)
+        old_url, _ = get_or_create_task_image(QUESTION_RU, 'Python')
+        new_url, _ = get_or_create_task_image(QUESTION_RU.replace('[::-1]', '[0]'), 'Python')
+        tenant = Tenant.objects.create(slug='render-cache', name='Render Cache', domain='render-cache.example.com', site_name='Render Cache')
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task, sibling = (
+            Task.objects.create(topic=topic, difficulty='easy', tenant=tenant, image_url=old_url)
+            for _ in range(2)
+        )
+
+        # Перевод ещё показывает прежнюю картинку
+        Task.objects.filter(pk=task.pk).update(image_url=new_url)
+        self.assertFalse(release_task_image(old_url, new_url))
+        delete.assert_not_called()
+
+        Task.objects.filter(pk=sibling.pk).update(image_url=new_url)
+        self.assertTrue(release_task_image(old_url, new_url))
+        delete.assert_called_once_with(old_url)
+        self.assertFalse(release_task_image(new_url, new_url))
@@ -0,0 +1,163 @@
+"""
+Тесты адаптивных копий изображений (WebP/AVIF для srcset).
+"""
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from tasks.models import Task
+from tasks.services.image_variant_service import (
+    build_url_variants,
+    delete_variants,
+    generate_variants,
+    image_srcset,
+    render_variants,
+    variant_name,
+)
+from tasks.services.s3_service import reset_s3_clients, upload_image_to_s3
+from tasks.tests.support.fake_s3 import FakeS3Server
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+@override_settings(IMAGE_VARIANT_WIDTHS=[320, 640, 960], IMAGE_VARIANT_FORMATS=['webp'])
+class RenderVariantsTestCase(SimpleTestCase):
+    def test_widths_never_upscale(self):
+        variants = render_variants(Image.new('RGB', (800, 1000), 'white'))
+
+        self.assertEqual([(fmt, width) for fmt, width, _ in variants], [('webp', 320), ('webp', 640), ('webp', 800)])
+        smallest = Image.open(io.BytesIO(variants[0][2]))
+        self.assertEqual(smallest.format, 'WEBP')
+        self.assertEqual(smallest.size, (320, 400))
+
+    def test_small_image_keeps_only_own_width(self):
+        variants = render_variants(Image.new('P', (200, 100)))
+
+        self.assertEqual([(fmt, width) for fmt, width, _ in variants], [('webp', 200)])
+
+    def test_variant_name_next_to_original(self):
+        self.assertEqual(variant_name('test/images/task_1.png', 'webp', 320), 'test/images/task_1_w320.webp')
+
+
+class ImageSrcsetTestCase(SimpleTestCase):
+    manifest = {
+        'source': 'https://cdn/images/a.png',
+        'webp': {'960': 'https://cdn/a_w960.webp', '320': 'https://cdn/a_w320.webp'},
+        'avif': {'320': 'https://cdn/a_w320.avif'},
+    }
+
+    def test_srcset_sorted_by_width_avif_first(self):
+        srcset = image_srcset(self.manifest, 'https://cdn/images/a.png')
+
+        self.assertEqual(list(srcset), ['avif', 'webp'])
+        self.assertEqual(srcset['webp'], 'https://cdn/a_w320.webp 320w, https://cdn/a_w960.webp 960w')
+
+    def test_stale_manifest_is_not_served(self):
+        self.assertIsNone(image_srcset(self.manifest, 'https://cdn/images/b.png'))
+        self.assertIsNone(image_srcset({}, 'https://cdn/images/a.png'))
+        self.assertIsNone(image_srcset({'source': 'https://cdn/images/a.png'}, 'https://cdn/images/a.png'))
+
+    def test_absolute_urls(self):
+        manifest = {'source': 'avatars/a.png', 'webp': {'320': '/media/avatars/a_w320.webp'}}
+
+        srcset = image_srcset(manifest, 'avatars/a.png', lambda url: f'https://site{url}')
+
+        self.assertEqual(srcset, {'webp': 'https://site/media/avatars/a_w320.webp 320w'})
+
+
+class FileVariantsTestCase(SimpleTestCase):
+    """Копии файла из storage удаляются по манифесту, оригинал остаётся."""
+
+    def test_delete_variants_of_replaced_file(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        with override_settings(MEDIA_ROOT=media_root):
+            original = default_storage.save('blog/posts/photos/a.png', ContentFile(b'png'))
+            variant = default_storage.save(variant_name(original, 'webp', 320), ContentFile(b'webp'))
+            manifest = {'source': original, 'webp': {'320': default_storage.url(variant)}}
+
+            self.assertEqual(delete_variants('blog', manifest), 1)
+
+            self.assertTrue(default_storage.exists(original))
+            self.assertFalse(os.path.exists(os.path.join(media_root, variant)))
+
+
+class UrlVariantsTestCase(SimpleTestCase):
+    """Копии картинки задачи на локальном фейковом S3."""
+
+    def setUp(self):
+        self.server = FakeS3Server().start()
+        self.addCleanup(self.server.stop)
+        reset_s3_clients()
+        self.addCleanup(reset_s3_clients)
+
+    def test_variants_uploaded_next_to_original(self):
+        with override_settings(**self.server.settings(IMAGE_VARIANT_WIDTHS=[320], IMAGE_VARIANT_FORMATS=['webp'])):
+            url = upload_image_to_s3(Image.new('RGB', (640, 480), 'red'), 'task_1.png')
+            manifest = build_url_variants(url)
+
+        self.assertEqual(manifest, {
+            'source': url,
+            'width': 640,
+            'height': 480,
+            'webp': {
+                '320': 'https://cdn.fake-s3.local/test/images/task_1_w320.webp',
+                '640': 'https://cdn.fake-s3.local/test/images/task_1_w640.webp',
+            },
+        })
+        key = (self.server.bucket, 'test/images/task_1_w320.webp')
+        self.assertEqual(self.server.content_types[key], 'image/webp')
+        self.assertEqual(Image.open(io.BytesIO(self.server.objects[key])).size, (320, 240))
+
+    def test_delete_variants_keeps_original(self):
+        with override_settings(**self.server.settings(IMAGE_VARIANT_WIDTHS=[320], IMAGE_VARIANT_FORMATS=['webp'])):
+            url = upload_image_to_s3(Image.new('RGB', (640, 480), 'red'), 'task_2.png')
+            manifest = build_url_variants(url)
+
+            self.assertEqual(delete_variants('tasks', manifest), 2)
+
+        self.assertEqual([key for _, key in self.server.objects], ['test/images/task_2.png'])
+
+
+class TaskVariantsTestCase(TestCase):
+    """Копии заменённой картинки задачи удаляются, когда их не использует ни одна задача."""
+
+    def setUp(self):
+        self.server = FakeS3Server().start()
+        self.addCleanup(self.server.stop)
+        reset_s3_clients()
+        self.addCleanup(reset_s3_clients)
+        settings_override = override_settings(**self.server.settings(IMAGE_VARIANT_WIDTHS=[320], IMAGE_VARIANT_FORMATS=['webp']))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.tenant = Tenant.objects.create(slug='variants', name='Variants', domain='variants.example.com', site_name='Variants')
+        self.topic = Topic.objects.create(name='Python', description='Python programming')
+
+    def test_replaced_image_variants_are_deleted_with_last_reference(self):
+        old_url = upload_image_to_s3(Image.new('RGB', (640, 480), 'red'), 'task_old.png')
+        new_url = upload_image_to_s3(Image.new('RGB', (640, 480), 'blue'), 'task_new.png')
+        task, sibling = (
+            Task.objects.create(topic=self.topic, difficulty='easy', tenant=self.tenant, image_url=old_url)
+            for _ in range(2)
+        )
+        generate_variants('tasks', task.pk)
+        generate_variants('tasks', sibling.pk)
+        old_variant = (self.server.bucket, 'test/images/task_old_w320.webp')
+        self.assertIn(old_variant, self.server.objects)
+
+        # Перевод ещё отдаёт копии прежней картинки
+        Task.objects.filter(pk=task.pk).update(image_url=new_url)
+        generate_variants('tasks', task.pk)
+        self.assertIn(old_variant, self.server.objects)
+
+        Task.objects.filter(pk=sibling.pk).update(image_url=new_url)
+        generate_variants('tasks', sibling.pk)
+        self.assertNotIn(old_variant, self.server.objects)
+        self.assertIn((self.server.bucket, 'test/images/task_old.png'), self.server.objects)
+        self.assertIn((self.server.bucket, 'test/images/task_new_w320.webp'), self.server.objects)
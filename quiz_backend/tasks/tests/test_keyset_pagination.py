@@ -0,0 +1,107 @@
+"""
+Тесты курсорной пагинации по (created_at, id).
+"""
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from tasks.comment_views import TaskCommentViewSet
+from tasks.pagination import CustomPageNumberPagination
+from tasks.models import Task, TaskComment, TaskTranslation
+from tenants.models import Tenant
+from topics.models import Topic
+
+
+def _query(url):
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+
+
+class CommentKeysetPaginationTestCase(TestCase):
+    """
+    Список комментариев листается курсором без OFFSET и COUNT на каждой странице.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(
+            slug='keyset-tenant',
+            name='Keyset Tenant',
+            domain='keyset.example.com',
+            site_name='Keyset Tenant'
+        )
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=self.tenant)
+        self.translation = TaskTranslation.objects.create(
+            task=task,
+            language='en',
+            question='Question?',
+            answers=['A', 'B'],
+            correct_answer='A'
+        )
+        # Одинаковое время у всех комментариев: порядок решает id
+        created_at = timezone.now()
+        self.comments = []
+        for index in range(25):
+            comment = TaskComment.objects.create(
+                task_translation=self.translation,
+                author_telegram_id=1,
+                author_username='user1',
+                text=f'Comment {index}'
+            )
+            self.comments.append(comment)
+        TaskComment.objects.update(created_at=created_at)
+        self.factory = APIRequestFactory()
+        self.view = TaskCommentViewSet.as_view({'get': 'list'})
+
+    def _get(self, params=None):
+        request = self.factory.get(
+            f'/api/tasks/translations/{self.translation.id}/comments/', params or {}
+        )
+        request.tenant = self.tenant
+        response = self.view(request, translation_id=self.translation.id)
+        response.render()
+        return response
+
+    def test_pages_follow_cursor_without_gaps(self):
+        first = self._get()
+        self.assertEqual(first.data['count'], 25)
+        self.assertIsNone(first.data['previous'])
+        cursor = _query(first.data['next'])['cursor']
+
+        # корни + изображения + ответы; без COUNT — количество берётся из курсора
+        with self.assertNumQueries(3):
+            second = self._get({'cursor': cursor})
+        self.assertEqual(second.data['count'], 25)
+        self.assertIsNone(second.data['next'])
+
+        ids = [item['id'] for item in first.data['results'] + second.data['results']]
+        expected = [comment.id for comment in reversed(self.comments)]
+        self.assertEqual(ids, expected)
+
+        # Ссылка previous со второй страницы ведёт на первую
+        previous = _query(second.data['previous'])
+        self.assertNotIn('cursor', previous)
+
+    def test_page_number_is_still_supported(self):
+        response = self._get({'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['id'], self.comments[4].id)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self._get({'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_unordered_list_without_created_at_uses_page_numbers(self):
+        """Модель без created_at и без сортировки листается обычной пагинацией."""
+        request = self.factory.get('/api/translations/', {'page_size': 1})
+        paginator = CustomPageNumberPagination()
+        queryset = TaskTranslation.objects.order_by()
+
+        rows = paginator.paginate_queryset(queryset, APIView().initialize_request(request))
+
+        self.assertFalse(paginator.keyset)
+        self.assertEqual([row.id for row in rows], [self.translation.id])
+        self.assertEqual(paginator.get_total_count(), 1)
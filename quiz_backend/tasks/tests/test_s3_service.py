@@ -2,15 +2,23 @@
 Тесты для S3/R2 сервиса.
 Поддерживает тестирование как AWS S3, так и Cloudflare R2.
 """
-from django.test import TestCase
+import os
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
 from unittest.mock import patch, MagicMock
 from PIL import Image
 from tasks.services.s3_service import (
     extract_s3_key_from_url,
+    get_s3_client,
+    reset_s3_clients,
     upload_image_to_s3,
     delete_image_from_s3,
-    upload_video_to_r2
+    delete_objects_from_s3,
+    upload_video_to_r2,
+    upload_video_to_s3,
 )
+from tasks.tests.support.fake_s3 import FakeS3Server
 
 
 class S3ServiceTestCase(TestCase):
@@ -18,6 +26,11 @@ class S3ServiceTestCase(TestCase):
     Тесты для работы с AWS S3 и Cloudflare R2.
     """
 
+    def setUp(self):
+        # Общий клиент процесса иначе пережил бы подмену boto3.client из прошлого теста
+        reset_s3_clients()
+        self.addCleanup(reset_s3_clients)
+
     def test_extract_s3_key_from_url(self):
         """
         Тест извлечения ключа S3 из URL.
@@ -180,3 +193,67 @@ class S3ServiceTestCase(TestCase):
         call_args = mock_s3.put_object.call_args
         self.assertEqual(call_args[1]['ContentType'], 'video/mp4')
 
+
+class S3TransferTestCase(SimpleTestCase):
+    """
+    Общий клиент и потоковая загрузка видео на локальном фейковом S3.
+    """
+
+    def setUp(self):
+        self.server = FakeS3Server().start()
+        self.addCleanup(self.server.stop)
+        reset_s3_clients()
+        self.addCleanup(reset_s3_clients)
+
+    def test_client_is_shared_between_uploads(self):
+        with override_settings(**self.server.settings()):
+            client = get_s3_client()
+            first = upload_image_to_s3(Image.new('RGB', (64, 64), 'red'), 'first.png')
+            second = upload_image_to_s3(Image.new('RGB', (64, 64), 'blue'), 'second.png')
+
+            self.assertIs(get_s3_client(), client)
+
+        self.assertEqual(first, 'https://cdn.fake-s3.local/test/images/first.png')
+        self.assertIsNotNone(second)
+        self.assertEqual(self.server.calls['PutObject'], 2)
+        # Обе загрузки прошли по одному соединению из пула
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_large_video_uploaded_in_parts(self):
+        video_bytes = os.urandom(11 * 1024 * 1024)
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as f:
+            f.write(video_bytes)
+        self.addCleanup(os.unlink, f.name)
+
+        with override_settings(**self.server.settings(S3_MULTIPART_PART_SIZE_MB=5, S3_MULTIPART_CONCURRENCY=2)):
+            url = upload_video_to_s3(f.name, 'task_1_ru.mp4')
+
+        key = (self.server.bucket, 'test/videos/task_1_ru.mp4')
+        self.assertEqual(url, 'https://cdn.fake-s3.local/test/videos/task_1_ru.mp4')
+        self.assertEqual(self.server.calls['UploadPart'], 3)
+        self.assertEqual(self.server.calls['PutObject'], 0)
+        self.assertEqual(self.server.max_part_size, 5 * 1024 * 1024)
+        self.assertEqual(self.server.objects[key], video_bytes)
+        self.assertEqual(self.server.content_types[key], 'video/mp4')
+
+    def test_small_video_bytes_use_single_put(self):
+        with override_settings(**self.server.settings()):
+            url = upload_video_to_r2(b'fake video content', 'short.webm')
+
+        self.assertIsNotNone(url)
+        self.assertEqual(self.server.calls['PutObject'], 1)
+        self.assertEqual(self.server.content_types[(self.server.bucket, 'test/videos/short.webm')], 'video/webm')
+
+    def test_delete_objects_in_batches_of_1000(self):
+        with override_settings(**self.server.settings()):
+            client = get_s3_client()
+            keys = [f'test/videos/{number}.mp4' for number in range(2500)]
+            for key in keys[:3]:
+                client.put_object(Bucket=self.server.bucket, Key=key, Body=b'video')
+
+            deleted, errors = delete_objects_from_s3(keys + keys[:10])
+
+        self.assertEqual(deleted, set(keys))
+        self.assertEqual(errors, {})
+        self.assertEqual(self.server.calls['DeleteObjects'], 3)
+        self.assertEqual(self.server.objects, {})
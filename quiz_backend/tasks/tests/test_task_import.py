@@ -65,9 +65,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             self.assertEqual(result['failed_tasks'], 0)
@@ -117,9 +116,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 2)  # 2 перевода = 2 задачи
             
@@ -219,9 +217,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             task = Task.objects.get(id=result['successfully_loaded_ids'][0])
@@ -259,9 +256,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             task = Task.objects.get(id=result['successfully_loaded_ids'][0])
@@ -311,9 +307,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
 
@@ -367,9 +362,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
 
@@ -435,9 +429,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             self.assertEqual(Topic.objects.count(), 2)  # Python из setUp + существующая Arabic Language
@@ -495,9 +488,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             self.assertEqual(
@@ -547,9 +539,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             task = Task.objects.get(id=result['successfully_loaded_ids'][0])
@@ -591,9 +582,8 @@ class TaskImportServiceTestCase(TestCase):
         json_file = self.create_test_json_file(tasks_data)
 
         try:
-            with patch('tasks.services.task_import_service.generate_image_for_task', return_value=None):
-                with patch('tasks.services.task_import_service.upload_image_to_s3', return_value=None):
-                    result = import_tasks_from_json(json_file, publish=False)
+            with patch('tasks.services.task_import_service.get_or_create_task_image', return_value=(None, False)):
+                result = import_tasks_from_json(json_file, publish=False)
 
             self.assertEqual(result['successfully_loaded'], 1)
             task = Task.objects.get(id=result['successfully_loaded_ids'][0])
@@ -0,0 +1,109 @@
+"""
+Тесты общего клиента Telegram Bot API на локальном фейковом сервере.
+"""
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from config.telegram_client import (
+    TelegramAPIError,
+    TelegramBotClient,
+    get_bot_client,
+    reset_bot_clients,
+)
+from tasks.tests.support.fake_bot_api import FakeBotAPIServer
+
+
+class TelegramBotClientTestCase(SimpleTestCase):
+    """
+    Повторы по retry_after, backoff на 5xx, лимиты на чат и пул соединений.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeBotAPIServer().start()
+        cls.base_url = cls.server.base_url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.reset()
+        self.events = []
+        self.sleeps = []
+        self.client = TelegramBotClient('TEST', base_url=self.base_url, metrics_hook=self.events.append)
+        self.client.sleep = self.sleeps.append
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_retry_after_is_respected(self):
+        self.server.responses.append((429, {
+            'ok': False, 'error_code': 429,
+            'description': 'Too Many Requests: retry after 7',
+            'parameters': {'retry_after': 7},
+        }))
+
+        result = self.client.send_message(42, 'Привет', parse_mode='HTML')
+
+        self.assertEqual(result['message_id'], 1)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIn('application/json', self.server.requests[0]['content_type'])
+        self.assertAlmostEqual(self.sleeps[-1], 7, delta=0.5)
+        self.assertEqual([event['status'] for event in self.events], [429, 200])
+        self.assertEqual(self.events[0]['retry_after'], 7)
+        self.assertTrue(self.events[1]['ok'])
+        # Оба запроса пошли по одному keep-alive соединению
+        ports = {request['client_port'] for request in self.server.requests}
+        self.assertEqual(len(ports), 1)
+
+    def test_server_errors_back_off_and_client_errors_raise(self):
+        self.server.responses.append((502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}))
+        self.client.send_message(42, 'text')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(len(self.sleeps), 1)
+
+        self.server.responses.append((403, {
+            'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'
+        }))
+        with self.assertRaises(TelegramAPIError) as ctx:
+            self.client.send_message(43, 'text')
+        self.assertEqual(ctx.exception.error_code, 403)
+        self.assertTrue(ctx.exception.chat_unavailable)
+        self.assertEqual(len(self.server.requests), 3)
+
+    @override_settings(TELEGRAM_API_CHAT_RATE=1)
+    def test_private_chat_is_rate_limited(self):
+        for index in range(4):
+            self.client.send_message(42, f'message {index}')
+        # Первые три сообщения уходят сразу (burst), четвёртое ждёт ~1 секунду
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertAlmostEqual(self.sleeps[0], 1.0, delta=0.1)
+
+        # Другой чат не ждёт чужой корзины
+        self.client.send_message(77, 'other chat')
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_upload_sends_multipart_with_json_markup(self):
+        photo = ContentFile(b'\x89PNG fake', name='photo.png')
+        self.client.send_photo(
+            -100123, photo_path=photo, caption='Подпись', parse_mode='HTML',
+            reply_markup={'inline_keyboard': [[{'text': 'Open', 'url': 'https://example.com'}]]}
+        )
+
+        request = self.server.requests[0]
+        self.assertTrue(request['path'].endswith('/botTEST/sendPhoto'))
+        self.assertIn('multipart/form-data', request['content_type'])
+        self.assertIn(b'\x89PNG fake', request['body'])
+        self.assertIn(b'"inline_keyboard"', request['body'])
+        self.assertIn(b'HTML', request['body'])
+
+    def test_registry_shares_client_per_token(self):
+        reset_bot_clients()
+        try:
+            self.assertIs(get_bot_client('A'), get_bot_client('A'))
+            self.assertIsNot(get_bot_client('A'), get_bot_client('B'))
+        finally:
+            reset_bot_clients()
@@ -2,7 +2,8 @@
 Тесты для Telegram сервиса.
 """
 from django.test import TestCase
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from config.telegram_client import TelegramAPIError
 from tasks.services.telegram_service import (
     escape_markdown_v2,
     send_photo,
@@ -28,24 +29,22 @@ class TelegramServiceTestCase(TestCase):
         self.assertIn('\\!', escaped)
         self.assertIn('\\=', escaped)
 
-    @patch('tasks.services.telegram_service.requests.post')
+    @patch('tasks.services.telegram_service.get_bot_client')
     @patch('tasks.services.telegram_service.settings')
-    def test_send_photo_success(self, mock_settings, mock_post):
+    def test_send_photo_success(self, mock_settings, mock_get_client):
         """
         Тест успешной отправки фото.
         """
         mock_settings.TELEGRAM_BOT_TOKEN = 'test_token'
         
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'ok': True, 'result': {'message_id': 123}}
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+        client = mock_get_client.return_value
+        client.send_photo.return_value = {'message_id': 123}
 
         result = send_photo('-1001234567890', 'https://example.com/image.png', 'Test caption')
 
         self.assertIsNotNone(result)
         self.assertEqual(result['message_id'], 123)
-        mock_post.assert_called_once()
+        client.send_photo.assert_called_once()
 
     @patch('tasks.services.telegram_service.settings')
     def test_send_photo_without_token(self, mock_settings):
@@ -58,36 +57,31 @@ class TelegramServiceTestCase(TestCase):
 
         self.assertIsNone(result)
 
-    @patch('tasks.services.telegram_service.requests.post')
+    @patch('tasks.services.telegram_service.get_bot_client')
     @patch('tasks.services.telegram_service.settings')
-    def test_send_message_success(self, mock_settings, mock_post):
+    def test_send_message_success(self, mock_settings, mock_get_client):
         """
         Тест успешной отправки сообщения.
         """
         mock_settings.TELEGRAM_BOT_TOKEN = 'test_token'
         
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'ok': True, 'result': {'message_id': 124}}
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+        mock_get_client.return_value.send_message.return_value = {'message_id': 124}
 
         result = send_message('-1001234567890', 'Test message')
 
         self.assertIsNotNone(result)
         self.assertEqual(result['message_id'], 124)
 
-    @patch('tasks.services.telegram_service.requests.post')
+    @patch('tasks.services.telegram_service.get_bot_client')
     @patch('tasks.services.telegram_service.settings')
-    def test_send_poll_success(self, mock_settings, mock_post):
+    def test_send_poll_success(self, mock_settings, mock_get_client):
         """
         Тест успешной отправки опроса.
         """
         mock_settings.TELEGRAM_BOT_TOKEN = 'test_token'
         
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'ok': True, 'result': {'poll': {'id': 'poll_123'}}}
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+        client = mock_get_client.return_value
+        client.call.return_value = {'poll': {'id': 'poll_123'}}
 
         result = send_poll(
             '-1001234567890',
@@ -98,20 +92,17 @@ class TelegramServiceTestCase(TestCase):
         )
 
         self.assertIsNotNone(result)
-        mock_post.assert_called_once()
+        client.call.assert_called_once()
 
-    @patch('tasks.services.telegram_service.requests.post')
+    @patch('tasks.services.telegram_service.get_bot_client')
     @patch('tasks.services.telegram_service.settings')
-    def test_send_message_api_error(self, mock_settings, mock_post):
+    def test_send_message_api_error(self, mock_settings, mock_get_client):
         """
         Тест обработки ошибки API.
         """
         mock_settings.TELEGRAM_BOT_TOKEN = 'test_token'
         
-        mock_response = MagicMock()
-        mock_response.json.return_value = {'ok': False, 'description': 'Bad Request'}
-        mock_response.raise_for_status = MagicMock()
-        mock_post.return_value = mock_response
+        mock_get_client.return_value.send_message.side_effect = TelegramAPIError('Bad Request', 400)
 
         result = send_message('-1001234567890', 'Test message')
 
@@ -0,0 +1,121 @@
+"""
+Тесты для дневного ряда активности пользователя (UserDailyActivity).
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import MiniAppUser
+from tasks.models import MiniAppTaskStatistics, Task, TaskStatistics, TaskTranslation, UserDailyActivity
+from tenants.models import Tenant
+from topics.models import Topic
+
+User = get_user_model()
+
+
+class UserDailyActivityTestCase(TestCase):
+    """
+    Тесты записи ответов в дневной ряд и расчёта серий.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='activity_user',
+            email='activity@example.com',
+            password='testpass123'
+        )
+
+    def test_record_increments_single_row_per_day(self):
+        """Несколько ответов за день складываются в одну строку."""
+        UserDailyActivity.record(self.user, successful=True)
+        UserDailyActivity.record(self.user, successful=False)
+        UserDailyActivity.record(self.user, successful=True)
+
+        rows = UserDailyActivity.objects.filter(user=self.user)
+        self.assertEqual(rows.count(), 1)
+        self.assertEqual(rows.get().attempts, 3)
+        self.assertEqual(rows.get().successful, 2)
+
+    def test_get_series_limits_days(self):
+        """get_series(days=N) возвращает только последние N дней."""
+        now = timezone.now()
+        UserDailyActivity.record(self.user, when=now - timedelta(days=40))
+        UserDailyActivity.record(self.user, when=now - timedelta(days=5))
+        UserDailyActivity.record(self.user, when=now)
+
+        self.assertEqual(len(UserDailyActivity.get_series(self.user)), 3)
+        recent = UserDailyActivity.get_series(self.user, days=30)
+        self.assertEqual([row['date'] for row in recent],
+                         [timezone.localdate(now - timedelta(days=5)), timezone.localdate(now)])
+
+    def test_compute_streaks(self):
+        """Серии считаются по дням подряд с активностью."""
+        today = date(2025, 3, 10)
+
+        def series(*offsets):
+            return [{'date': today - timedelta(days=o), 'attempts': 1, 'successful': 1}
+                    for o in sorted(offsets, reverse=True)]
+
+        self.assertEqual(UserDailyActivity.compute_streaks([], today), (0, 0))
+        # Сегодня, вчера, позавчера + старая серия из 4 дней
+        self.assertEqual(
+            UserDailyActivity.compute_streaks(series(0, 1, 2, 10, 11, 12, 13), today),
+            (3, 4)
+        )
+        # Сегодня ещё не отвечал, но вчера отвечал — серия не прерывается
+        self.assertEqual(UserDailyActivity.compute_streaks(series(1, 2), today), (2, 2))
+        # Пропущен день — текущая серия обнуляется
+        self.assertEqual(UserDailyActivity.compute_streaks(series(2, 3), today), (0, 2))
+
+    def test_dashboard_and_mini_app_stats_read_series(self):
+        """Статистика профиля строится по дневному ряду."""
+        now = timezone.now()
+        UserDailyActivity.record(self.user, successful=True, when=now - timedelta(days=1))
+        UserDailyActivity.record(self.user, successful=True, when=now)
+        UserDailyActivity.record(self.user, successful=False, when=now)
+
+        dashboard = TaskStatistics.get_stats_for_dashboard(self.user)
+        self.assertEqual(dashboard['activity_data'], [1, 2])
+        self.assertTrue(dashboard['has_activity_data'])
+
+        mini_app = TaskStatistics.get_stats_for_mini_app(self.user)
+        self.assertEqual(mini_app['stats']['current_streak'], 2)
+        self.assertEqual(mini_app['stats']['best_streak'], 2)
+
+        activity = TaskStatistics.get_activity_stats(self.user)
+        self.assertEqual(sum(row['attempts'] for row in activity), 3)
+
+    def test_mini_app_answer_is_counted_once_per_translation_group(self):
+        """Ответ в мини-аппе учитывается при отправке; слияние статистики ряд не меняет."""
+        tenant = Tenant.objects.create(slug='activity', name='Activity', domain='activity.example.com', site_name='Activity')
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task_ru, task_en = (
+            Task.objects.create(topic=topic, difficulty='easy', tenant=tenant, published=True)
+            for _ in range(2)
+        )
+        Task.objects.filter(pk=task_en.pk).update(translation_group_id=task_ru.translation_group_id)
+        for task, language in ((task_ru, 'ru'), (task_en, 'en')):
+            TaskTranslation.objects.create(
+                task=task, language=language, question='?', answers=['a', 'b'], correct_answer='a'
+            )
+        mini_app_user = MiniAppUser.objects.create(
+            tenant=tenant, telegram_id=4004, username='activity_mini', language='en', linked_custom_user=self.user
+        )
+
+        response = self.client.post(
+            reverse('tasks:submit-mini-app-task', args=[task_en.pk]), {'telegram_id': 4004, 'answer': 'a'},
+            content_type='application/json', HTTP_X_TENANT_SLUG=tenant.slug
+        )
+        self.assertEqual(response.status_code, 200)
+        # Копия статистики для перевода создана, но в ряд ответ попал один раз
+        self.assertEqual(MiniAppTaskStatistics.objects.filter(mini_app_user=mini_app_user).count(), 2)
+        expected = [{'date': timezone.localdate(), 'attempts': 1, 'successful': 1}]
+        self.assertEqual(UserDailyActivity.get_series(self.user), expected)
+
+        mini_app_user.merge_statistics_with_custom_user(self.user)
+        mini_app_user.merge_statistics_with_custom_user(self.user)
+
+        self.assertEqual(UserDailyActivity.get_series(self.user), expected)
@@ -0,0 +1,92 @@
+"""
+Тесты аудиодорожки видео с набором кода.
+"""
+import os
+import shutil
+import tempfile
+import wave
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from tasks.services import video_audio_service
+from tasks.services.ffmpeg_service import get_ffmpeg_binary
+from tasks.services.video_audio_service import SAMPLE_RATE, build_audio_bed, keystroke_gain, timeline_signature
+from tasks.services.video_timeline import HoldSegment, TypingSegment
+
+
+def write_tone(path, seconds, amplitude=0.5):
+    """Стерео WAV с постоянной амплитудой (проще проверять сведение)."""
+    samples = np.full((int(seconds * SAMPLE_RATE), 2), amplitude * 32767, dtype='<i2')
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wav:
+        frames = wav.readframes(wav.getnframes())
+    return np.frombuffer(frames, dtype='<i2').reshape(-1, 2) / 32767
+
+
+class KeystrokeGainTestCase(SimpleTestCase):
+    """
+    Клавиатура звучит в сегментах печати и молчит в статичных.
+    """
+
+    def test_gain_follows_timeline(self):
+        segments = [TypingSegment(list(range(1, 25))), HoldSegment(24, 24)]
+
+        gain = keystroke_gain(segments, fps=24, total_samples=2 * SAMPLE_RATE)
+
+        self.assertEqual(len(gain), 2 * SAMPLE_RATE)
+        self.assertAlmostEqual(float(gain[SAMPLE_RATE // 2]), 1.0, places=5)
+        self.assertAlmostEqual(float(gain[SAMPLE_RATE + SAMPLE_RATE // 2]), 0.0, places=5)
+        # Переход на границе плавный
+        self.assertTrue(0.0 < gain[SAMPLE_RATE] < 1.0)
+
+    def test_signature_ignores_visible_chars(self):
+        self.assertEqual(
+            timeline_signature([TypingSegment([1, 2, 3]), HoldSegment(3, 20)]),
+            timeline_signature([TypingSegment([5, 9, 11]), HoldSegment(11, 20)]),
+        )
+
+
+class AudioBedTestCase(SimpleTestCase):
+    """
+    Звуки декодируются один раз на воркер, дорожки кэшируются по таймлайну.
+    """
+
+    def setUp(self):
+        if not os.path.exists(get_ffmpeg_binary()) and not shutil.which(get_ffmpeg_binary()):
+            self.skipTest('ffmpeg не найден')
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        video_audio_service._decoded_asset.cache_clear()
+        self.addCleanup(video_audio_service._decoded_asset.cache_clear)
+        self.keyboard = os.path.join(self.temp_dir, 'keyboard.wav')
+        self.background = os.path.join(self.temp_dir, 'background.wav')
+        write_tone(self.keyboard, 3, amplitude=0.4)
+        write_tone(self.background, 0.5, amplitude=0.5)
+
+    def test_mixes_and_caches_track(self):
+        segments = [TypingSegment(list(range(1, 25))), HoldSegment(24, 24)]
+
+        with override_settings(VIDEO_AUDIO_CACHE_DIR=os.path.join(self.temp_dir, 'cache'), BACKGROUND_AUDIO_VOLUME=0.2), \
+                patch('tasks.services.video_audio_service.decode_audio', wraps=video_audio_service.decode_audio) as decode:
+            first = build_audio_bed(segments, 24, self.keyboard, self.background)
+            second = build_audio_bed(segments, 24, self.keyboard, self.background)
+
+        self.assertEqual(first, second)
+        self.assertEqual(decode.call_count, 2)
+        samples = read_wav(first)
+        self.assertEqual(len(samples), 2 * SAMPLE_RATE)
+        # Печать: клавиатура + зацикленный фон; пауза: только фон
+        self.assertAlmostEqual(float(samples[SAMPLE_RATE // 2, 0]), 0.4 + 0.5 * 0.2, places=2)
+        self.assertAlmostEqual(float(samples[SAMPLE_RATE + SAMPLE_RATE // 2, 0]), 0.5 * 0.2, places=2)
+
+    def test_without_assets_returns_none(self):
+        self.assertIsNone(build_audio_bed([HoldSegment(1, 24)], 24))
@@ -0,0 +1,126 @@
+"""
+Тесты кодирования видео по кускам.
+"""
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from pygments.formatters.img import FontNotFound
+
+from tasks.services.code_typing_renderer import CodeTypingRenderer, _get_video_code_formatter
+from tasks.services.ffmpeg_service import _run_ffmpeg, get_ffmpeg_binary
+from tasks.services.video_chunking import (
+    chunk_parallelism,
+    encode_timeline_chunked,
+    estimate_chunk_memory,
+    frame_ranges,
+    overlay_video_chunked,
+    split_timeline,
+)
+from tasks.services.video_timeline import (
+    HoldSegment,
+    TypingSegment,
+    build_typing_timeline,
+    encode_timeline,
+    timeline_frames,
+)
+from tasks.tests.test_video_timeline import count_frames
+
+
+def flatten(segments):
+    """Видимых символов в каждом кадре таймлайна."""
+    frames = []
+    for segment in segments:
+        if isinstance(segment, HoldSegment):
+            frames.extend([segment.visible_chars] * segment.frames)
+        else:
+            frames.extend(segment.visible_chars)
+    return frames
+
+
+class SplitTimelineTestCase(SimpleTestCase):
+    """
+    Куски покрывают таймлайн целиком и по порядку.
+    """
+
+    def test_chunks_keep_every_frame_in_order(self):
+        segments = build_typing_timeline(total_chars=300, typing_frames=200, pause_frames=100)
+
+        chunks = split_timeline(segments, 4)
+
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(flatten([segment for chunk in chunks for segment in chunk]), flatten(segments))
+        typing = [sum(s.frames for s in chunk if isinstance(s, TypingSegment)) for chunk in chunks]
+        self.assertLessEqual(max(typing) - min(typing[:-1]), 10)
+
+    def test_hold_segments_are_not_split(self):
+        segments = [TypingSegment([1, 2, 3]), HoldSegment(3, 500)]
+
+        chunks = split_timeline(segments, 3)
+
+        self.assertEqual(timeline_frames([segment for chunk in chunks for segment in chunk]), 503)
+        self.assertIn(HoldSegment(3, 500), [segment for chunk in chunks for segment in chunk])
+
+    def test_frame_ranges(self):
+        self.assertEqual(frame_ranges(10, 3), [(0, 3), (3, 7), (7, 10)])
+        self.assertEqual(frame_ranges(2, 5), [(0, 1), (1, 2)])
+
+    @override_settings(VIDEO_CHUNK_WORKERS=8, VIDEO_CHUNK_MIN_FRAMES=10)
+    def test_parallelism_is_limited_by_memory_budget(self):
+        per_chunk = estimate_chunk_memory(1080, 1920, 'medium')
+
+        with override_settings(VIDEO_CHUNK_MEMORY_BUDGET_MB=per_chunk * 3 // (1024 * 1024) + 1):
+            self.assertEqual(chunk_parallelism(720, 1080, 1920, 'medium'), 3)
+        with override_settings(VIDEO_CHUNK_MEMORY_BUDGET_MB=1):
+            self.assertEqual(chunk_parallelism(720, 1080, 1920, 'medium'), 1)
+        self.assertEqual(chunk_parallelism(25, 1080, 1920, 'ultrafast'), 2)
+
+
+class ChunkedEncodingTestCase(SimpleTestCase):
+    """
+    Куски кодируются параллельно и склеиваются в видео той же длины.
+    """
+
+    def setUp(self):
+        if not os.path.exists(get_ffmpeg_binary()) and not shutil.which(get_ffmpeg_binary()):
+            self.skipTest('ffmpeg не найден')
+        try:
+            _get_video_code_formatter(55)
+        except (FontNotFound, OSError):
+            self.skipTest('Моноширинный шрифт для Pygments не найден')
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+
+    @override_settings(VIDEO_CHUNK_WORKERS=3, VIDEO_CHUNK_MIN_FRAMES=10)
+    def test_chunked_timeline_has_every_frame(self):
+        code = "for i in range(3):\n    print(i)\n\n"
+        make_renderer = lambda: CodeTypingRenderer(code, 'python', question_text=None, width=540, height=960)
+        renderer = make_renderer()
+        segments = build_typing_timeline(renderer.total_chars, 40, 20)
+        output_path = os.path.join(self.temp_dir, 'out.mp4')
+
+        encode_timeline_chunked(renderer, make_renderer, segments, output_path, 24,
+                                preset='ultrafast', lossless=True)
+
+        self.assertEqual(count_frames(output_path), 60)
+        self.assertEqual(os.listdir(self.temp_dir), ['out.mp4'])
+
+    @override_settings(VIDEO_CHUNK_WORKERS=3, VIDEO_CHUNK_MIN_FRAMES=10)
+    def test_chunked_overlay_seeks_to_each_chunk(self):
+        code = "x = 1\n"
+        renderer = CodeTypingRenderer(code, 'python', question_text=None, width=540, height=960)
+        clip_path = os.path.join(self.temp_dir, 'clip.mp4')
+        encode_timeline(renderer, build_typing_timeline(renderer.total_chars, 40, 20), clip_path, 24,
+                        preset='ultrafast', lossless=True)
+        output_path = os.path.join(self.temp_dir, 'out.mp4')
+
+        with patch('tasks.services.ffmpeg_service._run_ffmpeg', wraps=_run_ffmpeg) as run:
+            overlay_video_chunked(clip_path, output_path, 60, 540, 960, 24,
+                                  overlay=Image.new('RGBA', (100, 50), 'red'), preset='ultrafast')
+
+        self.assertEqual(count_frames(output_path), 60)
+        seeks = sorted(call.args[0][1] for call in run.call_args_list if call.args[0][0] == '-ss')
+        self.assertEqual(seeks, [f'{19.5 / 24:.6f}', f'{39.5 / 24:.6f}'])
@@ -0,0 +1,142 @@
+"""
+Тесты блокировок и дедупликации генерации видео.
+"""
+import time
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from config.tasks import generate_video_for_task_async
+from tasks.models import Task
+from tasks.services.video_job_service import (
+    STATE_RUNNING,
+    VideoJobLock,
+    discard_queued_video_job,
+    enqueue_video_job,
+    find_inflight_video_job,
+    record_video_result,
+    video_job_key,
+)
+from tenants.models import Tenant
+from topics.models import Topic
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'video-jobs'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, VIDEO_JOB_LOCK_LEASE=60, VIDEO_JOB_QUEUED_TTL=600)
+class VideoJobLockTestCase(TestCase):
+    """
+    Одна генерация на (задачу, язык): повторы присоединяются, упавшие воркеры не держат ключ.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_duplicate_enqueue_attaches_to_inflight_job(self):
+        celery_task = MagicMock()
+
+        first_id, first_attached = enqueue_video_job(celery_task, task_id=1, video_language='ru', force_regenerate=True)
+        second_id, second_attached = enqueue_video_job(celery_task, task_id=1, video_language='ru')
+        other_id, other_attached = enqueue_video_job(celery_task, task_id=1, video_language='en')
+
+        self.assertEqual((second_id, second_attached), (first_id, True))
+        self.assertFalse(first_attached or other_attached)
+        self.assertNotEqual(other_id, first_id)
+        self.assertEqual(celery_task.apply_async.call_count, 2)
+        kwargs = celery_task.apply_async.call_args_list[0].kwargs
+        self.assertEqual(kwargs['task_id'], first_id)
+        self.assertEqual(kwargs['kwargs'], {'task_id': 1, 'video_language': 'ru', 'force_regenerate': True})
+
+    def test_queued_owner_takes_lease_and_others_wait(self):
+        celery_id, _ = enqueue_video_job(MagicMock(), task_id=2, video_language='ru')
+
+        duplicate = VideoJobLock(2, 'ru', owner='duplicate')
+        owner = VideoJobLock(2, 'ru', owner=celery_id)
+        self.assertFalse(duplicate.acquire())
+        self.assertTrue(owner.acquire())
+        self.addCleanup(owner.release)
+
+        self.assertEqual(find_inflight_video_job(2, 'ru')['state'], STATE_RUNNING)
+        self.assertFalse(duplicate.acquire())
+        self.assertEqual(duplicate.holder['owner'], celery_id)
+
+        duplicate.release()
+        self.assertIsNotNone(find_inflight_video_job(2, 'ru'))
+        owner.release()
+        self.assertIsNone(find_inflight_video_job(2, 'ru'))
+
+    def test_stale_lock_is_recovered(self):
+        crashed = VideoJobLock(3, 'en', owner='crashed-worker')
+        self.assertTrue(crashed.acquire())
+        crashed._stop_renewal()
+        marker = cache.get(video_job_key(3, 'en'))
+        marker['heartbeat'] = time.time() - 3600
+        cache.set(video_job_key(3, 'en'), marker, 60)
+
+        recovered = VideoJobLock(3, 'en', owner='new-worker')
+        self.assertTrue(recovered.acquire())
+        self.addCleanup(recovered.release)
+
+        self.assertFalse(crashed.renew())
+        self.assertTrue(crashed.lost)
+        self.assertEqual(cache.get(video_job_key(3, 'en'))['owner'], 'new-worker')
+
+    def test_requeue_keeps_key_for_retry(self):
+        lock = VideoJobLock(4, 'ru', owner='celery-id')
+        self.assertTrue(lock.acquire())
+        lock.requeue()
+
+        self.assertFalse(VideoJobLock(4, 'ru', owner='other').acquire())
+        retry = VideoJobLock(4, 'ru', owner='celery-id')
+        self.assertTrue(retry.acquire())
+        retry.release()
+
+    def test_discard_removes_only_own_queued_marker(self):
+        celery_id, _ = enqueue_video_job(MagicMock(), task_id=5, video_language='ru')
+
+        discard_queued_video_job(5, 'ru', 'other')
+        self.assertIsNotNone(find_inflight_video_job(5, 'ru'))
+        discard_queued_video_job(5, 'ru', celery_id)
+        self.assertIsNone(find_inflight_video_job(5, 'ru'))
+
+        running = VideoJobLock(5, 'ru', owner=celery_id)
+        self.assertTrue(running.acquire())
+        self.addCleanup(running.release)
+        discard_queued_video_job(5, 'ru', celery_id)
+        self.assertEqual(find_inflight_video_job(5, 'ru')['state'], STATE_RUNNING)
+
+    def test_early_exit_clears_queued_marker(self):
+        celery_id, _ = enqueue_video_job(MagicMock(), task_id=999999, video_language='ru')
+
+        # Задачи нет: генерация выходит, не взяв аренду
+        result = generate_video_for_task_async.apply(
+            kwargs={'task_id': 999999, 'task_question': 'q', 'topic_name': 'Python', 'video_language': 'ru'},
+            task_id=celery_id,
+        )
+
+        self.assertIsNone(result.result)
+        self.assertIsNone(find_inflight_video_job(999999, 'ru'))
+
+
+class RecordVideoResultTestCase(TestCase):
+    """
+    Результаты разных языков не затирают друг друга.
+    """
+
+    def test_merges_languages(self):
+        tenant = Tenant.objects.create(slug='video-jobs', name='Video Jobs', domain='video-jobs.example.com', site_name='Video Jobs')
+        topic = Topic.objects.create(name='Python', description='Python programming')
+        task = Task.objects.create(topic=topic, difficulty='easy', tenant=tenant,
+                                   video_generation_progress={'ru': False, 'en': False})
+        # Обе генерации загрузили задачу до записи результатов
+        stale_copy = Task.objects.get(pk=task.pk)
+
+        record_video_result(task.pk, 'ru', 'https://cdn.example.com/ru.mp4')
+        video_urls, progress = record_video_result(stale_copy.pk, 'en', 'https://cdn.example.com/en.mp4')
+
+        task.refresh_from_db()
+        self.assertEqual(task.video_urls, video_urls)
+        self.assertEqual(set(video_urls), {'ru', 'en'})
+        self.assertEqual(progress, {'ru': True, 'en': True})
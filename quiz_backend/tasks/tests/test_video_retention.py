@@ -0,0 +1,96 @@
+"""
+Тесты удаления старых видео из R2/S3 пачками.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.services.s3_service import get_s3_client, reset_s3_clients
+from tasks.services.video_retention_service import CHECKPOINT_KEY, _new_checkpoint, cleanup_old_videos
+from tasks.tests.support.fake_s3 import FakeS3Server
+from tenants.models import Tenant
+from topics.models import Topic
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'video-retention'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, VIDEO_RETENTION_DAYS=10, VIDEO_RETENTION_BATCH_SIZE=2)
+class CleanupOldVideosTestCase(TestCase):
+    """
+    Видео удаляются DeleteObjects на пачку задач, поля задач очищаются одним UPDATE.
+    """
+
+    def setUp(self):
+        self.server = FakeS3Server().start()
+        self.addCleanup(self.server.stop)
+        reset_s3_clients()
+        self.addCleanup(reset_s3_clients)
+        settings_override = override_settings(**self.server.settings())
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.delete(CHECKPOINT_KEY)
+
+        tenant = Tenant.objects.create(slug='retention', name='Retention', domain='retention.example.com', site_name='Retention')
+        self.topic = Topic.objects.create(name='Python', description='Python programming')
+        self.tenant = tenant
+
+    def make_task(self, days_old: int) -> Task:
+        task = Task.objects.create(topic=self.topic, difficulty='easy', tenant=self.tenant)
+        urls = {}
+        for language in ('ru', 'en'):
+            key = f'test/videos/task_{task.pk}_{language}.mp4'
+            get_s3_client().put_object(Bucket=self.server.bucket, Key=key, Body=b'video')
+            urls[language] = f'https://cdn.fake-s3.local/{key}'
+        created = timezone.now() - timedelta(days=days_old)
+        Task.objects.filter(pk=task.pk).update(
+            video_url=urls['ru'], video_urls=urls, video_generation_progress={'ru': True, 'en': True},
+            create_date=created, publish_date=created,
+        )
+        return task
+
+    def test_deletes_old_videos_in_batches(self):
+        old_tasks = [self.make_task(days_old=30) for _ in range(3)]
+        recent = self.make_task(days_old=1)
+        self.server.calls.clear()
+
+        summary = cleanup_old_videos()
+
+        self.assertEqual(self.server.calls['DeleteObjects'], 2)
+        self.assertEqual(self.server.calls['DeleteObject'], 0)
+        self.assertEqual(summary['tasks'], 3)
+        self.assertEqual(summary['tasks_cleared'], 3)
+        self.assertEqual(summary['objects_deleted'], 6)
+        self.assertEqual(summary['objects_failed'], 0)
+        self.assertEqual(summary['batches'], 2)
+        self.assertFalse(summary['resumed'])
+        for task in old_tasks:
+            task.refresh_from_db()
+            self.assertIsNone(task.video_url)
+            self.assertEqual(task.video_urls, {})
+            self.assertEqual(task.video_generation_progress, {})
+        recent.refresh_from_db()
+        self.assertEqual(set(recent.video_urls), {'ru', 'en'})
+        self.assertEqual(sorted(key for _, key in self.server.objects),
+                         sorted(f'test/videos/task_{recent.pk}_{lang}.mp4' for lang in ('ru', 'en')))
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        first, second = self.make_task(days_old=30), self.make_task(days_old=30)
+        # Прошлый запуск обработал первую задачу и упал
+        checkpoint = _new_checkpoint()
+        checkpoint.update(cursor=first.pk, tasks=1, tasks_cleared=1, objects=2, objects_deleted=2, batches=1)
+        cache.set(CHECKPOINT_KEY, checkpoint)
+
+        summary = cleanup_old_videos()
+
+        self.assertTrue(summary['resumed'])
+        self.assertEqual(summary['tasks'], 2)
+        self.assertEqual(summary['objects_deleted'], 4)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(set(first.video_urls), {'ru', 'en'})
+        self.assertEqual(second.video_urls, {})
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
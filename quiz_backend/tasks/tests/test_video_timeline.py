@@ -0,0 +1,143 @@
+"""
+Тесты сегментов видео и кодирования через ffmpeg.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from pygments.formatters.img import FontNotFound
+
+from tasks.services.code_typing_renderer import _get_video_code_formatter
+from tasks.services.ffmpeg_service import FfmpegFrameWriter, concat_videos, encode_still_frame, get_ffmpeg_binary
+from tasks.services.video_generation_service import generate_code_typing_video
+from tasks.services.video_chunking import encode_timeline_chunked
+from tasks.services.video_code_clip_cache import cleanup_expired_files
+from tasks.services.video_timeline import HoldSegment, TypingSegment, build_typing_timeline, timeline_frames
+
+
+def count_frames(path):
+    """Число кадров видео (декодированием через ffmpeg)."""
+    result = subprocess.run(
+        [get_ffmpeg_binary(), '-i', path, '-map', '0:v', '-f', 'null', '-'],
+        capture_output=True, text=True,
+    )
+    return int(re.findall(r'frame=\s*(\d+)', result.stderr)[-1])
+
+
+class TypingTimelineTestCase(SimpleTestCase):
+    """
+    Повторяющиеся кадры собираются в статичные сегменты.
+    """
+
+    def test_pause_becomes_single_hold(self):
+        segments = build_typing_timeline(total_chars=100, typing_frames=50, pause_frames=40)
+
+        self.assertIsInstance(segments[0], TypingSegment)
+        self.assertEqual(segments[-1], HoldSegment(visible_chars=100, frames=40 + 1))
+        self.assertEqual(timeline_frames(segments), 90)
+
+    def test_slow_typing_stalls_become_holds(self):
+        # 3 символа на 90 кадров: каждый символ держится ~30 кадров
+        segments = build_typing_timeline(total_chars=3, typing_frames=90, pause_frames=20)
+
+        self.assertTrue(all(isinstance(segment, HoldSegment) for segment in segments))
+        self.assertEqual([segment.visible_chars for segment in segments], [1, 2, 3])
+        self.assertEqual(timeline_frames(segments), 110)
+
+    def test_short_repeats_stay_in_typing_segment(self):
+        segments = build_typing_timeline(total_chars=40, typing_frames=80, pause_frames=0, min_hold_frames=5)
+
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0].frames, 80)
+
+
+class ClipCacheCleanupTestCase(SimpleTestCase):
+    def test_expired_clips_are_removed_but_locks_are_kept(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        for name in ('old.mp4', 'old.mp4.lock', 'fresh.mp4'):
+            open(os.path.join(cache_dir, name), 'w').close()
+        for name in ('old.mp4', 'old.mp4.lock'):
+            os.utime(os.path.join(cache_dir, name), (0, 0))
+
+        cleanup_expired_files(cache_dir, ttl=3600)
+        cleanup_expired_files(cache_dir, ttl=3600, suffixes=('.mp4', '.lock'))
+
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['fresh.mp4', 'old.mp4.lock'])
+
+
+class FfmpegServiceTestCase(TestCase):
+    """
+    Кадры из памяти и статичные кадры кодируются и склеиваются без промежуточных кадров на диске.
+    """
+
+    def setUp(self):
+        if not os.path.exists(get_ffmpeg_binary()) and not shutil.which(get_ffmpeg_binary()):
+            self.skipTest('ffmpeg не найден')
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+
+    def test_writes_and_concatenates_parts(self):
+        typing_path = os.path.join(self.temp_dir, 'typing.mp4')
+        with FfmpegFrameWriter(typing_path, 64, 64, 24, preset='ultrafast') as writer:
+            for shade in range(0, 240, 10):
+                writer.write(Image.new('RGB', (64, 64), (shade, 0, 0)).tobytes())
+        hold_path = os.path.join(self.temp_dir, 'hold.mp4')
+        encode_still_frame(Image.new('RGB', (64, 64), 'blue'), 36, hold_path, 24, preset='ultrafast')
+
+        output_path = os.path.join(self.temp_dir, 'out.mp4')
+        concat_videos([typing_path, hold_path], output_path)
+
+        self.assertEqual(writer.frames_written, 24)
+        self.assertEqual(count_frames(output_path), 60)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['hold.mp4', 'out.mp4', 'typing.mp4'])
+
+    def test_rejects_wrong_frame_size(self):
+        with self.assertRaises(ValueError):
+            with FfmpegFrameWriter(os.path.join(self.temp_dir, 'out.mp4'), 64, 64, 24) as writer:
+                writer.write(b'\0' * 10)
+
+    def skip_without_fonts(self):
+        try:
+            _get_video_code_formatter(55)
+        except (FontNotFound, OSError):
+            self.skipTest('Моноширинный шрифт для Pygments не найден')
+
+    @override_settings(MAX_VIDEO_DURATION=2, VIDEO_WIDTH=540, VIDEO_HEIGHT=960)
+    @patch('tasks.services.video_generation_service._get_keyboard_audio_path', return_value=None)
+    @patch('tasks.services.video_generation_service._get_background_audio_path', return_value=None)
+    def test_typing_video_has_every_frame_and_no_leftovers(self, *mocks):
+        self.skip_without_fonts()
+
+        with override_settings(VIDEO_CODE_CLIP_CACHE_DIR=os.path.join(self.temp_dir, 'clips')):
+            video_path = generate_code_typing_video("print('ok')", 'python')
+
+        self.assertTrue(video_path and os.path.exists(video_path))
+        self.addCleanup(shutil.rmtree, os.path.dirname(video_path), True)
+        self.assertEqual(os.listdir(os.path.dirname(video_path)), ['output.mp4'])
+        # Печать и пауза округляются до целых кадров по отдельности
+        self.assertAlmostEqual(count_frames(video_path), 2 * 24, delta=1)
+
+    @override_settings(MAX_VIDEO_DURATION=2, VIDEO_WIDTH=540, VIDEO_HEIGHT=960)
+    @patch('tasks.services.video_generation_service._get_keyboard_audio_path', return_value=None)
+    @patch('tasks.services.video_generation_service._get_background_audio_path', return_value=None)
+    def test_language_variants_share_code_clip(self, *mocks):
+        self.skip_without_fonts()
+
+        with override_settings(VIDEO_CODE_CLIP_CACHE_DIR=os.path.join(self.temp_dir, 'clips')), \
+                patch('tasks.services.video_code_clip_cache.encode_timeline_chunked', wraps=encode_timeline_chunked) as encode:
+            ru_path = generate_code_typing_video("print('ok')", 'python', question_text='Что выведет код?')
+            en_path = generate_code_typing_video("print('ok')", 'python', question_text='What will it print?')
+            other_code_path = generate_code_typing_video("print('другой')", 'python', question_text='Что выведет код?')
+
+        for path in (ru_path, en_path, other_code_path):
+            self.assertTrue(path and os.path.exists(path))
+            self.addCleanup(shutil.rmtree, os.path.dirname(path), True)
+        self.assertEqual(encode.call_count, 2)
+        self.assertEqual(len([name for name in os.listdir(os.path.join(self.temp_dir, 'clips')) if name.endswith('.mp4')]), 2)
+        self.assertAlmostEqual(count_frames(en_path), 2 * 24, delta=1)
@@ -0,0 +1,119 @@
+"""
+Тесты параллельной отправки вебхуков и circuit breaker.
+"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from webhooks.models import Webhook
+from webhooks.services import send_webhooks_for_task
+
+
+class FakeSession:
+    """
+    Сессия requests, которая отвечает по URL и считает одновременные запросы.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.bodies = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.bodies.append((url, json.loads(data)))
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return SimpleNamespace(status_code=self.statuses.get(url, 200), text='')
+
+
+@override_settings(
+    WEBHOOK_MAX_CONCURRENT=3,
+    WEBHOOK_RETRIES=2,
+    WEBHOOK_RETRY_DELAY=0,
+    WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=2,
+    WEBHOOK_CIRCUIT_COOLDOWN=60,
+)
+class WebhookDispatchTestCase(TestCase):
+    """
+    Payload строится один раз, отправка ограничена WEBHOOK_MAX_CONCURRENT,
+    сбойный вебхук приостанавливается, а не деактивируется.
+    """
+
+    def setUp(self):
+        for index in range(6):
+            Webhook.objects.create(url=f'https://hooks.example.com/{index}', service_name=f'hook {index}')
+        Webhook.objects.create(url='https://hooks.example.com/ru', webhook_type='russian_only')
+        Webhook.objects.create(url='https://hooks.example.com/en', webhook_type='english_only')
+        self.task = SimpleNamespace(id=1, video_urls={'ru': 'https://cdn.example.com/ru.mp4'})
+        self.payload = {
+            'type': 'quiz_published_full',
+            'id': 'payload-id',
+            'timestamp': '2026-01-01T00:00:00',
+            'task': {'id': 1},
+            'translations': [{'language': 'ru'}, {'language': 'en'}],
+        }
+
+    def _send(self, session):
+        with patch('webhooks.services._get_session', return_value=session), \
+                patch('webhooks.services.create_full_webhook_data', return_value=self.payload) as build:
+            result = send_webhooks_for_task(self.task)
+        self.assertEqual(build.call_count, 1)
+        return result
+
+    def test_payload_is_built_once_and_sent_concurrently(self):
+        session = FakeSession({})
+
+        result = self._send(session)
+
+        self.assertEqual(result['total'], 8)
+        self.assertEqual(result['success'], 8)
+        self.assertEqual(session.max_active, 3)
+        bodies = dict(session.bodies)
+        self.assertEqual(bodies['https://hooks.example.com/ru']['translations'], [{'language': 'ru'}])
+        self.assertEqual(bodies['https://hooks.example.com/ru']['task']['video_url'], 'https://cdn.example.com/ru.mp4')
+        self.assertEqual(bodies['https://hooks.example.com/en']['type'], 'quiz_published_english_only')
+        webhook = Webhook.objects.get(url='https://hooks.example.com/0')
+        self.assertEqual(webhook.successful_deliveries, 1)
+        self.assertGreaterEqual(webhook.last_latency_ms, 50)
+
+    def test_failing_webhook_trips_circuit_instead_of_deactivation(self):
+        broken_url = 'https://hooks.example.com/1'
+        session = FakeSession({broken_url: 503})
+
+        self._send(session)
+        broken = Webhook.objects.get(url=broken_url)
+        self.assertTrue(broken.is_active)
+        self.assertEqual(broken.consecutive_failures, 1)
+        self.assertIsNone(broken.circuit_open_until)
+        # 503 повторяется с backoff
+        self.assertEqual([url for url, _ in session.bodies].count(broken_url), 2)
+
+        self._send(session)
+        broken.refresh_from_db()
+        self.assertEqual(broken.consecutive_failures, 2)
+        self.assertTrue(broken.is_circuit_open)
+
+        # Пока circuit открыт, вебхук пропускается без запросов
+        session = FakeSession({})
+        result = self._send(session)
+        self.assertEqual(result['skipped'], 1)
+        self.assertNotIn(broken_url, [url for url, _ in session.bodies])
+
+        # После паузы первая успешная доставка закрывает circuit
+        Webhook.objects.filter(pk=broken.pk).update(circuit_open_until=timezone.now())
+        result = self._send(session)
+        self.assertEqual(result['success'], 8)
+        broken.refresh_from_db()
+        self.assertEqual(broken.consecutive_failures, 0)
+        self.assertIsNone(broken.circuit_open_until)
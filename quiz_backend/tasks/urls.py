@@ -40,6 +40,11 @@ urlpatterns = [
     # Комментарии (через роутер)
     path('', include(router.urls)),
     
+    # Количество комментариев для списка переводов (пачкой для мини-аппа)
+    path('comments/counts/',
+         TaskCommentViewSet.as_view({'get': 'bulk_comments_count'}),
+         name='comment-counts'),
+    
     # Отдельный endpoint для получения комментария по ID для deep link
     # Используем ViewSet напрямую через as_view
     path('comments/<int:pk>/detail-for-deeplink/', 
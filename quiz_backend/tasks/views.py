@@ -7,7 +7,8 @@ from django.shortcuts import get_object_or_404
 from django.db.models import F
 from django.db import transaction
 
-from .models import Task, TaskStatistics
+from .models import Task, TaskStatistics, UserDailyActivity
+from .services.image_variant_service import image_srcset
 from topics.models import Subtopic
 from tenants.mixins import TenantFilteredViewMixin
 from .serializers import (
@@ -71,6 +72,7 @@ class TaskSkipView(APIView):
         )
         stats.attempts += 1
         stats.save()
+        UserDailyActivity.record(request.user, successful=False)
         return Response({'status': 'skipped'})
 
 class NextTaskView(APIView):
@@ -195,6 +197,7 @@ def tasks_by_subtopic(request, subtopic_id):
                     'subtopic_id': task.subtopic.id,
                     'difficulty': task.difficulty,
                     'image_url': task.image_url,
+                    'image_srcset': image_srcset(task.image_variants, task.image_url),
                     'question': translation.question,
                     'answers': shuffled_answers,
                     'correct_answer': translation.correct_answer,
@@ -221,7 +224,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Task, TaskTranslation, MiniAppTaskStatistics
+from .models import Task, TaskTranslation, MiniAppTaskStatistics, UserDailyActivity
 from accounts.models import MiniAppUser
 
 logger = logging.getLogger(__name__)
@@ -354,6 +357,11 @@ def submit_mini_app_task_answer(request, task_id):
             selected_answer=selected_answer
         )
         logger.info(f"submit_mini_app_task_answer: Создана запись MiniAppTaskStatistics (ID: {stats.id}) для пользователя {telegram_id}, задачи {task_id}. Попыток: {stats.attempts}, Успешно: {stats.successful}")
+        # Серии и дневные графики профиля читаются из UserDailyActivity. Ответ учитывается
+        # только здесь и один раз на translation_group: копии статистики для переводов ниже
+        # и слияние статистики при связывании аккаунтов его не добавляют
+        if mini_app_user.linked_custom_user_id:
+            UserDailyActivity.record(mini_app_user.linked_custom_user, successful=is_correct)
         
         # Синхронизируем статистику для всех задач с тем же translation_group_id
         # Используем транзакцию для атомарности
@@ -9,6 +9,7 @@ from rest_framework.response import Response
 from django.db import models
 from django.db.models import Count, Q
 from tasks.models import TaskTranslation, MiniAppTaskStatistics
+from tasks.services.image_variant_service import image_srcset
 from tenants.mixins import TenantFilteredViewMixin
 import logging
 
@@ -486,6 +487,7 @@ def subtopic_detail_simple(request, subtopic_id):
                     'subtopic_id': task.subtopic.id,
                     'difficulty': task.difficulty,
                     'image_url': task.image_url,
+                    'image_srcset': image_srcset(task.image_variants, task.image_url),
                     'question': translation.question,
                     'answers': answers,
                     'correct_answer': translation.correct_answer,
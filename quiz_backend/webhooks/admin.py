@@ -45,12 +45,15 @@ class WebhookForm(forms.ModelForm):
 
 @admin.register(Webhook)
 class WebhookAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
-    list_display = ('id', 'url_link', 'service_name', 'webhook_type', 'platforms_display', 'is_active', 'created_at', 'updated_at')
+    list_display = ('id', 'url_link', 'service_name', 'webhook_type', 'platforms_display', 'is_active', 'delivery_status', 'latency_display', 'created_at', 'updated_at')
     list_filter = ('is_active', 'webhook_type', 'service_name')
     search_fields = ('url', 'service_name')
     ordering = ('-created_at',)
-    actions = ['activate_webhooks', 'deactivate_webhooks']
-    readonly_fields = ('created_at', 'updated_at')
+    actions = ['activate_webhooks', 'deactivate_webhooks', 'reset_circuit']
+    readonly_fields = (
+        'created_at', 'updated_at', 'consecutive_failures', 'circuit_open_until', 'last_delivery_at',
+        'last_success_at', 'last_latency_ms', 'successful_deliveries', 'total_latency_ms', 'last_error'
+    )
     
     fieldsets = (
         ('Основная информация', {
@@ -60,6 +63,13 @@ class WebhookAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
             'fields': ('target_platforms',),
             'description': 'Выберите платформы для этого webhook. Пример: ["instagram", "tiktok", "youtube_shorts"]'
         }),
+        ('Доставка', {
+            'fields': (
+                'consecutive_failures', 'circuit_open_until', 'last_delivery_at', 'last_success_at',
+                'last_latency_ms', 'successful_deliveries', 'total_latency_ms', 'last_error'
+            ),
+            'classes': ('collapse',)
+        }),
         ('Системная информация', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -99,6 +109,38 @@ class WebhookAdmin(TenantFilteredAdminMixin, admin.ModelAdmin):
 
     deactivate_webhooks.short_description = "Деактивировать выбранные вебхуки"
 
+    def delivery_status(self, obj):
+        """Состояние доставки: работает, есть ошибки или приостановлен circuit breaker."""
+        if obj.is_circuit_open:
+            return format_html(
+                '<span style="color: #dc3545;" title="{}">🔌 Пауза до {}</span>',
+                obj.last_error, obj.circuit_open_until.strftime('%d.%m %H:%M')
+            )
+        if obj.consecutive_failures:
+            return format_html(
+                '<span style="color: #ffc107;" title="{}">⚠️ Ошибок подряд: {}</span>',
+                obj.last_error, obj.consecutive_failures
+            )
+        return '✅'
+
+    delivery_status.short_description = 'Доставка'
+
+    def latency_display(self, obj):
+        """Последняя и средняя длительность доставки."""
+        if obj.last_latency_ms is None:
+            return '—'
+        average = obj.average_latency_ms
+        return f"{obj.last_latency_ms} мс (ср. {average} мс)" if average is not None else f"{obj.last_latency_ms} мс"
+
+    latency_display.short_description = 'Задержка'
+
+    def reset_circuit(self, request, queryset):
+        """Снимает паузу circuit breaker, следующая публикация отправится сразу."""
+        updated = queryset.update(consecutive_failures=0, circuit_open_until=None)
+        self.message_user(request, f"Пауза снята для {updated} вебхуков.")
+
+    reset_circuit.short_description = "Снять паузу после ошибок"
+
     form = WebhookForm
 
     def save_model(self, request, obj, form, change):
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.11 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("webhooks", "0004_mainfallbacklink_tenant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhook",
+            name="circuit_open_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="До этого момента отправки на вебхук пропускаются (circuit breaker)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="consecutive_failures",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Неудачных доставок подряд (сбрасывается после успешной)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="last_delivery_at",
+            field=models.DateTimeField(
+                blank=True, help_text="Время последней попытки доставки", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="last_error",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Последняя ошибка доставки",
+                max_length=500,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="last_latency_ms",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Длительность последней доставки, мс (включая повторы)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="last_success_at",
+            field=models.DateTimeField(
+                blank=True, help_text="Время последней успешной доставки", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="successful_deliveries",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Количество успешных доставок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="webhook",
+            name="total_latency_ms",
+            field=models.BigIntegerField(
+                default=0, help_text="Суммарная длительность успешных доставок, мс"
+            ),
+        ),
+    ]
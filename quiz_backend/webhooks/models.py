@@ -61,6 +61,56 @@ class Webhook(models.Model):
         auto_now=True,
         help_text='Дата последнего обновления'
     )
+    consecutive_failures = models.PositiveIntegerField(
+        default=0,
+        help_text='Неудачных доставок подряд (сбрасывается после успешной)'
+    )
+    circuit_open_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='До этого момента отправки на вебхук пропускаются (circuit breaker)'
+    )
+    last_delivery_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Время последней попытки доставки'
+    )
+    last_success_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Время последней успешной доставки'
+    )
+    last_latency_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Длительность последней доставки, мс (включая повторы)'
+    )
+    successful_deliveries = models.PositiveIntegerField(
+        default=0,
+        help_text='Количество успешных доставок'
+    )
+    total_latency_ms = models.BigIntegerField(
+        default=0,
+        help_text='Суммарная длительность успешных доставок, мс'
+    )
+    last_error = models.CharField(
+        max_length=500,
+        blank=True,
+        default='',
+        help_text='Последняя ошибка доставки'
+    )
+
+    @property
+    def is_circuit_open(self):
+        """Отправки временно приостановлены после серии ошибок."""
+        return bool(self.circuit_open_until and self.circuit_open_until > timezone.now())
+
+    @property
+    def average_latency_ms(self):
+        """Средняя длительность успешной доставки, мс."""
+        if not self.successful_deliveries:
+            return None
+        return round(self.total_latency_ms / self.successful_deliveries)
 
     def clean(self):
         """Резервная проверка: добавляет https://, если протокол отсутствует."""
@@ -1,14 +1,22 @@
+import json
 import logging
+import os
+import threading
 import time
 import uuid
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
 from platforms.models import TelegramGroup
 from accounts.models import CustomUser
 from tasks.models import Task
-from tasks.services.webhook_service import create_full_webhook_data, create_bulk_webhook_data, create_russian_only_webhook_data, create_english_only_webhook_data
+from tasks.services.webhook_service import _language_task_payload, build_full_webhook_data, create_full_webhook_data, create_bulk_webhook_data, create_russian_only_webhook_data, create_english_only_webhook_data
 
 from webhooks.models import Webhook
 
@@ -90,10 +98,30 @@ class TelegramWebhookHandler:
         return response.status_code == 200 
 
 
-WEBHOOK_TIMEOUT = getattr(settings, "WEBHOOK_TIMEOUT", 15)  # Уменьшен таймаут
-WEBHOOK_RETRIES = getattr(settings, "WEBHOOK_RETRIES", 2)  # Уменьшено количество повторных попыток
-WEBHOOK_RETRY_DELAY = getattr(settings, "WEBHOOK_RETRY_DELAY", 1)  # Уменьшена задержка
-WEBHOOK_MAX_CONCURRENT = getattr(settings, "WEBHOOK_MAX_CONCURRENT", 3)  # Максимум одновременных запросов
+def _webhook_setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+_session_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+
+def _get_session() -> requests.Session:
+    """
+    Общая для процесса сессия с пулом keep-alive соединений.
+    После fork (воркеры Celery/gunicorn) создаётся заново.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            pool_size = max(1, _webhook_setting('WEBHOOK_MAX_CONCURRENT', 3))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _session_pid = session, os.getpid()
+        return _session
 
 
 def _build_headers(payload: Dict[str, Any]) -> Dict[str, str]:
@@ -107,22 +135,32 @@ def _build_headers(payload: Dict[str, Any]) -> Dict[str, str]:
     }
 
 
-def send_task_published_webhook(webhook_url: str, data: Dict[str, Any]) -> bool:
+def _encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Сериализует payload один раз для всех получателей (как json= в requests)."""
+    return json.dumps(payload, allow_nan=False).encode('utf-8')
+
+
+def _deliver(webhook_url: str, payload: Dict[str, Any], body: bytes) -> Dict[str, Any]:
     """
-    Отправляет один вебхук с повтором при ошибках.
+    Отправляет готовое тело вебхука с повторами и экспоненциальной задержкой.
 
-    Возвращает True только если получен успешный HTTP-ответ.
+    Returns:
+        dict: success, status_code, latency_ms, error
     """
-    headers = _build_headers(data)
-    for attempt in range(1, WEBHOOK_RETRIES + 1):
+    retries = max(1, _webhook_setting('WEBHOOK_RETRIES', 2))
+    retry_delay = _webhook_setting('WEBHOOK_RETRY_DELAY', 1)
+    timeout = _webhook_setting('WEBHOOK_TIMEOUT', 15)
+    headers = _build_headers(payload)
+    session = _get_session()
+    status_code = None
+    error = ''
+    started = time.monotonic()
+
+    for attempt in range(1, retries + 1):
         try:
-            logger.info("Попытка %s/%s отправки вебхука на %s", attempt, WEBHOOK_RETRIES, webhook_url)
-            response = requests.post(
-                webhook_url,
-                json=data,
-                headers=headers,
-                timeout=WEBHOOK_TIMEOUT
-            )
+            logger.info("Попытка %s/%s отправки вебхука на %s", attempt, retries, webhook_url)
+            response = session.post(webhook_url, data=body, headers=headers, timeout=timeout)
+            status_code = response.status_code
 
             logger.info(
                 "Вебхук %s: статус=%s, тело=%s",
@@ -133,30 +171,151 @@ def send_task_published_webhook(webhook_url: str, data: Dict[str, Any]) -> bool:
 
             if response.status_code in {200, 201, 202, 204}:
                 logger.info("✅ Вебхук отправлен: %s", webhook_url)
-                return True
+                return {
+                    'success': True,
+                    'status_code': status_code,
+                    'latency_ms': int((time.monotonic() - started) * 1000),
+                    'error': '',
+                }
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            # 4xx (кроме 408/429) повтором не исправить
+            if 400 <= response.status_code < 500 and response.status_code not in {408, 429}:
+                break
         except requests.RequestException as exc:
+            error = str(exc)
             logger.warning("⚠️ Ошибка при попытке %s отправки на %s: %s", attempt, webhook_url, exc)
 
-        if attempt < WEBHOOK_RETRIES:
-            delay = WEBHOOK_RETRY_DELAY * attempt
+        if attempt < retries:
+            delay = retry_delay * (2 ** (attempt - 1))
             logger.info("⏳ Ожидание %s секунд перед повторной попыткой", delay)
             time.sleep(delay)
 
     logger.error("❌ Все попытки отправки вебхука на %s провалились", webhook_url)
-    return False
+    return {
+        'success': False,
+        'status_code': status_code,
+        'latency_ms': int((time.monotonic() - started) * 1000),
+        'error': error[:500],
+    }
 
 
-def send_webhooks_for_task(task: "Task") -> Dict[str, Any]:
+def send_task_published_webhook(webhook_url: str, data: Dict[str, Any]) -> bool:
     """
-    Формирует данные задачи и отправляет их на все активные вебхуки.
-    Для вебхуков типа 'russian_only' отправляет только русские данные.
+    Отправляет один вебхук с повтором при ошибках.
+
+    Возвращает True только если получен успешный HTTP-ответ.
     """
-    # Группируем вебхуки по типу
-    webhooks = list(Webhook.objects.filter(is_active=True))
-    if not webhooks:
-        logger.info("Нет активных вебхуков для задачи %s", task.id)
-        return {"total": 0, "success": 0, "failed": 0, "details": []}
+    return _deliver(webhook_url, data, _encode_payload(data))['success']
+
+
+def _record_delivery(webhook: Webhook, outcome: Dict[str, Any]):
+    """
+    Сохраняет задержку и состояние circuit breaker вебхука.
+
+    После WEBHOOK_CIRCUIT_FAILURE_THRESHOLD неудач подряд вебхук пропускается
+    на WEBHOOK_CIRCUIT_COOLDOWN секунд, каждая следующая неудача удваивает паузу
+    (не больше WEBHOOK_CIRCUIT_MAX_COOLDOWN). Первая успешная доставка после
+    паузы закрывает circuit. is_active меняется только вручную.
+    """
+    now = timezone.now()
+    updates = {
+        'last_delivery_at': now,
+        'last_latency_ms': outcome['latency_ms'],
+    }
+    if outcome['success']:
+        updates.update(
+            consecutive_failures=0,
+            circuit_open_until=None,
+            last_success_at=now,
+            last_error='',
+            successful_deliveries=F('successful_deliveries') + 1,
+            total_latency_ms=F('total_latency_ms') + outcome['latency_ms'],
+        )
+    else:
+        failures = webhook.consecutive_failures + 1
+        threshold = _webhook_setting('WEBHOOK_CIRCUIT_FAILURE_THRESHOLD', 3)
+        updates.update(
+            consecutive_failures=F('consecutive_failures') + 1,
+            last_error=outcome['error'],
+        )
+        if failures >= threshold:
+            cooldown = min(
+                _webhook_setting('WEBHOOK_CIRCUIT_COOLDOWN', 60) * 2 ** (failures - threshold),
+                _webhook_setting('WEBHOOK_CIRCUIT_MAX_COOLDOWN', 3600),
+            )
+            updates['circuit_open_until'] = now + timedelta(seconds=cooldown)
+            logger.warning(
+                f"🔌 Вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) "
+                f"приостановлен на {cooldown} с после {failures} неудач подряд"
+            )
+    try:
+        Webhook.objects.filter(pk=webhook.pk).update(**updates)
+    except Exception as e:
+        logger.error(f"❌ Ошибка при сохранении статистики вебхука {webhook.url}: {e}")
+
+
+def dispatch_webhooks(jobs: List[Tuple[Webhook, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Доставляет payload'ы на вебхуки параллельно (не больше
+    WEBHOOK_MAX_CONCURRENT одновременно) через общий пул соединений.
+    Вебхуки с открытым circuit пропускаются.
 
+    Args:
+        jobs: Пары (вебхук, payload); один payload может быть у нескольких вебхуков
+
+    Returns:
+        dict: total, success, failed, skipped, details
+    """
+    encoded = {}
+    deliverable = []
+    results: List[Dict[str, Any]] = []
+
+    for webhook, payload in jobs:
+        detail = {
+            "url": webhook.url,
+            "service": webhook.service_name or "Неизвестный сервис",
+            "type": webhook.webhook_type,
+            "success": False,
+            "skipped": False,
+            "latency_ms": None,
+        }
+        results.append(detail)
+        if webhook.is_circuit_open:
+            detail["skipped"] = True
+            logger.info(
+                "🔌 Вебхук %s пропущен до %s после серии ошибок", webhook.url, webhook.circuit_open_until
+            )
+            continue
+        # Тело сериализуется один раз на payload, а не на каждый вебхук
+        if id(payload) not in encoded:
+            encoded[id(payload)] = _encode_payload(payload)
+        deliverable.append((webhook, payload, encoded[id(payload)], detail))
+
+    if deliverable:
+        max_workers = max(1, min(_webhook_setting('WEBHOOK_MAX_CONCURRENT', 3), len(deliverable)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(
+                lambda job: _deliver(job[0].url, job[1], job[2]), deliverable
+            ))
+        # Запись в БД — из основного потока
+        for (webhook, _payload, _body, detail), outcome in zip(deliverable, outcomes):
+            detail["success"] = outcome['success']
+            detail["latency_ms"] = outcome['latency_ms']
+            _record_delivery(webhook, outcome)
+
+    success_count = sum(1 for detail in results if detail["success"])
+    skipped_count = sum(1 for detail in results if detail["skipped"])
+    return {
+        "total": len(results),
+        "success": success_count,
+        "failed": len(results) - success_count,
+        "skipped": skipped_count,
+        "details": results,
+    }
+
+
+def _group_webhooks(webhooks: List[Webhook]) -> Tuple[List[Webhook], List[Webhook], List[Webhook]]:
+    """Делит вебхуки на обычные, русскоязычные и англоязычные."""
     regular_webhooks = []
     russian_only_webhooks = []
     english_only_webhooks = []
@@ -168,106 +327,49 @@ def send_webhooks_for_task(task: "Task") -> Dict[str, Any]:
             english_only_webhooks.append(webhook)
         else:
             regular_webhooks.append(webhook)
+    return regular_webhooks, russian_only_webhooks, english_only_webhooks
 
-    results: List[Dict[str, Any]] = []
-    success_count = 0
 
-    # Отправка на обычные вебхуки
-    if regular_webhooks:
-        payload = create_full_webhook_data(task)
-        for webhook in regular_webhooks:
-            success = send_task_published_webhook(webhook.url, payload)
-            results.append({
-                "url": webhook.url,
-                "service": webhook.service_name or "Неизвестный сервис",
-                "type": webhook.webhook_type,
-                "success": success,
-            })
-            if success:
-                success_count += 1
-            else:
-                # 🛑 Автоматическая деактивация при неудаче
-                try:
-                    webhook.is_active = False
-                    webhook.save(update_fields=['is_active'])
-                    logger.warning(f"🛑 Вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                except Exception as e:
-                    logger.error(f"❌ Ошибка при деактивации вебхука {webhook.url}: {e}")
-
-    # Отправка на русскоязычные вебхуки
-    if russian_only_webhooks:
-        # Создаем payload только с русскими данными
-        full_payload = create_full_webhook_data(task)
-        russian_translations = [trans for trans in full_payload.get("translations", []) if trans.get("language") == "ru"]
-
-        if russian_translations:  # Отправляем только если есть русский перевод
-            russian_payload = full_payload.copy()
-            russian_payload["type"] = "quiz_published_russian_only"
-            russian_payload["translations"] = russian_translations
-
-            for webhook in russian_only_webhooks:
-                success = send_task_published_webhook(webhook.url, russian_payload)
-                results.append({
-                    "url": webhook.url,
-                    "service": webhook.service_name or "Неизвестный сервис",
-                    "type": webhook.webhook_type,
-                    "success": success,
-                })
-                if success:
-                    success_count += 1
-                else:
-                    # 🛑 Автоматическая деактивация при неудаче
-                    try:
-                        webhook.is_active = False
-                        webhook.save(update_fields=['is_active'])
-                        logger.warning(f"🛑 Русскоязычный вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка при деактивации русскоязычного вебхука {webhook.url}: {e}")
-
-    # Отправка на англоязычные вебхуки
-    if english_only_webhooks:
-        # Создаем payload только с английскими данными
-        full_payload = create_full_webhook_data(task)
-        english_translations = [trans for trans in full_payload.get("translations", []) if trans.get("language") == "en"]
-
-        if english_translations:  # Отправляем только если есть английский перевод
-            english_payload = full_payload.copy()
-            english_payload["type"] = "quiz_published_english_only"
-            english_payload["translations"] = english_translations
-
-            for webhook in english_only_webhooks:
-                success = send_task_published_webhook(webhook.url, english_payload)
-                results.append({
-                    "url": webhook.url,
-                    "service": webhook.service_name or "Неизвестный сервис",
-                    "type": webhook.webhook_type,
-                    "success": success,
-                })
-                if success:
-                    success_count += 1
-                else:
-                    # 🛑 Автоматическая деактивация при неудаче
-                    try:
-                        webhook.is_active = False
-                        webhook.save(update_fields=['is_active'])
-                        logger.warning(f"🛑 Англоязычный вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка при деактивации англоязычного вебхука {webhook.url}: {e}")
-
-    failed_count = len(results) - success_count
+def _language_payload(task: "Task", full_payload: Dict[str, Any], language: str, payload_type: str) -> Optional[Dict[str, Any]]:
+    """Payload задачи только с переводом и видео на language или None, если перевода нет."""
+    language_payload = _language_task_payload(task, full_payload, language)
+    if not language_payload:
+        return None
+    return {**full_payload, **language_payload, "type": payload_type}
+
+
+def send_webhooks_for_task(task: "Task") -> Dict[str, Any]:
+    """
+    Формирует данные задачи и отправляет их на все активные вебхуки.
+    Для вебхуков типа 'russian_only' отправляет только русские данные.
+    Payload задачи строится один раз, языковые варианты — его копии.
+    """
+    webhooks = list(Webhook.objects.filter(is_active=True))
+    if not webhooks:
+        logger.info("Нет активных вебхуков для задачи %s", task.id)
+        return {"total": 0, "success": 0, "failed": 0, "skipped": 0, "details": []}
+
+    regular_webhooks, russian_only_webhooks, english_only_webhooks = _group_webhooks(webhooks)
+    full_payload = create_full_webhook_data(task)
+    jobs = [(webhook, full_payload) for webhook in regular_webhooks]
+
+    # Отправляем языковые вебхуки только если есть нужный перевод
+    russian_payload = _language_payload(task, full_payload, "ru", "quiz_published_russian_only")
+    if russian_payload:
+        jobs.extend((webhook, russian_payload) for webhook in russian_only_webhooks)
+    english_payload = _language_payload(task, full_payload, "en", "quiz_published_english_only")
+    if english_payload:
+        jobs.extend((webhook, english_payload) for webhook in english_only_webhooks)
+
+    result = dispatch_webhooks(jobs)
     logger.info(
-        "Вебхуки: отправлено=%s, неудачных=%s, всего=%s",
-        success_count,
-        failed_count,
-        len(results),
+        "Вебхуки: отправлено=%s, неудачных=%s, пропущено=%s, всего=%s",
+        result["success"],
+        result["failed"],
+        result["skipped"],
+        result["total"],
     )
-
-    return {
-        "total": len(results),
-        "success": success_count,
-        "failed": failed_count,
-        "details": results,
-    }
+    return result
 
 
 def send_webhooks_for_bulk_tasks(tasks: List["Task"], include_video: bool = False) -> Dict[str, Any]:
@@ -281,116 +383,46 @@ def send_webhooks_for_bulk_tasks(tasks: List["Task"], include_video: bool = Fals
     """
     if not tasks:
         logger.info("Нет опубликованных задач для отправки сводного вебхука.")
-        return {"total": 0, "success": 0, "failed": 0, "details": []}
+        return {"total": 0, "success": 0, "failed": 0, "skipped": 0, "details": []}
 
     webhooks = list(Webhook.objects.filter(is_active=True))
     if not webhooks:
         logger.info("Нет активных вебхуков для сводной отправки")
-        return {"total": 0, "success": 0, "failed": 0, "details": []}
+        return {"total": 0, "success": 0, "failed": 0, "skipped": 0, "details": []}
 
-    # Группируем вебхуки по типу
-    regular_webhooks = []
-    russian_only_webhooks = []
-    english_only_webhooks = []
+    regular_webhooks, russian_only_webhooks, english_only_webhooks = _group_webhooks(webhooks)
+    # Полные данные каждой задачи считаются один раз для всех вариантов payload
+    full_data = build_full_webhook_data(tasks)
+    jobs = []
 
-    for webhook in webhooks:
-        if webhook.webhook_type == 'russian_only':
-            russian_only_webhooks.append(webhook)
-        elif webhook.webhook_type == 'english_only':
-            english_only_webhooks.append(webhook)
-        else:
-            regular_webhooks.append(webhook)
-
-    results: List[Dict[str, Any]] = []
-    success_count = 0
-
-    # Отправка на обычные вебхуки
     if regular_webhooks:
-        payload = create_bulk_webhook_data(tasks, include_video=include_video)
-        for webhook in regular_webhooks:
-            success = send_task_published_webhook(webhook.url, payload)
-            results.append({
-                "url": webhook.url,
-                "service": webhook.service_name or "Неизвестный сервис",
-                "type": webhook.webhook_type,
-                "success": success,
-            })
-            if success:
-                success_count += 1
-            else:
-                # 🛑 Автоматическая деактивация при неудаче
-                try:
-                    webhook.is_active = False
-                    webhook.save(update_fields=['is_active'])
-                    logger.warning(f"🛑 Вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                except Exception as e:
-                    logger.error(f"❌ Ошибка при деактивации вебхука {webhook.url}: {e}")
-
-    # Отправка на русскоязычные вебхуки
+        payload = create_bulk_webhook_data(tasks, include_video=include_video, full_data=full_data)
+        jobs.extend((webhook, payload) for webhook in regular_webhooks)
+
     if russian_only_webhooks:
-        russian_payload = create_russian_only_webhook_data(tasks)
+        russian_payload = create_russian_only_webhook_data(tasks, full_data=full_data)
         published_tasks_count = len(russian_payload.get("published_tasks", []))
         logger.info(f"🇷🇺 Русские вебхуки: {len(russian_only_webhooks)} вебхуков, {published_tasks_count} задач для отправки")
         if russian_payload.get("published_tasks"):  # Отправляем только если есть задачи с русским переводом
-            for webhook in russian_only_webhooks:
-                success = send_task_published_webhook(webhook.url, russian_payload)
-                results.append({
-                    "url": webhook.url,
-                    "service": webhook.service_name or "Неизвестный сервис",
-                    "type": webhook.webhook_type,
-                    "success": success,
-                })
-                if success:
-                    success_count += 1
-                else:
-                    # 🛑 Автоматическая деактивация при неудаче
-                    try:
-                        webhook.is_active = False
-                        webhook.save(update_fields=['is_active'])
-                        logger.warning(f"🛑 Русскоязычный вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка при деактивации русскоязычного вебхука {webhook.url}: {e}")
+            jobs.extend((webhook, russian_payload) for webhook in russian_only_webhooks)
         else:
             logger.info("🇷🇺 Русские вебхуки: пропущены - нет задач с русским переводом")
 
-    # Отправка на англоязычные вебхуки
     if english_only_webhooks:
-        english_payload = create_english_only_webhook_data(tasks)
+        english_payload = create_english_only_webhook_data(tasks, full_data=full_data)
         published_tasks_count = len(english_payload.get("published_tasks", []))
         logger.info(f"🇺🇸 Английские вебхуки: {len(english_only_webhooks)} вебхуков, {published_tasks_count} задач для отправки")
         if english_payload.get("published_tasks"):  # Отправляем только если есть задачи с английским переводом
-            for webhook in english_only_webhooks:
-                success = send_task_published_webhook(webhook.url, english_payload)
-                results.append({
-                    "url": webhook.url,
-                    "service": webhook.service_name or "Неизвестный сервис",
-                    "type": webhook.webhook_type,
-                    "success": success,
-                })
-                if success:
-                    success_count += 1
-                else:
-                    # 🛑 Автоматическая деактивация при неудаче
-                    try:
-                        webhook.is_active = False
-                        webhook.save(update_fields=['is_active'])
-                        logger.warning(f"🛑 Англоязычный вебхук '{webhook.service_name or 'Неизвестный'}' ({webhook.url}) деактивирован после неудачной отправки")
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка при деактивации англоязычного вебхука {webhook.url}: {e}")
+            jobs.extend((webhook, english_payload) for webhook in english_only_webhooks)
         else:
             logger.info("🇺🇸 Английские вебхуки: пропущены - нет задач с английским переводом")
 
-    failed_count = len(results) - success_count
+    result = dispatch_webhooks(jobs)
     logger.info(
-        "Сводные вебхуки: отправлено=%s, неудачных=%s, всего=%s",
-        success_count,
-        failed_count,
-        len(results),
+        "Сводные вебхуки: отправлено=%s, неудачных=%s, пропущено=%s, всего=%s",
+        result["success"],
+        result["failed"],
+        result["skipped"],
+        result["total"],
     )
-
-    return {
-        "total": len(results),
-        "success": success_count,
-        "failed": failed_count,
-        "details": results,
-    }
\ No newline at end of file
+    return result